@@ -74,7 +74,6 @@ import traceback
 from io import open
 
 from twisted.internet import reactor  # @UnresolvedImport
-from twisted.internet.task import LoopingCall  #@UnresolvedImport
 from twisted.internet.defer import Deferred, fail  #@UnresolvedImport
 
 #------------------------------------------------------------------------------
@@ -99,6 +98,7 @@ _Counter = 0  # : Increment by one for every new object, the idea is to keep uni
 _Index = {}  # : Index dictionary, unique id (string) to index (int)
 _Objects = {}  # : Objects dictionary to store all state machines objects
 _StateChangedCallback = None  # : Called when some state were changed
+_TimerWheel = None  # : Shared scheduler for timers of all state machines
 
 #------------------------------------------------------------------------------
 
@@ -122,6 +122,8 @@ def shutdown():
     _Index.clear()
     _Objects.clear()
     _Counter = 0
+    if _TimerWheel is not None:
+        _TimerWheel.clear()
 
 
 #------------------------------------------------------------------------------
@@ -341,6 +343,231 @@ def SetGlobalLogTransitions(value=False):
 #------------------------------------------------------------------------------
 
 
+def timer_wheel():
+    """
+    Returns shared ``TimerWheel`` object which drives timers of all state machines.
+    """
+    global _TimerWheel
+    if _TimerWheel is None:
+        _TimerWheel = TimerWheel()
+    return _TimerWheel
+
+
+def timers_stats():
+    """
+    Returns a dictionary with number of currently running timers per state machine class name.
+    """
+    return timer_wheel().stats()
+
+
+class _Timer(object):
+
+    __slots__ = ('callback', 'args', 'owner', 'interval', 'expires', 'level', 'slot', 'running')
+
+    def __init__(self, callback, args, owner, interval):
+        self.callback = callback
+        self.args = args
+        self.owner = owner
+        self.interval = interval
+        self.expires = 0
+        self.level = None
+        self.slot = None
+        self.running = False
+
+    def __repr__(self):
+        return '_Timer(%s, %r, %d)' % (self.owner, self.args, self.interval)
+
+
+class TimerWheel(object):
+
+    """
+    Hierarchical timing wheel, all periodic timers of state machines are scheduled here.
+
+    Time is measured in ticks, level 0 has one slot for every tick and every next level has
+    ``slots`` times wider slots covering the whole span of the previous level.
+    When the wheel reaches a slot of the upper level its timers are moved down to lower levels.
+    Only one reactor delayed call is active at any moment and it is scheduled to the nearest
+    non-empty slot, so idle machines do not create any load on the reactor.
+    """
+
+    def __init__(self, tick=0.01, slots=256, levels=4, clock=None):
+        self.clock = clock or reactor
+        self.tick = tick
+        self.slots = slots
+        self.levels = levels
+        self.wheels = [[set() for _ in range(slots)] for _ in range(levels)]
+        self.sizes = [0]*levels
+        self.spans = [slots**level for level in range(levels + 1)]
+        self.counters = {}
+        self.current = 0
+        self.started = None
+        self.delayed_call = None
+
+    def clear(self):
+        for wheel in self.wheels:
+            for slot in wheel:
+                for t in slot:
+                    t.running = False
+                slot.clear()
+        self.sizes = [0]*self.levels
+        self.counters.clear()
+        self.current = 0
+        self.started = None
+        if self.delayed_call and self.delayed_call.active():
+            self.delayed_call.cancel()
+        self.delayed_call = None
+
+    def stats(self):
+        return dict(self.counters)
+
+    def size(self):
+        return sum(self.sizes)
+
+    def arm(self, callback, args=(), interval=1.0, owner=None):
+        """
+        Start periodic timer to call ``callback(*args)`` every ``interval`` seconds.
+        Returns an object which can be passed to ``disarm()`` later.
+        """
+        if self.started is None:
+            self.started = self.clock.seconds()
+            self.current = 0
+        if not self.size():
+            self.current = self._now_tick()
+        t = _Timer(callback, args, owner, max(1, int(round(interval/self.tick))))
+        t.expires = self._now_tick() + t.interval
+        t.running = True
+        self.counters[owner] = self.counters.get(owner, 0) + 1
+        self._place(t)
+        if self.delayed_call and self.delayed_call.active():
+            if self.delayed_call.getTime() <= self.started + t.expires*self.tick:
+                return t
+        self._reschedule()
+        return t
+
+    def disarm(self, t):
+        """
+        Stop given timer, that is a cheap operation and reactor is only touched when the last timer is stopped.
+        """
+        if not t.running:
+            return False
+        t.running = False
+        self._remove(t)
+        self.counters[t.owner] -= 1
+        if not self.counters[t.owner]:
+            self.counters.pop(t.owner)
+        if not self.size() and self.delayed_call and self.delayed_call.active():
+            self.delayed_call.cancel()
+            self.delayed_call = None
+        return True
+
+    def _now_tick(self):
+        return max(self.current, int((self.clock.seconds() - self.started)/self.tick + 0.01))
+
+    def _place(self, t, cascade=False):
+        # during cascading timer can be moved into the current slot which is about to be processed
+        expires = max(t.expires, self.current if cascade else self.current + 1)
+        delta = expires - self.current
+        level = 0
+        while level < self.levels - 1 and delta >= self.spans[level + 1]:
+            level += 1
+        expires = min(expires, self.current + self.spans[level + 1] - 1)
+        t.level = level
+        t.slot = (expires//self.spans[level]) % self.slots
+        self.wheels[level][t.slot].add(t)
+        self.sizes[level] += 1
+
+    def _remove(self, t):
+        if t.level is None:
+            return
+        self.wheels[t.level][t.slot].discard(t)
+        self.sizes[t.level] -= 1
+        t.level = None
+        t.slot = None
+
+    def _cascade(self, tick):
+        for level in range(1, self.levels):
+            if tick % self.spans[level]:
+                break
+            slot = self.wheels[level][(tick//self.spans[level]) % self.slots]
+            moved = list(slot)
+            slot.clear()
+            self.sizes[level] -= len(moved)
+            for t in moved:
+                t.level = None
+                self._place(t, cascade=True)
+
+    def _next_tick(self):
+        """
+        Find the nearest tick when wheel must be processed: the first non-empty slot on level 0
+        or the moment when the first non-empty upper level must be moved down.
+        """
+        result = None
+        for level in range(self.levels):
+            if not self.sizes[level]:
+                continue
+            span = self.spans[level]
+            for pos in range(self.current//span + 1, self.current//span + self.slots + 1):
+                if self.wheels[level][pos % self.slots]:
+                    if result is None or pos*span < result:
+                        result = pos*span
+                    break
+        return result
+
+    def _advance(self, target):
+        while self.current < target:
+            tick = self._next_tick()
+            if tick is None or tick > target:
+                self.current = target
+                break
+            self.current = tick
+            self._cascade(tick)
+            slot = self.wheels[0][tick % self.slots]
+            if not slot:
+                continue
+            expired = []
+            for t in list(slot):
+                self._remove(t)
+                if t.expires <= tick:
+                    # after a stall missed periods are coalesced into one call, same as LoopingCall does
+                    t.expires = tick + t.interval
+                    if t.expires <= target:
+                        t.expires = target + t.interval
+                    expired.append(t)
+                self._place(t)
+            for t in expired:
+                # timer can be stopped by another callback
+                if t.running:
+                    try:
+                        t.callback(*t.args)
+                    except:
+                        traceback.print_exc()
+
+    def _reschedule(self):
+        if not self.size():
+            if self.delayed_call and self.delayed_call.active():
+                self.delayed_call.cancel()
+            self.delayed_call = None
+            return
+        tick = self._next_tick()
+        if tick is None:
+            return
+        # wake up a bit earlier to not depend on floating point errors
+        when = self.started + (tick - 0.005)*self.tick
+        if self.delayed_call and self.delayed_call.active():
+            if abs(self.delayed_call.getTime() - when) < self.tick/2.0:
+                return
+            self.delayed_call.cancel()
+        self.delayed_call = self.clock.callLater(max(0, when - self.clock.seconds()), self._on_tick)
+
+    def _on_tick(self):
+        self.delayed_call = None
+        self._advance(self._now_tick())
+        self._reschedule()
+
+
+#------------------------------------------------------------------------------
+
+
 class Automat(object):
 
     """
@@ -627,20 +854,25 @@ class Automat(object):
         """
         Stop all state machine timers.
         """
+        wheel = timer_wheel()
         for name, timer in self._timers.items():  # @UnusedVariable
-            if timer.running:
-                timer.stop()
+            wheel.disarm(timer)
         self._timers.clear()
 
     def startTimers(self):
         """
         Start all state machine timers.
+
+        Timers are not using separate reactor calls, but all of them are driven by shared ``timer_wheel()``.
         """
+        wheel = timer_wheel()
+        owner = self.__class__.__name__
         for name, (interval, states) in self.timers.items():
             if len(states) > 0 and self.state not in states:
                 continue
-            self._timers[name] = LoopingCall(self.timerEvent, name, interval)
-            self._timers[name].start(interval, self.instant_timers)
+            self._timers[name] = wheel.arm(self.timerEvent, (name, interval), interval, owner=owner)
+            if self.instant_timers:
+                self.timerEvent(name, interval)
 
     def restartTimers(self):
         """
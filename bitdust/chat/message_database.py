@@ -27,6 +27,12 @@
 ..
 
 module:: message_database
+
+Stores history of all chat messages and conversations in a local SQLite database.
+
+New messages and conversation updates are not written immediately: they are collected in a write-behind queue
+and stored all together in a single transaction on the next reactor iteration.
+All read operations flush the queue first, so they always see the latest state.
 """
 
 #------------------------------------------------------------------------------
@@ -45,6 +51,8 @@ import os
 import json
 import sqlite3
 
+from collections import OrderedDict
+
 #------------------------------------------------------------------------------
 
 if __name__ == '__main__':
@@ -54,6 +62,10 @@ if __name__ == '__main__':
 
 #------------------------------------------------------------------------------
 
+from twisted.internet import reactor  # @UnresolvedImport
+
+#------------------------------------------------------------------------------
+
 from bitdust.logs import lg
 
 from bitdust.lib import utime
@@ -74,8 +86,30 @@ from bitdust.userid import my_id
 
 #------------------------------------------------------------------------------
 
+FLUSH_DELAY = 0
+FLUSH_RETRY_DELAY = 0.5
+FLUSH_RETRY_MAX_ATTEMPTS = 6
+
+#------------------------------------------------------------------------------
+
 _HistoryDB = None
 _HistoryCursor = None
+_PendingMessages = []
+_PendingConversations = OrderedDict()
+_FlushTask = None
+_FlushRetryAttempts = 0
+
+_InsertMessageSQL = '''INSERT INTO history (
+    sender_local_key_id,
+    sender_id,
+    recipient_local_key_id,
+    recipient_id,
+    direction,
+    payload_type,
+    payload_time,
+    payload_message_id,
+    payload_body
+) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)'''
 
 #------------------------------------------------------------------------------
 
@@ -130,6 +164,8 @@ def init(filepath=None):
         )
         _HistoryCursor.execute('CREATE INDEX "sender local key id" on history(sender_local_key_id)')
         _HistoryCursor.execute('CREATE INDEX "recipient local key id" on history(recipient_local_key_id)')
+        _HistoryCursor.execute('CREATE INDEX "payload time" on history(payload_time)')
+        _HistoryCursor.execute('CREATE INDEX "payload message id" on history(payload_message_id)')
 
         _HistoryCursor.execute(
             '''CREATE TABLE IF NOT EXISTS "conversations" (
@@ -155,6 +191,12 @@ def init(filepath=None):
     _HistoryDB = sqlite3.connect(filepath, timeout=1)
     _HistoryDB.text_factory = str
     _HistoryDB.execute('PRAGMA case_sensitive_like = 1;')
+    # in WAL mode commit does not need to sync the database file, data is still safe if the process crashed
+    _HistoryDB.execute('PRAGMA journal_mode = WAL;')
+    _HistoryDB.execute('PRAGMA synchronous = NORMAL;')
+    # indexes were not created in older versions of the database file
+    _HistoryDB.execute('CREATE INDEX IF NOT EXISTS "payload time" on history(payload_time)')
+    _HistoryDB.execute('CREATE INDEX IF NOT EXISTS "payload message id" on history(payload_message_id)')
     _HistoryDB.commit()
     _HistoryCursor = _HistoryDB.cursor()
 
@@ -167,6 +209,7 @@ def shutdown():
     if _Debug:
         lg.dbg(_DebugLevel, '')
 
+    flush()
     _HistoryDB.commit()
     _HistoryDB.close()
     _HistoryDB = None
@@ -189,6 +232,131 @@ def cur(instance='current'):
 #------------------------------------------------------------------------------
 
 
+def flush():
+    """
+    Writes all queued messages and conversation updates to the database in a single transaction.
+    If the transaction failed rows are written one by one, so only the failed rows are reported and lost,
+    rows failed because the database is locked or busy are queued again and retried with an increasing delay.
+    Returns number of stored messages.
+    """
+    global _FlushTask
+    global _FlushRetryAttempts
+    if _FlushTask:
+        if _FlushTask.active():
+            _FlushTask.cancel()
+        _FlushTask = None
+    if not _PendingMessages and not _PendingConversations:
+        return 0
+    messages = list(_PendingMessages)
+    conversations = list(_PendingConversations.items())
+    del _PendingMessages[:]
+    _PendingConversations.clear()
+    try:
+        if messages:
+            cur().executemany(_InsertMessageSQL, messages)
+        for conversation_id, conversation in conversations:
+            _store_conversation(conversation_id, conversation)
+        db().commit()
+    except sqlite3.Error as exc:
+        db().rollback()
+        lg.warn('failed to store %d messages and %d conversations in one transaction, will try one by one: %r' % (len(messages), len(conversations), exc))
+        return _flush_one_by_one(messages, conversations)
+    _FlushRetryAttempts = 0
+    if _Debug:
+        lg.args(_DebugLevel, messages=len(messages), conversations=len(conversations))
+    return len(messages)
+
+
+def _flush_one_by_one(messages, conversations):
+    global _FlushRetryAttempts
+    stored = 0
+    retry_messages = []
+    retry_conversations = []
+    for message in messages:
+        try:
+            cur().execute(_InsertMessageSQL, message)
+            db().commit()
+            stored += 1
+        except sqlite3.Error as exc:
+            db().rollback()
+            if _is_temporary_error(exc):
+                retry_messages.append(message)
+            else:
+                lg.err('failed to store message %r : %r' % (message, exc))
+    for conversation_id, conversation in conversations:
+        try:
+            _store_conversation(conversation_id, conversation)
+            db().commit()
+        except sqlite3.Error as exc:
+            db().rollback()
+            if _is_temporary_error(exc):
+                retry_conversations.append((conversation_id, conversation))
+            elif conversation['new']:
+                # row could be already created before, try to only update it
+                lg.warn('failed to insert conversation %r, will try to update it: %r' % (conversation_id, exc))
+                try:
+                    _store_conversation(conversation_id, dict(conversation, new=False))
+                    db().commit()
+                except sqlite3.Error as exc:
+                    db().rollback()
+                    lg.err('failed to store conversation %r : %r' % (conversation_id, exc))
+            else:
+                lg.err('failed to store conversation %r : %r' % (conversation_id, exc))
+    if retry_messages or retry_conversations:
+        _FlushRetryAttempts += 1
+        if _FlushRetryAttempts >= FLUSH_RETRY_MAX_ATTEMPTS:
+            lg.err('database is still locked after %d attempts, %d messages and %d conversations were not stored' % (_FlushRetryAttempts, len(retry_messages), len(retry_conversations)))
+            _FlushRetryAttempts = 0
+        else:
+            lg.warn('database is locked, %d messages and %d conversations will be stored again later' % (len(retry_messages), len(retry_conversations)))
+            _PendingMessages.extend(retry_messages)
+            _PendingConversations.update(retry_conversations)
+            _schedule_flush(delay=FLUSH_RETRY_DELAY*(2**(_FlushRetryAttempts - 1)))
+    else:
+        _FlushRetryAttempts = 0
+    if _Debug:
+        lg.args(_DebugLevel, messages=len(messages), conversations=len(conversations), stored=stored, retry_messages=len(retry_messages), retry_conversations=len(retry_conversations))
+    return stored
+
+
+def _is_temporary_error(exc):
+    """
+    Only "database is locked" and "database is busy" errors are expected to go away by themselves.
+    """
+    if not isinstance(exc, sqlite3.OperationalError):
+        return False
+    err = str(exc).lower()
+    return err.count('locked') > 0 or err.count('busy') > 0
+
+
+def _store_conversation(conversation_id, conversation):
+    if conversation['new']:
+        cur().execute(
+            'INSERT INTO conversations (conversation_id, payload_type, started_time, last_updated_time, last_message_id) VALUES (?, ?, ?, ?, ?)',
+            [conversation_id, conversation['payload_type'], conversation['started_time'], conversation['last_updated_time'], conversation['last_message_id']],
+        )
+    else:
+        cur().execute(
+            'UPDATE conversations SET last_updated_time=?, last_message_id=? WHERE conversation_id=?',
+            [conversation['last_updated_time'], conversation['last_message_id'], conversation_id],
+        )
+
+
+def _on_flush_task():
+    global _FlushTask
+    _FlushTask = None
+    flush()
+
+
+def _schedule_flush(delay=FLUSH_DELAY):
+    global _FlushTask
+    if not _FlushTask:
+        _FlushTask = reactor.callLater(delay, _on_flush_task)  # @UndefinedVariable
+
+
+#------------------------------------------------------------------------------
+
+
 def adapt_json(data):
     return (json.dumps(data, sort_keys=True)).encode()
 
@@ -348,30 +516,18 @@ def insert_message(data, message_id, message_time=None, sender=None, recipient=N
     if sender_local_key_id is None or recipient_local_key_id is None:
         lg.err('failed to store message because local_key_id is not found, sender=%r recipient=%r' % (sender_local_key_id, recipient_local_key_id))
         return None
-    cur().execute(
-        '''INSERT INTO history (
-            sender_local_key_id,
-            sender_id,
-            recipient_local_key_id,
-            recipient_id,
-            direction,
-            payload_type,
-            payload_time,
-            payload_message_id,
-            payload_body
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)''', (
-            sender_local_key_id,
-            sender,
-            recipient_local_key_id,
-            recipient,
-            0 if direction == 'in' else 1,
-            payload_type,
-            payload_time,
-            payload_message_id,
-            data,
-        )
-    )
-    db().commit()
+    _PendingMessages.append((
+        sender_local_key_id,
+        sender,
+        recipient_local_key_id,
+        recipient,
+        0 if direction == 'in' else 1,
+        payload_type,
+        payload_time,
+        payload_message_id,
+        data,
+    ))
+    _schedule_flush()
     conversation_id = update_conversation(sender_local_key_id, recipient_local_key_id, payload_type, payload_time, payload_message_id)
     snap_id = '{}/{}'.format(conversation_id, payload_message_id)
     message_json = build_json_message(
@@ -393,31 +549,26 @@ def update_conversation(sender_local_key_id, recipient_local_key_id, payload_typ
     if conversation_id is None:
         lg.err('failed to update conversation, local_key_id was not found')
         return None
-    sql = 'SELECT * FROM conversations WHERE conversation_id=?'
-    params = [
-        conversation_id,
-    ]
-    found_conversation = list(cur().execute(sql, params))
-    if found_conversation:
-        sql = 'UPDATE conversations SET last_updated_time=?, last_message_id=? WHERE conversation_id=?'
-        params = [
-            payload_time,
-            payload_message_id,
-            conversation_id,
-        ]
+    conversation = _PendingConversations.get(conversation_id)
+    if conversation is not None:
+        found_conversation = True
     else:
-        sql = 'INSERT INTO conversations (conversation_id, payload_type, started_time, last_updated_time, last_message_id) VALUES (?, ?, ?, ?, ?)'
+        sql = 'SELECT * FROM conversations WHERE conversation_id=?'
         params = [
             conversation_id,
-            payload_type,
-            payload_time,
-            payload_time,
-            payload_message_id,
         ]
+        found_conversation = bool(list(cur().execute(sql, params)))
+        conversation = {
+            'new': not found_conversation,
+            'payload_type': payload_type,
+            'started_time': payload_time,
+        }
+        _PendingConversations[conversation_id] = conversation
+    conversation['last_updated_time'] = payload_time
+    conversation['last_message_id'] = payload_message_id
+    _schedule_flush()
     if _Debug:
-        lg.args(_DebugLevel, conversation_id=conversation_id, found_conversation=len(found_conversation), params=params)
-    cur().execute(sql, params)
-    db().commit()
+        lg.args(_DebugLevel, conversation_id=conversation_id, found_conversation=found_conversation, conversation=conversation)
     if not found_conversation:
         snapshot = build_json_conversation(
             conversation_id=conversation_id,
@@ -431,6 +582,7 @@ def update_conversation(sender_local_key_id, recipient_local_key_id, payload_typ
 
 
 def query_messages(sender_id=None, recipient_id=None, bidirectional=True, order_by_id=True, order_by_time=False, message_types=[], sequence_head=None, sequence_tail=None, offset=None, limit=None, raw_results=False):
+    flush()
     sql = 'SELECT * FROM history'
     q = ''
     params = []
@@ -537,6 +689,7 @@ def query_messages(sender_id=None, recipient_id=None, bidirectional=True, order_
 
 
 def list_conversations(order_by_time=True, message_types=[], offset=None, limit=None):
+    flush()
     sql = 'SELECT * FROM conversations'
     q = ''
     params = []
@@ -577,6 +730,7 @@ def list_conversations(order_by_time=True, message_types=[], offset=None, limit=
 
 
 def update_history_with_new_local_key_id(old_id, new_id):
+    flush()
     sql = 'UPDATE history SET sender_local_key_id=? WHERE sender_local_key_id=?'
     params = [
         new_id,
@@ -598,6 +752,7 @@ def update_history_with_new_local_key_id(old_id, new_id):
 
 
 def update_conversations_with_new_local_key_id(old_id, new_id):
+    flush()
     sql = 'SELECT * FROM conversations'
     params = []
     modifications = {}
@@ -629,6 +784,7 @@ def update_conversations_with_new_local_key_id(old_id, new_id):
 
 
 def rebuild_conversations():
+    flush()
     cur().execute('SELECT count(name) FROM sqlite_master WHERE type="table" AND name="conversations"')
     if cur().fetchone()[0]:
         return
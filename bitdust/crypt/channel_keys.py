@@ -0,0 +1,287 @@
+#!/usr/bin/env python
+# channel_keys.py
+#
+# Copyright (C) 2008 Veselin Penev, https://bitdust.io
+#
+# This file (channel_keys.py) is part of BitDust Software.
+#
+# BitDust is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# BitDust Software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with BitDust Software.  If not, see <http://www.gnu.org/licenses/>.
+#
+# Please contact us if you have any questions at bitdust.io@gmail.com
+"""
+.. module:: channel_keys.
+
+Symmetric keys shared between two nodes to protect a long running channel, for example a route
+between ``proxy_router()`` and ``proxy_receiver()``.
+
+The channel secret is created by one side and delivered to the other side encrypted with RSA only once.
+Every packet in the channel is encrypted with AES and authenticated with HMAC-SHA256 instead of RSA signature.
+Keys are rotated periodically: the secret is never used directly, but keys for every "epoch"
+are derived from it, so both sides can switch to the next keys without any extra messages.
+
+Packets authenticated with a channel key carry key ID in the form "channel:<channel ID>:<epoch>"
+in the ``KeyID`` field of ``signed.Packet()``.
+Incoming packets are only accepted when the channel was registered with ``register_channel()``
+for the same creator.
+"""
+
+#------------------------------------------------------------------------------
+
+from __future__ import absolute_import
+from __future__ import print_function
+
+#------------------------------------------------------------------------------
+
+_Debug = False
+_DebugLevel = 10
+
+#------------------------------------------------------------------------------
+
+import os
+import hmac
+import time
+import hashlib
+
+#------------------------------------------------------------------------------
+
+from bitdust.logs import lg
+
+from bitdust.lib import strng
+
+from bitdust.crypt import key
+
+from bitdust.userid import id_url
+
+#------------------------------------------------------------------------------
+
+SECRET_SIZE = 32
+SESSION_KEY_SIZE = 16
+EPOCH_LIFETIME = 60*60
+
+_KeyIDPrefix = 'channel:'
+
+#------------------------------------------------------------------------------
+
+_Channels = {}
+
+#------------------------------------------------------------------------------
+
+
+def shutdown():
+    _Channels.clear()
+
+
+#------------------------------------------------------------------------------
+
+
+def new_secret():
+    return os.urandom(SECRET_SIZE)
+
+
+def new_channel_id():
+    return strng.to_text(os.urandom(8).hex())
+
+
+def make_reverse_channel_id(channel_id):
+    """
+    Packets sent back to the node which created the secret use another channel ID,
+    so the same secret can be registered on both sides for different creators.
+    """
+    return '%s-r' % strng.to_text(channel_id)
+
+
+def current_epoch(started):
+    return int((time.time() - started)/EPOCH_LIFETIME)
+
+
+def is_valid_epoch(channel, epoch):
+    """
+    Only keys of the current epoch of the channel and the neighbour epochs are accepted,
+    so both sides can switch to the next keys at slightly different moments.
+    """
+    return abs(epoch - current_epoch(channel['started'])) <= 1
+
+
+def make_key_id(channel_id, epoch):
+    return '%s%s:%d' % (_KeyIDPrefix, channel_id, epoch)
+
+
+def split_key_id(key_id):
+    """
+    Returns tuple (channel_id, epoch) or (None, None) if given key ID is not a channel key.
+    """
+    key_id = strng.to_text(key_id or '')
+    if not key_id.startswith(_KeyIDPrefix):
+        return None, None
+    channel_id, _, epoch = key_id[len(_KeyIDPrefix):].rpartition(':')
+    if not channel_id or not epoch.isdigit():
+        return None, None
+    return channel_id, int(epoch)
+
+
+def is_channel_key_id(key_id):
+    return strng.to_text(key_id or '').startswith(_KeyIDPrefix)
+
+
+def derive_keys(secret, epoch):
+    """
+    Returns tuple (session_key, auth_key) for given epoch, session key is used to encrypt data with AES
+    and auth key is used to calculate HMAC-SHA256.
+    """
+    session_key = hmac.new(secret, b'encrypt:%d' % epoch, hashlib.sha256).digest()[:SESSION_KEY_SIZE]
+    auth_key = hmac.new(secret, b'authenticate:%d' % epoch, hashlib.sha256).digest()
+    return session_key, auth_key
+
+
+#------------------------------------------------------------------------------
+
+
+def register_channel(channel_id, creator_idurl, secret, started=None):
+    """
+    Remember secret of the channel, so incoming packets from ``creator_idurl`` can be verified and decrypted.
+    Epochs of the channel are counted from ``started`` moment, by default from now.
+    """
+    _Channels[strng.to_text(channel_id)] = {
+        'creator': id_url.field(creator_idurl),
+        'secret': secret,
+        'started': time.time() if started is None else started,
+    }
+    if _Debug:
+        lg.args(_DebugLevel, channel_id=channel_id, creator=creator_idurl)
+
+
+def unregister_channel(channel_id):
+    return _Channels.pop(strng.to_text(channel_id), None) is not None
+
+
+def is_registered(channel_id):
+    return strng.to_text(channel_id) in _Channels
+
+
+def get_channel(channel_id):
+    return _Channels.get(strng.to_text(channel_id))
+
+
+#------------------------------------------------------------------------------
+
+
+def make_auth_code(auth_key, inp):
+    return hmac.new(auth_key, strng.to_bin(inp), hashlib.sha256).digest()
+
+
+def verify_auth_code(key_id, creator_idurl, inp, auth_code):
+    """
+    Check HMAC of the incoming packet, channel must be registered and belong to the packet creator.
+    """
+    channel_id, epoch = split_key_id(key_id)
+    channel = _Channels.get(channel_id) if channel_id else None
+    if not channel:
+        lg.warn('unknown channel key %r' % key_id)
+        return False
+    if not id_url.is_the_same(channel['creator'], creator_idurl):
+        lg.warn('channel key %r does not belong to %r' % (key_id, creator_idurl))
+        return False
+    if not is_valid_epoch(channel, epoch):
+        lg.warn('channel key %r is expired or not valid yet' % key_id)
+        return False
+    _, auth_key = derive_keys(channel['secret'], epoch)
+    return hmac.compare_digest(make_auth_code(auth_key, inp), strng.to_bin(auth_code or b''))
+
+
+def encrypt(secret, epoch, inp):
+    session_key, _ = derive_keys(secret, epoch)
+    return key.EncryptWithSessionKey(session_key, inp, session_key_type=key.SessionKeyType(), binary=True)
+
+
+def decrypt(key_id, inp):
+    """
+    Decrypt data of the incoming packet, channel must be registered. Returns None if channel is not known
+    or the epoch of the key is not valid anymore.
+    """
+    channel_id, epoch = split_key_id(key_id)
+    channel = _Channels.get(channel_id) if channel_id else None
+    if not channel:
+        return None
+    if not is_valid_epoch(channel, epoch):
+        return None
+    session_key, _ = derive_keys(channel['secret'], epoch)
+    return key.DecryptWithSessionKey(session_key, inp, session_key_type=key.SessionKeyType())
+
+
+#------------------------------------------------------------------------------
+
+
+def SpeedTest():
+    """
+    Compare how many packets per second can be relayed with RSA protected blocks and with channel keys.
+    """
+    import time
+    from bitdust.crypt import signed
+    from bitdust.crypt import encrypted
+    from bitdust.userid import my_id
+    dataSZ = 1024*4
+    loops = 200
+    data = os.urandom(dataSZ)
+    publickey = my_id.getLocalIdentity().getPublicKey()
+    dt = time.time()
+    for i in range(loops):
+        block = encrypted.Block(
+            CreatorID=my_id.getIDURL(),
+            BackupID='routed incoming data',
+            BlockNumber=0,
+            SessionKey=key.NewSessionKey(session_key_type=key.SessionKeyType()),
+            SessionKeyType=key.SessionKeyType(),
+            LastBlock=True,
+            Data=data,
+            EncryptKey=lambda inp: key.EncryptOpenSSHPublicKey(publickey, inp),
+        )
+        signed.Packet('Relay', my_id.getIDURL(), my_id.getIDURL(), 'packet%d' % i, block.Serialize(), my_id.getIDURL()).Serialize()
+    rsa_rate = loops/(time.time() - dt)
+    print('RSA blocks: %d packets of %d bytes, %.1f packets/sec' % (loops, dataSZ, rsa_rate))
+    channel_id = new_channel_id()
+    secret = new_secret()
+    register_channel(channel_id, my_id.getIDURL(), secret)
+    dt = time.time()
+    for i in range(loops):
+        _, auth_key = derive_keys(secret, 0)
+        p = signed.Packet(
+            'Relay',
+            my_id.getIDURL(),
+            my_id.getIDURL(),
+            'packet%d' % i,
+            encrypt(secret, 0, data),
+            my_id.getIDURL(),
+            KeyID=make_key_id(channel_id, 0),
+            AuthKey=auth_key,
+        )
+        p.Serialize()
+    channel_rate = loops/(time.time() - dt)
+    print('channel keys: %d packets of %d bytes, %.1f packets/sec' % (loops, dataSZ, channel_rate))
+    unregister_channel(channel_id)
+    return rsa_rate, channel_rate
+
+
+#------------------------------------------------------------------------------
+
+if __name__ == '__main__':
+    from bitdust.system import bpio
+    from bitdust.main import settings
+    from bitdust.userid import my_id
+    bpio.init()
+    lg.set_debug_level(18)
+    settings.init()
+    key.InitMyKey()
+    my_id.loadLocalIdentity()
+    SpeedTest()
+    settings.shutdown()
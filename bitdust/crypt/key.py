@@ -48,6 +48,9 @@ import os
 import sys
 import gc
 import tempfile
+import threading
+
+from collections import OrderedDict
 
 #------------------------------------------------------------------------------
 
@@ -62,6 +65,8 @@ from bitdust.logs import lg
 from bitdust.system import bpio
 from bitdust.system import local_fs
 
+from bitdust.lib import strng
+
 from bitdust.main import settings
 
 from bitdust.crypt import rsa_key
@@ -72,6 +77,13 @@ from bitdust.crypt import cipher
 
 _MyKeyObject = None
 
+# parsed public keys are kept in memory, so every signature verification does not need to parse key again
+_PublicKeysCache = OrderedDict()
+_PublicKeysCacheMaxSize = 1000
+_PublicKeysCacheHits = 0
+_PublicKeysCacheMisses = 0
+_PublicKeysCacheLock = threading.Lock()
+
 #------------------------------------------------------------------------------
 
 
@@ -247,8 +259,7 @@ def VerifySignature(pubkeystring, hashcode, signature):
 
     Return True if signature is correct, otherwise False.
     """
-    pub_key = rsa_key.RSAKey()
-    pub_key.fromString(pubkeystring)
+    pub_key = PublicKeyObject(pubkeystring)
     result = pub_key.verify(signature, hashcode, context='crypt.key.VerifySignature')
     return result
 
@@ -316,13 +327,16 @@ def NewSessionKey(session_key_type):
 #------------------------------------------------------------------------------
 
 
-def EncryptWithSessionKey(session_key, inp, session_key_type):
+def EncryptWithSessionKey(session_key, inp, session_key_type, binary=False):
     """
     Encrypt input string with Session Key.
 
     :param session_key: randomly generated session key
     :param inp: input string to encrypt
+    :param binary: build a binary envelope instead of JSON, see ``cipher.encrypt_binary()``
     """
+    if binary:
+        return cipher.encrypt_binary(inp, session_key, session_key_type)
     ret = cipher.encrypt_json(inp, session_key, session_key_type)
     return ret
 
@@ -335,19 +349,75 @@ def DecryptWithSessionKey(session_key, inp, session_key_type):
         here it must be already decrypted
     :param inp: input string to decrypt
     """
-    ret = cipher.decrypt_json(inp, session_key, session_key_type)
+    ret = cipher.decrypt_any(inp, session_key, session_key_type)
     return ret
 
 
 #------------------------------------------------------------------------------
 
 
-def EncryptOpenSSHPublicKey(pubkeystring, inp):
+def PublicKeyObject(pubkeystring):
     """
-    Encrypt ``inp`` string with given Public Key.
+    Return ``rsa_key.RSAKey()`` object for given Public Key in openssh format.
+    Parsed keys are stored in a bounded LRU cache, the same object can be used from different threads.
     """
+    global _PublicKeysCacheHits
+    global _PublicKeysCacheMisses
+    cache_key = strng.to_bin(pubkeystring)
+    with _PublicKeysCacheLock:
+        pub_key = _PublicKeysCache.get(cache_key)
+        if pub_key is not None:
+            _PublicKeysCache.move_to_end(cache_key)
+            _PublicKeysCacheHits += 1
+            return pub_key
+        _PublicKeysCacheMisses += 1
     pub_key = rsa_key.RSAKey()
     pub_key.fromString(pubkeystring)
+    with _PublicKeysCacheLock:
+        _PublicKeysCache[cache_key] = pub_key
+        while len(_PublicKeysCache) > _PublicKeysCacheMaxSize:
+            _PublicKeysCache.popitem(last=False)
+    return pub_key
+
+
+def ForgetPublicKey(pubkeystring):
+    """
+    Remove parsed Public Key from the cache, returns True if it was there.
+    """
+    with _PublicKeysCacheLock:
+        return _PublicKeysCache.pop(strng.to_bin(pubkeystring), None) is not None
+
+
+def ClearPublicKeysCache():
+    """
+    Remove all parsed Public Keys from the cache and reset the counters.
+    """
+    global _PublicKeysCacheHits
+    global _PublicKeysCacheMisses
+    with _PublicKeysCacheLock:
+        _PublicKeysCache.clear()
+        _PublicKeysCacheHits = 0
+        _PublicKeysCacheMisses = 0
+
+
+def PublicKeysCacheStats():
+    """
+    Return current size of the parsed Public Keys cache and hit/miss counters.
+    """
+    with _PublicKeysCacheLock:
+        return {
+            'size': len(_PublicKeysCache),
+            'max_size': _PublicKeysCacheMaxSize,
+            'hits': _PublicKeysCacheHits,
+            'misses': _PublicKeysCacheMisses,
+        }
+
+
+def EncryptOpenSSHPublicKey(pubkeystring, inp):
+    """
+    Encrypt ``inp`` string with given Public Key.
+    """
+    pub_key = PublicKeyObject(pubkeystring)
     result = pub_key.encrypt(inp)
     return result
 
@@ -74,6 +74,7 @@ from bitdust.lib import serialization
 from bitdust.contacts import contactsdb
 
 from bitdust.crypt import key
+from bitdust.crypt import channel_keys
 
 from bitdust.userid import my_id
 from bitdust.userid import id_url
@@ -108,10 +109,16 @@ class Packet(object):
         KeyID=None,
         Date=None,
         Signature=None,
+        EnvelopeVersion=None,
+        AuthKey=None,
     ):
         """
         Init all fields and sign the packet.
+        If ``AuthKey`` is given the packet is authenticated with HMAC instead of RSA signature,
+        ``KeyID`` must be a channel key ID in that case, see ``crypt.channel_keys`` module.
         """
+        # format used to serialize the packet: JSON or binary envelope
+        self.EnvelopeVersion = EnvelopeVersion or serialization.EnvelopeVersion()
         # Legal Commands are in commands.py
         self.Command = strng.to_text(Command)
         # who owns this data and pays bills - http://somehost.com/id1.xml
@@ -133,6 +140,9 @@ class Packet(object):
         self.KeyID = strng.to_text(KeyID or my_id.getGlobalID(key_alias='master'))
         if Signature:
             self.Signature = Signature
+        elif AuthKey:
+            # message authentication code with a key shared between two nodes
+            self.Signature = channel_keys.make_auth_code(AuthKey, self.GenerateHashBase())
         else:
             # signature on Hash is always by CreatorID
             self.Signature = None
@@ -229,7 +239,11 @@ class Packet(object):
         - the packet ``Creator`` identity ( it keeps the public key ),
         - hash of that packet - just call ``GenerateHash()`` to make it,
         - the signature itself.
+
+        Packets authenticated with a channel key are verified with HMAC.
         """
+        if channel_keys.is_channel_key_id(self.KeyID):
+            return channel_keys.verify_auth_code(self.KeyID, self.CreatorID, self.GenerateHashBase(), self.Signature)
         CreatorIdentity = contactsdb.get_contact_identity(self.CreatorID)
         if CreatorIdentity is None:
             # OwnerIdentity = contactsdb.get_contact_identity(self.OwnerID)
@@ -327,11 +341,26 @@ class Packet(object):
         """
         return packetid.SupplierNumber(self.PacketID)
 
-    def Serialize(self):
+    def Serialize(self, envelope_version=None):
         """
         Create a string from packet object.
         This is useful when need to save the packet on disk or send via network.
+        Envelope format can be selected with ``envelope_version``, by default ``self.EnvelopeVersion`` is used.
         """
+        if (envelope_version or self.EnvelopeVersion) == serialization.ENVELOPE_BINARY:
+            return serialization.FieldsToBinary(
+                b'P', [
+                    self.Command,
+                    self.OwnerID.original(),
+                    self.CreatorID.original(),
+                    self.PacketID,
+                    self.Date,
+                    self.Payload,
+                    self.RemoteID.original(),
+                    self.KeyID,
+                    self.Signature,
+                ]
+            )
         dct = {
             'm': self.Command,
             'o': self.OwnerID.original(),
@@ -362,10 +391,14 @@ def Unserialize(data):
     We expect here a string containing a whole packet object in text form.
     Will return a real object in the memory from given string.
     All class fields are loaded, signature can be verified to be sure - it was truly original string.
+    Both JSON and binary envelopes are recognized.
     """
     if data is None:
         return None
 
+    if serialization.IsBinaryEnvelope(data):
+        return _UnserializeBinary(data)
+
     dct = serialization.BytesToDict(data, keys_to_text=True, encoding='latin1')
 
     # if _Debug:
@@ -396,6 +429,7 @@ def Unserialize(data):
             RemoteID=RemoteID,
             KeyID=KeyID,
             Signature=Signature,
+            EnvelopeVersion=serialization.ENVELOPE_JSON,
         )
     except:
         if _Debug:
@@ -420,6 +454,27 @@ def Unserialize(data):
     return newobject
 
 
+def _UnserializeBinary(data):
+    try:
+        fields = serialization.BinaryToFields(data, b'P', 9)
+        newobject = Packet(
+            Command=strng.to_text(bytes(fields[0])),
+            OwnerID=bytes(fields[1]),
+            CreatorID=bytes(fields[2]),
+            PacketID=strng.to_text(bytes(fields[3])),
+            Date=strng.to_text(bytes(fields[4])),
+            Payload=bytes(fields[5]),
+            RemoteID=bytes(fields[6]),
+            KeyID=strng.to_text(bytes(fields[7])),
+            Signature=bytes(fields[8]),
+            EnvelopeVersion=serialization.ENVELOPE_BINARY,
+        )
+    except:
+        lg.exc()
+        return None
+    return newobject
+
+
 def MakePacket(Command, OwnerID, CreatorID, PacketID, Payload, RemoteID):
     """
     Just calls the constructor of packet class.
@@ -300,6 +300,7 @@ class ListFilesOrator(automat.Automat):
         outpacket = p2p_service.SendListFiles(
             target_supplier=supplier_idurl,
             customer_idurl=self.target_customer_idurl,
+            revision=self._latest_revision(supplier_idurl),
             timeout=settings.P2PTimeOut(),
         )
         if outpacket:
@@ -325,6 +326,7 @@ class ListFilesOrator(automat.Automat):
                     outpacket = p2p_service.SendListFiles(
                         target_supplier=idurl,
                         customer_idurl=self.target_customer_idurl,
+                        revision=self._latest_revision(idurl),
                         timeout=settings.P2PTimeOut(),
                     )
                     if outpacket:
@@ -334,6 +336,21 @@ class ListFilesOrator(automat.Automat):
                 else:
                     lg.warn('skip sending ListFiles() because %s is not online' % idurl)
 
+    def _latest_revision(self, supplier_idurl):
+        from bitdust.storage import backup_fs
+        from bitdust.storage import backup_matrix
+        from bitdust.storage import index_synchronizer
+        if not id_url.is_the_same(self.target_customer_idurl, my_id.getIDURL()):
+            return None
+        supplier_num = contactsdb.supplier_position(supplier_idurl, customer_idurl=self.target_customer_idurl)
+        if supplier_num < 0:
+            return ''
+        is_in_sync = index_synchronizer.is_synchronized() and backup_fs.revision() > 0
+        if backup_matrix.IsListFilesLocalStateChanged(supplier_num, is_in_sync):
+            # request full listing, all lines must be checked again
+            return ''
+        return backup_matrix.GetRemoteListFilesRevision(supplier_num)
+
     def _on_my_identity_rotated(self, evt):
         self.ping_required = True
         if _Debug:
@@ -363,3 +380,25 @@ def IncomingListFiles(newpacket):
     else:
         if _Debug:
             lg.dbg(_DebugLevel, 'received and ignored %r, currently target customer is %r' % (newpacket, A().target_customer_idurl))
+
+
+def RequestFullListFiles(newpacket, supplier_idurl, customer_idurl):
+    """
+    Called from ``p2p.backup_control`` when received changes can not be applied to the local copy of the listing.
+    Full listing is requested again and will be expected instead of the rejected packet.
+    """
+    outpacket = p2p_service.SendListFiles(
+        target_supplier=supplier_idurl,
+        customer_idurl=customer_idurl,
+        revision='',
+        timeout=settings.P2PTimeOut(),
+    )
+    if not outpacket:
+        lg.err('failed sending ListFiles() to %r' % supplier_idurl)
+    if not A():
+        return outpacket
+    if newpacket.PacketID in A().requested_lf_packet_ids:
+        A().requested_lf_packet_ids.discard(newpacket.PacketID)
+        if outpacket:
+            A().requested_lf_packet_ids.add(outpacket.PacketID)
+    return outpacket
@@ -40,12 +40,15 @@ _DebugLevel = 24
 
 import os
 import sys
+import copy
 import hashlib
 import random
 import optparse
 import pprint
 import json
 
+from collections import OrderedDict
+
 #------------------------------------------------------------------------------
 
 from twisted.internet import reactor  # @UnresolvedImport
@@ -94,6 +97,8 @@ SENDING_FREQUENCY_SEC = 0.02  # must be always slower than receiving frequency!
 RECEIVING_QUEUE_LENGTH_CRITICAL = 100
 SENDING_QUEUE_LENGTH_CRITICAL = 50
 DEFAULT_CACHE_TTL = 60*60*3
+CACHE_MAX_RECORDS = 1000
+CACHE_FLUSH_DELAY = 10
 
 #------------------------------------------------------------------------------
 
@@ -103,6 +108,11 @@ _ActiveLookupLayerID = None
 _Counters = {}
 _ProtocolVersion = 7
 _Cache = {}
+_CacheDirPath = None
+_CacheMaxRecords = CACHE_MAX_RECORDS
+_CacheDirtyLayers = set()
+_CacheFlushTask = None
+_PendingLookups = {}
 
 #------------------------------------------------------------------------------
 
@@ -136,7 +146,7 @@ def init(udp_port, dht_dir_path=None, open_layers=[]):
     cache_dir_path = os.path.join(dht_dir_path, 'cache')
     if not os.path.isdir(cache_dir_path):
         os.makedirs(cache_dir_path)
-    load_cache(cache_dir_path)
+    load_cache(cache_dir_path, max_records=settings.getDHTCacheMaxRecords())
     if _Debug:
         lg.dbg(_DebugLevel, 'dht_dir_path=%r list_layers=%r network_info=%r' % (dht_dir_path, list_layers, nw_info))
     layerStores = {}
@@ -180,6 +190,7 @@ def init(udp_port, dht_dir_path=None, open_layers=[]):
 
 def shutdown():
     global _MyNode
+    save_cache()
     if _MyNode is not None:
         for ds in _MyNode._dataStores.values():
             ds._db.close()
@@ -619,17 +630,56 @@ def on_read_json_response(response, key, result_defer=None):
 
 
 def get_json_value(key, layer_id=0, update_cache=True):
+    """
+    Concurrent calls for the same key and layer are served by a single DHT lookup.
+    """
+    ret = Deferred()
+    lookup_id = (layer_id, key)
+    lookup = _PendingLookups.get(lookup_id)
+    if lookup is not None:
+        count('lookup_coalesced')
+        lookup['result_defers'].append(ret)
+        if update_cache:
+            lookup['update_cache'] = True
+        if _Debug:
+            lg.out(_DebugLevel, 'dht_service.get_json_value key=[%r] layer_id=%d joined pending lookup with %d callers' % (key, layer_id, len(lookup['result_defers'])))
+        return ret
     if _Debug:
         lg.out(_DebugLevel, 'dht_service.get_json_value key=[%r] layer_id=%d update_cache=%s' % (key, layer_id, update_cache))
-    ret = Deferred()
+    lookup = {
+        'result_defers': [
+            ret,
+        ],
+        'update_cache': update_cache,
+    }
+    _PendingLookups[lookup_id] = lookup
+    result = Deferred()
+    result.addCallback(on_json_lookup_finished, lookup_id)
+    result.addErrback(on_json_lookup_failed, lookup_id)
     d = get_value(key, layer_id=layer_id)
-    d.addCallback(on_read_json_response, key, ret)
-    d.addErrback(ret.errback)
-    if update_cache:
-        d.addCallback(on_json_response_to_be_cached, key=key, layer_id=layer_id)
+    d.addCallback(on_read_json_response, key, result)
+    d.addErrback(result.errback)
+    d.addCallback(on_json_response_to_be_cached, key=key, layer_id=layer_id, lookup=lookup)
     return ret
 
 
+def on_json_lookup_finished(response, lookup_id):
+    lookup = _PendingLookups.pop(lookup_id, None)
+    if lookup:
+        for result_defer in lookup['result_defers']:
+            # every caller gets own copy, so one of them is not able to modify the value for others
+            result_defer.callback(copy.deepcopy(response))
+    return None
+
+
+def on_json_lookup_failed(err, lookup_id):
+    lookup = _PendingLookups.pop(lookup_id, None)
+    if lookup:
+        for result_defer in lookup['result_defers']:
+            result_defer.errback(err)
+    return None
+
+
 def set_json_value(key, json_data, age=0, expire=KEY_EXPIRE_MAX_SECONDS, collect_results=True, layer_id=0):
     if not node():
         return fail(Exception('DHT service is off'))
@@ -1167,60 +1217,153 @@ def cache():
     return _Cache
 
 
-def load_cache(cache_dir_path):
+def cache_stats():
+    return {
+        'hits': counter('cache_hit'),
+        'misses': counter('cache_miss'),
+        'coalesced': counter('lookup_coalesced'),
+        'evicted': counter('cache_evicted'),
+        'lookups': len(_PendingLookups),
+        'records': dict((layer_id, len(layer_cache)) for layer_id, layer_cache in _Cache.items()),
+    }
+
+
+def load_cache(cache_dir_path, max_records=CACHE_MAX_RECORDS):
+    """
+    Every layer is stored in a single "<layer_id>.json" file inside of the cache folder.
+    Records stored by older versions one file per key in "<layer_id>/" sub-folders are imported and removed.
+    """
     global _Cache
+    global _CacheDirPath
+    global _CacheMaxRecords
+    save_cache()
     _Cache.clear()
-    total_records = 0
+    _CacheDirPath = cache_dir_path
+    _CacheMaxRecords = max_records
+    oldest = utime.utcnow_to_sec1970() - KEY_EXPIRE_MAX_SECONDS
     records_per_layer = {}
-    for layer_id_str in os.listdir(cache_dir_path):
-        layer_id = int(layer_id_str)
-        if layer_id not in _Cache:
-            _Cache[layer_id] = {}
-        records_per_layer[layer_id] = 0
-        for hash_key in os.listdir(cache_dir_path):
-            _Cache[layer_id][hash_key] = jsn.loads_text(local_fs.ReadTextFile(os.path.join(cache_dir_path, hash_key)))
-            total_records += 1
-            records_per_layer[layer_id] += 1
+    for filename in sorted(os.listdir(cache_dir_path)):
+        file_path = os.path.join(cache_dir_path, filename)
+        layer_records = {}
+        if os.path.isdir(file_path):
+            try:
+                layer_id = int(filename)
+            except:
+                continue
+            for hash_key in os.listdir(file_path):
+                try:
+                    layer_records[hash_key] = jsn.loads_text(local_fs.ReadTextFile(os.path.join(file_path, hash_key)))
+                except:
+                    lg.exc()
+            layer_records = dict(sorted(layer_records.items(), key=lambda i: i[1]['t']))
+            bpio.rmdir_recursive(file_path, ignore_errors=True)
+            _CacheDirtyLayers.add(layer_id)
+        elif filename.endswith('.json'):
+            try:
+                layer_id = int(filename[:-5])
+            except:
+                continue
+            try:
+                layer_records = jsn.loads_text(local_fs.ReadTextFile(file_path) or '{}')
+            except:
+                lg.exc()
+                continue
+        else:
+            continue
+        layer_cache = _Cache.setdefault(layer_id, OrderedDict())
+        for hash_key, cached_json_record in layer_records.items():
+            if int(cached_json_record['t']) < oldest:
+                _CacheDirtyLayers.add(layer_id)
+                continue
+            layer_cache[hash_key] = cached_json_record
+        _evict_cached_records(layer_id)
+        records_per_layer[layer_id] = len(layer_cache)
+    save_cache()
+    total_records = sum(records_per_layer.values())
     if _Debug:
         lg.args(_DebugLevel, total_records=total_records, records_per_layer=records_per_layer)
     return total_records
 
 
+def save_cache(layer_id=None):
+    global _CacheFlushTask
+    if layer_id is None:
+        if _CacheFlushTask:
+            if _CacheFlushTask.active():
+                _CacheFlushTask.cancel()
+            _CacheFlushTask = None
+        layers = list(_CacheDirtyLayers)
+    else:
+        layers = [
+            layer_id,
+        ] if layer_id in _CacheDirtyLayers else []
+    for _layer_id in layers:
+        _CacheDirtyLayers.discard(_layer_id)
+        if not _CacheDirPath:
+            continue
+        cached_records = _Cache.get(_layer_id, {})
+        cached_layer_file_path = os.path.join(_CacheDirPath, '%d.json' % _layer_id)
+        if not local_fs.WriteTextFile(cached_layer_file_path, jsn.dumps(cached_records, separators=(',', ':'))):
+            lg.err('failed to store cached dht records in layer %d' % _layer_id)
+    return len(layers)
+
+
+def _evict_cached_records(layer_id):
+    layer_cache = _Cache.get(layer_id)
+    if not layer_cache:
+        return 0
+    evicted = 0
+    while len(layer_cache) > _CacheMaxRecords:
+        layer_cache.popitem(last=False)
+        count('cache_evicted')
+        evicted += 1
+    if evicted:
+        _CacheDirtyLayers.add(layer_id)
+    return evicted
+
+
+def _on_cache_flush():
+    global _CacheFlushTask
+    _CacheFlushTask = None
+    save_cache()
+
+
 def store_cached_key(hash_key, json_value, layer_id=0, timestamp=None):
-    global _Cache
+    global _CacheFlushTask
     if not timestamp:
         timestamp = utime.utcnow_to_sec1970()
-    if layer_id not in _Cache:
-        _Cache[layer_id] = {}
-    cached_json_record = {
+    layer_cache = _Cache.setdefault(layer_id, OrderedDict())
+    layer_cache[hash_key] = {
         'v': json_value,
         't': timestamp,
     }
-    dht_dir_path = settings.ServiceDir('service_entangled_dht')
-    layer_cache_dir_path = os.path.join(dht_dir_path, 'cache', strng.to_text(layer_id))
-    if not os.path.isdir(layer_cache_dir_path):
-        os.makedirs(layer_cache_dir_path)
-    cached_record_file_path = os.path.join(layer_cache_dir_path, hash_key)
-    if not local_fs.WriteTextFile(cached_record_file_path, jsn.dumps(cached_json_record)):
-        lg.err('failed to store cached dht key %r in layer %d' % (hash_key, layer_id))
-        return False
-    _Cache[layer_id][hash_key] = cached_json_record
+    layer_cache.move_to_end(hash_key)
+    _CacheDirtyLayers.add(layer_id)
+    _evict_cached_records(layer_id)
+    if _CacheDirPath and not _CacheFlushTask:
+        _CacheFlushTask = reactor.callLater(CACHE_FLUSH_DELAY, _on_cache_flush)  # @UndefinedVariable
     if _Debug:
-        lg.args(_DebugLevel, hash_key=hash_key, layer_id=layer_id, timestamp=timestamp, cached_records=len(_Cache[layer_id]))
+        lg.args(_DebugLevel, hash_key=hash_key, layer_id=layer_id, timestamp=timestamp, cached_records=len(layer_cache))
     return True
 
 
 def get_cached_value(hash_key, layer_id=0):
-    global _Cache
-    value = _Cache.get(layer_id, {}).get(hash_key)
+    layer_cache = _Cache.get(layer_id)
+    value = None
+    if layer_cache:
+        value = layer_cache.get(hash_key)
+        if value is not None:
+            layer_cache.move_to_end(hash_key)
     if _Debug:
         lg.args(_DebugLevel, layer_id=layer_id, hash_key=hash_key, value_exist=(value is not None))
     return value
 
 
-def on_json_response_to_be_cached(json_value, key, layer_id):
+def on_json_response_to_be_cached(json_value, key, layer_id, lookup=None):
     if not json_value:
         return json_value
+    if lookup is not None and not lookup['update_cache']:
+        return json_value
     hash_key = key_to_hash(key)
     store_cached_key(hash_key, json_value, layer_id)
     return json_value
@@ -1228,11 +1371,11 @@ def on_json_response_to_be_cached(json_value, key, layer_id):
 
 def get_cached_json_value(key, layer_id=0, cache_ttl=DEFAULT_CACHE_TTL):
     hash_key = key_to_hash(key)
-    cached_record = get_cached_value(hash_key)
-    if not cached_record:
-        return get_json_value(key, layer_id=layer_id, update_cache=True)
-    if utime.utcnow_to_sec1970() - int(cached_record['t']) > cache_ttl:
+    cached_record = get_cached_value(hash_key, layer_id=layer_id)
+    if not cached_record or utime.utcnow_to_sec1970() - int(cached_record['t']) > cache_ttl:
+        count('cache_miss')
         return get_json_value(key, layer_id=layer_id, update_cache=True)
+    count('cache_hit')
     if _Debug:
         lg.out(_DebugLevel, 'dht_service.get_cached_json_value key=[%r] layer_id=%d cache_ttl=%d' % (key, layer_id, cache_ttl))
     ret = Deferred()
@@ -1292,22 +1435,9 @@ class DHTNode(MultiLayerNode):
     def expire(self):
         now = utime.utcnow_to_sec1970()
         for layer_id in self._dataStores.keys():
-            expired_keys = []
-            for key in self._dataStores[layer_id].keys():
-                if key == self.nodeStateKey:
-                    continue
-                item_data = self._dataStores[layer_id].getItem(key)
-                if item_data:
-                    originaly_published = item_data.get('originallyPublished')
-                    expireSeconds = item_data.get('expireSeconds')
-                    if expireSeconds and originaly_published:
-                        age = now - originaly_published
-                        if age > expireSeconds:
-                            expired_keys.append(key)
-            for key in expired_keys:
-                if _Debug:
-                    lg.out(_DebugLevel, 'dht_service.expire   [%s] removed from layer %d' % (key, layer_id))
-                del self._dataStores[layer_id][key]
+            removed = self._dataStores[layer_id].removeExpired(now, skipKeys=[self.nodeStateKey])
+            if _Debug:
+                lg.out(_DebugLevel, 'dht_service.expire   %d records removed from layer %d' % (removed, layer_id))
 
     @rpcmethod
     def store(self, key, value, originalPublisherID=None, age=0, expireSeconds=KEY_EXPIRE_MAX_SECONDS, **kwargs):
@@ -580,6 +580,10 @@ def process_info():
         from bitdust.dht import dht_service
         result['dht']['bytes_out'] = dht_service.node().bytes_out
         result['dht']['bytes_in'] = dht_service.node().bytes_in
+        cache_stats = dht_service.cache_stats()
+        result['dht']['cache_hits'] = cache_stats['hits']
+        result['dht']['cache_misses'] = cache_stats['misses']
+        result['dht']['lookups_coalesced'] = cache_stats['coalesced']
         for layer_id in dht_service.node().active_layers:
             result['dht']['layers'][layer_id] = {
                 'cache': len(dht_service.cache().get(layer_id, [])),
@@ -3100,6 +3104,7 @@ def files_downloads():
                 'version': r.version,
                 'block_number': r.block_number,
                 'bytes_processed': r.bytes_written,
+                'bytes_saved': r.get_bytes_saved(),
                 'created': time.asctime(time.localtime(r.Started)),
                 'aborted': r.abort_flag,
                 'done': r.done_flag,
@@ -26,11 +26,27 @@ from __future__ import absolute_import
 
 #------------------------------------------------------------------------------
 
+import struct
+
+#------------------------------------------------------------------------------
+
 from bitdust.lib import jsn
 from bitdust.lib import strng
 
 #------------------------------------------------------------------------------
 
+ENVELOPE_JSON = 1
+ENVELOPE_BINARY = 2
+
+# JSON output always starts with "{", so this byte marks a binary envelope
+_BinaryMarker = b'\x00'
+
+# envelope version used to serialize newly created objects,
+# binary envelope is only used for nodes which advertised support for it, see ``EnvelopeCapability()``
+_EnvelopeVersion = ENVELOPE_JSON
+
+#------------------------------------------------------------------------------
+
 
 def DictToBytes(dct, encoding='latin1', errors='strict', keys_to_text=False, values_to_text=False, pack_types=False, indent=None, to_text=False):
     """
@@ -80,3 +96,87 @@ def BytesToDict(inp, encoding='latin1', errors='strict', keys_to_text=False, val
     if keys_to_text:
         return jsn.dict_keys_to_text(jsn.loads(_t, encoding=encoding))
     return jsn.loads(_t, encoding=encoding)
+
+
+#------------------------------------------------------------------------------
+
+
+def EnvelopeVersion():
+    """
+    Return envelope version to be used to serialize newly created packets and blocks.
+    """
+    return _EnvelopeVersion
+
+
+def SetEnvelopeVersion(version):
+    """
+    Switch serialization of newly created packets and blocks between ``ENVELOPE_JSON`` and ``ENVELOPE_BINARY``.
+    """
+    global _EnvelopeVersion
+    if version not in (ENVELOPE_JSON, ENVELOPE_BINARY):
+        raise ValueError('unknown envelope version: %r' % version)
+    _EnvelopeVersion = version
+
+
+def EnvelopeCapability():
+    """
+    Label added to the version string of the identity to let other nodes know that binary envelope is supported.
+    """
+    return b'envelope/%d' % ENVELOPE_BINARY
+
+
+def IsBinaryEnvelope(inp):
+    """
+    Return True if input bytes were created with `FieldsToBinary()` method, otherwise it is a JSON envelope.
+    """
+    return bool(inp) and inp[0:1] == _BinaryMarker
+
+
+def FieldsToBinary(kind, fields):
+    """
+    Build a versioned, length-prefixed binary envelope from the list of fields.
+    The header is: zero byte marker, one byte `kind`, one byte version and two bytes number of fields.
+    Every field is written as 4 bytes length followed by the field bytes.
+    Text values are encoded to utf-8, other non-binary values are converted with `str()` first.
+    """
+    parts = [
+        _BinaryMarker,
+        kind,
+        struct.pack('>BH', ENVELOPE_BINARY, len(fields)),
+    ]
+    for field in fields:
+        field = strng.to_bin(field)
+        parts.append(struct.pack('>I', len(field)))
+        parts.append(field)
+    return b''.join(parts)
+
+
+def BinaryToFields(inp, kind, count):
+    """
+    Extract at least `count` fields from a binary envelope built with `FieldsToBinary()`.
+    Returns a list of `memoryview` objects pointing inside of the input bytes, so no data is copied here.
+    Extra fields added by future versions of the same envelope are also returned.
+    Raises `ValueError` if input is not a valid envelope of given `kind`.
+    """
+    buf = memoryview(inp)
+    if len(buf) < 5 or buf[0:1] != _BinaryMarker:
+        raise ValueError('not a binary envelope')
+    if buf[1:2] != kind:
+        raise ValueError('unexpected envelope kind %r, expected %r' % (bytes(buf[1:2]), kind))
+    version, total = struct.unpack_from('>BH', buf, 2)
+    if version != ENVELOPE_BINARY:
+        raise ValueError('unsupported envelope version %d' % version)
+    if total < count:
+        raise ValueError('envelope has %d fields, expected %d' % (total, count))
+    fields = []
+    pos = 5
+    for _ in range(total):
+        if pos + 4 > len(buf):
+            raise ValueError('envelope is truncated')
+        length = struct.unpack_from('>I', buf, pos)[0]
+        pos += 4
+        if pos + length > len(buf):
+            raise ValueError('envelope is truncated')
+        fields.append(buf[pos:pos + length])
+        pos += length
+    return fields
@@ -39,11 +39,13 @@ import six
 import os
 import sys
 import time
+import atexit
 import datetime
 import threading
 import traceback
 import logging
 import platform
+import collections
 from io import open
 
 #------------------------------------------------------------------------------
@@ -72,6 +74,20 @@ _TimePush = 0.0
 _TimeTotalDict = {}
 _TimeDeltaDict = {}
 _TimeCountsDict = {}
+_AsyncWriterThread = None
+_AsyncRecords = collections.deque()
+_AsyncBufferSize = 10000
+_AsyncBatchSize = 500
+_AsyncFlushInterval = 0.5
+_AsyncStopping = False
+_AsyncLock = threading.Lock()
+_AsyncCounterLock = threading.Lock()
+_AsyncWakeUp = threading.Event()
+_AsyncDroppedCounter = 0
+_AsyncDroppedReported = 0
+_AsyncWrittenCounter = 0
+_AsyncBatchesCounter = 0
+_AsyncAtExitRegistered = False
 
 #------------------------------------------------------------------------------
 
@@ -83,33 +99,30 @@ def fqn(o):
 #------------------------------------------------------------------------------
 
 
-def out(_DebugLevel, msg, nl='\n', log_name='stdout', showtime=False):
+def out(_DebugLevel, msg, *args, nl='\n', log_name='stdout', showtime=False):
     """
     Prints a text line to the log file or console.
 
     :param level: lower values are counting as more important messages.
                         Usually I am using only even values from 0 to 18.
     :param msg: message string to be printed
+    :param args: if given, the message is formatted as ``msg % args`` only when the line is going to be written
     :param nl: this string is added at the end,
                set to empty string to avoid new line.
+
+    When async writer is started the message is formatted right away, so the arguments are
+    converted to text while they are still in the same state, and the line is placed into the in-memory buffer
+    to be written to the files later from a background thread.
     """
     global _IsAndroid
     global _InterceptedLogFile
     global _WebStreamFunc
-    global _LogFile
-    global _LogFileName
-    global _RedirectStdOut
-    global _RedirectStdErr
-    global _ShowTime
-    global _LifeBeginsTime
     global _NoOutput
     global _LogLinesCounter
     global _LogsEnabled
-    global _UseColors
-    global _GlobalDebugLevel
-    global _AllLogFiles
-    s = msg
-    s_ = s
+    global _AsyncWriterThread
+    global _AsyncRecords
+    global _AsyncDroppedCounter
     level = _DebugLevel
     if not level:
         level = 0
@@ -117,18 +130,84 @@ def out(_DebugLevel, msg, nl='\n', log_name='stdout', showtime=False):
         level = 0
     if level % 2:
         level -= 1
+    if _IsAndroid is None:
+        _IsAndroid = (sys.executable == 'android_python' or ('ANDROID_ARGUMENT' in os.environ or 'ANDROID_ROOT' in os.environ))
+    if _AsyncWriterThread is not None and not _InterceptedLogFile:
+        if not _LogsEnabled:
+            return None
+        if is_debug(level):
+            if len(_AsyncRecords) >= _AsyncBufferSize:
+                # never block the caller, the record is lost but counted
+                with _AsyncCounterLock:
+                    _AsyncDroppedCounter += 1
+            else:
+                msg = format_message(msg, args)
+                args = ()
+                _AsyncRecords.append((
+                    time.time(),
+                    level,
+                    msg,
+                    nl,
+                    log_name,
+                    showtime,
+                    threading.current_thread().name if is_debug(30) else None,
+                ))
+                if len(_AsyncRecords) >= _AsyncBatchSize:
+                    _AsyncWakeUp.set()
+        if _WebStreamFunc is not None:
+            _WebStreamFunc(level, format_message(msg, args) + nl)
+        _LogLinesCounter += 1
+        return None
+    msg = format_message(msg, args)
+    s = format_line(level, msg, showtime, time.time(), threading.current_thread().name if is_debug(30) else None)
+    if _InterceptedLogFile:
+        if is_debug(level):
+            _InterceptedLogFile.write(log_name + ': ' + s + nl)
+            _InterceptedLogFile.flush()
+        return
+    if not _LogsEnabled:
+        return
+    if is_debug(level):
+        write_line(s, nl, log_name, flush=True)
+    if _WebStreamFunc is not None:
+        _WebStreamFunc(level, msg + nl)
+    _LogLinesCounter += 1
+    # if _LogLinesCounter % 10000 == 0:
+    #     out(10, '[%s]' % time.asctime())
+    return None
+
+
+def format_message(msg, args):
+    """
+    Substitutes lazy arguments passed to ``out()``, ``info()`` or ``warn()`` into the message.
+    """
+    if not args:
+        return msg
+    try:
+        return msg % args
+    except:
+        return '%s %r' % (msg, args)
+
+
+def format_line(level, msg, showtime, when, thread_name=None):
+    """
+    Builds a final text line : adds indentation, time and thread name to the message.
+    """
+    global _ShowTime
+    global _LifeBeginsTime
+    global _UseColors
+    global _GlobalDebugLevel
+    s = msg
     if level:
         lstr = s.lstrip()
         if lstr.startswith('INFO') or lstr.startswith('DEBUG') or lstr.startswith('DEBUG') or lstr.startswith('WARNING') or lstr.startswith('ERROR'):
             s = '  ' + lstr
         else:
             s = ' '*level + s
-    if _IsAndroid is None:
-        _IsAndroid = (sys.executable == 'android_python' or ('ANDROID_ARGUMENT' in os.environ or 'ANDROID_ROOT' in os.environ))
     if (_ShowTime and level > 0) or showtime:
-        tm_string = time.strftime('%H:%M:%S')
+        tm_string = time.strftime('%H:%M:%S', time.localtime(when))
         if _LifeBeginsTime != 0:
-            dt = time.time() - _LifeBeginsTime
+            dt = when - _LifeBeginsTime
             mn = dt // 60
             sc = dt - mn*60
             if _GlobalDebugLevel >= 6:
@@ -142,67 +221,67 @@ def out(_DebugLevel, msg, nl='\n', log_name='stdout', showtime=False):
         if level == 0:
             tm_string += '  '
         s = tm_string + s
-    if is_debug(30):
-        currentThreadName = threading.currentThread().getName()
-        s = s + ' {%s}' % currentThreadName.lower()
-    if _InterceptedLogFile:
-        if is_debug(level):
-            _InterceptedLogFile.write(log_name + ': ' + s + nl)
-            _InterceptedLogFile.flush()
-        return
-    if not _LogsEnabled:
-        return
-    if is_debug(level):
-        if log_name == 'stdout':
-            if _LogFile is not None:
-                o = s + nl
-                if sys.version_info[0] == 3:
-                    if not isinstance(o, str):
-                        o = o.decode('utf-8')
-                else:
-                    if not isinstance(o, unicode):  # @UndefinedVariable
-                        o = o.decode('utf-8')
-                try:
-                    _LogFile.write(o)
+    if thread_name is not None:
+        s = s + ' {%s}' % thread_name.lower()
+    return s
+
+
+def write_line(s, nl='\n', log_name='stdout', flush=True):
+    """
+    Writes already formatted line to the log file and to the console.
+    """
+    global _LogFile
+    global _LogFileName
+    global _RedirectStdOut
+    global _RedirectStdErr
+    global _NoOutput
+    global _AllLogFiles
+    if log_name == 'stdout':
+        if _LogFile is not None:
+            o = s + nl
+            if sys.version_info[0] == 3:
+                if not isinstance(o, str):
+                    o = o.decode('utf-8')
+            else:
+                if not isinstance(o, unicode):  # @UndefinedVariable
+                    o = o.decode('utf-8')
+            try:
+                _LogFile.write(o)
+                if flush:
                     _LogFile.flush()
-                except:
-                    pass
-        else:
-            if _LogFileName:
-                if log_name not in _AllLogFiles:
-                    filename = os.path.join(os.path.dirname(_LogFileName), log_name + '.log')
-                    if not os.path.isdir(os.path.dirname(os.path.abspath(filename))):
-                        os.makedirs(os.path.dirname(os.path.abspath(filename)))
-                    _AllLogFiles[log_name] = open(os.path.abspath(filename), 'w')
-                o = s + nl
-                if sys.version_info[0] == 3:
-                    if not isinstance(o, str):
-                        o = o.decode('utf-8')
-                else:
-                    if not isinstance(o, unicode):  # @UndefinedVariable
-                        o = o.decode('utf-8')
-                try:
-                    _AllLogFiles[log_name].write(o)
+            except:
+                pass
+    else:
+        if _LogFileName:
+            if log_name not in _AllLogFiles:
+                filename = os.path.join(os.path.dirname(_LogFileName), log_name + '.log')
+                if not os.path.isdir(os.path.dirname(os.path.abspath(filename))):
+                    os.makedirs(os.path.dirname(os.path.abspath(filename)))
+                _AllLogFiles[log_name] = open(os.path.abspath(filename), 'w')
+            o = s + nl
+            if sys.version_info[0] == 3:
+                if not isinstance(o, str):
+                    o = o.decode('utf-8')
+            else:
+                if not isinstance(o, unicode):  # @UndefinedVariable
+                    o = o.decode('utf-8')
+            try:
+                _AllLogFiles[log_name].write(o)
+                if flush:
                     _AllLogFiles[log_name].flush()
-                except:
-                    pass
-        if not _RedirectStdOut and not _RedirectStdErr and not _NoOutput:
-            if log_name == 'stdout':
-                s = s + nl
+            except:
+                pass
+    if not _RedirectStdOut and not _RedirectStdErr and not _NoOutput:
+        if log_name == 'stdout':
+            s = s + nl
+            try:
+                sys.stdout.write(s)
+            except:
                 try:
-                    sys.stdout.write(s)
+                    sys.stdout.write(format_exception() + '\n\n' + s)
                 except:
-                    try:
-                        sys.stdout.write(format_exception() + '\n\n' + s)
-                    except:
-                        # very bad stuff... we can't write anything to stdout?
-                        pass
-    if _WebStreamFunc is not None:
-        _WebStreamFunc(level, s_ + nl)
-    _LogLinesCounter += 1
-    # if _LogLinesCounter % 10000 == 0:
-    #     out(10, '[%s]' % time.asctime())
-    return None
+                    # very bad stuff... we can't write anything to stdout?
+                    pass
 
 
 def dbg(_DebugLevel, message, *args, **kwargs):
@@ -237,7 +316,7 @@ def args(_DebugLevel, *args, **kwargs):
     return o
 
 
-def info(message, level=2, log_name='stdout'):
+def info(message, *args, level=2, log_name='stdout'):
     global _UseColors
     if _UseColors is None:
         _UseColors = platform.uname()[0] != 'Windows' and os.environ.get('BITDUST_LOG_USE_COLORS', '1') != '0'
@@ -247,11 +326,11 @@ def info(message, level=2, log_name='stdout'):
     output_string = 'INFO %s.%s() %s' % (modul, caller, message)
     if _UseColors:
         output_string = '\033[0;49;92mINFO\033[0m \033[0;49;37m%s.%s()\033[0m \033[0;49;92m%s\033[0m' % (modul, caller, message)
-    out(level, output_string, showtime=True, log_name=log_name)
+    out(level, output_string, *args, showtime=True, log_name=log_name)
     return message
 
 
-def warn(message, level=2, log_name='stdout'):
+def warn(message, *args, level=2, log_name='stdout'):
     global _UseColors
     if _UseColors is None:
         _UseColors = platform.uname()[0] != 'Windows' and os.environ.get('BITDUST_LOG_USE_COLORS', '1') != '0'
@@ -261,7 +340,7 @@ def warn(message, level=2, log_name='stdout'):
     output_string = 'WARNING %s.%s() %s' % (modul, caller, message)
     if _UseColors:
         output_string = '\033[0;35mWARNING\033[0m \033[0;49;37m%s.%s()\033[0m \033[0;35m%s\033[0m' % (modul, caller, message)
-    out(level, output_string, showtime=True, log_name=log_name)
+    out(level, output_string, *args, showtime=True, log_name=log_name)
     return message
 
 
@@ -285,6 +364,8 @@ def err(message, level=0, log_name='stdout'):
     if _UseColors:
         message = '\033[1;37;41m%s\033[0m' % message
     out(level, message, showtime=True, log_name=log_name)
+    # errors must not be lost if the process crashes right after
+    flush_async_writer()
     return message
 
 
@@ -398,6 +479,8 @@ def exception(level, maxTBlevel, exc_info, message=None, log_name='stdout'):
         fout.write(s)
         fout.close()
         out(level, 'saved to: %s' % exc_filename, log_name=log_name)
+    # exceptions must not be lost if the process crashes right after
+    flush_async_writer()
     return s
 
 
@@ -638,6 +721,7 @@ def close_log_file():
     """
     global _LogFile
     global _AllLogFiles
+    stop_async_writer()
     if not _LogFile:
         return
     _LogFile.flush()
@@ -649,6 +733,124 @@ def close_log_file():
     _AllLogFiles.clear()
 
 
+def start_async_writer(buffer_size=10000, flush_interval=0.5):
+    """
+    Start a background thread to write logs to the files in batches.
+
+    After that ``out()`` only appends a record to the in-memory ring buffer of ``buffer_size`` records.
+    Formatting and writing is done by the background thread every ``flush_interval`` seconds
+    or when the buffer is getting full. If the buffer is full new records are dropped and counted,
+    the caller is never blocked.
+    """
+    global _AsyncWriterThread
+    global _AsyncBufferSize
+    global _AsyncBatchSize
+    global _AsyncFlushInterval
+    global _AsyncStopping
+    global _AsyncAtExitRegistered
+    if _AsyncWriterThread is not None:
+        return False
+    if not _AsyncAtExitRegistered:
+        # buffered records are written when the process is exiting
+        atexit.register(stop_async_writer)
+        _AsyncAtExitRegistered = True
+    _AsyncBufferSize = max(1, int(buffer_size))
+    _AsyncBatchSize = max(1, int(_AsyncBufferSize/20))
+    _AsyncFlushInterval = flush_interval
+    _AsyncStopping = False
+    _AsyncWakeUp.clear()
+    _AsyncWriterThread = threading.Thread(target=_async_writer_loop, name='lg_writer')
+    _AsyncWriterThread.daemon = True
+    _AsyncWriterThread.start()
+    return True
+
+
+def stop_async_writer():
+    """
+    Write all buffered records and stop the background thread, logs are written synchronously again.
+    """
+    global _AsyncWriterThread
+    global _AsyncStopping
+    if _AsyncWriterThread is None:
+        return False
+    _AsyncStopping = True
+    _AsyncWakeUp.set()
+    if _AsyncWriterThread is not threading.current_thread():
+        _AsyncWriterThread.join()
+    _AsyncWriterThread = None
+    _write_async_records()
+    return True
+
+
+def flush_async_writer():
+    """
+    Write all buffered records right now from the current thread.
+    """
+    if _AsyncWriterThread is None:
+        return 0
+    return _write_async_records()
+
+
+def is_async_writer_started():
+    return _AsyncWriterThread is not None
+
+
+def async_writer_stats():
+    return {
+        'started': _AsyncWriterThread is not None,
+        'buffer_size': _AsyncBufferSize,
+        'buffered': len(_AsyncRecords),
+        'written': _AsyncWrittenCounter,
+        'dropped': _AsyncDroppedCounter,
+        'batches': _AsyncBatchesCounter,
+    }
+
+
+def _async_writer_loop():
+    while not _AsyncStopping:
+        _AsyncWakeUp.wait(_AsyncFlushInterval)
+        _AsyncWakeUp.clear()
+        _write_async_records()
+
+
+def _write_async_records():
+    global _AsyncDroppedReported
+    global _AsyncWrittenCounter
+    global _AsyncBatchesCounter
+    with _AsyncLock:
+        log_names = set()
+        count = 0
+        while _AsyncRecords:
+            try:
+                when, level, msg, nl, log_name, showtime, thread_name = _AsyncRecords.popleft()
+            except IndexError:
+                break
+            try:
+                write_line(format_line(level, msg, showtime, when, thread_name), nl, log_name, flush=False)
+            except:
+                pass
+            log_names.add(log_name)
+            count += 1
+        with _AsyncCounterLock:
+            dropped = _AsyncDroppedCounter - _AsyncDroppedReported
+        if dropped:
+            _AsyncDroppedReported += dropped
+            write_line(format_line(0, 'WARNING %d log records were dropped, logs buffer is full' % dropped, True, time.time()), log_name='stdout', flush=False)
+            log_names.add('stdout')
+        if not log_names:
+            return 0
+        for log_name in log_names:
+            logfile = _LogFile if log_name == 'stdout' else _AllLogFiles.get(log_name)
+            try:
+                if logfile:
+                    logfile.flush()
+            except:
+                pass
+        _AsyncWrittenCounter += count
+        _AsyncBatchesCounter += 1
+    return count
+
+
 def open_intercepted_log_file(filename, mode='w'):
     global _InterceptedLogFile
     if not _InterceptedLogFile:
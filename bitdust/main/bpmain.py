@@ -101,6 +101,11 @@ def init(UI='', options=None, args=None, overDict=None, executablePath=None):
     from bitdust.main import settings
     from bitdust.main import config
 
+    #---async logs---
+    # log lines will be written by a separate thread, see lg.close_log_file() in shutdown()
+    if config.conf().getBool('logs/async-enabled'):
+        lg.start_async_writer()
+
     #---USE_TRAY_ICON---
     USE_TRAY_ICON = False
     if _Debug:
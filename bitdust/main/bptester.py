@@ -157,7 +157,7 @@ def SpaceTime():
             printlog('SpaceTime ERROR customers folder not exist: %r' % customers_dir)
         return False
     remove_list = {}
-    used_space = accounting.read_customers_usage()
+    used_space = {}
     for customer_filename in os.listdir(customers_dir):
         onecustdir = os.path.join(customers_dir, customer_filename)
         if not os.path.isdir(onecustdir):
@@ -213,17 +213,6 @@ def SpaceTime():
         timedict.clear()
         sizedict.clear()
 
-    for customer_idurl_bin in list(used_space.keys()):
-        if not id_url.field(customer_idurl_bin).is_latest():
-            latest_customer_idurl_bin = id_url.field(customer_idurl_bin).to_bin()
-            if latest_customer_idurl_bin != customer_idurl_bin:
-                used_space[latest_customer_idurl_bin] = used_space.pop(customer_idurl_bin)
-                if _Debug:
-                    printlog('found customer idurl rotated in customer usage dictionary : %r -> %r' % (
-                        latest_customer_idurl_bin,
-                        customer_idurl_bin,
-                    ))
-
     for path in remove_list.keys():
         if not os.path.exists(path):
             continue
@@ -250,6 +239,7 @@ def SpaceTime():
                 printlog('SpaceTime ERROR removing %r' % path)
     del remove_list
 
+    # only customers found on disk are updated, space used by others is not touched
     accounting.update_customers_usage(used_space)
 
     return True
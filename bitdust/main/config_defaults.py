@@ -54,6 +54,7 @@ def reset(conf_obj):
     conf_obj.setDefaultValue('interface/ftp/port', settings.DefaultFTPPort())
 
     conf_obj.setDefaultValue('logs/api-enabled', 'false')
+    conf_obj.setDefaultValue('logs/async-enabled', 'true')
     conf_obj.setDefaultValue('logs/automat-transitions-enabled', 'false')
     conf_obj.setDefaultValue('logs/automat-events-enabled', 'false')
     conf_obj.setDefaultValue('logs/debug-level', settings.defaultDebugLevel())
@@ -82,6 +83,7 @@ def reset(conf_obj):
     conf_obj.setDefaultValue('services/backups/block-size', diskspace.MakeStringFromBytes(settings.DefaultBackupBlockSize()))
     conf_obj.setDefaultValue('services/backups/max-block-size', diskspace.MakeStringFromBytes(settings.DefaultBackupMaxBlockSize()))
     conf_obj.setDefaultValue('services/backups/max-copies', '2')
+    conf_obj.setDefaultValue('services/backups/encrypt-pipeline-depth', '2')
     conf_obj.setDefaultValue('services/backups/keep-local-copies-enabled', 'true')
     conf_obj.setDefaultValue('services/backups/wait-suppliers-enabled', 'true')
 
@@ -141,6 +143,7 @@ def reset(conf_obj):
     conf_obj.setDefaultValue('services/entangled-dht/udp-port', settings.DefaultDHTPort())
     conf_obj.setDefaultValue('services/entangled-dht/known-nodes', '')
     conf_obj.setDefaultValue('services/entangled-dht/attached-layers', '')
+    conf_obj.setDefaultValue('services/entangled-dht/cache-max-records', '1000')
 
     conf_obj.setDefaultValue('services/employer/enabled', 'true')
     conf_obj.setDefaultValue('services/employer/replace-critically-offline-enabled', 'true')
@@ -190,6 +193,8 @@ def reset(conf_obj):
     conf_obj.setDefaultValue('services/my-ip-port/enabled', 'true')
 
     conf_obj.setDefaultValue('services/network/enabled', 'true')
+    conf_obj.setDefaultValue('services/network/inbox-in-memory-max-size', str(256*1024))
+    conf_obj.setDefaultValue('services/network/outbox-in-memory-max-size', str(256*1024))
     conf_obj.setDefaultValue('services/network/proxy/enabled', 'false')
     conf_obj.setDefaultValue('services/network/proxy/host', '')
     conf_obj.setDefaultValue('services/network/proxy/password', '')
@@ -233,8 +238,11 @@ def reset(conf_obj):
     conf_obj.setDefaultValue('services/proxy-transport/current-router', '')
 
     conf_obj.setDefaultValue('services/rebuilding/enabled', 'true')
+    conf_obj.setDefaultValue('services/rebuilding/child-processes-enabled', 'true')
+    conf_obj.setDefaultValue('services/rebuilding/child-processes-count', 0)
 
     conf_obj.setDefaultValue('services/restores/enabled', 'true')
+    conf_obj.setDefaultValue('services/restores/prefetch-blocks', '3')
 
     conf_obj.setDefaultValue('services/shared-data/enabled', 'true')
 
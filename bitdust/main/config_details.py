@@ -53,6 +53,9 @@ def raw():
 {logs/api-enabled} log API calls
 Enable logging of all API calls that reach the main process to the `~/.bitdust/logs/api.log` file.
 
+{logs/async-enabled} write logs in background
+Log lines are collected in memory and written to the log files by a separate thread, so logging does not slow down the main process. If too many lines are produced at once some of them can be dropped. Disable this option to write every line immediately, restart is required to take place changes.
+
 {logs/automat-events-enabled} log state machines events
 This option enables logging of all events that are submitted to state machines, see `~/.bitdust/logs/automats.log` file.
 
@@ -106,6 +109,10 @@ Maximum block size in bytes which used to split the raw data during uploading pr
 The actual block size is calculated depending on size of the particular backup to optimize performance and data storage.
 If you plan to do a large file uploads - set higher values to increase the performance.
 
+{services/backups/encrypt-pipeline-depth} number of blocks encrypted in parallel
+During uploading every block of data is encrypted and signed in a background thread, so the main process stays responsive.
+That value defines how many blocks can be prepared at the same time while the next block is being read.
+
 {services/backups/keep-local-copies-enabled} keep locally copies of uploaded files
 Enable this to keep a copy of every uploaded file on your local disk as well as on remote machines of your suppliers.
 This increases data reliability, rebuilding performance and decrease network load, but consumes much storage space of your own device.
@@ -196,6 +203,10 @@ This allows the network services to be separated from each other and also makes
 On startup, your device will be automatically connected to some of the layers.
 This value overrides this list and is intended for advanced software use.
 
+{services/entangled-dht/cache-max-records} number of cached DHT records
+Values recently received from the DHT network are cached locally to make repeated lookups faster.
+This value limits the number of cached records for every DHT layer, least recently used records are dropped first.
+
 {services/employer/enabled} search & connect with available suppliers
 In order to store data on the network, you must already have your suppliers ready and accepting your uploads.
 The `employer` network service automatically searches for new suppliers through the DHT network and monitors their reliability.
@@ -305,6 +316,16 @@ The service relies on other nodes and uses the STUN protocol to recognize your p
 {services/network/enabled} network is enabled
 Basic network service of the application. If you disable it, all other network services will be turned off as well and your device will go offline.
 
+{services/network/inbox-in-memory-max-size} keep small incoming packets in memory
+Incoming packets smaller than that value in bytes are received directly into memory,
+only bigger packets are written to temporary files on disk first.
+Set value to `0` to always use temporary files.
+
+{services/network/outbox-in-memory-max-size} keep small outgoing packets in memory
+Outgoing packets smaller than that value in bytes are passed to the transports directly from memory,
+only bigger packets are written to temporary files on disk first.
+Set value to `0` to always use temporary files.
+
 {services/network/proxy/enabled}
 
 {services/network/proxy/host}
@@ -390,9 +411,20 @@ When one of your suppliers is not available for some reason, all encrypted fragm
 The `rebuilding` service will automatically download the available fragments from those suppliers that are still online, and "rebuild" the lost fragments that the new supplier receives.
 **WARNING!** At the moment when a critical number of fragments are lost, downloading data is no longer possible.
 
+{services/rebuilding/child-processes-enabled} use multiple CPU cores
+Enable this option to run RAID encoding, decoding and rebuilding tasks in a pool of child processes and use several CPU cores at once.
+When disabled, all tasks are executed one by one in a separate thread of the main process.
+
+{services/rebuilding/child-processes-count} number of child processes
+Number of RAID tasks executed simultaneously in child processes, set to 0 to use half of the available CPU cores.
+
 {services/restores/enabled} enable data downloading
 Controls network connections and incoming data streams when downloading encrypted fragments from suppliers nodes.
 
+{services/restores/prefetch-blocks} number of blocks requested in advance
+While one block is being rebuilt and decrypted, fragments of the next few blocks are already requested from suppliers.
+Higher values increase downloading speed, but more fragments are kept on your local disk during restore, set to 0 to download blocks one by one.
+
 {services/shared-data/enabled} enable data sharing
 Makes possible decentralized sharing of encrypted files with other users.
 
@@ -78,6 +78,7 @@ def defaults():
         'interface/ftp/enabled': TYPE_BOOLEAN,
         'interface/ftp/port': TYPE_PORT_NUMBER,
         'logs/api-enabled': TYPE_BOOLEAN,
+        'logs/async-enabled': TYPE_BOOLEAN,
         'logs/automat-events-enabled': TYPE_BOOLEAN,
         'logs/automat-transitions-enabled': TYPE_BOOLEAN,
         'logs/debug-level': TYPE_POSITIVE_INTEGER,
@@ -101,6 +102,7 @@ def defaults():
         'services/backup-db/enabled': TYPE_BOOLEAN,
         'services/backups/block-size': TYPE_DISK_SPACE,
         'services/backups/enabled': TYPE_BOOLEAN,
+        'services/backups/encrypt-pipeline-depth': TYPE_POSITIVE_INTEGER,
         'services/backups/keep-local-copies-enabled': TYPE_BOOLEAN,
         'services/backups/max-block-size': TYPE_DISK_SPACE,
         'services/backups/max-copies': TYPE_POSITIVE_INTEGER,
@@ -145,6 +147,7 @@ def defaults():
         'services/entangled-dht/udp-port': TYPE_PORT_NUMBER,
         'services/entangled-dht/known-nodes': TYPE_STRING,
         'services/entangled-dht/attached-layers': TYPE_STRING,
+        'services/entangled-dht/cache-max-records': TYPE_POSITIVE_INTEGER,
         'services/employer/enabled': TYPE_BOOLEAN,
         'services/employer/replace-critically-offline-enabled': TYPE_BOOLEAN,
         'services/employer/candidates': TYPE_STRING,
@@ -178,6 +181,8 @@ def defaults():
         'services/my-data/enabled': TYPE_BOOLEAN,
         'services/my-ip-port/enabled': TYPE_BOOLEAN,
         'services/network/enabled': TYPE_BOOLEAN,
+        'services/network/inbox-in-memory-max-size': TYPE_POSITIVE_INTEGER,
+        'services/network/outbox-in-memory-max-size': TYPE_POSITIVE_INTEGER,
         'services/network/proxy/enabled': TYPE_BOOLEAN,
         'services/network/proxy/host': TYPE_STRING,
         'services/network/proxy/password': TYPE_PASSWORD,
@@ -207,7 +212,10 @@ def defaults():
         'services/proxy-transport/current-router': TYPE_STRING,
         'services/proxy-transport/preferred-routers': TYPE_TEXT,  # 'services/proxy-transport/router-lifetime-seconds': TYPE_POSITIVE_INTEGER,
         'services/rebuilding/enabled': TYPE_BOOLEAN,
+        'services/rebuilding/child-processes-enabled': TYPE_BOOLEAN,
+        'services/rebuilding/child-processes-count': TYPE_POSITIVE_INTEGER,
         'services/restores/enabled': TYPE_BOOLEAN,
+        'services/restores/prefetch-blocks': TYPE_POSITIVE_INTEGER,
         'services/shared-data/enabled': TYPE_BOOLEAN,
         'services/supplier/donated-space': TYPE_DISK_SPACE,
         'services/supplier/enabled': TYPE_BOOLEAN,
@@ -1382,6 +1382,20 @@ def getBandInLimit():
     return config.conf().getInt('services/network/receive-limit', DefaultBandwidthInLimit())
 
 
+def getInboxInMemoryMaxSize():
+    """
+    Incoming packets smaller than that size in bytes are not written on disk.
+    """
+    return config.conf().getInt('services/network/inbox-in-memory-max-size', 256*1024)
+
+
+def getOutboxInMemoryMaxSize():
+    """
+    Outgoing packets smaller than that size in bytes are not written on disk.
+    """
+    return config.conf().getInt('services/network/outbox-in-memory-max-size', 256*1024)
+
+
 def enableIdServer(enable=None):
     if enable is None:
         return config.conf().getBool('services/identity-server/enabled')
@@ -1566,6 +1580,13 @@ def getDHTPort():
     return config.conf().getInt('services/entangled-dht/udp-port', DefaultDHTPort())
 
 
+def getDHTCacheMaxRecords():
+    """
+    Maximum number of cached DHT values to be kept for every DHT layer.
+    """
+    return config.conf().getInt('services/entangled-dht/cache-max-records', 1000)
+
+
 def enablePROXY(enable=None):
     """
     Switch on/off transport_proxy in the settings or get its current state.
@@ -1906,6 +1927,34 @@ def setBackupMaxBlockSize(block_size):
     return config.conf().setData('services/backups/max-block-size', diskspace.MakeStringFromBytes(block_size))
 
 
+def getBackupEncryptPipelineDepth():
+    """
+    Return max number of backup blocks to be encrypted in parallel.
+    """
+    return config.conf().getInt('services/backups/encrypt-pipeline-depth', 2)
+
+
+def getRaidChildProcessesEnabled():
+    """
+    Return True if RAID tasks must be executed in a pool of child processes.
+    """
+    return config.conf().getBool('services/rebuilding/child-processes-enabled')
+
+
+def getRaidChildProcessesCount():
+    """
+    Return number of child processes to be used to execute RAID tasks, 0 means "auto".
+    """
+    return config.conf().getInt('services/rebuilding/child-processes-count', 0)
+
+
+def getRestorePrefetchBlocks():
+    """
+    Return number of blocks to be requested from suppliers in advance during restore.
+    """
+    return config.conf().getInt('services/restores/prefetch-blocks', 3)
+
+
 def getPrivateKeySize():
     """
     Returns your preferred Private Key size from settings.
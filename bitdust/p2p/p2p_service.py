@@ -545,10 +545,14 @@ def ListFiles(request, info):
         lg.out(_DebugLevel, '  from remoteID=%s  ownerID=%s  creatorID=%s' % (request.RemoteID, request.OwnerID, request.CreatorID))
 
 
-def SendListFiles(target_supplier, customer_idurl=None, key_id=None, query_items=[], wide=False, callbacks={}, timeout=None):
+def SendListFiles(target_supplier, customer_idurl=None, key_id=None, query_items=[], revision=None, wide=False, callbacks={}, timeout=None):
     """
     This is used as a request method from your supplier : if you send him a ListFiles() packet
     he will reply you with a list of stored files in a Files() packet.
+
+    If `revision` is not None, supplier is asked to reply with a versioned listing:
+    only lines added or removed since given revision are returned when possible.
+    Empty string means we do not have any listing yet from that supplier.
     """
     if timeout is None:
         timeout = settings.P2PTimeOut()
@@ -581,9 +585,12 @@ def SendListFiles(target_supplier, customer_idurl=None, key_id=None, query_items
     )
     if not query_items:
         query_items = ['*']
-    Payload = serialization.DictToBytes({'items': query_items})
+    json_query = {'items': query_items}
+    if revision is not None:
+        json_query['revision'] = revision
+    Payload = serialization.DictToBytes(json_query)
     if _Debug:
-        lg.out(_DebugLevel, 'p2p_service.SendListFiles %r to %r of customer %r with query : %r' % (PacketID, nameurl.GetName(RemoteID), nameurl.GetName(customer_idurl), query_items))
+        lg.out(_DebugLevel, 'p2p_service.SendListFiles %r to %r of customer %r with query : %r, revision=%r' % (PacketID, nameurl.GetName(RemoteID), nameurl.GetName(customer_idurl), query_items, revision))
     result = signed.Packet(
         Command=commands.ListFiles(),
         OwnerID=MyID,
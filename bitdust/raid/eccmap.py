@@ -578,6 +578,17 @@ class eccmap:
         Lists are 1 for Data and Parity, lists are [0,1,1,1,0...] 0 is
         don't have 1 is have.
         """
+        DataSegs = self.FixData(data_segs, parity_segs)
+        for i in range(self.datasegments):
+            if DataSegs[i] != 1:
+                return False
+        return True
+
+    def FixData(self, data_segs, parity_segs):
+        """
+        Returns a copy of ``data_segs`` where all Data segments which can be reconstructed
+        from given Data and Parity segments are also marked with 1.
+        """
         DataSegs = list(data_segs)
         ParitySegs = list(parity_segs)
         stillMissing = 0
@@ -602,8 +613,48 @@ class eccmap:
                         DataSegs[lastMissing] = 1  # as we could fix lastMissing with current Parity
                         stillMissing -= 1  # so one less stillMissing
 
-        AllFixed = stillMissing == 0  # If nothing else missing we are good
-        return AllFixed
+        return DataSegs
+
+    def GetFetchPlan(self, DataSegs, ParitySegs, DataAvailable, ParityAvailable):
+        """
+        Select the cheapest set of segments which must be downloaded to be able to rebuild the block.
+
+        ``DataSegs`` and ``ParitySegs`` are segments we already have, ``DataAvailable`` and ``ParityAvailable``
+        are segments which can be requested, all lists are [0,1,1,1,0...] 0 is don't have 1 is have.
+        Every available Data segment is selected, because reading the Data is cheaper than reconstructing it.
+        Parity segments are added one by one only to cover Data segments which are missing and not available.
+        Return a tuple of two lists: Data and Parity segment numbers to be requested.
+        """
+        DataSegs = list(DataSegs)
+        ParitySegs = list(ParitySegs)
+        fetchData = []
+        fetchParity = []
+        for DataNum in range(self.datasegments):
+            if DataSegs[DataNum] != 1 and DataAvailable[DataNum]:
+                DataSegs[DataNum] = 1
+                fetchData.append(DataNum)
+        while not self.Fixable(DataSegs, ParitySegs):
+            fixedData = self.FixData(DataSegs, ParitySegs)
+            bestParityNum = -1
+            bestParityCost = None
+            for paritynum in range(self.paritysegments):
+                if ParitySegs[paritynum] == 1 or not ParityAvailable[paritynum]:
+                    continue
+                Parity = self.ParityToData[paritynum]
+                missing = len([DataNum for DataNum in Parity if fixedData[DataNum] != 1])
+                if missing == 0:
+                    # this parity will not help to fix anything
+                    continue
+                # parity with exactly one missing data fixes it right away, smaller parity maps are preferred
+                if bestParityCost is None or (missing, len(Parity)) < bestParityCost:
+                    bestParityNum = paritynum
+                    bestParityCost = (missing, len(Parity))
+            if bestParityNum < 0:
+                # not possible to fix the block even with all available parity segments
+                break
+            ParitySegs[bestParityNum] = 1
+            fetchParity.append(bestParityNum)
+        return fetchData, fetchParity
 
     def CanMakeProgress(self, DataSegs, ParitySegs):
         """
@@ -57,6 +57,10 @@ _Debug = False
 
 #------------------------------------------------------------------------------
 
+_ParityEngine = 'bigint'
+
+#------------------------------------------------------------------------------
+
 import os
 import sys
 import copy
@@ -99,6 +103,16 @@ def RoundupFile(filename, stepsize):
         f.close()
 
 
+def RoundupData(data, stepsize):
+    """
+    Same as ``RoundupFile()`` but works with the data in memory.
+    """
+    mod = len(data) % stepsize
+    if mod > 0:
+        data += b' '*(stepsize - mod)
+    return data
+
+
 def ReadBinaryFile(filename):
     if not os.path.isfile(filename):
         return b''
@@ -139,11 +153,22 @@ def ReadBinaryFileAsArray(filename):
     return values
 
 
-def do_in_memory(filename, eccmapname, version, blockNumber, targetDir, threshold_control=None):
+def do_in_memory(filename, eccmapname, version, blockNumber, targetDir, threshold_control=None, engine=None):
+    """
+    Split the input file into Data segments and build Parity segments for them.
+
+    Two parity engines are available and both produce byte-identical Data/Parity files:
+        "bigint" : XOR whole data segments at once as big integers, this is the default
+        "array" : old engine, walks every 4-byte integer of every data segment in a Python loop
+    """
     try:
+        engine = engine or _ParityEngine
         if _Debug:
             with open('/tmp/raid.log', 'a') as logfile:
-                logfile.write(u'make filename=%s eccmapname=%s blockNumber=%s\n' % (repr(filename), eccmapname, blockNumber))
+                logfile.write(u'make filename=%s eccmapname=%s blockNumber=%s engine=%s\n' % (repr(filename), eccmapname, blockNumber, engine))
+
+        if engine not in ('bigint', 'array'):
+            raise Exception('unknown parity engine: %r' % engine)
 
         if not os.path.exists(targetDir):
             os.makedirs(targetDir)
@@ -152,6 +177,10 @@ def do_in_memory(filename, eccmapname, version, blockNumber, targetDir, threshol
         myeccmap = bitdust.raid.eccmap.eccmap(eccmapname)
         # any padding at end and block.Length fixes
         RoundupFile(filename, myeccmap.datasegments*INTSIZE)
+
+        if engine == 'bigint':
+            return WriteSegments(ReadBinaryFile(filename), myeccmap, blockNumber, targetDir, threshold_control=threshold_control)
+
         wholefile = ReadBinaryFileAsArray(filename)
         length = len(wholefile)
         length = length*4
@@ -191,6 +220,62 @@ def do_in_memory(filename, eccmapname, version, blockNumber, targetDir, threshol
         return -1, -1
 
 
+def do_in_memory_data(blockID, data, eccmapname, version, blockNumber, targetDir, threshold_control=None):
+    """
+    Same as ``do_in_memory()`` but takes the block data directly from memory, so only
+    the resulting Data/Parity segments are written to disk.
+
+    The ``blockID`` is only used to identify the task, ``data`` must be a bytes-like object.
+    """
+    try:
+        if _Debug:
+            with open('/tmp/raid.log', 'a') as logfile:
+                logfile.write(u'make blockID=%s length=%d eccmapname=%s blockNumber=%s\n' % (repr(blockID), len(data), eccmapname, blockNumber))
+
+        if not os.path.exists(targetDir):
+            os.makedirs(targetDir)
+
+        INTSIZE = 4
+        myeccmap = bitdust.raid.eccmap.eccmap(eccmapname)
+        # any padding at end and block.Length fixes
+        wholefile = RoundupData(bytes(data), myeccmap.datasegments*INTSIZE)
+        return WriteSegments(wholefile, myeccmap, blockNumber, targetDir, threshold_control=threshold_control)
+
+    except:
+        bitdust.logs.lg.exc()
+        return -1, -1
+
+
+def WriteSegments(wholefile, myeccmap, blockNumber, targetDir, threshold_control=None):
+    """
+    Split already padded data into Data segments, build Parity segments with "bigint" engine
+    and write all of them into ``targetDir``.
+    """
+    seglength = int(len(wholefile)/myeccmap.datasegments)
+
+    # dict of data segments
+    sds = {}
+    for seg_num, chunk in enumerate(bitdust.raid.raidutils.chunks(wholefile, seglength or 1)):
+        FileName = targetDir + '/' + str(blockNumber) + '-' + str(seg_num) + '-Data'
+        with open(FileName, mode='wb') as f:
+            sds[seg_num] = chunk
+            f.write(chunk)
+
+    psds_list = bitdust.raid.raidutils.build_parity_bigint(
+        sds,
+        seglength,
+        myeccmap,
+        threshold_control=threshold_control,
+    )
+
+    for PSegNum, _ in psds_list.items():
+        FileName = targetDir + '/' + str(blockNumber) + '-' + str(PSegNum) + '-Parity'
+        with open(FileName, mode='wb') as f:
+            f.write(psds_list[PSegNum])
+
+    return len(sds), len(psds_list)
+
+
 def main():
     do_in_memory(filename=sys.argv[1], eccmapname=sys.argv[2], version=sys.argv[3], blockNumber=int(sys.argv[4]), targetDir=sys.argv[5])
 
@@ -86,9 +86,13 @@ from bitdust.automats import automat
 
 from bitdust.system import bpio
 
+from bitdust.main import config
+from bitdust.main import settings
+
 from bitdust.raid import read
 from bitdust.raid import make
 from bitdust.raid import rebuild
+from bitdust.raid import worker
 
 #------------------------------------------------------------------------------
 
@@ -118,6 +122,13 @@ _VALID_TASKS = {
             make.ReadBinaryFileAsArray,
         ),
     ),
+    'make_data': (
+        make.do_in_memory_data,
+        (
+            make.RoundupData,
+            make.WriteSegments,
+        ),
+    ),
     'read': (
         read.raidread,
         (
@@ -151,7 +162,10 @@ def cancel_task(cmd, first_parameter):
     for t_id, t_cmd, t_params in A().tasks:
         if cmd == t_cmd and first_parameter == t_params[0]:
             try:
-                A().tasks.remove(t_id, t_cmd, t_params)
+                A().tasks.remove((t_id, t_cmd, t_params))
+                A().task_times.pop(t_id, None)
+                cb = A().callbacks.pop(t_id)
+                reactor.callLater(0, cb, t_cmd, t_params, None)  # @UndefinedVariable
                 if _Debug:
                     lg.out(_DebugLevel, 'raid_worker.cancel_task found pending task %r, canceling %r' % (t_id, first_parameter))
             except:
@@ -172,6 +186,24 @@ def cancel_task(cmd, first_parameter):
     return True
 
 
+def get_ncpus():
+    """
+    Returns number of RAID tasks which can be executed at the same time.
+    """
+    if not A() or not A().processor:
+        return 1
+    return A().processor.get_ncpus()
+
+
+def get_stats():
+    """
+    Returns info about RAID tasks: queue depth, progress of running tasks and tasks latency.
+    """
+    if not A():
+        return {}
+    return A().get_stats()
+
+
 #------------------------------------------------------------------------------
 
 
@@ -218,6 +250,11 @@ class RaidWorker(automat.Automat):
         self.activetasks = {}
         self.processor = None
         self.callbacks = {}
+        self.task_times = {}
+        self.tasks_done = 0
+        self.total_wait_time = 0.0
+        self.total_run_time = 0.0
+        self.max_run_time = 0.0
 
     def A(self, event, *args, **kwargs):
         #---AT_STARTUP---
@@ -309,34 +346,18 @@ class RaidWorker(automat.Automat):
         """
         Action method.
         """
-        self.processor = ThreadedRaidProcessor()
-
-        # TODO: possible improvement in the future
         # On Android it is not possible to run a separate sub-process: the only possible way is to use threads
-        # but on Windows and Linux we can use parallelp or multiprocessing libraries to utilize other CPU cores and
-        # gain more performance
-
-        # we do not want to use all CPU cores at once
-        # need to keep at least one for all other operations
-        # decided to use only half of CPUs at the moment
-        # TODO: make an option in the software settings
-        # ncpus = bpio.detect_number_of_cpu_cores()
-        # if ncpus > 1:
-        #     ncpus = int(ncpus/2.0)
-        # if bpio.Android() or not config.conf().getBool('services/rebuilding/child-processes-enabled'):
-        #     self.processor = ThreadedRaidProcessor()
-        # else:
-        #     os.environ['PYTHONUNBUFFERED'] = '1'
-        #     from parallelp import pp
-        #     self.processor = pp.Server(
-        #         secret='bitdust',
-        #         ncpus=ncpus,
-        #         loglevel=lg.get_loging_level(_DebugLevel),
-        #         logfile=settings.ParallelPLogFilename(),
-        #     )
-        # else:
-        #     from bitdust.raid import worker
-        #     self.processor = worker.Manager(ncpus=ncpus)
+        # but on Windows and Linux we can use multiprocessing library to utilize other CPU cores and gain more performance
+        if bpio.Android() or not config.conf() or not settings.getRaidChildProcessesEnabled():
+            self.processor = ThreadedRaidProcessor()
+        else:
+            ncpus = settings.getRaidChildProcessesCount()
+            if not ncpus:
+                # we do not want to use all CPU cores at once
+                # need to keep at least one for all other operations
+                # decided to use only half of CPUs by default
+                ncpus = max(1, int(bpio.detect_number_of_cpu_cores()/2.0))
+            self.processor = ProcessRaidProcessor(ncpus=ncpus)
 
         self.automat('process-started')
 
@@ -356,6 +377,7 @@ class RaidWorker(automat.Automat):
         self.task_id += 1
         self.tasks.append((self.task_id, cmd, params))
         self.callbacks[self.task_id] = callback
+        self.task_times[self.task_id] = [time.time(), None]
 
     def doStartTask(self, *args, **kwargs):
         """
@@ -385,6 +407,8 @@ class RaidWorker(automat.Automat):
         )
 
         self.activetasks[task_id] = (proc, cmd, params)
+        if task_id in self.task_times:
+            self.task_times[task_id][1] = time.time()
         if _Debug:
             lg.out(_DebugLevel, 'raid_worker.doStartTask job_id=%r active=%d cpus=%d %s' % (task_id, len(self.activetasks), self.processor.get_ncpus(), threading.currentThread().getName()))
 
@@ -398,6 +422,7 @@ class RaidWorker(automat.Automat):
         task_id, cmd, params, result = args[0]
         cb = self.callbacks.pop(task_id)
         reactor.callLater(0, cb, cmd, params, result)  # @UndefinedVariable
+        self._count_task_latency(task_id)
         if result is not None:
             if _Debug:
                 lg.out(_DebugLevel, 'raid_worker.doReportTaskDone callbacks: %d tasks: %d active: %d' % (len(self.callbacks), len(self.tasks), len(self.activetasks)))
@@ -437,6 +462,39 @@ class RaidWorker(automat.Automat):
     #         task_id, err, list(self.activetasks.keys()), cmd, params))
     #     self.automat('shutdown')
 
+    def _count_task_latency(self, task_id):
+        added, started = self.task_times.pop(task_id, (None, None))
+        if added is None or started is None:
+            return
+        run_time = time.time() - started
+        self.tasks_done += 1
+        self.total_wait_time += started - added
+        self.total_run_time += run_time
+        self.max_run_time = max(self.max_run_time, run_time)
+
+    def get_stats(self):
+        active = []
+        for task_id, task_data in self.activetasks.items():
+            t_proc, t_cmd, t_params = task_data
+            started = (self.task_times.get(task_id) or [None, None])[1]
+            active.append({
+                'task_id': task_id,
+                'cmd': t_cmd,
+                'param': t_params[0],
+                'bytes_processed': self.processor.get_progress(t_proc.tid) if self.processor else 0,
+                'running_seconds': (time.time() - started) if started else 0,
+            })
+        return {
+            'processor': self.processor.__class__.__name__ if self.processor else None,
+            'ncpus': self.processor.get_ncpus() if self.processor else 0,
+            'queue_depth': len(self.tasks),
+            'active': active,
+            'tasks_done': self.tasks_done,
+            'average_wait_seconds': (self.total_wait_time/self.tasks_done) if self.tasks_done else 0,
+            'average_run_seconds': (self.total_run_time/self.tasks_done) if self.tasks_done else 0,
+            'max_run_seconds': self.max_run_time,
+        }
+
     def _kill_processor(self):
         if self.processor:
             self.processor.destroy()
@@ -502,18 +560,27 @@ class RaidTaskInfo(object):
 
 class ThreadedRaidProcessor(object):
 
-    def __init__(self):
+    def __init__(self, max_simultaneous_tasks=1):
         self.latest_task_id = 0
         self.tasks = {}
         self.active_tasks = {}
-        self.max_simultaneous_tasks = 1
+        self.max_simultaneous_tasks = max_simultaneous_tasks
 
     def cancel(self, task_id):
+        if task_id in self.tasks:
+            # task was not started yet, it will fail right after the start
+            self.tasks[task_id].stop()
+            return
         if task_id not in self.active_tasks:
             lg.warn('can not cancel task %r, task was not found' % task_id)
             return
         self.active_tasks[task_id].stop()
 
+    def get_progress(self, task_id):
+        if task_id not in self.active_tasks:
+            return 0
+        return self.active_tasks[task_id]._bytes_processed
+
     def destroy(self):
         for ts in self.active_tasks.values():
             ts.stop()
@@ -569,6 +636,100 @@ class ThreadedRaidProcessor(object):
 #------------------------------------------------------------------------------
 
 
+class ProcessRaidProcessor(object):
+
+    """
+    Executes up to ``ncpus`` RAID tasks at once in a pool of child processes.
+
+    Each running task occupies one "slot" in two arrays shared with the child processes:
+    the ``threshold_control`` callback in the child process checks the cancellation flag
+    and counts processed bytes there.
+    """
+
+    def __init__(self, ncpus):
+        self.ncpus = ncpus
+        self.latest_task_id = 0
+        self.tasks = {}
+        self.active_tasks = {}
+        self.free_slots = list(range(ncpus))
+        self.cancel_flags = worker.create_shared_array('b', ncpus)
+        self.bytes_processed = worker.create_shared_array('q', ncpus)
+        self.pool = worker.create_pool(ncpus, self.cancel_flags, self.bytes_processed)
+
+    def cancel(self, task_id):
+        if task_id in self.tasks:
+            _, _, callback = self.tasks.pop(task_id)
+            reactor.callLater(0, callback, None)  # @UndefinedVariable
+            return
+        if task_id not in self.active_tasks:
+            lg.warn('can not cancel task %r, task was not found' % task_id)
+            return
+        self.cancel_flags[self.active_tasks[task_id]] = 1
+
+    def destroy(self):
+        for slot in self.active_tasks.values():
+            self.cancel_flags[slot] = 1
+        self.tasks.clear()
+        if self.pool:
+            self.pool.terminate()
+            self.pool = None
+
+    def get_ncpus(self):
+        return self.ncpus
+
+    def get_progress(self, task_id):
+        if task_id not in self.active_tasks:
+            return 0
+        return self.bytes_processed[self.active_tasks[task_id]]
+
+    def on_done(self, task_id, result, callback):
+        slot = self.active_tasks.pop(task_id, None)
+        if slot is None:
+            return None
+        if _Debug:
+            lg.args(_DebugLevel, task_id=task_id, result=result, bytes_processed=self.bytes_processed[slot], active_tasks=list(self.active_tasks.keys()))
+        self.free_slots.append(slot)
+        reactor.callLater(0, callback, result)  # @UndefinedVariable
+        reactor.callLater(0, self.process)  # @UndefinedVariable
+        return None
+
+    def on_fail(self, task_id, err, callback):
+        lg.err('raid task %r failed: %r' % (task_id, err))
+        return self.on_done(task_id, None, callback)
+
+    def process(self):
+        if not self.pool:
+            return False
+        while self.free_slots and self.tasks:
+            next_task_id = sorted(self.tasks.keys())[0]
+            func, args, callback = self.tasks.pop(next_task_id)
+            slot = self.free_slots.pop(0)
+            self.cancel_flags[slot] = 0
+            self.bytes_processed[slot] = 0
+            self.active_tasks[next_task_id] = slot
+            self.pool.apply_async(
+                worker.run_child_task,
+                args=(slot, func, args),
+                callback=lambda result, task_id=next_task_id, cb=callback: reactor.callFromThread(self.on_done, task_id, result, cb),  # @UndefinedVariable
+                error_callback=lambda err, task_id=next_task_id, cb=callback: reactor.callFromThread(self.on_fail, task_id, err, cb),  # @UndefinedVariable
+            )
+        return True
+
+    def submit(self, func, args=None, depfuncs=None, modules=None, callback=None):
+        task_id = self.latest_task_id + 1
+        if task_id in self.tasks:
+            raise Exception('another RaidTask already exists with task_id=%r' % task_id)
+        self.tasks[task_id] = (func, args or (), callback)
+        self.latest_task_id = task_id
+        if _Debug:
+            lg.args(_DebugLevel, task_id=task_id, func=func, total_tasks=len(self.tasks))
+        reactor.callLater(0, self.process)  # @UndefinedVariable
+        return RaidTaskInfo(task_id)
+
+
+#------------------------------------------------------------------------------
+
+
 def _read_done(cmd, taskdata, result):
     lg.out(0, '_read_done %r %r %r' % (cmd, taskdata, result))
     A('shutdown')
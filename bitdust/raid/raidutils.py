@@ -60,6 +60,37 @@ def build_parity(sds, iters, datasegments, myeccmap, paritysegments, threshold_c
     return psds_list
 
 
+def build_parity_bigint(segments, seglength, myeccmap, threshold_control=None):
+    """
+    Same result as ``build_parity()`` but every data segment is converted into one big integer
+    and XOR-ed with the parity segments at once, so no Python loop over 4-byte values is needed.
+
+    Input is a dict of ``{DSegNum: bytes}``, output is a dict of ``{PSegNum: bytes}``
+    where each value is exactly ``seglength`` bytes long.
+    """
+    parities = [0]*myeccmap.paritysegments
+
+    for DSegNum in range(myeccmap.datasegments):
+        segment = segments.get(DSegNum)
+        if not segment:
+            continue
+
+        value = int.from_bytes(segment, 'big')
+        Map = myeccmap.DataToParity[DSegNum]
+        for PSegNum in Map:
+            if PSegNum >= myeccmap.paritysegments:
+                myeccmap.check()
+                raise Exception('eccmap error')
+
+            parities[PSegNum] ^= value
+
+        if threshold_control:
+            if not threshold_control(len(segment)):
+                raise Exception('task cancelled')
+
+    return {PSegNum: parities[PSegNum].to_bytes(seglength, 'big') for PSegNum in range(myeccmap.paritysegments)}
+
+
 def chunks(l, n):
     """Yield successive n-sized chunks from l."""
     for i in range(0, len(l), n):
@@ -56,7 +56,6 @@
 
 from __future__ import absolute_import
 from __future__ import print_function
-import six
 from io import open
 from six.moves import range
 
@@ -66,6 +65,10 @@ _Debug = False
 
 #------------------------------------------------------------------------------
 
+_RebuildChunkSize = 1024*1024
+
+#------------------------------------------------------------------------------
+
 import os
 import sys
 
@@ -97,51 +100,43 @@ def ReadBinaryFile(filename):
 
 
 def RebuildOne(inlist, listlen, outfilename, threshold_control=None):
-    readsize = 1  # vary from 1 byte to 4 bytes
-    raidfiles = ['']*listlen  # just need a list of this size
-    raidreads = ['']*listlen
+    """
+    Reconstruct one missing segment by XOR-ing all other segments from ``inlist`` together.
+
+    Every input file is read at once and XOR-ed in chunks of ``_RebuildChunkSize`` bytes as big integers,
+    the ``threshold_control`` callback is executed after each chunk.
+    Result is written to ``outfilename`` with a single write.
+    """
+    raidreads = []
     for filenum in range(listlen):
         try:
-            raidfiles[filenum] = open(inlist[filenum], 'rb')
+            with open(inlist[filenum], 'rb') as f:
+                raidreads.append(memoryview(f.read()))
         except:
             bitdust.logs.lg.exc()
-            for f in raidfiles:
-                try:
-                    f.close()
-                except:
-                    pass
             return False
 
-    rebuildfile = open(outfilename, 'wb')
+    length = len(raidreads[0])
+    for filenum in range(listlen):
+        if len(raidreads[filenum]) < length:
+            raise Exception('segment %r is shorter than %d bytes' % (inlist[filenum], length))
+
+    rebuilt = []
     progress = 0
-    while True:
+    while progress < length:
+        readsize = min(_RebuildChunkSize, length - progress)
+        xor = 0
         for k in range(listlen):
-            raidreads[k] = raidfiles[k].read(2048)
-        if not raidreads[0]:
-            break
-        i = 0
-        while i < len(raidreads[0]):
-            xor = 0
-            for j in range(listlen):
-                b1 = ord(raidreads[j][i:i + 1])
-                xor = xor ^ b1
-            if six.PY3:
-                out_byte = bytes([
-                    xor,
-                ])
-            else:
-                out_byte = chr(xor)
-            rebuildfile.write(out_byte)
-            i += readsize
-            progress += 1
-
-            if threshold_control:
-                if not threshold_control(readsize):
-                    raise Exception('task cancelled')
+            xor ^= int.from_bytes(raidreads[k][progress:progress + readsize], 'big')
+        rebuilt.append(xor.to_bytes(readsize, 'big'))
+        progress += readsize
 
-    for filenum in range(listlen):
-        raidfiles[filenum].close()
-    rebuildfile.close()
+        if threshold_control:
+            if not threshold_control(readsize):
+                raise Exception('task cancelled')
+
+    with open(outfilename, 'wb') as rebuildfile:
+        rebuildfile.write(b''.join(rebuilt))
 
     if _Debug:
         with open('/tmp/raid.log', 'a') as logfile:
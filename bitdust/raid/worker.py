@@ -184,3 +184,55 @@ class Manager(object):
                 del self.tasks[task_id]
             except KeyError:
                 pass
+
+
+#------------------------------------------------------------------------------
+
+_ChildCancelFlags = None
+_ChildBytesProcessed = None
+
+#------------------------------------------------------------------------------
+
+
+def create_pool(ncpus, cancel_flags, bytes_processed):
+    """
+    Starts a new pool of ``ncpus`` child processes.
+
+    Every child process keeps a reference to two shared arrays created with ``create_shared_array()``:
+    one slot of ``cancel_flags`` and ``bytes_processed`` is assigned to each running task.
+    """
+    ctx = multiprocessing.get_context('spawn')
+    from bitdust.system import bpio
+    if bpio.Windows():
+        from bitdust.system import deploy
+        deploy.init_base_dir()
+        venv_python_path = os.path.join(deploy.current_base_dir(), 'venv', 'Scripts', 'bitdust-node.exe')
+        lg.info('will use %s as multiprocessing executable' % venv_python_path)
+        ctx.set_executable(venv_python_path)
+    return ctx.Pool(ncpus, initializer=init_child_process, initargs=(cancel_flags, bytes_processed))
+
+
+def create_shared_array(typecode, size):
+    return multiprocessing.get_context('spawn').RawArray(typecode, size)
+
+
+def init_child_process(cancel_flags, bytes_processed):
+    global _ChildCancelFlags
+    global _ChildBytesProcessed
+    _ChildCancelFlags = cancel_flags
+    _ChildBytesProcessed = bytes_processed
+
+
+def run_child_task(slot, func, params):
+    """
+    Executed inside of a child process, the ``threshold_control`` callback is passed to the task
+    as the last argument the same way as ``raid_worker.RaidTask`` does.
+    """
+
+    def _threshold_control(more_bytes):
+        if _ChildCancelFlags[slot]:
+            return False
+        _ChildBytesProcessed[slot] += more_bytes
+        return True
+
+    return func(*(tuple(params) + (_threshold_control, )))
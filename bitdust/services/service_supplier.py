@@ -60,13 +60,17 @@ class SupplierService(LocalService):
         ]
 
     def start(self):
+        from bitdust.storage import accounting
         from bitdust.supplier import customer_space
+        accounting.init()
         customer_space.init()
         return True
 
     def stop(self):
+        from bitdust.storage import accounting
         from bitdust.supplier import customer_space
         customer_space.shutdown()
+        accounting.shutdown()
         return True
 
     def request(self, json_payload, newpacket, info):
@@ -48,6 +48,9 @@ _DebugLevel = 4
 
 import os
 import math
+import threading
+
+from twisted.internet import reactor  # @UnresolvedImport
 
 from bitdust.logs import lg
 
@@ -72,43 +75,152 @@ from bitdust.userid import my_id
 #------------------------------------------------------------------------------
 
 
+LEDGER_FLUSH_DELAY = 5
+
+#------------------------------------------------------------------------------
+
+_Quotas = None
+_FreeSpace = 0
+_QuotasFileExists = False
+_Usage = None
+_UsageChanged = False
+_FlushPending = False
+_FlushTask = None
+_LedgerLock = threading.RLock()
+
+#------------------------------------------------------------------------------
+
+
 def init():
     if _Debug:
         lg.out(_DebugLevel, 'accounting.init')
+    load_ledger()
+
+
+def shutdown():
+    global _Quotas
+    global _Usage
+    if _Debug:
+        lg.out(_DebugLevel, 'accounting.shutdown')
+    with _LedgerLock:
+        flush_ledger()
+        _Quotas = None
+        _Usage = None
+
+
+#------------------------------------------------------------------------------
+
+
+def load_ledger(force=False):
+    """
+    Customers quotas and used space are read from the disk only once and then kept in memory.
+    Both files are written back in the same format, so they can still be read by older versions.
+    """
+    global _Quotas
+    global _FreeSpace
+    global _QuotasFileExists
+    global _Usage
+    global _UsageChanged
+    with _LedgerLock:
+        if _Quotas is not None and not force:
+            return False
+        _QuotasFileExists = os.path.isfile(settings.CustomersSpaceFile())
+        space_dict = bpio._read_dict(settings.CustomersSpaceFile(), {}) or {}
+        _FreeSpace = int(space_dict.pop('free', 0))
+        _Quotas = {id_url.field(k).to_bin(): v for k, v in space_dict.items()}
+        usage_dict = {}
+        if os.path.exists(settings.CustomersUsedSpaceFile()):
+            usage_dict = jsn.dict_keys_to_bin(bpio._read_dict(settings.CustomersUsedSpaceFile(), {}) or {})
+        _Usage = {id_url.field(k).to_bin(): v for k, v in usage_dict.items()}
+        _UsageChanged = False
+        if _Debug:
+            lg.args(_DebugLevel, quotas=len(_Quotas), usage=len(_Usage), free=_FreeSpace)
+    return True
+
+
+def flush_ledger():
+    """
+    Writes pending changes of customers used space to the disk.
+    """
+    global _UsageChanged
+    global _FlushPending
+    global _FlushTask
+    with _LedgerLock:
+        _FlushPending = False
+        if _FlushTask and _FlushTask.active():
+            _FlushTask.cancel()
+        _FlushTask = None
+        if not _UsageChanged or _Usage is None:
+            return False
+        _UsageChanged = False
+        return bpio._write_dict(settings.CustomersUsedSpaceFile(), jsn.dict_keys_to_text(_Usage))
+
+
+def _schedule_flush():
+    global _FlushPending
+    if _FlushPending:
+        return
+    _FlushPending = True
+    reactor.callFromThread(_start_flush_task)  # @UndefinedVariable
+
+
+def _start_flush_task():
+    global _FlushTask
+    with _LedgerLock:
+        if not _FlushPending or _FlushTask:
+            return
+        _FlushTask = reactor.callLater(LEDGER_FLUSH_DELAY, flush_ledger)  # @UndefinedVariable
 
 
 #------------------------------------------------------------------------------
 
 
 def read_customers_quotas():
-    space_dict = bpio._read_dict(settings.CustomersSpaceFile(), {})
-    free_space = int(space_dict.pop('free', 0))
-    space_dict = {id_url.field(k).to_bin(): v for k, v in space_dict.items()}
-    return space_dict, free_space
+    with _LedgerLock:
+        load_ledger()
+        return dict(_Quotas), _FreeSpace
 
 
 def write_customers_quotas(new_space_dict, free_space):
-    space_dict = {id_url.field(k).to_text(): v for k, v in new_space_dict.items()}
-    space_dict['free'] = free_space
-    return bpio._write_dict(settings.CustomersSpaceFile(), space_dict)
+    global _Quotas
+    global _FreeSpace
+    global _QuotasFileExists
+    with _LedgerLock:
+        load_ledger()
+        _Quotas = {id_url.field(k).to_bin(): v for k, v in new_space_dict.items()}
+        _FreeSpace = int(free_space)
+        _QuotasFileExists = True
+        space_dict = {id_url.field(k).to_text(): v for k, v in _Quotas.items()}
+        space_dict['free'] = free_space
+        return bpio._write_dict(settings.CustomersSpaceFile(), space_dict)
 
 
 def get_customer_quota(customer_idurl):
     customer_idurl = id_url.field(customer_idurl).to_bin()
-    try:
-        return int(read_customers_quotas()[0].get(customer_idurl, None))
-    except:
-        return None
+    with _LedgerLock:
+        load_ledger()
+        try:
+            return int(_Quotas.get(customer_idurl, None))
+        except:
+            return None
 
 
 def check_create_customers_quotas(donated_bytes=None):
-    if not os.path.isfile(settings.CustomersSpaceFile()):
+    global _Quotas
+    global _FreeSpace
+    global _QuotasFileExists
+    with _LedgerLock:
+        load_ledger()
+        if _QuotasFileExists:
+            return False
+        _Quotas = {}
+        _FreeSpace = donated_bytes or settings.getDonatedBytes()
+        _QuotasFileExists = True
         bpio._write_dict(settings.CustomersSpaceFile(), {
-            'free': donated_bytes or settings.getDonatedBytes(),
+            'free': _FreeSpace,
         })
-        lg.info('created a new customers quotas file: %s' % settings.CustomersSpaceFile())
-        return True
-    return False
+    lg.info('created a new customers quotas file: %s' % settings.CustomersSpaceFile())
+    return True
 
 
 def count_consumed_space(space_dict=None):
@@ -148,16 +260,85 @@ def validate_customers_quotas(space_dict=None, free_space=None):
 
 
 def read_customers_usage():
-    usage_dict = {}
-    if os.path.exists(settings.CustomersUsedSpaceFile()):
-        usage_dict = jsn.dict_keys_to_bin(bpio._read_dict(settings.CustomersUsedSpaceFile(), {}))
-    usage_dict = {id_url.field(k).to_bin(): v for k, v in usage_dict.items()}
-    return usage_dict
+    with _LedgerLock:
+        load_ledger()
+        return dict(_Usage)
 
 
 def update_customers_usage(new_space_usage_dict):
-    usage_dict = {id_url.field(k).to_bin(): v for k, v in new_space_usage_dict.items()}
-    return bpio._write_dict(settings.CustomersUsedSpaceFile(), jsn.dict_keys_to_text(usage_dict))
+    """
+    Merge used space re-calculated by `bptester.SpaceTime()` into the ledger.
+    Only given customers are updated, value stored with previous IDURL of the same customer is replaced.
+    """
+    global _UsageChanged
+    with _LedgerLock:
+        load_ledger()
+        for customer_idurl, used_bytes in new_space_usage_dict.items():
+            customer_idurl = id_url.field(customer_idurl)
+            customer_idurl_bin = customer_idurl.to_bin()
+            if id_url.is_cached(customer_idurl):
+                for known_idurl_bin in list(_Usage.keys()):
+                    if known_idurl_bin != customer_idurl_bin and id_url.is_cached(known_idurl_bin) and id_url.field(known_idurl_bin) == customer_idurl:
+                        _Usage.pop(known_idurl_bin)
+            _Usage[customer_idurl_bin] = used_bytes
+        _UsageChanged = True
+        _schedule_flush()
+    return True
+
+
+def get_customer_usage(customer_idurl):
+    customer_idurl = id_url.field(customer_idurl).to_bin()
+    with _LedgerLock:
+        load_ledger()
+        try:
+            return int(_Usage.get(customer_idurl, None))
+        except:
+            return None
+
+
+def add_customer_usage(customer_idurl, delta_bytes):
+    """
+    Adjusts known used space of given customer after a file was written or removed.
+    The value is periodically re-calculated from the files on disk by `bptester.SpaceTime()`.
+    """
+    global _UsageChanged
+    customer_idurl = id_url.field(customer_idurl).to_bin()
+    with _LedgerLock:
+        load_ledger()
+        try:
+            current_bytes = int(_Usage.get(customer_idurl, 0))
+        except:
+            current_bytes = 0
+        _Usage[customer_idurl] = str(max(0, current_bytes + delta_bytes))
+        _UsageChanged = True
+        _schedule_flush()
+        return int(_Usage[customer_idurl])
+
+
+def rotate_customer_usage(old_idurl):
+    """
+    Used space is stored in memory with the latest known IDURL of the customer,
+    so it must be moved to the new key when identity of that customer was rotated.
+    """
+    global _UsageChanged
+    old_idurl = id_url.field(old_idurl)
+    changed = False
+    with _LedgerLock:
+        load_ledger()
+        for customer_idurl_bin in list(_Usage.keys()):
+            if not id_url.is_cached(old_idurl) or not id_url.is_cached(customer_idurl_bin):
+                continue
+            if id_url.field(customer_idurl_bin) != old_idurl:
+                continue
+            latest_customer_idurl_bin = id_url.field(customer_idurl_bin).to_bin()
+            if latest_customer_idurl_bin != customer_idurl_bin:
+                _Usage[latest_customer_idurl_bin] = _Usage.pop(customer_idurl_bin)
+                changed = True
+                lg.info('found customer idurl rotated in customers usage dictionary : %r -> %r' % (customer_idurl_bin, latest_customer_idurl_bin))
+        if changed:
+            _UsageChanged = True
+            _schedule_flush()
+    return changed
 
 
 def calculate_customers_usage_ratio(space_dict=None, used_dict=None):
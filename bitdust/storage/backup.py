@@ -45,8 +45,10 @@ Main idea:
    3) always use select/poll before reading, so never block the main process
    4) also poll to see if more data is needed to create a block
    5) number/name blocks so can be sure what is what when we read back later
-   6) encrypt the block data into ``encrypted_blocks``
-   7) call ``p2p.raidmake`` to split block and make "Parity" packets (pieces of block)
+   6) encrypt the block data into ``encrypted_blocks`` in a background thread,
+      few blocks can be encrypted in parallel while next block is being read
+   7) call ``p2p.raidmake`` to split block and make "Parity" packets (pieces of block),
+      encrypted blocks are passed to RAID always in the same order they were read
    8) notify the top level code about new pieces of data to send on suppliers
 
 This state machine controls the data read from the folder,
@@ -86,6 +88,12 @@ _DebugLevel = 14
 
 #------------------------------------------------------------------------------
 
+# serialized blocks are passed to the RAID encoder directly from memory,
+# set to False to write every block to a temporary file first
+_RaidInMemory = True
+
+#------------------------------------------------------------------------------
+
 import os
 import sys
 import time
@@ -96,7 +104,8 @@ try:
 except:
     sys.exit('Error initializing twisted.internet.reactor in backup.py')
 
-from twisted.internet.defer import maybeDeferred, Deferred, succeed
+from twisted.internet import threads
+from twisted.internet.defer import Deferred, succeed
 
 #------------------------------------------------------------------------------
 
@@ -177,6 +186,19 @@ class backup(automat.Automat):
         self.currentBlockData = BytesIO()
         self.currentBlockSize = 0
         self.workBlocks = {}
+        self.encryptedBlocks = {}
+        self.encryptingCount = 0
+        self.encryptDepth = max(1, settings.getBackupEncryptPipelineDepth() or 1)
+        self.waitingBlockNumber = None
+        self.waitingRaidBlockNumber = None
+        self.nextRaidBlockNumber = 0
+        self.stageTimings = {
+            'read': 0.0,
+            'encrypt': 0.0,
+            'serialize': 0.0,
+            'raid': 0.0,
+        }
+        self.raidInMemory = _RaidInMemory
         self.blockNumber = 0
         self.dataSent = 0
         self.blocksSent = 0
@@ -350,6 +372,7 @@ class backup(automat.Automat):
             return self.pipe.read_defer(size)
 
         def readDone(data):
+            self.stageTimings['read'] += time.time() - dt
             try:
                 self.stateReading = False
                 if data:
@@ -372,6 +395,7 @@ class backup(automat.Automat):
             return None
 
         self.stateReading = True
+        dt = time.time()
         d = readChunk()
         d.addCallback(readDone)
         d.addErrback(readFailed)
@@ -380,60 +404,40 @@ class backup(automat.Automat):
         """
         Action method.
         """
-
-        def _doBlock():
-            dt = time.time()
-            raw_bytes = self.currentBlockData.getvalue()
-            block = encrypted.Block(
-                CreatorID=self.creatorIDURL,
-                BackupID=self.backupID,
-                BlockNumber=self.blockNumber,
-                SessionKey=key.NewSessionKey(session_key_type=key.SessionKeyType()),
-                SessionKeyType=key.SessionKeyType(),
-                LastBlock=self.stateEOF,
-                Data=raw_bytes,
-                EncryptKey=self.keyID,
-            )
-            del raw_bytes
-            if _Debug:
-                lg.out(_DebugLevel, 'backup.doEncryptBlock blockNumber=%d size=%d atEOF=%s dt=%s EncryptKey=%s' % (self.blockNumber, self.currentBlockSize, self.stateEOF, str(time.time() - dt), self.keyID))
-            return block
-
-        d = maybeDeferred(_doBlock)
-        d.addCallback(lambda block: self.automat('block-encrypted', block))
-        d.addErrback(lambda err: self.automat('fail', err))
+        block_number = self.blockNumber
+        raw_bytes = self.currentBlockData.getvalue()
+        self.workBlocks[block_number] = None
+        self.encryptingCount += 1
+        d = threads.deferToThread(self._encrypt_block, block_number, raw_bytes, self.stateEOF)
+        d.addCallback(self._on_block_encrypted, block_number)
+        d.addErrback(self._on_block_encrypt_failed, block_number)
+        del raw_bytes
+        if self.encryptingCount < self.encryptDepth:
+            self.automat('block-encrypted', block_number)
+        else:
+            self.waitingBlockNumber = block_number
+        if _Debug:
+            lg.out(_DebugLevel, 'backup.doEncryptBlock blockNumber=%d size=%d atEOF=%s encrypting=%d waiting=%r' % (block_number, self.currentBlockSize, self.stateEOF, self.encryptingCount, self.waitingBlockNumber))
 
     def doBlockPushAndRaid(self, *args, **kwargs):
         """
         Action method.
         """
-        newblock = args[0]
-        if newblock is None:
-            self.abort()
-            self.automat('fail')
-            if _Debug:
-                lg.out(_DebugLevel, 'backup.doBlockPushAndRaid ERROR newblock is empty, terminating=%s' % self.terminating)
-            lg.warn('failed to encrypt block, ABORTING')
-            return
+        block_number = args[0]
         if self.terminating:
-            self.automat('block-raid-done', (newblock.BlockNumber, None))
+            self.automat('block-raid-done', (block_number, None))
             if _Debug:
                 lg.out(_DebugLevel, 'backup.doBlockPushAndRaid SKIP, terminating=True')
             return
-        fileno, filename = tmpfile.make('raid', extension='.raid')
-        serializedblock = newblock.Serialize()
-        blocklen = len(serializedblock)
-        os.write(fileno, strng.to_bin(blocklen) + b':' + serializedblock)
-        os.close(fileno)
-        self.workBlocks[newblock.BlockNumber] = filename
-        dt = time.time()
-        outputpath = os.path.join(settings.getLocalBackupsDir(), self.customerGlobalID, self.pathID, self.version)
-        task_params = (filename, self.eccmap.name, self.version, newblock.BlockNumber, outputpath)
-        raid_worker.add_task('make', task_params, lambda cmd, params, result: self._raidmakeCallback(params, result, dt))
-        self.automat('block-raid-started', newblock)
-        del serializedblock
+        if self._count_raid_blocks() >= self._max_raid_blocks():
+            # too many blocks are already held in memory for RAID workers, do not read the next block yet
+            self.waitingRaidBlockNumber = block_number
+            if _Debug:
+                lg.out(_DebugLevel, 'backup.doBlockPushAndRaid %d waiting, %d blocks in progress' % (block_number, len(self.workBlocks)))
+            return
+        self.automat('block-raid-started', block_number)
         if _Debug:
-            lg.out(_DebugLevel, 'backup.doBlockPushAndRaid %s : start process data from %s to %s, %d' % (newblock.BlockNumber, filename, outputpath, id(self.terminating)))
+            lg.out(_DebugLevel, 'backup.doBlockPushAndRaid %d accepted, %d blocks in progress' % (block_number, len(self.workBlocks)))
 
     def doPopBlock(self, *args, **kwargs):
         """
@@ -441,7 +445,8 @@ class backup(automat.Automat):
         """
         blockNumber, _ = args[0]
         filename = self.workBlocks.pop(blockNumber)
-        tmpfile.throw_out(filename, 'block raid done')
+        if filename and not self.raidInMemory:
+            tmpfile.throw_out(filename, 'block raid done')
 
     def doFirstBlock(self, *args, **kwargs):
         """
@@ -484,8 +489,13 @@ class backup(automat.Automat):
         Action method.
         """
         self.closed = True
-        for filename in self.workBlocks.values():
-            tmpfile.throw_out(filename, 'backup aborted')
+        self.encryptedBlocks.clear()
+        if not self.raidInMemory:
+            for filename in self.workBlocks.values():
+                if filename:
+                    tmpfile.throw_out(filename, 'backup aborted')
+        if _Debug:
+            lg.args(_DebugLevel, backup_id=self.backupID, timings=self.stageTimings)
 
     def doReport(self, *args, **kwargs):
         """
@@ -495,12 +505,12 @@ class backup(automat.Automat):
             if self.finishCallback:
                 self.finishCallback(self.backupID, 'abort')
             self.resultDefer.callback('abort')
-            events.send('backup-aborted', data=dict(backup_id=self.backupID, source_path=self.sourcePath))
+            events.send('backup-aborted', data=dict(backup_id=self.backupID, source_path=self.sourcePath, timings=dict(self.stageTimings)))
         else:
             if self.finishCallback:
                 self.finishCallback(self.backupID, 'done')
             self.resultDefer.callback('done')
-            events.send('backup-done', data=dict(backup_id=self.backupID, source_path=self.sourcePath))
+            events.send('backup-done', data=dict(backup_id=self.backupID, source_path=self.sourcePath, timings=dict(self.stageTimings)))
 
     def doDestroyMe(self, *args, **kwargs):
         """
@@ -515,6 +525,8 @@ class backup(automat.Automat):
         self.stateReading = False
         self.closed = False
         self.workBlocks = None
+        self.encryptedBlocks = None
+        self.waitingBlockNumber = None
         self.resultDefer = None
         self.finishCallback = None
         self.blockResultCallback = None
@@ -533,8 +545,10 @@ class backup(automat.Automat):
             lg.out(_DebugLevel, 'backup.abort id %s, %d' % (str(self.backupID), id(self.ask4abort)))
         self.terminating = True
         for blockNumber, filename in self.workBlocks.items():
+            if not filename:
+                continue
             lg.warn('aborting raid make worker for block %d in %s' % (blockNumber, filename))
-            raid_worker.cancel_task('make', filename)
+            raid_worker.cancel_task('make_data' if self.raidInMemory else 'make', filename)
         lg.warn('killing backup pipe')
         self.ask4abort = True
         self._kill_pipe()
@@ -547,8 +561,100 @@ class backup(automat.Automat):
         percent = min(100.0, 100.0*self.dataSent/self.totalSize)
         return percent
 
+    def _encrypt_block(self, block_number, raw_bytes, last_block):
+        # executed in a thread from the reactor thread pool, must not modify the state of the backup
+        dt = time.time()
+        block = encrypted.Block(
+            CreatorID=self.creatorIDURL,
+            BackupID=self.backupID,
+            BlockNumber=block_number,
+            SessionKey=key.NewSessionKey(session_key_type=key.SessionKeyType()),
+            SessionKeyType=key.SessionKeyType(),
+            LastBlock=last_block,
+            Data=raw_bytes,
+            EncryptKey=self.keyID,
+        )
+        encrypt_dt = time.time() - dt
+        dt = time.time()
+        serializedblock = block.Serialize()
+        del block
+        return serializedblock, encrypt_dt, time.time() - dt
+
+    def _on_block_encrypted(self, result, block_number):
+        self.encryptingCount -= 1
+        if self.workBlocks is None:
+            return None
+        serializedblock, encrypt_dt, serialize_dt = result
+        self.stageTimings['encrypt'] += encrypt_dt
+        self.stageTimings['serialize'] += serialize_dt
+        if _Debug:
+            lg.out(_DebugLevel, 'backup._on_block_encrypted blockNumber=%d size=%d encrypt_dt=%s serialize_dt=%s EncryptKey=%s' % (block_number, len(serializedblock), encrypt_dt, serialize_dt, self.keyID))
+        if not self.terminating and not self.closed:
+            self.encryptedBlocks[block_number] = serializedblock
+            while self.nextRaidBlockNumber in self.encryptedBlocks:
+                self._start_raid(self.nextRaidBlockNumber, self.encryptedBlocks.pop(self.nextRaidBlockNumber))
+                self.nextRaidBlockNumber += 1
+        del serializedblock
+        self._accept_waiting_block()
+        return None
+
+    def _on_block_encrypt_failed(self, err, block_number):
+        self.encryptingCount -= 1
+        if self.workBlocks is None:
+            return None
+        lg.err('failed to encrypt block %d, ABORTING: %r' % (block_number, err))
+        self.automat('fail', err)
+        return None
+
+    def _accept_waiting_block(self):
+        if self.waitingBlockNumber is None:
+            return
+        if self.encryptingCount >= self.encryptDepth:
+            return
+        block_number = self.waitingBlockNumber
+        self.waitingBlockNumber = None
+        self.automat('block-encrypted', block_number)
+
+    def _count_raid_blocks(self):
+        """
+        Number of encrypted blocks which are already passed to RAID workers or waiting for that.
+        """
+        return len([filename for filename in self.workBlocks.values() if filename]) + len(self.encryptedBlocks)
+
+    def _max_raid_blocks(self):
+        return raid_worker.get_ncpus()*2
+
+    def _accept_waiting_raid_block(self):
+        if self.waitingRaidBlockNumber is None:
+            return
+        if self.workBlocks is None or self._count_raid_blocks() >= self._max_raid_blocks():
+            return
+        block_number = self.waitingRaidBlockNumber
+        self.waitingRaidBlockNumber = None
+        self.automat('block-raid-started', block_number)
+
+    def _start_raid(self, block_number, serializedblock):
+        blocklen = len(serializedblock)
+        dt = time.time()
+        outputpath = os.path.join(settings.getLocalBackupsDir(), self.customerGlobalID, self.pathID, self.version)
+        if self.raidInMemory:
+            filename = '%s/%d' % (self.backupID, block_number)
+            self.workBlocks[block_number] = filename
+            task_params = (filename, strng.to_bin(blocklen) + b':' + serializedblock, self.eccmap.name, self.version, block_number, outputpath)
+            raid_worker.add_task('make_data', task_params, lambda cmd, params, result: self._raidmakeCallback(params, result, dt))
+        else:
+            fileno, filename = tmpfile.make('raid', extension='.raid')
+            os.write(fileno, strng.to_bin(blocklen) + b':' + serializedblock)
+            os.close(fileno)
+            self.workBlocks[block_number] = filename
+            task_params = (filename, self.eccmap.name, self.version, block_number, outputpath)
+            raid_worker.add_task('make', task_params, lambda cmd, params, result: self._raidmakeCallback(params, result, dt))
+        if _Debug:
+            lg.out(_DebugLevel, 'backup._start_raid %d : start process data from %s to %s' % (block_number, filename, outputpath))
+
     def _raidmakeCallback(self, params, result, dt):
-        _, _, _, blockNumber, _ = params
+        blockNumber = params[-2]
+        self.stageTimings['raid'] += time.time() - dt
         if result is None:
             if _Debug:
                 lg.out(_DebugLevel, 'backup._raidmakeCallback WARNING - result is None :  %r eof=%s dt=%s' % (blockNumber, str(self.stateEOF), str(time.time() - dt)))
@@ -559,6 +665,7 @@ class backup(automat.Automat):
             if _Debug:
                 lg.out(_DebugLevel, 'backup._raidmakeCallback %r %r eof=%s dt=%s' % (blockNumber, result, str(self.stateEOF), str(time.time() - dt)))
             self.automat('block-raid-done', (blockNumber, result))
+            self._accept_waiting_raid_block()
 
     def _kill_pipe(self):
         if self.pipe:
@@ -253,15 +253,34 @@ def IncomingSupplierListFiles(newpacket, list_files_global_id):
     from bitdust.storage import index_synchronizer
     is_in_sync = index_synchronizer.is_synchronized() and backup_fs.revision() > 0
     list_files_raw = UnpackListFiles(input_data, settings.ListFilesFormat())
-    remote_files_changed, backups2remove, paths2remove, missed_backups = backup_matrix.process_raw_list_files(
-        supplier_num=num,
-        list_files_text_body=list_files_raw,
-        customer_idurl=None,
-        is_in_sync=is_in_sync,
-    )
+    revision, known_revision = backup_matrix.ReadListFilesRevision(list_files_raw)
+    if known_revision is not None:
+        # only added and removed lines were sent by supplier
+        result = backup_matrix.process_raw_list_files_delta(
+            supplier_num=num,
+            list_files_delta_body=list_files_raw,
+            list_files_text_body=backup_matrix.LoadLatestRawListFiles(supplier_idurl),
+            customer_idurl=None,
+            is_in_sync=is_in_sync,
+        )
+        if result is None:
+            # our local copy of the listing is different, request the full listing again
+            list_files_orator.RequestFullListFiles(newpacket, supplier_idurl, customer_idurl)
+            return False
+        remote_files_changed, backups2remove, paths2remove, missed_backups, list_files_raw = result
+        list_files_changed = revision != known_revision
+    else:
+        remote_files_changed, backups2remove, paths2remove, missed_backups = backup_matrix.process_raw_list_files(
+            supplier_num=num,
+            list_files_text_body=list_files_raw,
+            customer_idurl=None,
+            is_in_sync=is_in_sync,
+        )
+        list_files_changed = remote_files_changed or (revision is not None and revision != backup_matrix.GetLatestListFilesRevision(supplier_idurl))
     list_files_orator.IncomingListFiles(newpacket)
-    if remote_files_changed:
+    if list_files_changed:
         backup_matrix.SaveLatestRawListFiles(supplier_idurl, list_files_raw)
+    backup_matrix.SetRemoteListFilesRevision(num, revision, is_in_sync=is_in_sync)
     if _Debug:
         lg.args(_DebugLevel, s=nameurl.GetName(supplier_idurl), c=nameurl.GetName(customer_idurl), backups2remove=len(backups2remove), paths2remove=len(paths2remove), files_changed=remote_files_changed, missed_backups=len(missed_backups))
     if len(backups2remove) > 0:
@@ -54,6 +54,7 @@ to reconstruct "Data" pieces. So need to keep track of both "surfaces".
 from __future__ import absolute_import
 from six.moves import range
 from io import BytesIO
+from io import StringIO
 
 #------------------------------------------------------------------------------
 
@@ -63,6 +64,9 @@ _DebugLevel = 24
 #------------------------------------------------------------------------------
 
 import os
+import re
+
+from collections import OrderedDict
 
 #------------------------------------------------------------------------------
 
@@ -101,6 +105,8 @@ _StatusCallBackForGuiBackup = None
 _LocalFilesNotifyCallback = None
 _UpdatedBackupIDs = set()
 _ListFilesQueryCallbacks = {}
+_RemoteListFilesRevisions = {}
+_RemoteListFilesLocalStates = {}
 
 #------------------------------------------------------------------------------
 
@@ -139,10 +145,10 @@ def remote_files():
       0  : no info comes yet
       1  : this file exist on given remote machine
 
-    This is a dictionary of dictionaries of dictionaries of lists. :-)))
+    This is a dictionary of ``BlocksMatrix`` objects, one for every backup.
     Values can be accessed this way::
 
-      remote_files()[backupID][blockNumber][dataORparity][supplierNumber]
+      remote_files()[backupID].get(blockNumber, dataORparity, supplierNumber)
 
     Here the keys are:
 
@@ -194,6 +200,173 @@ def local_backup_size():
     return _LocalBackupSize
 
 
+#------------------------------------------------------------------------------
+
+# every cell of the matrix keeps both Data and Parity values: (data + 1) * 3 + (parity + 1)
+_NO_INFO_CELL = b'\x04'
+_BOTH_PRESENT_CELL = 8
+
+_DATA_PRESENT = bytes([1 if (cell < 9 and cell//3 == 2) else 0 for cell in range(256)])
+_PARITY_PRESENT = bytes([1 if (cell < 9 and cell % 3 == 2) else 0 for cell in range(256)])
+_PIECES_PRESENT = bytes([_DATA_PRESENT[cell] + _PARITY_PRESENT[cell] for cell in range(256)])
+_NOT_BOTH_PRESENT = bytes([0 if cell == _BOTH_PRESENT_CELL else 1 for cell in range(256)])
+_CLEAR_PRESENT = bytes([(cell - 3 if cell//3 == 2 else cell) - (1 if cell % 3 == 2 else 0) if cell < 9 else cell for cell in range(256)])
+_CLEAR_ALL = bytes([4 if cell < 9 else cell for cell in range(256)])
+_NOT_KNOWN = bytes([0 if cell else 1 for cell in range(256)])
+
+_NOT_ZERO_RE = re.compile(b'[^\\x00]')
+
+
+class BlocksMatrix(object):
+    """
+    Keeps "remote" or "local" info about all blocks of a single backup in a compact form.
+
+    Every (block, supplier) cell is a single byte in a flat ``bytearray`` and holds both Data and Parity values:
+    ``(data + 1) * 3 + (parity + 1)``, values are -1, 0 or 1 as described in ``remote_files()``.
+    Cells of one block are placed one after another, so the whole column of a single supplier
+    is taken with one slice and then scanned with ``bytes`` methods instead of a Python loop.
+    """
+
+    def __init__(self, suppliers_number):
+        self.suppliers_number = suppliers_number
+        self.cells = bytearray()
+        self.known = bytearray()
+
+    def __repr__(self):
+        return 'BlocksMatrix(%d suppliers, %d blocks)' % (self.suppliers_number, len(self))
+
+    def __contains__(self, blockNum):
+        return 0 <= blockNum < len(self.known) and self.known[blockNum] == 1
+
+    def __len__(self):
+        return self.known.count(1)
+
+    def keys(self):
+        """
+        Returns list of known block numbers.
+        """
+        return _positions(self.known)
+
+    def add_block(self, blockNum):
+        if blockNum >= len(self.known):
+            grow = blockNum + 1 - len(self.known)
+            self.known.extend(b'\x00'*grow)
+            self.cells.extend(_NO_INFO_CELL*(grow*self.suppliers_number))
+        self.known[blockNum] = 1
+
+    def get(self, blockNum, dataORparity, supplierNum):
+        if blockNum not in self:
+            raise KeyError(blockNum)
+        if not 0 <= supplierNum < self.suppliers_number:
+            raise IndexError(supplierNum)
+        cell = self.cells[blockNum*self.suppliers_number + supplierNum]
+        if dataORparity[0] == 'D':
+            return cell//3 - 1
+        return cell % 3 - 1
+
+    def set(self, blockNum, dataORparity, supplierNum, value):
+        if not 0 <= supplierNum < self.suppliers_number:
+            raise IndexError(supplierNum)
+        self.add_block(blockNum)
+        pos = blockNum*self.suppliers_number + supplierNum
+        cell = self.cells[pos]
+        if dataORparity[0] == 'D':
+            self.cells[pos] = (value + 1)*3 + cell % 3
+        else:
+            self.cells[pos] = cell - cell % 3 + value + 1
+
+    def set_both(self, blockNum, supplierNum, data_value, parity_value):
+        if not 0 <= supplierNum < self.suppliers_number:
+            raise IndexError(supplierNum)
+        self.add_block(blockNum)
+        self.cells[blockNum*self.suppliers_number + supplierNum] = (data_value + 1)*3 + parity_value + 1
+
+    def row(self, blockNum, dataORparity):
+        """
+        Returns list of values for given block, same as it was stored in the old dictionary-based matrix.
+        """
+        if blockNum not in self:
+            return [0]*self.suppliers_number
+        start = blockNum*self.suppliers_number
+        if dataORparity[0] == 'D':
+            return [cell//3 - 1 for cell in self.cells[start:start + self.suppliers_number]]
+        return [cell % 3 - 1 for cell in self.cells[start:start + self.suppliers_number]]
+
+    def block(self, blockNum):
+        return {
+            'D': self.row(blockNum, 'D'),
+            'P': self.row(blockNum, 'P'),
+        }
+
+    def to_dict(self):
+        return {blockNum: self.block(blockNum) for blockNum in self.keys()}
+
+    def column(self, supplierNum, blocks_number):
+        """
+        Returns cells of given supplier for blocks from 0 to `blocks_number - 1`.
+        Unknown blocks are filled with "no info" cells.
+        """
+        if 0 <= supplierNum < self.suppliers_number:
+            col = bytes(self.cells[supplierNum::self.suppliers_number][:blocks_number])
+        else:
+            col = b''
+        if len(col) < blocks_number:
+            col += _NO_INFO_CELL*(blocks_number - len(col))
+        return col
+
+    def unknown_blocks(self, blocks_number):
+        """
+        Returns list of block numbers from 0 to `blocks_number - 1` which are not known yet.
+        """
+        known = bytes(self.known[:blocks_number])
+        return _positions(known.translate(_NOT_KNOWN)) + list(range(len(known), blocks_number))
+
+    def count_pieces(self, supplierNum, blocks_number=None, table=_PIECES_PRESENT):
+        """
+        Counts existing Data and Parity pieces of given supplier.
+        """
+        if not 0 <= supplierNum < self.suppliers_number:
+            return 0
+        if blocks_number is None:
+            blocks_number = len(self.known)
+        return sum(self.column(supplierNum, blocks_number).translate(table))
+
+    def clear_supplier(self, supplierNum, table=_CLEAR_PRESENT):
+        """
+        Erase info about existing pieces for given supplier, returns number of erased pieces.
+        """
+        if not 0 <= supplierNum < self.suppliers_number:
+            return 0
+        col = self.cells[supplierNum::self.suppliers_number]
+        erased = sum(col.translate(_PIECES_PRESENT))
+        self.cells[supplierNum::self.suppliers_number] = col.translate(table)
+        return erased
+
+
+def _positions(flags):
+    """
+    Returns list of positions of all non-zero bytes.
+    """
+    return [m.start() for m in _NOT_ZERO_RE.finditer(flags)]
+
+
+def _and_not(flags1, flags2):
+    """
+    Both arguments are strings of 0 and 1 bytes of the same length, returns `flags1 AND NOT flags2` for every byte.
+    """
+    return (int.from_bytes(flags1, 'little') & ~int.from_bytes(flags2, 'little')).to_bytes(len(flags1), 'little')
+
+
+def _sum_flags(columns, length):
+    """
+    Returns sum of all given strings of 0 and 1 bytes for every byte, there must be less than 256 columns.
+    """
+    total = 0
+    for flags in columns:
+        total += int.from_bytes(flags, 'little')
+    return total.to_bytes(length, 'little')
+
+
 #------------------------------------------------------------------------------
 
 
@@ -618,21 +791,17 @@ def process_version_data(words, customer_idurl, backupID, supplier_num, maxBlock
                 lg.exc()
                 return None, None
     if backupID not in remote_files():
-        remote_files()[backupID] = {}
+        remote_files()[backupID] = BlocksMatrix(contactsdb.num_suppliers(customer_idurl=customer_idurl))
         if _Debug:
             lg.out(_DebugLevel, '            new remote entry for %s created in memory' % backupID)
+    remote_blocks = remote_files()[backupID]
     # +1 because range(2) give us [0,1] but we want [0,1,2]
     for blockNum in range(maxBlockNum + 1):
-        if blockNum not in remote_files()[backupID]:
-            remote_files()[backupID][blockNum] = {
-                'D': [0]*contactsdb.num_suppliers(customer_idurl=customer_idurl),
-                'P': [0]*contactsdb.num_suppliers(customer_idurl=customer_idurl),
-            }
-        for dataORparity in ['Data', 'Parity']:
-            # we set -1 if the file is missing and 1 if exist, so 0 mean "no info yet" ... smart!
-            bit = -1 if str(blockNum) in missingBlocksSet[dataORparity] else 1
-            remote_files()[backupID][blockNum][dataORparity[0]][supplier_num] = bit
-            stored_files += int((bit + 1)/2)  # this should switch -1 or 1 to 0 or 1
+        # we set -1 if the file is missing and 1 if exist, so 0 mean "no info yet" ... smart!
+        data_bit = -1 if str(blockNum) in missingBlocksSet['Data'] else 1
+        parity_bit = -1 if str(blockNum) in missingBlocksSet['Parity'] else 1
+        remote_blocks.set_both(blockNum, supplier_num, data_bit, parity_bit)
+        stored_files += int((data_bit + 1)/2) + int((parity_bit + 1)/2)  # this should switch -1 or 1 to 0 or 1
     # save max block number for this backup
     if backupID not in remote_max_block_numbers():
         remote_max_block_numbers()[backupID] = -1
@@ -645,7 +814,7 @@ def process_version_data(words, customer_idurl, backupID, supplier_num, maxBlock
     return stored_files, is_complete
 
 
-def process_raw_list_files(supplier_num, list_files_text_body, customer_idurl=None, is_in_sync=None):
+def process_raw_list_files(supplier_num, list_files_text_body, customer_idurl=None, is_in_sync=None, clear_supplier_info=True):
     """
     Read ListFiles packet for given supplier and build a "remote" matrix. All
     lines are something like that:
@@ -672,6 +841,7 @@ def process_raw_list_files(supplier_num, list_files_text_body, customer_idurl=No
       "D" for folders
       "F" for files
       "V" for stored data
+      "R" for listing revision, see ``process_raw_list_files_delta()``
     """
     global _ListFilesQueryCallbacks
     from bitdust.storage import backup_control
@@ -704,6 +874,9 @@ def process_raw_list_files(supplier_num, list_files_text_body, customer_idurl=No
         if line.find('http://') != -1 or line.find('.xml') != -1:
             continue
 
+        if typ == 'R':
+            continue
+
         if typ == 'Q':
             current_query = line.strip()
             if _Debug:
@@ -719,7 +892,8 @@ def process_raw_list_files(supplier_num, list_files_text_body, customer_idurl=No
                     current_ignored_path_ids.update(shared_access_coordinator.get_deleted_path_ids(customer_idurl, current_key_alias))
             if _Debug:
                 lg.out(_DebugLevel, '    %s %s/%s' % (typ, current_query, current_key_alias))
-            oldfiles += ClearSupplierRemoteInfo(supplier_num, customer_idurl=customer_idurl, key_alias=current_key_alias)
+            if clear_supplier_info:
+                oldfiles += ClearSupplierRemoteInfo(supplier_num, customer_idurl=customer_idurl, key_alias=current_key_alias)
             continue
 
         if typ == 'D':
@@ -820,6 +994,161 @@ def process_raw_list_files(supplier_num, list_files_text_body, customer_idurl=No
     return remote_files_changed, backups2remove, paths2remove, missed_backups
 
 
+def process_raw_list_files_delta(supplier_num, list_files_delta_body, list_files_text_body, customer_idurl=None, is_in_sync=None):
+    """
+    Supplier replies with only added and removed lines when we send him revision of the latest listing we have:
+
+      R12-0a1b2c3d 9-4e5f6a7b
+      Q*
+      Kmaster
+      -V0/1/F20090709034221PM 3 0-1000 7463434
+      +V0/1/F20090709034221PM 3 0-1001 7470000
+      -Kkey_abc_123
+
+    Here the "-K" line means the whole section was removed.
+    Removed versions are cleared from the "remote" matrix only for that supplier,
+    added lines are processed the same way as ``process_raw_list_files()`` does, but without clearing the whole column.
+
+    Returns same values as ``process_raw_list_files()`` plus the merged full listing to be saved locally.
+    If the delta was prepared for another revision of the listing returns None.
+    """
+    if not customer_idurl:
+        customer_idurl = my_id.getIDURL()
+    revision, known_revision = ReadListFilesRevision(list_files_delta_body)
+    if not known_revision or known_revision != ReadListFilesRevision(list_files_text_body)[0] or known_revision != GetRemoteListFilesRevision(supplier_num, customer_idurl):
+        lg.warn('list files delta from supplier %d was prepared for revision %r' % (supplier_num, known_revision))
+        return None
+    if IsListFilesLocalStateChanged(supplier_num, is_in_sync, customer_idurl=customer_idurl):
+        lg.warn('local state changed since latest full listing from supplier %d was processed' % supplier_num)
+        return None
+    sections = _split_list_files_sections(list_files_text_body)
+    removed_lines = []
+    added = StringIO()
+    current_query = None
+    current_key_alias = None
+    current_lines = None
+    for line in strng.to_text(list_files_delta_body).split('\n'):
+        if not line or line[0] == 'R':
+            continue
+        if line[0] == 'Q':
+            current_query = line[1:]
+            current_lines = None
+            added.write('%s\n' % line)
+            continue
+        if line[0] == 'K':
+            current_key_alias = process_line_key(line[1:])
+            current_lines = sections.setdefault((current_query, line[1:]), [])
+            added.write('%s\n' % line)
+            continue
+        if line.startswith('-K'):
+            for old_line in sections.pop((current_query, line[2:]), []):
+                removed_lines.append((process_line_key(line[2:]), old_line))
+            current_lines = None
+            continue
+        if current_lines is None or line[0] not in ('-', '+'):
+            raise Exception('unexpected line received: %r' % line)
+        if line[0] == '-':
+            if line[1:] in current_lines:
+                current_lines.remove(line[1:])
+                removed_lines.append((current_key_alias, line[1:]))
+            continue
+        current_lines.append(line[1:])
+        added.write('%s\n' % line[1:])
+    added_versions = set()
+    for line in added.getvalue().split('\n'):
+        if line.startswith('V'):
+            added_versions.add(line[1:].split(' ')[0])
+    oldfiles = 0
+    for key_alias, line in removed_lines:
+        if line[0] != 'V':
+            continue
+        if key_alias == 'master' and not id_url.is_the_same(customer_idurl, my_id.getIDURL()):
+            continue
+        version_path = line[1:].split(' ')[0]
+        if version_path in added_versions:
+            # same version was listed again with updated info, will be overwritten
+            continue
+        try:
+            _, remotePath, versionName = packetid.SplitBackupID(version_path)
+            backupID = packetid.MakeBackupID(
+                customer=global_id.UrlToGlobalID(customer_idurl),
+                path_id=remotePath,
+                key_alias=key_alias,
+                version=versionName,
+            )
+        except:
+            lg.err('incorrect line (global id format): [%s]' % line)
+            continue
+        oldfiles += ClearSupplierBackupRemoteInfo(supplier_num, backupID)
+    remote_files_changed, backups2remove, paths2remove, _ = process_raw_list_files(
+        supplier_num=supplier_num,
+        list_files_text_body=added.getvalue(),
+        customer_idurl=customer_idurl,
+        is_in_sync=is_in_sync,
+        clear_supplier_info=False,
+    )
+    added.close()
+    remote_files_changed = remote_files_changed or len(removed_lines) > 0
+    missed_backups = GetSupplierMissedBackups(supplier_num, customer_idurl=customer_idurl)
+    out = StringIO()
+    out.write('R%s\n' % revision)
+    current_query = None
+    for section_key, lines in sections.items():
+        if section_key[0] != current_query:
+            out.write('Q%s\n' % section_key[0])
+            current_query = section_key[0]
+        out.write('K%s\n' % section_key[1])
+        for line in lines:
+            out.write('%s\n' % line)
+    new_list_files_text_body = out.getvalue()
+    out.close()
+    if _Debug:
+        lg.out(
+            _DebugLevel, 'backup_matrix.process_raw_list_files_delta [%d] : %d bytes, rev:%s->%s, removed:%d, cleared:%d, changed:%r, missed_backups:%d' % (
+                supplier_num,
+                len(list_files_delta_body),
+                known_revision,
+                revision,
+                len(removed_lines),
+                oldfiles,
+                remote_files_changed,
+                len(missed_backups),
+            )
+        )
+    return remote_files_changed, backups2remove, paths2remove, missed_backups, new_list_files_text_body
+
+
+def ReadListFilesRevision(list_files_text_body):
+    """
+    Returns tuple (revision, known_revision) from the "R" header line of the listing.
+    Second value is not None only for "delta" listing.
+    """
+    header = strng.to_text(list_files_text_body or '').split('\n', 1)[0]
+    if not header.startswith('R'):
+        return None, None
+    words = header[1:].strip().split(' ')
+    if len(words) > 1:
+        return words[0], words[1]
+    return words[0] or None, None
+
+
+def _split_list_files_sections(list_files_text_body):
+    sections = OrderedDict()
+    current_query = None
+    current_lines = None
+    for line in strng.to_text(list_files_text_body or '').split('\n'):
+        if not line or line[0] == 'R':
+            continue
+        if line[0] == 'Q':
+            current_query = line[1:]
+            current_lines = None
+            continue
+        if line[0] == 'K':
+            current_lines = sections.setdefault((current_query, line[1:]), [])
+            continue
+        if current_lines is not None:
+            current_lines.append(line)
+    return sections
 #------------------------------------------------------------------------------
 
 
@@ -841,6 +1170,38 @@ def SaveLatestRawListFiles(supplier_idurl, raw_data, customer_idurl=None):
     bpio.WriteTextFile(settings.SupplierListFilesFilename(supplier_idurl, customer_idurl), raw_data)
 
 
+def LoadLatestRawListFiles(supplier_idurl, customer_idurl=None):
+    """
+    Returns the latest ListFiles packet from given supplier stored on local HDD.
+    """
+    if not customer_idurl:
+        customer_idurl = my_id.getIDURL()
+    filename = settings.SupplierListFilesFilename(supplier_idurl, customer_idurl)
+    if not os.path.isfile(filename):
+        return ''
+    return bpio.ReadTextFile(filename) or ''
+
+
+def GetLatestListFilesRevision(supplier_idurl, customer_idurl=None):
+    """
+    Returns revision of the latest ListFiles packet from given supplier stored on local HDD.
+    Only the first line of the file is read.
+    Empty string is returned if the listing is not versioned or not exist.
+    """
+    if not customer_idurl:
+        customer_idurl = my_id.getIDURL()
+    filename = settings.SupplierListFilesFilename(supplier_idurl, customer_idurl)
+    if not os.path.isfile(filename):
+        return ''
+    try:
+        with open(filename, 'r') as fin:
+            header = fin.readline()
+    except:
+        lg.exc()
+        return ''
+    return ReadListFilesRevision(header)[0] or ''
+
+
 def ReadLatestRawListFiles(customer_idurl=None):
     """
     Call ``process_raw_list_files()`` for every local file we have on hands and build
@@ -862,6 +1223,7 @@ def ReadLatestRawListFiles(customer_idurl=None):
                         customer_idurl=customer_idurl,
                         is_in_sync=False,
                     )
+                    SetRemoteListFilesRevision(contactsdb.supplier_position(idurl), ReadListFilesRevision(listFileText)[0], customer_idurl=customer_idurl)
                     if _Debug:
                         lg.out(
                             _DebugLevel,
@@ -952,19 +1314,13 @@ def RemoteFileReport(backupID, blockNum, supplierNum, dataORparity, result, item
             lg.out(_DebugLevel, 'backup_matrix.RemoteFileReport got too big supplier number, possible this is an old packet')
         return
     if backupID not in remote_files():
-        remote_files()[backupID] = {}
+        remote_files()[backupID] = BlocksMatrix(contactsdb.num_suppliers(customer_idurl=customer_idurl))
         lg.info('new remote entry for %s created in memory' % backupID)
-    if blockNum not in remote_files()[backupID]:
-        remote_files()[backupID][blockNum] = {
-            'D': [0]*contactsdb.num_suppliers(customer_idurl=customer_idurl),
-            'P': [0]*contactsdb.num_suppliers(customer_idurl=customer_idurl),
-        }
+    remote_files()[backupID].add_block(blockNum)
     # save backed up block info into remote info structure, synchronize on hand info
     flag = 1 if result else 0
-    if dataORparity == 'Data':
-        remote_files()[backupID][blockNum]['D'][supplierNum] = flag
-    elif dataORparity == 'Parity':
-        remote_files()[backupID][blockNum]['P'][supplierNum] = flag
+    if dataORparity in ('Data', 'Parity'):
+        remote_files()[backupID].set(blockNum, dataORparity, supplierNum, flag)
     else:
         lg.warn('incorrect backup ID: %s' % backupID)
     # if we know only N blocks stored on remote machine
@@ -1029,16 +1385,11 @@ def LocalFileReport(packetID=None, backupID=None, blockNum=None, supplierNum=Non
         return
     localDest = os.path.join(settings.getLocalBackupsDir(), customer, filename)
     if backupID not in local_files():
-        local_files()[backupID] = {}
-    if blockNum not in local_files()[backupID]:
-        local_files()[backupID][blockNum] = {
-            'D': [0]*contactsdb.num_suppliers(customer_idurl=customer_idurl),
-            'P': [0]*contactsdb.num_suppliers(customer_idurl=customer_idurl),
-        }
+        local_files()[backupID] = BlocksMatrix(contactsdb.num_suppliers(customer_idurl=customer_idurl))
     if not os.path.isfile(localDest):
-        local_files()[backupID][blockNum][dataORparity[0]][supplierNum] = 0
+        local_files()[backupID].set(blockNum, dataORparity, supplierNum, 0)
         return
-    local_files()[backupID][blockNum][dataORparity[0]][supplierNum] = 1
+    local_files()[backupID].set(blockNum, dataORparity, supplierNum, 1)
     if backupID not in local_max_block_numbers():
         local_max_block_numbers()[backupID] = -1
     if local_max_block_numbers()[backupID] < blockNum:
@@ -1078,25 +1429,15 @@ def LocalBlockReport(backupID, blockNumber, result):
             packetID = packetid.MakePacketID(backupID, blockNum, supplierNum, dataORparity)
             local_file = os.path.join(settings.getLocalBackupsDir(), customer, packetID)
             if backupID not in local_files():
-                local_files()[backupID] = {}
+                local_files()[backupID] = BlocksMatrix(num_suppliers)
                 # repaint_flag = True
                 if _Debug:
                     lg.out(_DebugLevel, '    new local entry for %s created in memory' % backupID)
-            if blockNum not in local_files()[backupID]:
-                local_files()[backupID][blockNum] = {
-                    'D': [
-                        0,
-                    ]*num_suppliers,
-                    'P': [
-                        0,
-                    ]*num_suppliers,
-                }
-                # repaint_flag = True
             if not os.path.isfile(local_file):
-                local_files()[backupID][blockNum][dataORparity[0]][supplierNum] = 0
+                local_files()[backupID].set(blockNum, dataORparity, supplierNum, 0)
                 # repaint_flag = True
                 continue
-            local_files()[backupID][blockNum][dataORparity[0]][supplierNum] = 1
+            local_files()[backupID].set(blockNum, dataORparity, supplierNum, 1)
             if backupID not in local_backup_size():
                 local_backup_size()[backupID] = 0
                 # repaint_flag = True
@@ -1145,47 +1486,34 @@ def ScanMissingBlocks(backupID):
             # need to scan all block numbers
             if _Debug:
                 lg.out(_DebugLevel, '    no remote info but found local info, maxBlockNum=%d' % localMaxBlockNum)
-            for blockNum in range(localMaxBlockNum + 1):
+            local_blocks = local_files()[backupID]
+            for supplierNum in range(len(supplierActiveArray)):
+                # if supplier is not alive we can not send to him
+                # so no need to scan for missing blocks
+                if supplierActiveArray[supplierNum] != 1:
+                    continue
                 # we check for Data and Parity packets
-                localData = GetLocalDataArray(backupID, blockNum)
-                localParity = GetLocalParityArray(backupID, blockNum)
-                for supplierNum in range(len(supplierActiveArray)):
-                    # if supplier is not alive we can not send to him
-                    # so no need to scan for missing blocks
-                    if supplierActiveArray[supplierNum] != 1:
-                        continue
-                    if localData[supplierNum] == 1:
-                        missingBlocks.add(blockNum)
-                    if localParity[supplierNum] == 1:
-                        missingBlocks.add(blockNum)
+                missingBlocks.update(_positions(local_blocks.column(supplierNum, localMaxBlockNum + 1).translate(_PIECES_PRESENT)))
     else:
         # now we have some remote info
         # we take max block number from local and remote
         maxBlockNum = max(remoteMaxBlockNum, localMaxBlockNum)
         if _Debug:
             lg.out(_DebugLevel, '    found remote info, maxBlockNum=%d' % maxBlockNum)
-        # and increase by one because range(3) give us [0, 1, 2], but we want [0, 1, 2, 3]
-        for blockNum in range(maxBlockNum + 1):
-            # if we have few remote files, but many locals - we want to send all missed
-            if blockNum not in remote_files()[backupID]:
-                missingBlocks.add(blockNum)
+        remote_blocks = remote_files()[backupID]
+        # if we have few remote files, but many locals - we want to send all missed
+        missingBlocks.update(remote_blocks.unknown_blocks(maxBlockNum + 1))
+        # now check every our supplier for every block
+        for supplierNum in range(len(supplierActiveArray)):
+            # if supplier is not alive we can not send to him
+            # so no need to scan for missing blocks
+            if supplierActiveArray[supplierNum] != 1:
                 continue
-            # take remote info for this block
-            remoteData = GetRemoteDataArray(backupID, blockNum)
-            remoteParity = GetRemoteParityArray(backupID, blockNum)
-            # now check every our supplier for every block
-            for supplierNum in range(len(supplierActiveArray)):
-                # if supplier is not alive we can not send to him
-                # so no need to scan for missing blocks
-                if supplierActiveArray[supplierNum] != 1:
-                    continue
-                if supplierNum >= len(remoteData) or supplierNum >= len(remoteParity):
-                    missingBlocks.add(blockNum)
-                    continue
-                if remoteData[supplierNum] != 1:  # -1 means missing
-                    missingBlocks.add(blockNum)  # 0 - no info yet
-                if remoteParity[supplierNum] != 1:  # 1 - file exist on remote supplier
-                    missingBlocks.add(blockNum)
+            if supplierNum >= remote_blocks.suppliers_number:
+                missingBlocks.update(range(maxBlockNum + 1))
+                break
+            # -1 means missing, 0 - no info yet, 1 - file exist on remote supplier
+            missingBlocks.update(_positions(remote_blocks.column(supplierNum, maxBlockNum + 1).translate(_NOT_BOTH_PRESENT)))
 
     if _Debug:
         lg.out(_DebugLevel, '    missingBlocks=%s' % missingBlocks)
@@ -1209,40 +1537,34 @@ def ScanBlocksToRemove(backupID, check_all_suppliers=True):
     if backupID not in remote_files() or backupID not in local_files():
         # no info about this backup yet - skip
         return packets
-    for blockNum in range(localMaxBlockNum + 1):
-        localArray = {'Data': GetLocalDataArray(backupID, blockNum), 'Parity': GetLocalParityArray(backupID, blockNum)}
-        remoteArray = {'Data': GetRemoteDataArray(backupID, blockNum), 'Parity': GetRemoteParityArray(backupID, blockNum)}
-        if (0 in remoteArray['Data']) or (0 in remoteArray['Parity']):
-            # if some supplier do not have some data for that block - do not remove any local files for that block!
-            # we do remove the local files only when we sure all suppliers got the all data pieces
+    remote_blocks = remote_files()[backupID]
+    local_blocks = local_files()[backupID]
+    # if some supplier do not have some data for that block - do not remove any local files for that block!
+    # we do remove the local files only when we sure all suppliers got the all data pieces
+    # also if we do not have any info about this block for some supplier do not remove other local pieces
+    incomplete_blocks = set(remote_blocks.unknown_blocks(localMaxBlockNum + 1))
+    for supplierNum in range(remote_blocks.suppliers_number):
+        incomplete_blocks.update(_positions(remote_blocks.column(supplierNum, localMaxBlockNum + 1).translate(_NOT_BOTH_PRESENT)))
+    if len(incomplete_blocks) >= localMaxBlockNum + 1:
+        return packets
+    for supplierNum in range(contactsdb.num_suppliers(customer_idurl=customer_idurl)):
+        supplierIDURL = contactsdb.supplier(supplierNum, customer_idurl=customer_idurl)
+        if not supplierIDURL:
+            # supplier is unknown - skip
             continue
-        if (-1 in remoteArray['Data']) or (-1 in remoteArray['Parity']):
-            # also if we do not have any info about this block for some supplier do not remove other local pieces
+        if supplierNum >= local_blocks.suppliers_number:
+            lg.warn('wrong supplier %r position %d for customer %r' % (supplierIDURL, supplierNum, customer_idurl))
             continue
-        for supplierNum in range(contactsdb.num_suppliers(customer_idurl=customer_idurl)):
-            supplierIDURL = contactsdb.supplier(supplierNum, customer_idurl=customer_idurl)
-            if not supplierIDURL:
-                # supplier is unknown - skip
-                continue
-            for dataORparity in ['Data', 'Parity']:
+        local_column = local_blocks.column(supplierNum, localMaxBlockNum + 1)
+        for dataORparity, present_table in (('Data', _DATA_PRESENT), ('Parity', _PARITY_PRESENT)):
+            for blockNum in _positions(local_column.translate(present_table)):
+                if blockNum in incomplete_blocks:
+                    continue
                 packetID = packetid.MakePacketID(backupID, blockNum, supplierNum, dataORparity)
                 if io_throttle.HasPacketInSendQueue(supplierIDURL, packetID):
                     # if we do sending the packet at the moment - skip
                     continue
-                if supplierNum >= len(localArray[dataORparity]):
-                    lg.warn('wrong supplier %r position %d for customer %r' % (supplierIDURL, supplierNum, customer_idurl))
-                    continue
-                if localArray[dataORparity][supplierNum] == 1:
-                    packets.append(packetID)
-                    # lg.out(10, '    mark to remove %s, blockNum:%d remote:%s local:%s' % (packetID, blockNum, str(remoteArray), str(localArray)))
-
-
-#                if check_all_suppliers:
-#                    if localArray[dataORparity][supplierNum] == 1:
-#                        packets.append(packetID)
-#                else:
-#                    if remoteArray[dataORparity][supplierNum] == 1 and localArray[dataORparity][supplierNum] == 1:
-#                        packets.append(packetID)
+                packets.append(packetID)
     return packets
 
 
@@ -1259,44 +1581,28 @@ def ScanBlocksToSend(backupID, limit_per_supplier=None):
     bySupplier = {}
     for supplierNum in range(len(supplierActiveArray)):
         bySupplier[supplierNum] = set()
-    if backupID not in remote_files():
-        # if _Debug:
-        #     lg.out(_DebugLevel, 'backup_matrix.ScanBlocksToSend  backupID %r not found in remote files' % backupID)
-        for blockNum in range(localMaxBlockNum + 1):
-            localData = GetLocalDataArray(backupID, blockNum)
-            localParity = GetLocalParityArray(backupID, blockNum)
-            for supplierNum in range(len(supplierActiveArray)):
-                if supplierActiveArray[supplierNum] != 1:
-                    continue
-                if supplierNum >= len(localData) or supplierNum >= len(localParity):
-                    continue
-                if localData[supplierNum] == 1:
-                    bySupplier[supplierNum].add(packetid.MakePacketID(backupID, blockNum, supplierNum, 'Data'))
-                if localParity[supplierNum] == 1:
-                    bySupplier[supplierNum].add(packetid.MakePacketID(backupID, blockNum, supplierNum, 'Parity'))
-                if limit_per_supplier:
-                    if len(bySupplier[supplierNum]) > limit_per_supplier:
-                        break
-    else:
-        # if _Debug:
-        #     lg.out(_DebugLevel, 'backup_matrix.ScanBlocksToSend  backupID %r was found in remote files' % backupID)
-        for blockNum in range(localMaxBlockNum + 1):
-            remoteData = GetRemoteDataArray(backupID, blockNum)
-            remoteParity = GetRemoteParityArray(backupID, blockNum)
-            localData = GetLocalDataArray(backupID, blockNum)
-            localParity = GetLocalParityArray(backupID, blockNum)
-            for supplierNum in range(len(supplierActiveArray)):
-                if supplierActiveArray[supplierNum] != 1:
-                    continue
-                if supplierNum >= len(remoteData) or supplierNum >= len(remoteParity):
-                    continue
-                if remoteData[supplierNum] != 1 and localData[supplierNum] == 1:
-                    bySupplier[supplierNum].add(packetid.MakePacketID(backupID, blockNum, supplierNum, 'Data'))
-                if remoteParity[supplierNum] != 1 and localParity[supplierNum] == 1:
-                    bySupplier[supplierNum].add(packetid.MakePacketID(backupID, blockNum, supplierNum, 'Parity'))
-                if limit_per_supplier:
-                    if len(bySupplier[supplierNum]) > limit_per_supplier:
-                        break
+    local_blocks = local_files().get(backupID)
+    if local_blocks is None:
+        return bySupplier
+    # if backupID is not found in remote files all local pieces must be sent
+    remote_blocks = remote_files().get(backupID)
+    for supplierNum in range(len(supplierActiveArray)):
+        if supplierActiveArray[supplierNum] != 1:
+            continue
+        if supplierNum >= local_blocks.suppliers_number:
+            continue
+        if remote_blocks is not None and supplierNum >= remote_blocks.suppliers_number:
+            continue
+        local_column = local_blocks.column(supplierNum, localMaxBlockNum + 1)
+        remote_column = None if remote_blocks is None else remote_blocks.column(supplierNum, localMaxBlockNum + 1)
+        for dataORparity, present_table in (('Data', _DATA_PRESENT), ('Parity', _PARITY_PRESENT)):
+            to_send = local_column.translate(present_table)
+            if remote_column is not None:
+                to_send = _and_not(to_send, remote_column.translate(present_table))
+            for blockNum in _positions(to_send):
+                if limit_per_supplier and len(bySupplier[supplierNum]) > limit_per_supplier:
+                    break
+                bySupplier[supplierNum].add(packetid.MakePacketID(backupID, blockNum, supplierNum, dataORparity))
     return bySupplier
 
 
@@ -1343,6 +1649,8 @@ def ClearRemoteInfo():
     """
     remote_files().clear()
     remote_max_block_numbers().clear()
+    _RemoteListFilesRevisions.clear()
+    _RemoteListFilesLocalStates.clear()
 
 
 def ClearSupplierRemoteInfo(supplierNum, customer_idurl=None, key_alias=None):
@@ -1352,30 +1660,94 @@ def ClearSupplierRemoteInfo(supplierNum, customer_idurl=None, key_alias=None):
     """
     if not customer_idurl:
         customer_idurl = my_id.getIDURL()
+    if key_alias is None or key_alias == 'master':
+        SetRemoteListFilesRevision(supplierNum, None, customer_idurl=customer_idurl)
     files = 0
     backups = 0
     for backupID in remote_files().keys():
         _key_alias, _customer_idurl = packetid.KeyAliasCustomer(backupID)
         if _customer_idurl == customer_idurl and (key_alias is None or key_alias == 'master' or _key_alias == key_alias):
             backups += 1
-            for blockNum in remote_files()[backupID].keys():
-                try:
-                    if remote_files()[backupID][blockNum]['D'][supplierNum] == 1:
-                        files += 1
-                        remote_files()[backupID][blockNum]['D'][supplierNum] = 0
-                except:
-                    pass
-                try:
-                    if remote_files()[backupID][blockNum]['P'][supplierNum] == 1:
-                        files += 1
-                        remote_files()[backupID][blockNum]['P'][supplierNum] = 0
-                except:
-                    pass
+            files += remote_files()[backupID].clear_supplier(supplierNum)
     if _Debug:
         lg.args(_DebugLevel, files_cleaned=files, backups_cleaned=backups, supplier_pos=supplierNum, c=customer_idurl, k=key_alias)
     return files
 
 
+def GetRemoteListFilesRevision(supplierNum, customer_idurl=None):
+    """
+    Returns revision of the listing from given supplier which is currently loaded into the "remote" matrix.
+    """
+    if not customer_idurl:
+        customer_idurl = my_id.getIDURL()
+    return _RemoteListFilesRevisions.get((id_url.to_bin(customer_idurl), supplierNum)) or ''
+
+
+def SetRemoteListFilesRevision(supplierNum, revision, customer_idurl=None, is_in_sync=False):
+    """
+    Also remembers the local state which was used to check that listing for items to be removed,
+    see ``IsListFilesLocalStateChanged()``.
+    """
+    if not customer_idurl:
+        customer_idurl = my_id.getIDURL()
+    if revision:
+        _RemoteListFilesRevisions[(id_url.to_bin(customer_idurl), supplierNum)] = revision
+        _RemoteListFilesLocalStates[(id_url.to_bin(customer_idurl), supplierNum)] = GetListFilesLocalState(is_in_sync)
+    else:
+        _RemoteListFilesRevisions.pop((id_url.to_bin(customer_idurl), supplierNum), None)
+        _RemoteListFilesLocalStates.pop((id_url.to_bin(customer_idurl), supplierNum), None)
+
+
+def GetListFilesLocalState(is_in_sync):
+    """
+    Items to be removed from suppliers are only detected when local index is in sync,
+    and the result also depends on the local index revision.
+    """
+    return (bool(is_in_sync), backup_fs.revision())
+
+
+def IsListFilesLocalStateChanged(supplierNum, is_in_sync, customer_idurl=None):
+    """
+    Delta listing only contains added and removed lines, unchanged lines are not checked again.
+    So full listing must be requested when the local state changed since the previous listing was processed.
+    """
+    if not customer_idurl:
+        customer_idurl = my_id.getIDURL()
+    return _RemoteListFilesLocalStates.get((id_url.to_bin(customer_idurl), supplierNum)) != GetListFilesLocalState(is_in_sync)
+
+
+def ClearSupplierBackupRemoteInfo(supplierNum, backupID):
+    """
+    Clear info about given backup in the "remote" matrix only for given supplier.
+    """
+    files = 0
+    if backupID in remote_files():
+        files = remote_files()[backupID].clear_supplier(supplierNum, table=_CLEAR_ALL)
+    if _Debug:
+        lg.args(_DebugLevel, files_cleaned=files, supplier_pos=supplierNum, b=backupID)
+    return files
+
+
+def GetSupplierMissedBackups(supplierNum, customer_idurl=None):
+    """
+    Returns set of backups of given customer which are not fully stored on given supplier.
+    """
+    if not customer_idurl:
+        customer_idurl = my_id.getIDURL()
+    missed_backups = set()
+    for backupID, blocks in remote_files().items():
+        _, _customer_idurl = packetid.KeyAliasCustomer(backupID)
+        if not id_url.is_the_same(_customer_idurl, customer_idurl):
+            continue
+        known_blocks = len(blocks)
+        if not known_blocks:
+            continue
+        # unknown blocks are kept as "no info" cells, so only known blocks can be counted as fully stored
+        if blocks.column(supplierNum, len(blocks.known)).count(_BOTH_PRESENT_CELL) < known_blocks:
+            missed_backups.add(backupID)
+    return missed_backups
+
+
 #------------------------------------------------------------------------------
 
 
@@ -1390,23 +1762,14 @@ def GetBackupStats(backupID):
     percentPerSupplier = 100.0/contactsdb.num_suppliers(customer_idurl=customer_idurl)
     # ??? maxBlockNum = remote_max_block_numbers().get(backupID, -1)
     maxBlockNum = GetKnownMaxBlockNum(backupID)
+    remote_blocks = remote_files()[backupID]
     fileNumbers = [0]*contactsdb.num_suppliers(customer_idurl=customer_idurl)
-    totalNumberOfFiles = 0
-    for blockNum in remote_files()[backupID].keys():
-        for supplierNum in range(len(fileNumbers)):
-            if supplierNum < contactsdb.num_suppliers(customer_idurl=customer_idurl):
-                if supplierNum < len(remote_files()[backupID][blockNum]['D']):
-                    if remote_files()[backupID][blockNum]['D'][supplierNum] == 1:
-                        fileNumbers[supplierNum] += 1
-                        totalNumberOfFiles += 1
-                else:
-                    lg.warn('wrong supplier position %d for customer %r in backup Data matrix, backupID=%r' % (supplierNum, customer_idurl, backupID))
-                if supplierNum < len(remote_files()[backupID][blockNum]['P']):
-                    if remote_files()[backupID][blockNum]['P'][supplierNum] == 1:
-                        fileNumbers[supplierNum] += 1
-                        totalNumberOfFiles += 1
-                else:
-                    lg.warn('wrong supplier position %d for customer %r in backup Parity matrix, backupID=%r' % (supplierNum, customer_idurl, backupID))
+    for supplierNum in range(len(fileNumbers)):
+        if supplierNum >= remote_blocks.suppliers_number and len(remote_blocks):
+            lg.warn('wrong supplier position %d for customer %r in backup matrix, backupID=%r' % (supplierNum, customer_idurl, backupID))
+            continue
+        fileNumbers[supplierNum] = remote_blocks.count_pieces(supplierNum)
+    totalNumberOfFiles = sum(fileNumbers)
     statsArray = []
     for supplierNum in range(contactsdb.num_suppliers(customer_idurl=customer_idurl)):
         if maxBlockNum > -1:
@@ -1432,22 +1795,11 @@ def GetBackupLocalStats(backupID):
     if backupID not in local_files():
         return 0, 0, 0, maxBlockNum, [(0, 0)]*contactsdb.num_suppliers(customer_idurl=customer_idurl)
     percentPerSupplier = 100.0/contactsdb.num_suppliers(customer_idurl=customer_idurl)
-    totalNumberOfFiles = 0
+    local_blocks = local_files()[backupID]
     fileNumbers = [0]*contactsdb.num_suppliers(customer_idurl=customer_idurl)
-    for blockNum in range(maxBlockNum + 1):
-        if blockNum not in list(local_files()[backupID].keys()):
-            continue
-
-
-#    for blockNum in local_files()[backupID].keys():
-        for supplierNum in range(len(fileNumbers)):
-            if supplierNum < contactsdb.num_suppliers(customer_idurl=customer_idurl):
-                if local_files()[backupID][blockNum]['D'][supplierNum] == 1:
-                    fileNumbers[supplierNum] += 1
-                    totalNumberOfFiles += 1
-                if local_files()[backupID][blockNum]['P'][supplierNum] == 1:
-                    fileNumbers[supplierNum] += 1
-                    totalNumberOfFiles += 1
+    for supplierNum in range(len(fileNumbers)):
+        fileNumbers[supplierNum] = local_blocks.count_pieces(supplierNum, maxBlockNum + 1)
+    totalNumberOfFiles = sum(fileNumbers)
     statsArray = []
     for supplierNum in range(contactsdb.num_suppliers(customer_idurl=customer_idurl)):
         if maxBlockNum > -1:
@@ -1475,12 +1827,8 @@ def GetBackupBlocksAndPercent(backupID):
     customer_idurl = packetid.CustomerIDURL(backupID)
     # we count all remote files for this backup
     fileCounter = 0
-    for blockNum in remote_files()[backupID].keys():
-        for supplierNum in range(contactsdb.num_suppliers(customer_idurl=customer_idurl)):
-            if remote_files()[backupID][blockNum]['D'][supplierNum] == 1:
-                fileCounter += 1
-            if remote_files()[backupID][blockNum]['P'][supplierNum] == 1:
-                fileCounter += 1
+    for supplierNum in range(contactsdb.num_suppliers(customer_idurl=customer_idurl)):
+        fileCounter += remote_files()[backupID].count_pieces(supplierNum)
     # +1 since zero based and *0.5 because Data and Parity
     return maxBlockNum + 1, 100.0*0.5*fileCounter/((maxBlockNum + 1)*contactsdb.num_suppliers(customer_idurl=customer_idurl))
 
@@ -1507,36 +1855,23 @@ def GetBackupRemoteStats(backupID, only_available_files=True):
         return -1, 0, -1, 0
     customer_idurl = packetid.CustomerIDURL(backupID)
     supplierCount = contactsdb.num_suppliers(customer_idurl=customer_idurl)
-    fileCounter = 0
-    weakBlockNum = -1
-    lessSuppliers = supplierCount
+    remote_blocks = remote_files()[backupID]
     activeArray = GetActiveArray(customer_idurl=customer_idurl)
-    # we count all remote files for this backup - scan all blocks
-    for blockNum in range(maxBlockNum + 1):
-        if blockNum not in list(remote_files()[backupID].keys()):
-            lessSuppliers = 0
-            weakBlockNum = blockNum
+    goodSupplierNumbers = []
+    for supplierNum in range(min(supplierCount, remote_blocks.suppliers_number)):
+        if activeArray[supplierNum] != 1 and only_available_files:
             continue
-        goodSuppliers = supplierCount
-        for supplierNum in range(supplierCount):
-            if activeArray[supplierNum] != 1 and only_available_files:
-                goodSuppliers -= 1
-                continue
-            try:
-                remote_files()[backupID][blockNum]['D'][supplierNum]
-                remote_files()[backupID][blockNum]['P'][supplierNum]
-            except:
-                goodSuppliers -= 1
-                continue
-            if remote_files()[backupID][blockNum]['D'][supplierNum] != 1 or remote_files()[backupID][blockNum]['P'][supplierNum] != 1:
-                goodSuppliers -= 1
-            if remote_files()[backupID][blockNum]['D'][supplierNum] == 1:
-                fileCounter += 1
-            if remote_files()[backupID][blockNum]['P'][supplierNum] == 1:
-                fileCounter += 1
-        if goodSuppliers < lessSuppliers:
-            lessSuppliers = goodSuppliers
-            weakBlockNum = blockNum
+        goodSupplierNumbers.append(supplierNum)
+    # we count all remote files for this backup - scan all blocks
+    fileCounter = 0
+    for supplierNum in goodSupplierNumbers:
+        fileCounter += remote_blocks.count_pieces(supplierNum, maxBlockNum + 1)
+    unknownBlocks = remote_blocks.unknown_blocks(maxBlockNum + 1)
+    if unknownBlocks:
+        weakBlockNum = unknownBlocks[-1]
+        lessSuppliers = 0
+    else:
+        weakBlockNum, lessSuppliers = _find_weak_block(remote_blocks, maxBlockNum + 1, supplierCount, goodSupplierNumbers)
     # +1 since zero based and *0.5 because Data and Parity
     return (
         maxBlockNum + 1,
@@ -1555,7 +1890,7 @@ def GetBackupRemoteArray(backupID):
     maxBlockNum = GetKnownMaxBlockNum(backupID)
     if maxBlockNum == -1:
         return None
-    return remote_files()[backupID]
+    return remote_files()[backupID].to_dict()
 
 
 def GetBackupLocalArray(backupID):
@@ -1567,7 +1902,7 @@ def GetBackupLocalArray(backupID):
     maxBlockNum = GetKnownMaxBlockNum(backupID)
     if maxBlockNum == -1:
         return None
-    return local_files()[backupID]
+    return local_files()[backupID].to_dict()
 
 
 def GetBackupIDs(remote=True, local=False, sorted_ids=False):
@@ -1605,7 +1940,7 @@ def GetLocalMatrix(backupID, blockNum):
             'D': [0]*contactsdb.num_suppliers(customer_idurl=customer_idurl),
             'P': [0]*contactsdb.num_suppliers(customer_idurl=customer_idurl),
         }
-    return local_files()[backupID][blockNum]
+    return local_files()[backupID].block(blockNum)
 
 
 def GetLocalDataArray(backupID, blockNum):
@@ -1622,7 +1957,7 @@ def GetLocalDataArray(backupID, blockNum):
         return [
             0,
         ]*contactsdb.num_suppliers(customer_idurl=customer_idurl)
-    return local_files()[backupID][blockNum]['D']
+    return local_files()[backupID].row(blockNum, 'D')
 
 
 def GetLocalParityArray(backupID, blockNum):
@@ -1635,7 +1970,7 @@ def GetLocalParityArray(backupID, blockNum):
         return [0]*contactsdb.num_suppliers(customer_idurl=customer_idurl)
     if blockNum not in local_files()[backupID]:
         return [0]*contactsdb.num_suppliers(customer_idurl=customer_idurl)
-    return local_files()[backupID][blockNum]['P']
+    return local_files()[backupID].row(blockNum, 'P')
 
 
 def GetRemoteMatrix(backupID, blockNum):
@@ -1650,7 +1985,7 @@ def GetRemoteMatrix(backupID, blockNum):
             'D': [0]*contactsdb.num_suppliers(customer_idurl=customer_idurl),
             'P': [0]*contactsdb.num_suppliers(customer_idurl=customer_idurl),
         }
-    return remote_files()[backupID][blockNum]
+    return remote_files()[backupID].block(blockNum)
 
 
 def GetRemoteDataArray(backupID, blockNum):
@@ -1663,7 +1998,7 @@ def GetRemoteDataArray(backupID, blockNum):
         return [0]*contactsdb.num_suppliers(customer_idurl=customer_idurl)
     if blockNum not in remote_files()[backupID]:
         return [0]*contactsdb.num_suppliers(customer_idurl=customer_idurl)
-    return remote_files()[backupID][blockNum]['D']
+    return remote_files()[backupID].row(blockNum, 'D')
 
 
 def GetRemoteParityArray(backupID, blockNum):
@@ -1676,7 +2011,7 @@ def GetRemoteParityArray(backupID, blockNum):
         return [0]*contactsdb.num_suppliers(customer_idurl=customer_idurl)
     if blockNum not in remote_files()[backupID]:
         return [0]*contactsdb.num_suppliers(customer_idurl=customer_idurl)
-    return remote_files()[backupID][blockNum]['P']
+    return remote_files()[backupID].row(blockNum, 'P')
 
 
 def GetSupplierStats(supplierNum, customer_idurl=None):
@@ -1688,20 +2023,14 @@ def GetSupplierStats(supplierNum, customer_idurl=None):
     for backupID in remote_files().keys():
         if customer_idurl != packetid.CustomerIDURL(backupID):
             continue
+        remote_blocks = remote_files()[backupID]
         result[backupID] = {
-            'data': 0,
-            'parity': 0,
-            'total': 0,
+            'data': remote_blocks.count_pieces(supplierNum, table=_DATA_PRESENT),
+            'parity': remote_blocks.count_pieces(supplierNum, table=_PARITY_PRESENT),
+            'total': 2*len(remote_blocks),
         }
-        for blockNum in remote_files()[backupID].keys():
-            if remote_files()[backupID][blockNum]['D'][supplierNum] == 1:
-                result[backupID]['data'] += 1
-                files += 1
-            if remote_files()[backupID][blockNum]['P'][supplierNum] == 1:
-                result[backupID]['parity'] += 1
-                files += 1
-            result[backupID]['total'] += 2
-            total += 2
+        files += result[backupID]['data'] + result[backupID]['parity']
+        total += result[backupID]['total']
     return files, total, result
 
 
@@ -1714,18 +2043,12 @@ def GetWeakLocalBlock(backupID):
     if backupID not in local_files():
         return -1, 0, supplierCount
     maxBlockNum = GetKnownMaxBlockNum(backupID)
-    weakBlockNum = -1
-    lessSuppliers = supplierCount
-    for blockNum in range(maxBlockNum + 1):
-        if blockNum not in list(local_files()[backupID].keys()):
-            return blockNum, 0, supplierCount
-        goodSuppliers = supplierCount
-        for supplierNum in range(supplierCount):
-            if local_files()[backupID][blockNum]['D'][supplierNum] != 1 or local_files()[backupID][blockNum]['P'][supplierNum] != 1:
-                goodSuppliers -= 1
-        if goodSuppliers < lessSuppliers:
-            lessSuppliers = goodSuppliers
-            weakBlockNum = blockNum
+    local_blocks = local_files()[backupID]
+    unknownBlocks = local_blocks.unknown_blocks(maxBlockNum + 1)
+    if unknownBlocks:
+        return unknownBlocks[0], 0, supplierCount
+    goodSupplierNumbers = list(range(min(supplierCount, local_blocks.suppliers_number)))
+    weakBlockNum, lessSuppliers = _find_weak_block(local_blocks, maxBlockNum + 1, supplierCount, goodSupplierNumbers)
     return weakBlockNum, lessSuppliers, supplierCount
 
 
@@ -1739,25 +2062,31 @@ def GetWeakRemoteBlock(backupID):
     if backupID not in remote_files():
         return -1, 0, supplierCount
     maxBlockNum = GetKnownMaxBlockNum(backupID)
-    weakBlockNum = -1
-    lessSuppliers = supplierCount
+    remote_blocks = remote_files()[backupID]
+    unknownBlocks = remote_blocks.unknown_blocks(maxBlockNum + 1)
+    if unknownBlocks:
+        return unknownBlocks[0], 0, supplierCount
     activeArray = GetActiveArray(customer_idurl=customer_idurl)
-    for blockNum in range(maxBlockNum + 1):
-        if blockNum not in list(remote_files()[backupID].keys()):
-            return blockNum, 0, supplierCount
-        goodSuppliers = supplierCount
-        for supplierNum in range(supplierCount):
-            if activeArray[supplierNum] != 1:
-                goodSuppliers -= 1
-                continue
-            if remote_files()[backupID][blockNum]['D'][supplierNum] != 1 or remote_files()[backupID][blockNum]['P'][supplierNum] != 1:
-                goodSuppliers -= 1
-        if goodSuppliers < lessSuppliers:
-            lessSuppliers = goodSuppliers
-            weakBlockNum = blockNum
+    goodSupplierNumbers = [supplierNum for supplierNum in range(min(supplierCount, remote_blocks.suppliers_number)) if activeArray[supplierNum] == 1]
+    weakBlockNum, lessSuppliers = _find_weak_block(remote_blocks, maxBlockNum + 1, supplierCount, goodSupplierNumbers)
     return weakBlockNum, lessSuppliers, supplierCount
 
 
+def _find_weak_block(blocks, blocks_number, supplierCount, supplier_numbers):
+    """
+    Returns tuple (weakBlockNum, lessSuppliers) - the first block which is fully kept by less suppliers
+    from `supplier_numbers` than all other blocks, all other suppliers are counted as "bad".
+    """
+    if blocks_number <= 0:
+        return -1, supplierCount
+    missing = _sum_flags([blocks.column(supplierNum, blocks_number).translate(_NOT_BOTH_PRESENT) for supplierNum in supplier_numbers], blocks_number)
+    worst = max(missing)
+    lessSuppliers = len(supplier_numbers) - worst
+    if lessSuppliers >= supplierCount:
+        return -1, supplierCount
+    return missing.index(worst), lessSuppliers
+
+
 #------------------------------------------------------------------------------
 
 
@@ -376,11 +376,11 @@ class BackupRebuilder(automat.Automat):
         # this mean this is only local backup!
         from bitdust.storage import backup_matrix
         if self.currentBackupID not in backup_matrix.remote_files():
-            backup_matrix.remote_files()[self.currentBackupID] = {}
+            backup_matrix.remote_files()[self.currentBackupID] = backup_matrix.BlocksMatrix(contactsdb.num_suppliers())
             # we create empty remote info for every local block
             # range(0) should return []
             for blockNum in range(backup_matrix.local_max_block_numbers().get(self.currentBackupID, -1) + 1):
-                backup_matrix.remote_files()[self.currentBackupID][blockNum] = {'D': [0]*contactsdb.num_suppliers(), 'P': [0]*contactsdb.num_suppliers()}
+                backup_matrix.remote_files()[self.currentBackupID].add_block(blockNum)
         # detect missing blocks from remote info
         self.workingBlocksQueue = backup_matrix.ScanMissingBlocks(self.currentBackupID)
         # find the correct max block number for this backup
@@ -393,7 +393,7 @@ class BackupRebuilder(automat.Automat):
         for blockNum in range(backupMaxBlock + 1):
             if blockNum in backup_matrix.remote_files()[self.currentBackupID]:
                 continue
-            backup_matrix.remote_files()[self.currentBackupID][blockNum] = {'D': [0]*contactsdb.num_suppliers(), 'P': [0]*contactsdb.num_suppliers()}
+            backup_matrix.remote_files()[self.currentBackupID].add_block(blockNum)
         # clear requesting queue, remove old packets for this backup, we will
         # send them again
         from bitdust.stream import io_throttle
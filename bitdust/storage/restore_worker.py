@@ -41,18 +41,30 @@ EVENTS:
     * :red:`timer-5sec`
 
 
-At least for now we will work one block at a time, though packets in parallel.
+Blocks are rebuilt, decrypted and written one at a time, though packets in parallel.
 We ask transport_control for all the data packets for a block then see if we
 get them all or need to ask for some parity packets.  We do this till we have
 gotten a block with the "LastBlock" flag set.  If we have tried several times
 and not gotten data packets from a supplier we can flag him as suspect-bad
 and start requesting a parity packet to cover him right away.
 
+To not wait for a network round trip on every block, packets of the next few blocks
+(see ``services/restores/prefetch-blocks`` option) are requested in advance
+while current block is still being received, rebuilt or decrypted.
+Prefetched packets are saved to the local disk and picked up when the block becomes current,
+so only a limited number of blocks are kept locally at the same time.
+
 When we are missing a data packet we pick a parity packet where we have all the
 other data packets for that parity so we can recover the missing data packet.
 This network cost for this is just as low as if we read the data packet.
 But most of the time we won't bother reading the parities.  Just uses up bandwidth.
 
+Which packets to request is decided by ``eccmap.GetFetchPlan()``: all available Data packets
+and only those Parity packets which are needed to cover Data packets from failed or offline suppliers.
+When a request fails, or stays pending for too long, the block is planned again
+and more Parity packets are requested right away.
+Number of Parity packets which were never downloaded is used to estimate how many bytes were saved.
+
 We don't want to fire someone till
 after we have finished a restore in case we have other problems and they might come
 back to life and save us.  However, we might keep packets for a node we plan to fire.
@@ -139,10 +151,10 @@ class RestoreWorker(automat.Automat):
     """
 
     timers = {
-        'timer-5sec': (5.0, ['REQUESTED']),
+        'timer-5sec': (5.0, ['REQUESTED', 'RECEIVING']),
     }
 
-    def __init__(self, BackupID, OutputFile, KeyID=None, ecc_map=None, debug_level=_DebugLevel, log_events=False, log_transitions=_Debug, publish_events=False, **kwargs):
+    def __init__(self, BackupID, OutputFile, KeyID=None, ecc_map=None, prefetch_blocks=None, debug_level=_DebugLevel, log_events=False, log_transitions=_Debug, publish_events=False, **kwargs):
         """
         Builds `restore_worker()` state machine.
         """
@@ -170,6 +182,17 @@ class RestoreWorker(automat.Automat):
         self.RequestFails = []
         self.block_requests = {}
         self.AlreadyRequestedCounts = {}
+        # requests for packets of the next blocks, which were sent in advance
+        self.prefetch_blocks = settings.getRestorePrefetchBlocks() if prefetch_blocks is None else prefetch_blocks
+        self.prefetch_requests = {}
+        # pending requests which are running longer than that are covered with Parity packets
+        self.request_times = {}
+        self.slow_request_timeout = max(30, 2*int(settings.getBackupBlockSize()/settings.SendingSpeedLimit()))
+        # packets which are not needed to rebuild current block
+        self.skipped_requests = set()
+        self.packets_received = 0
+        self.packets_skipped = 0
+        self.bytes_received = 0
         # For anyone who wants to know when we finish
         self.MyDeferred = Deferred()
         self.packetInCallback = None
@@ -216,6 +239,9 @@ class RestoreWorker(automat.Automat):
                 self.state = 'RECEIVING'
             elif event == 'timer-5sec' and self.Attempts == 2:
                 self.doPingOfflineSuppliers(*args, **kwargs)
+                self.doRequestSlowPackets(*args, **kwargs)
+            elif event == 'timer-5sec' and self.Attempts != 2:
+                self.doRequestSlowPackets(*args, **kwargs)
             elif event == 'data-received':
                 self.doSavePacket(*args, **kwargs)
             elif event == 'request-failed' and self.isStillCorrectable(*args, **kwargs) and self.Attempts < 3:
@@ -241,6 +267,8 @@ class RestoreWorker(automat.Automat):
                 self.doRequestPackets(*args, **kwargs)
             elif event == 'data-received':
                 self.doSavePacket(*args, **kwargs)
+            elif event == 'timer-5sec':
+                self.doRequestSlowPackets(*args, **kwargs)
             elif (event == 'abort' or ((event == 'request-failed' or event == 'data-receiving-stopped') and
                                        not self.isStillCorrectable(*args, **kwargs))) or ((event == 'instant' or event == 'request-finished') and not self.isBlockReceiving(*args, **kwargs) and not self.isBlockFixable(*args, **kwargs)):
                 self.state = 'FAILED'
@@ -395,8 +423,13 @@ class RestoreWorker(automat.Automat):
             lg.out(_DebugLevel, 'restore_worker.doStartNewBlock ' + str(self.block_number))
         self.OnHandData = [False]*self.EccMap.datasegments
         self.OnHandParity = [False]*self.EccMap.paritysegments
-        self.RequestFails = []
-        self.block_requests = {}
+        self.packets_skipped += len(self.skipped_requests)
+        self.skipped_requests = set()
+        # requests for that block could be already sent in advance, all received packets will be found on the local disk
+        # requests which are still in progress are kept and failed requests are covered with Parity packets
+        prefetched_requests = self.prefetch_requests.pop(self.block_number, {})
+        self.block_requests = {packetID: result for packetID, result in prefetched_requests.items() if result is not True}
+        self.RequestFails = [packetID for packetID, result in self.block_requests.items() if result is False]
         self.AlreadyRequestedCounts = {}
 
     def doPingOfflineSuppliers(self, *args, **kwargs):
@@ -414,14 +447,7 @@ class RestoreWorker(automat.Automat):
         """
         Action method.
         """
-        for SupplierNumber in range(self.EccMap.datasegments):
-            PacketID = packetid.MakePacketID(self.backup_id, self.block_number, SupplierNumber, 'Data')
-            customerID, remotePath = packetid.SplitPacketID(PacketID)
-            self.OnHandData[SupplierNumber] = bool(os.path.exists(os.path.join(settings.getLocalBackupsDir(), customerID, remotePath)))
-        for SupplierNumber in range(self.EccMap.paritysegments):
-            PacketID = packetid.MakePacketID(self.backup_id, self.block_number, SupplierNumber, 'Parity')
-            customerID, remotePath = packetid.SplitPacketID(PacketID)
-            self.OnHandParity[SupplierNumber] = bool(os.path.exists(os.path.join(settings.getLocalBackupsDir(), customerID, remotePath)))
+        self.OnHandData, self.OnHandParity = self._scan_existing_packets(self.block_number)
 
     def doRestoreBlock(self, *args, **kwargs):
         """
@@ -457,6 +483,23 @@ class RestoreWorker(automat.Automat):
         Action method.
         """
         self._do_check_run_requests()
+        self._do_prefetch_next_blocks()
+
+    def doRequestSlowPackets(self, *args, **kwargs):
+        """
+        Action method.
+        """
+        now = time.time()
+        slow_requests = set()
+        for packetID, request_time in self.request_times.items():
+            if packetID in self.block_requests and self.block_requests[packetID] is None:
+                if now - request_time > self.slow_request_timeout:
+                    slow_requests.add(packetID)
+        if not slow_requests:
+            return
+        requests_made = self._do_request_block_packets(slow_requests=slow_requests)
+        if _Debug:
+            lg.args(_DebugLevel, block_number=self.block_number, slow_requests=slow_requests, requests_made=requests_made)
 
     def doSavePacket(self, *args, **kwargs):
         """
@@ -465,9 +508,8 @@ class RestoreWorker(automat.Automat):
         if not args or not args[0]:
             raise Exception('no input found')
         NewPacket, PacketID = args[0]
-        glob_path = global_id.NormalizeGlobalID(PacketID, detect_version=True)
         packetID = global_id.CanonicalID(PacketID)
-        customer_id, _, _, _, SupplierNumber, dataORparity = packetid.SplitFull(packetID)
+        _, _, _, _, SupplierNumber, dataORparity = packetid.SplitFull(packetID)
         if dataORparity == 'Data':
             self.OnHandData[SupplierNumber] = True
         elif dataORparity == 'Parity':
@@ -475,21 +517,7 @@ class RestoreWorker(automat.Automat):
         if not NewPacket:
             lg.warn('packet %r already exists locally' % packetID)
             return
-        filename = os.path.join(settings.getLocalBackupsDir(), customer_id, glob_path['path'])
-        dirpath = os.path.dirname(filename)
-        if not os.path.exists(dirpath):
-            try:
-                bpio._dirs_make(dirpath)
-            except:
-                lg.exc()
-        # either way the payload of packet is saved
-        if not bpio.WriteBinaryFile(filename, NewPacket.Payload):
-            lg.err('unable to write to %s' % filename)
-            return
-        if self.packetInCallback is not None:
-            self.packetInCallback(self.backup_id, NewPacket)
-        if _Debug:
-            lg.out(_DebugLevel, 'restore_worker.doSavePacket %s saved to %s' % (packetID, filename))
+        self._do_save_packet(NewPacket, PacketID)
 
     def doReadRaid(self, *args, **kwargs):
         """
@@ -525,22 +553,7 @@ class RestoreWorker(automat.Automat):
                     if _Debug:
                         lg.out(_DebugLevel, 'restore_worker.doRemoveTempFile SKIP because rebuilding in process')
                     return
-        count = 0
-        for supplierNum in range(contactsdb.num_suppliers(customer_idurl=self.customer_idurl)):
-            supplierIDURL = contactsdb.supplier(supplierNum, customer_idurl=self.customer_idurl)
-            if not supplierIDURL:
-                continue
-            for dataORparity in ['Data', 'Parity']:
-                packetID = packetid.MakePacketID(self.backup_id, self.block_number, supplierNum, dataORparity)
-                customer, remotePath = packetid.SplitPacketID(packetID)
-                filename = os.path.join(settings.getLocalBackupsDir(), customer, remotePath)
-                if os.path.isfile(filename):
-                    try:
-                        os.remove(filename)
-                    except:
-                        lg.exc()
-                        continue
-                    count += 1
+        count = self._do_remove_block_packets(self.block_number)
         backup_matrix.LocalBlockReport(self.backup_id, self.block_number, *args, **kwargs)
         if _Debug:
             lg.out(_DebugLevel, 'restore_worker.doRemoveTempFile %d files were removed' % count)
@@ -567,6 +580,8 @@ class RestoreWorker(automat.Automat):
         Action method.
         """
         io_throttle.DeleteBackupRequests(self.backup_id)
+        self._do_forget_prefetched_blocks()
+        self.request_times.clear()
 
     def doReportDone(self, *args, **kwargs):
         """
@@ -574,6 +589,9 @@ class RestoreWorker(automat.Automat):
         """
         if _Debug:
             lg.out(_DebugLevel, 'restore_worker.doReportDone')
+        self.packets_skipped += len(self.skipped_requests)
+        self.skipped_requests = set()
+        lg.info('restore of %s finished, %d packets received, %d packets not requested, ~%d bytes saved' % (self.backup_id, self.packets_received, self.packets_skipped, self.get_bytes_saved()))
         self.done_flag = True
         self.MyDeferred.callback('done')
         # events.send('restore-done', data=dict(backup_id=self.backup_id))
@@ -595,6 +613,7 @@ class RestoreWorker(automat.Automat):
             block_number=self.block_number,
             args=args,
             reason=reason,
+            bytes_saved=self.get_bytes_saved(),
         ))
 
     def doDestroyMe(self, *args, **kwargs):
@@ -611,10 +630,21 @@ class RestoreWorker(automat.Automat):
         self.RequestFails = []
         self.AlreadyRequestedCounts = None
         self.block_requests = None
+        self.prefetch_requests = None
+        self.request_times = None
+        self.skipped_requests = None
         self.MyDeferred = None
         self.output_stream = None
         self.destroy()
 
+    def get_bytes_saved(self):
+        """
+        Estimated amount of bytes which were not downloaded because Parity packets were not needed.
+        """
+        if not self.packets_received:
+            return 0
+        return int(self.packets_skipped*self.bytes_received/self.packets_received)
+
     def _do_block_rebuilding(self):
         from bitdust.storage import backup_rebuilder
         backup_rebuilder.BlockBackup(self.backup_id)
@@ -624,63 +654,134 @@ class RestoreWorker(automat.Automat):
         from bitdust.storage import backup_rebuilder
         backup_rebuilder.UnBlockBackup(self.backup_id)
 
-    def _do_check_run_requests(self):
+    def _scan_existing_packets(self, block_number):
+        on_hand_data = [False]*self.EccMap.datasegments
+        on_hand_parity = [False]*self.EccMap.paritysegments
+        for on_hand, dataORparity in ((on_hand_data, 'Data'), (on_hand_parity, 'Parity')):
+            for SupplierNumber in range(len(on_hand)):
+                PacketID = packetid.MakePacketID(self.backup_id, block_number, SupplierNumber, dataORparity)
+                customerID, remotePath = packetid.SplitPacketID(PacketID)
+                on_hand[SupplierNumber] = bool(os.path.exists(os.path.join(settings.getLocalBackupsDir(), customerID, remotePath)))
+        return on_hand_data, on_hand_parity
+
+    def _do_save_packet(self, NewPacket, PacketID):
+        glob_path = global_id.NormalizeGlobalID(PacketID, detect_version=True)
+        packetID = global_id.CanonicalID(PacketID)
+        customer_id = packetid.SplitFull(packetID)[0]
+        filename = os.path.join(settings.getLocalBackupsDir(), customer_id, glob_path['path'])
+        dirpath = os.path.dirname(filename)
+        if not os.path.exists(dirpath):
+            try:
+                bpio._dirs_make(dirpath)
+            except:
+                lg.exc()
+        # either way the payload of packet is saved
+        if not bpio.WriteBinaryFile(filename, NewPacket.Payload):
+            lg.err('unable to write to %s' % filename)
+            return False
+        self.packets_received += 1
+        self.bytes_received += len(NewPacket.Payload)
+        if self.packetInCallback is not None:
+            self.packetInCallback(self.backup_id, NewPacket)
         if _Debug:
-            lg.out(_DebugLevel, 'restore_worker._do_check_run_requests for %s at block %d' % (self.backup_id, self.block_number))
-        packetsToRequest = []
-        for SupplierNumber in range(self.EccMap.datasegments):
-            request_packet_id = packetid.MakePacketID(self.backup_id, self.block_number, SupplierNumber, 'Data')
-            if self.OnHandData[SupplierNumber]:
-                if _Debug:
-                    lg.out(_DebugLevel, '        SKIP, OnHandData is True for supplier %d' % SupplierNumber)
-                if request_packet_id not in self.block_requests:
-                    self.block_requests[request_packet_id] = True
-                continue
-            if request_packet_id in self.block_requests:
-                if _Debug:
-                    lg.out(_DebugLevel, '        SKIP, request for packet %r already sent to IO queue for supplier %d' % (request_packet_id, SupplierNumber))
-                continue
-            SupplierID = contactsdb.supplier(SupplierNumber, customer_idurl=self.customer_idurl)
-            if not SupplierID:
-                lg.warn('unknown supplier at position %s' % SupplierNumber)
-                continue
-            if online_status.isOffline(SupplierID):
-                if _Debug:
-                    lg.out(_DebugLevel, '        SKIP, offline supplier: %s' % SupplierID)
-                continue
-            packetsToRequest.append((SupplierID, request_packet_id))
-        for SupplierNumber in range(self.EccMap.paritysegments):
-            request_packet_id = packetid.MakePacketID(self.backup_id, self.block_number, SupplierNumber, 'Parity')
-            if self.OnHandParity[SupplierNumber]:
-                if _Debug:
-                    lg.out(_DebugLevel, '        SKIP, OnHandParity is True for supplier %d' % SupplierNumber)
-                if request_packet_id not in self.block_requests:
-                    self.block_requests[request_packet_id] = True
-                continue
-            if request_packet_id in self.block_requests:
-                if _Debug:
-                    lg.out(_DebugLevel, '        SKIP, request for packet %r already sent to IO queue for supplier %d' % (request_packet_id, SupplierNumber))
-                continue
-            SupplierID = contactsdb.supplier(SupplierNumber, customer_idurl=self.customer_idurl)
-            if not SupplierID:
-                lg.warn('unknown supplier at position %s' % SupplierNumber)
-                continue
-            if online_status.isOffline(SupplierID):
-                if _Debug:
-                    lg.out(_DebugLevel, '        SKIP, offline supplier: %s' % SupplierID)
+            lg.out(_DebugLevel, 'restore_worker._do_save_packet %s saved to %s' % (packetID, filename))
+        return True
+
+    def _do_remove_block_packets(self, block_number):
+        count = 0
+        for supplierNum in range(contactsdb.num_suppliers(customer_idurl=self.customer_idurl)):
+            supplierIDURL = contactsdb.supplier(supplierNum, customer_idurl=self.customer_idurl)
+            if not supplierIDURL:
                 continue
-            packetsToRequest.append((SupplierID, request_packet_id))
+            for dataORparity in ['Data', 'Parity']:
+                packetID = packetid.MakePacketID(self.backup_id, block_number, supplierNum, dataORparity)
+                customer, remotePath = packetid.SplitPacketID(packetID)
+                filename = os.path.join(settings.getLocalBackupsDir(), customer, remotePath)
+                if os.path.isfile(filename):
+                    try:
+                        os.remove(filename)
+                    except:
+                        lg.exc()
+                        continue
+                    count += 1
+        return count
+
+    def _do_forget_prefetched_blocks(self):
+        prefetched_blocks = sorted(self.prefetch_requests.keys())
+        self.prefetch_requests.clear()
+        if not prefetched_blocks or settings.getBackupsKeepLocalCopies():
+            return
+        count = 0
+        for block_number in prefetched_blocks:
+            count += self._do_remove_block_packets(block_number)
+        if _Debug:
+            lg.args(_DebugLevel, prefetched_blocks=prefetched_blocks, removed_files=count)
+
+    def _list_packets_to_request(self, block_number, on_hand_data, on_hand_parity, block_requests, slow_requests=None):
+        """
+        Returns a tuple of two lists: packets to be requested and IDs of packets which are not needed at the moment.
+        Packets on hand and pending requests are counted as received, failed and slow requests,
+        unknown or offline suppliers are covered with Parity packets selected by ``eccmap.GetFetchPlan()``.
+        """
+        segments_have = {'Data': [], 'Parity': []}
+        segments_available = {'Data': [], 'Parity': []}
+        candidates = {}
+        for on_hand, dataORparity in ((on_hand_data, 'Data'), (on_hand_parity, 'Parity')):
+            for SupplierNumber in range(len(on_hand)):
+                segments_have[dataORparity].append(0)
+                segments_available[dataORparity].append(0)
+                request_packet_id = packetid.MakePacketID(self.backup_id, block_number, SupplierNumber, dataORparity)
+                if on_hand[SupplierNumber]:
+                    if _Debug:
+                        lg.out(_DebugLevel, '        SKIP, %s packet is on hand for supplier %d' % (dataORparity, SupplierNumber))
+                    if request_packet_id not in block_requests:
+                        block_requests[request_packet_id] = True
+                    segments_have[dataORparity][SupplierNumber] = 1
+                    continue
+                if request_packet_id in block_requests:
+                    if block_requests[request_packet_id] is False:
+                        if _Debug:
+                            lg.out(_DebugLevel, '        SKIP, request for packet %r failed for supplier %d' % (request_packet_id, SupplierNumber))
+                        continue
+                    if slow_requests and request_packet_id in slow_requests:
+                        if _Debug:
+                            lg.out(_DebugLevel, '        SKIP, request for packet %r is too slow for supplier %d' % (request_packet_id, SupplierNumber))
+                        continue
+                    if _Debug:
+                        lg.out(_DebugLevel, '        SKIP, request for packet %r already sent to IO queue for supplier %d' % (request_packet_id, SupplierNumber))
+                    segments_have[dataORparity][SupplierNumber] = 1
+                    continue
+                SupplierID = contactsdb.supplier(SupplierNumber, customer_idurl=self.customer_idurl)
+                if not SupplierID:
+                    lg.warn('unknown supplier at position %s' % SupplierNumber)
+                    continue
+                if online_status.isOffline(SupplierID):
+                    if _Debug:
+                        lg.out(_DebugLevel, '        SKIP, offline supplier: %s' % SupplierID)
+                    continue
+                segments_available[dataORparity][SupplierNumber] = 1
+                candidates[(dataORparity, SupplierNumber)] = (SupplierID, request_packet_id)
+        fetch_data, fetch_parity = self.EccMap.GetFetchPlan(
+            segments_have['Data'],
+            segments_have['Parity'],
+            segments_available['Data'],
+            segments_available['Parity'],
+        )
+        selected = [('Data', SupplierNumber) for SupplierNumber in fetch_data] + [('Parity', SupplierNumber) for SupplierNumber in fetch_parity]
+        packetsToRequest = [candidates[segment] for segment in selected]
+        skippedPackets = [candidates[segment][1] for segment in candidates if segment not in selected]
+        if _Debug:
+            lg.args(_DebugLevel, block_number=block_number, fetch_data=fetch_data, fetch_parity=fetch_parity, skipped=len(skippedPackets))
+        return packetsToRequest, skippedPackets
+
+    def _do_send_requests(self, packetsToRequest, block_requests):
         requests_made = 0
-        # already_requested = 0
         for SupplierID, packetID in packetsToRequest:
             if io_throttle.HasPacketInRequestQueue(SupplierID, packetID):
-                # already_requested += 1
-                # if packetID not in self.AlreadyRequestedCounts:
-                #     self.AlreadyRequestedCounts[packetID] = 0
-                # self.AlreadyRequestedCounts[packetID] += 1
                 lg.warn('packet already in IO queue for supplier %s : %s' % (SupplierID, packetID))
                 continue
-            self.block_requests[packetID] = None
+            block_requests[packetID] = None
+            self.request_times[packetID] = time.time()
             if io_throttle.QueueRequestFile(
                 callOnReceived=self._on_packet_request_result,
                 creatorID=self.creator_id,
@@ -690,10 +791,36 @@ class RestoreWorker(automat.Automat):
             ):
                 requests_made += 1
             else:
-                self.block_requests[packetID] = False
+                block_requests[packetID] = False
             if _Debug:
-                lg.dbg(_DebugLevel, 'sent request %r to %r, other requests: %r' % (packetID, SupplierID, list(self.block_requests.values())))
-        del packetsToRequest
+                lg.dbg(_DebugLevel, 'sent request %r to %r, other requests: %r' % (packetID, SupplierID, list(block_requests.values())))
+        return requests_made
+
+    def _do_prefetch_next_blocks(self):
+        """
+        Sends requests for packets of the next few blocks, so they are already received when the block becomes current.
+        Only blocks known from the "remote" matrix are requested, so nothing is requested after the last block.
+        """
+        if self.prefetch_blocks <= 0:
+            return
+        from bitdust.storage import backup_matrix
+        last_block_number = min(self.block_number + self.prefetch_blocks, backup_matrix.GetKnownMaxBlockNum(self.backup_id))
+        requests_made = 0
+        for block_number in range(self.block_number + 1, last_block_number + 1):
+            if block_number in self.prefetch_requests:
+                continue
+            block_requests = {}
+            self.prefetch_requests[block_number] = block_requests
+            on_hand_data, on_hand_parity = self._scan_existing_packets(block_number)
+            packetsToRequest, _ = self._list_packets_to_request(block_number, on_hand_data, on_hand_parity, block_requests)
+            requests_made += self._do_send_requests(packetsToRequest, block_requests)
+        if _Debug and requests_made:
+            lg.out(_DebugLevel, 'restore_worker._do_prefetch_next_blocks requested %d packets for blocks %d-%d' % (requests_made, self.block_number + 1, last_block_number))
+
+    def _do_check_run_requests(self):
+        if _Debug:
+            lg.out(_DebugLevel, 'restore_worker._do_check_run_requests for %s at block %d' % (self.backup_id, self.block_number))
+        requests_made = self._do_request_block_packets()
         if requests_made:
             if _Debug:
                 lg.out(_DebugLevel, '        requested %d packets for block %d' % (requests_made, self.block_number))
@@ -715,6 +842,11 @@ class RestoreWorker(automat.Automat):
             lg.out(_DebugLevel, '        all requests finished for block %d : %r' % (self.block_number, current_block_requests_results))
         reactor.callLater(0, self.automat, 'request-finished', None)  # @UndefinedVariable
 
+    def _do_request_block_packets(self, slow_requests=None):
+        packetsToRequest, skippedPackets = self._list_packets_to_request(self.block_number, self.OnHandData, self.OnHandParity, self.block_requests, slow_requests=slow_requests)
+        self.skipped_requests = set(skippedPackets)
+        return self._do_send_requests(packetsToRequest, self.block_requests)
+
     def _on_block_restored(self, restored_blocks, filename):
         if _Debug:
             lg.out(_DebugLevel, 'restore_worker._on_block_restored at %s with result: %s' % (filename, restored_blocks))
@@ -735,16 +867,15 @@ class RestoreWorker(automat.Automat):
             packet_id = getattr(NewPacketOrPacketID, 'PacketID', None)
         if not packet_id:
             raise Exception('packet ID is unknown from %r' % NewPacketOrPacketID)
+        if result != 'in queue':
+            self.request_times.pop(packet_id, None)
         if packet_id not in self.block_requests:
-            resp = global_id.NormalizeGlobalID(packet_id)
-            for req_packet_id in self.block_requests:
-                req = global_id.NormalizeGlobalID(req_packet_id)
-                if resp['version'] == req['version'] and resp['path'] == req['path']:
-                    if resp['key_alias'] == req['key_alias'] and resp['user'] == req['user']:
-                        if id_url.is_the_same(resp['idurl'], req['idurl']):
-                            packet_id = req_packet_id
-                            lg.warn('found matching packet request %r for rotated idurl %r' % (packet_id, resp['idurl']))
-                            break
+            for prefetch_block_requests in self.prefetch_requests.values():
+                prefetch_packet_id = self._find_packet_request(packet_id, prefetch_block_requests)
+                if prefetch_packet_id:
+                    self._on_prefetched_packet_result(NewPacketOrPacketID, prefetch_packet_id, result, prefetch_block_requests)
+                    return
+            packet_id = self._find_packet_request(packet_id, self.block_requests) or packet_id
         if packet_id not in self.block_requests:
             if _Debug:
                 lg.args(_DebugLevel, block_requests=self.block_requests)
@@ -765,9 +896,40 @@ class RestoreWorker(automat.Automat):
         else:
             self.block_requests[packet_id] = False
             self.RequestFails.append(packet_id)
+            if self.state in ['REQUESTED', 'RECEIVING'] and self.isStillCorrectable():
+                if self._do_request_block_packets():
+                    if _Debug:
+                        lg.out(_DebugLevel, 'restore_worker._on_packet_request_result requested Parity packets to cover failed packet %r' % packet_id)
+                    return
             # reactor.callLater(0, self.automat, 'request-failed', packet_id)  # @UndefinedVariable
             self.event('request-failed', packet_id)
 
+    def _find_packet_request(self, packet_id, block_requests):
+        if packet_id in block_requests:
+            return packet_id
+        resp = global_id.NormalizeGlobalID(packet_id)
+        for req_packet_id in block_requests:
+            req = global_id.NormalizeGlobalID(req_packet_id)
+            if resp['version'] == req['version'] and resp['path'] == req['path']:
+                if resp['key_alias'] == req['key_alias'] and resp['user'] == req['user']:
+                    if id_url.is_the_same(resp['idurl'], req['idurl']):
+                        lg.warn('found matching packet request %r for rotated idurl %r' % (req_packet_id, resp['idurl']))
+                        return req_packet_id
+        return None
+
+    def _on_prefetched_packet_result(self, NewPacketOrPacketID, packet_id, result, block_requests):
+        if _Debug:
+            lg.args(_DebugLevel, packet_id=packet_id, result=result)
+        if result == 'in queue':
+            lg.warn('packet already in the request queue: %r' % packet_id)
+            return
+        if result == 'received':
+            block_requests[packet_id] = self._do_save_packet(NewPacketOrPacketID, packet_id)
+        elif result == 'exist':
+            block_requests[packet_id] = True
+        else:
+            block_requests[packet_id] = False
+
     def _on_data_receiver_state_changed(self, oldstate, newstate, event_string, *args, **kwargs):
         if newstate == 'RECEIVING' and oldstate != 'RECEIVING':
             self.automat('data-receiving-started', newstate)
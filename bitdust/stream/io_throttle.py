@@ -317,7 +317,7 @@ class SupplierQueue:
                 reactor.callLater(0, callOnFail, self.remoteID, packetID, 'offline')  # @UndefinedVariable
             return False
         if packetID in self.fileSendQueue:
-            lg.warn('packet %s already in the queue for %s' % (packetID, self.remoteName))
+            lg.warn('packet %s already in the queue for %s', packetID, self.remoteName)
             if callOnFail is not None:
                 reactor.callLater(0, callOnFail, self.remoteID, packetID, 'in queue')  # @UndefinedVariable
             return False
@@ -380,10 +380,10 @@ class SupplierQueue:
         self.ackedCount += 1
         packetID = global_id.CanonicalID(newpacket.PacketID)
         if packetID not in self.fileSendQueue:
-            lg.warn('packet %s not in sending queue for %s' % (newpacket.PacketID, self.remoteName))
+            lg.warn('packet %s not in sending queue for %s', newpacket.PacketID, self.remoteName)
             return
         if packetID not in list(self.fileSendDict.keys()):
-            lg.warn('packet %s not in sending dict for %s' % (newpacket.PacketID, self.remoteName))
+            lg.warn('packet %s not in sending dict for %s', newpacket.PacketID, self.remoteName)
             return
         f_up = self.fileSendDict[packetID]
         if newpacket.Command == commands.Ack():
@@ -422,7 +422,7 @@ class SupplierQueue:
             try:
                 packetID = self.fileSendQueue[i]
             except:
-                lg.warn('item at position %d not exist in send queue' % i)
+                lg.warn('item at position %d not exist in send queue', i)
                 continue
 
             f_up = self.fileSendDict[packetID]
@@ -436,13 +436,13 @@ class SupplierQueue:
                     if time.time() - f_up.sendTime > f_up.sendTimeout:
                         # so this packet is failed because no response for too long
                         packetsToBeFailed[packetID] = 'timeout'
-                        lg.warn('uploading %r failed because of timeout %d src' % (packetID, f_up.sendTimeout))
+                        lg.warn('uploading %r failed because of timeout %d src', packetID, f_up.sendTimeout)
                 # this packet already in progress - check next one
                 continue
 
             # the data file to send no longer exists - it is failed situation
             if not os.path.exists(f_up.fileName):
-                lg.warn('file %s not exist' % (f_up.fileName))
+                lg.warn('file %s not exist', f_up.fileName)
                 packetsToBeFailed[packetID] = 'not exist'
                 continue
 
@@ -505,7 +505,7 @@ class SupplierQueue:
             self.StopAllRequests()
             return False
         if packetID in self.fileRequestQueue:
-            lg.warn('packet %s already in the queue for %s' % (packetID, self.remoteName))
+            lg.warn('packet %s already in the queue for %s', packetID, self.remoteName)
             if callOnReceived:
                 reactor.callLater(0, callOnReceived, packetID, 'in queue')  # @UndefinedVariable
             return False
@@ -546,7 +546,7 @@ class SupplierQueue:
                 if _Debug:
                     lg.out(_DebugLevel, 'io_throttle.DeleteBackupRequests stopped %r in %s downloading queue, %d more items' % (packetID, self.remoteID, len(self.fileRequestQueue)))
             else:
-                lg.warn('can not find %r in request queue' % packetID)
+                lg.warn('can not find %r in request queue', packetID)
         if len(self.fileRequestQueue) > 0:
             reactor.callLater(0, self.DoRequest)  # @UndefinedVariable
 
@@ -564,7 +564,7 @@ class SupplierQueue:
             another_packetID = global_id.SubstitutePacketID(packetID, idurl=latest_idurl)
             if (another_packetID in self.fileRequestQueue) and (another_packetID in self.fileRequestDict):
                 packetID = another_packetID
-                lg.warn('found incoming %r with outdated packet id, corrected: %r' % (newpacket, another_packetID))
+                lg.warn('found incoming %r with outdated packet id, corrected: %r', newpacket, another_packetID)
         if (packetID not in self.fileRequestQueue) or (packetID not in self.fileRequestDict):
             lg.err('unexpected %r received which is not in the downloading queue' % newpacket)
         else:
@@ -609,10 +609,10 @@ class SupplierQueue:
                 if why == 'exist':
                     f_down.event('file-already-exists')
                 else:
-                    lg.warn('unexpected result "%r" for %r in downloading queue for %s' % (why, packetID, self.remoteID))
+                    lg.warn('unexpected result "%r" for %r in downloading queue for %s', why, packetID, self.remoteID)
                     f_down.event('stop')
             else:
-                lg.warn('packet %r not found in request queue for [%s]' % (packetID, self.remoteID))
+                lg.warn('packet %r not found in request queue for [%s]', packetID, self.remoteID)
         del packetsToRemove
         if result:
             self.DoRequest()
@@ -692,7 +692,7 @@ class SupplierQueue:
         else:
             if pkt_out.outpacket.Command == commands.Data():
                 if packetID in self.fileSendQueue:
-                    lg.warn('packet %r is %r during uploading to %s' % (packetID, status, self.remoteID))
+                    lg.warn('packet %r is %r during uploading to %s', packetID, status, self.remoteID)
                     f_up = self.fileSendDict[packetID]
                     f_up.event('sending-failed')
                     return False
@@ -792,7 +792,7 @@ class IOThrottle:
             return False
         if remoteID not in list(self.supplierQueues.keys()):
             self.supplierQueues[remoteID] = SupplierQueue(remoteID, self.creatorID)
-            lg.info('made a new sending queue for %s' % nameurl.GetName(remoteID))
+            lg.info('made a new sending queue for %s', nameurl.GetName(remoteID))
         return self.supplierQueues[remoteID].SupplierSendFile(
             fileName,
             packetID,
@@ -812,14 +812,14 @@ class IOThrottle:
             customer, pathID = packetid.SplitPacketID(packetID)
             filename = os.path.join(settings.getLocalBackupsDir(), customer, pathID)
             if os.path.exists(filename):
-                lg.warn('%s already exist ' % filename)
+                lg.warn('%s already exist ', filename)
                 if callOnReceived:
                     reactor.callLater(0, callOnReceived, packetID, 'exist')  # @UndefinedVariable
                 return False
         if remoteID not in list(self.supplierQueues.keys()):
             # made a new queue for this man
             self.supplierQueues[remoteID] = SupplierQueue(remoteID, self.creatorID)
-            lg.info('made a new receiving queue for %s' % nameurl.GetName(remoteID))
+            lg.info('made a new receiving queue for %s', nameurl.GetName(remoteID))
         # lg.out(10, "io_throttle.QueueRequestFile asking for %s from %s" % (packetID, nameurl.GetName(remoteID)))
         return self.supplierQueues[remoteID].SupplierRequestFile(callOnReceived, creatorID, packetID, ownerID)
 
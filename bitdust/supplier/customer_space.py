@@ -79,6 +79,7 @@ from bitdust.dht import known_nodes
 
 from bitdust.supplier import list_files
 from bitdust.supplier import local_tester
+from bitdust.supplier import files_index
 
 from bitdust.userid import global_id
 from bitdust.userid import id_url
@@ -93,6 +94,7 @@ _SupplierFileModifiedNotifyTasks = {}
 
 
 def init():
+    files_index.init()
     callback.append_inbox_callback(on_inbox_packet_received)
     events.add_subscriber(on_identity_url_changed, 'identity-url-changed')
     events.add_subscriber(on_customer_accepted, 'existing-customer-accepted')
@@ -127,6 +129,7 @@ def shutdown():
     events.remove_subscriber(on_customer_terminated, 'existing-customer-terminated')
     events.remove_subscriber(on_identity_url_changed, 'identity-url-changed')
     callback.remove_inbox_callback(on_inbox_packet_received)
+    files_index.shutdown()
 
 
 #------------------------------------------------------------------------------
@@ -385,25 +388,19 @@ def on_data(newpacket):
     new_data = newpacket.Serialize()
     donated_bytes = settings.getDonatedBytes()
     accounting.check_create_customers_quotas(donated_bytes)
-    space_dict, _ = accounting.read_customers_quotas()
-    known_customers_quoats = list(space_dict.keys())
-    if id_url.is_not_in(customer_idurl, known_customers_quoats, as_field=False, as_bin=True):
+    bytes_donated_to_customer = accounting.get_customer_quota(customer_idurl)
+    if bytes_donated_to_customer is None:
         lg.err('customer space is broken, no info about donated space can be found for %s' % newpacket)
         p2p_service.SendFail(newpacket, 'customer space is broken, no info found about donated space', remote_idurl=authorized_idurl)
         return False
-    used_space_dict = accounting.read_customers_usage()
-    known_customers_usage = list(used_space_dict.keys())
-    if id_url.is_in(customer_idurl, known_customers_usage, as_field=False, as_bin=True):
-        try:
-            bytes_used_by_customer = int(used_space_dict[customer_idurl.to_bin()])
-            bytes_donated_to_customer = int(space_dict[customer_idurl.to_bin()])
-            if bytes_donated_to_customer - bytes_used_by_customer < len(new_data):
-                lg.warn('no free space left for customer data for %s' % customer_idurl)
-                p2p_service.SendFail(newpacket, 'no free space left for customer data', remote_idurl=authorized_idurl)
-                return False
-        except:
-            lg.exc()
+    bytes_used_by_customer = accounting.get_customer_usage(customer_idurl)
+    if bytes_used_by_customer is not None:
+        if bytes_donated_to_customer - bytes_used_by_customer < len(new_data):
+            lg.warn('no free space left for customer data for %s' % customer_idurl)
+            p2p_service.SendFail(newpacket, 'no free space left for customer data', remote_idurl=authorized_idurl)
+            return False
     data_existed = os.path.exists(filename)
+    existing_size = os.path.getsize(filename) if data_existed else 0
     # data_changed = True
     # if data_exists:
     #     if remote_path == settings.BackupIndexFileName() or packetid.IsIndexFileName(remote_path):
@@ -425,6 +422,8 @@ def on_data(newpacket):
             p2p_service.SendFail(newpacket, 'write error', remote_idurl=authorized_idurl)
             return False
     # Here Data() packet was stored as it is on supplier node (current machine)
+    accounting.add_customer_usage(customer_idurl, len(new_data) - existing_size)
+    files_index.on_file_written(filename)
     del new_data
     sz = len(newpacket.Payload)
     p2p_service.SendAck(newpacket, response=strng.to_text(sz), remote_idurl=authorized_idurl)
@@ -592,6 +591,7 @@ def on_list_files(newpacket):
         key_id=key_id,
         remote_idurl=newpacket.OwnerID,  # send back to the requesting node
         query_items=json_query['items'],
+        revision=json_query.get('revision'),
     )
     if _Debug:
         lg.args(_DebugLevel, r=newpacket.OwnerID, c=customer_idurl, k=key_id, pid=newpacket.PacketID)
@@ -636,14 +636,20 @@ def on_delete_file(newpacket):
             return False
         if os.path.isfile(filename):
             try:
+                removed_bytes = os.path.getsize(filename)
                 os.remove(filename)
                 filescount += 1
+                accounting.add_customer_usage(newpacket.OwnerID, -removed_bytes)
+                files_index.on_path_removed(filename)
             except:
                 lg.exc()
         elif os.path.isdir(filename):
             try:
+                removed_bytes = bpio.getDirectorySize(filename)
                 bpio._dir_remove(filename)
                 dirscount += 1
+                accounting.add_customer_usage(newpacket.OwnerID, -removed_bytes)
+                files_index.on_path_removed(filename)
             except:
                 lg.exc()
         else:
@@ -688,14 +694,20 @@ def on_delete_backup(newpacket):
             return False
         if os.path.isdir(filename):
             try:
+                removed_bytes = bpio.getDirectorySize(filename)
                 bpio._dir_remove(filename)
                 count += 1
+                accounting.add_customer_usage(newpacket.OwnerID, -removed_bytes)
+                files_index.on_path_removed(filename)
             except:
                 lg.exc()
         elif os.path.isfile(filename):
             try:
+                removed_bytes = os.path.getsize(filename)
                 os.remove(filename)
                 count += 1
+                accounting.add_customer_usage(newpacket.OwnerID, -removed_bytes)
+                files_index.on_path_removed(filename)
             except:
                 lg.exc()
         else:
@@ -835,12 +847,16 @@ def on_identity_url_changed(evt):
                     lg.info('found customer idurl rotated in customer quotas dictionary : %r -> %r' % (latest_customer_idurl_bin, customer_idurl_bin))
     if space_changed:
         accounting.write_customers_quotas(space_dict, free_space)
+    # update customer idurl in the used space ledger
+    accounting.rotate_customer_usage(old_idurl)
     # rename customer folder where I store all his files
     old_customer_dirname = str(global_id.UrlToGlobalID(evt.data['old_idurl']))
     new_customer_dirname = str(global_id.UrlToGlobalID(evt.data['new_idurl']))
     customers_dir = settings.getCustomersFilesDir()
     old_owner_dir = os.path.join(customers_dir, old_customer_dirname)
     new_owner_dir = os.path.join(customers_dir, new_customer_dirname)
+    files_index.forget(old_owner_dir)
+    files_index.forget(new_owner_dir)
     if os.path.isdir(old_owner_dir):
         try:
             bpio.move_dir_recursive(old_owner_dir, new_owner_dir)
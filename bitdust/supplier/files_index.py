@@ -0,0 +1,383 @@
+#!/usr/bin/env python
+# files_index.py
+#
+# Copyright (C) 2008 Veselin Penev, https://bitdust.io
+#
+# This file (files_index.py) is part of BitDust Software.
+#
+# BitDust is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# BitDust Software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with BitDust Software.  If not, see <http://www.gnu.org/licenses/>.
+#
+# Please contact us if you have any questions at bitdust.io@gmail.com
+"""
+.. module:: files_index.
+
+Keeps an index of all files stored on that supplier for every customer: folders, file names and sizes.
+The index is updated when customer writes or removes files, so ListFiles() response can be prepared
+without walking the whole customer folder.
+
+Every indexed folder also remembers its modification time.
+When index is loaded from disk or after files were changed by `bptester`,
+only folders with a different modification time are listed again.
+"""
+
+#------------------------------------------------------------------------------
+
+from __future__ import absolute_import
+
+#------------------------------------------------------------------------------
+
+_Debug = False
+_DebugLevel = 10
+
+#------------------------------------------------------------------------------
+
+import os
+
+#------------------------------------------------------------------------------
+
+from twisted.internet import reactor  # @UnresolvedImport
+
+#------------------------------------------------------------------------------
+
+from bitdust.logs import lg
+
+from bitdust.system import local_fs
+
+from bitdust.lib import jsn
+
+from bitdust.main import settings
+
+#------------------------------------------------------------------------------
+
+FLUSH_DELAY = 10
+
+#------------------------------------------------------------------------------
+
+_Indexes = {}
+_DirtyIndexes = set()
+_FlushTask = None
+
+#------------------------------------------------------------------------------
+
+
+def init():
+    if _Debug:
+        lg.out(_DebugLevel, 'files_index.init')
+
+
+def shutdown():
+    if _Debug:
+        lg.out(_DebugLevel, 'files_index.shutdown')
+    flush()
+    _Indexes.clear()
+
+
+#------------------------------------------------------------------------------
+
+
+def index_dir_path():
+    return os.path.join(settings.ServiceDir('service_supplier'), 'files_index')
+
+
+def index_file_path(customer_dir_name):
+    return os.path.join(index_dir_path(), customer_dir_name + '.json')
+
+
+def get_index(ownerdir):
+    """
+    Returns index of files stored in the given customer folder.
+    Index is loaded from disk and verified, or created from scratch when accessed for the first time.
+    """
+    customer_dir_name = os.path.basename(ownerdir)
+    customer_index = _Indexes.get(customer_dir_name)
+    if customer_index is None:
+        customer_index = read_index(customer_dir_name)
+        _Indexes[customer_dir_name] = customer_index
+        validate(ownerdir)
+    return customer_index
+
+
+def forget(ownerdir):
+    customer_dir_name = os.path.basename(ownerdir)
+    _Indexes.pop(customer_dir_name, None)
+    _DirtyIndexes.discard(customer_dir_name)
+    if os.path.isfile(index_file_path(customer_dir_name)):
+        try:
+            os.remove(index_file_path(customer_dir_name))
+        except:
+            lg.exc()
+
+
+def revision(ownerdir):
+    return get_index(ownerdir)['revision']
+
+
+def list_folder(ownerdir, relpath):
+    """
+    Returns tuple (files, folders) for given folder, `files` is a dictionary of file names and sizes.
+    If folder is not known returns None.
+    """
+    folder_info = get_index(ownerdir)['folders'].get(relpath)
+    if folder_info is None:
+        return None
+    return folder_info['f'], folder_info['d']
+
+
+def exists(ownerdir, relpath):
+    folders = get_index(ownerdir)['folders']
+    if relpath in folders:
+        return True
+    parent_relpath, name = _split(relpath)
+    parent_info = folders.get(parent_relpath)
+    return parent_info is not None and name in parent_info['f']
+
+
+#------------------------------------------------------------------------------
+
+
+def validate(ownerdir):
+    """
+    Compares modification time of every indexed folder with the disk and scans again only changed folders.
+    """
+    customer_dir_name = os.path.basename(ownerdir)
+    customer_index = _Indexes.get(customer_dir_name)
+    if customer_index is None:
+        return False
+    changed = _validate_folder(customer_index['folders'], ownerdir, '')
+    if changed:
+        _changed(customer_dir_name)
+    if _Debug:
+        lg.args(_DebugLevel, c=customer_dir_name, changed=changed, folders=len(customer_index['folders']), rev=customer_index['revision'])
+    return changed
+
+
+def validate_all():
+    customers_dir = settings.getCustomersFilesDir()
+    for customer_dir_name in list(_Indexes.keys()):
+        validate(os.path.join(customers_dir, customer_dir_name))
+
+
+def on_file_written(filename):
+    """
+    Must be called after a file was written into the customer folder.
+    """
+    ownerdir, relpath = _owner_and_relpath(filename)
+    if not ownerdir:
+        return False
+    customer_dir_name = os.path.basename(ownerdir)
+    customer_index = _Indexes.get(customer_dir_name)
+    if customer_index is None:
+        # index will be verified when it is loaded next time
+        return False
+    folders = customer_index['folders']
+    parent_relpath, name = _split(relpath)
+    if not _add_folder(folders, ownerdir, parent_relpath):
+        return False
+    parent_info = folders[parent_relpath]
+    try:
+        parent_info['f'][name] = os.path.getsize(filename)
+        parent_info['m'] = os.stat(_real_path(ownerdir, parent_relpath)).st_mtime_ns
+    except:
+        lg.exc()
+        return False
+    _changed(customer_dir_name)
+    return True
+
+
+def on_path_removed(filename):
+    """
+    Must be called after a file or a folder was removed from the customer folder.
+    """
+    ownerdir, relpath = _owner_and_relpath(filename)
+    if not ownerdir or not relpath:
+        return False
+    customer_dir_name = os.path.basename(ownerdir)
+    customer_index = _Indexes.get(customer_dir_name)
+    if customer_index is None:
+        return False
+    folders = customer_index['folders']
+    parent_relpath, name = _split(relpath)
+    parent_info = folders.get(parent_relpath)
+    if parent_info is None:
+        return False
+    parent_info['f'].pop(name, None)
+    if name in parent_info['d']:
+        parent_info['d'].remove(name)
+        _drop_folder(folders, relpath)
+    try:
+        parent_info['m'] = os.stat(_real_path(ownerdir, parent_relpath)).st_mtime_ns
+    except:
+        parent_info['m'] = 0
+    _changed(customer_dir_name)
+    return True
+
+
+#------------------------------------------------------------------------------
+
+
+def read_index(customer_dir_name):
+    customer_index = None
+    src = local_fs.ReadTextFile(index_file_path(customer_dir_name))
+    if src:
+        try:
+            customer_index = jsn.loads_text(src)
+            customer_index['revision'] = int(customer_index['revision'])
+            customer_index['folders'] = dict(customer_index['folders'])
+        except:
+            lg.exc()
+            customer_index = None
+    if customer_index is None:
+        customer_index = {
+            'revision': 0,
+            'folders': {},
+        }
+    return customer_index
+
+
+def flush():
+    global _FlushTask
+    if _FlushTask:
+        if _FlushTask.active():
+            _FlushTask.cancel()
+        _FlushTask = None
+    count = 0
+    for customer_dir_name in list(_DirtyIndexes):
+        _DirtyIndexes.discard(customer_dir_name)
+        customer_index = _Indexes.get(customer_dir_name)
+        if customer_index is None:
+            continue
+        if not os.path.isdir(index_dir_path()):
+            os.makedirs(index_dir_path())
+        if not local_fs.WriteTextFile(index_file_path(customer_dir_name), jsn.dumps(customer_index, separators=(',', ':'))):
+            lg.err('failed to store files index for %r' % customer_dir_name)
+            continue
+        count += 1
+    return count
+
+
+def _on_flush_task():
+    global _FlushTask
+    _FlushTask = None
+    flush()
+
+
+def _changed(customer_dir_name):
+    global _FlushTask
+    _Indexes[customer_dir_name]['revision'] += 1
+    _DirtyIndexes.add(customer_dir_name)
+    if not _FlushTask:
+        _FlushTask = reactor.callLater(FLUSH_DELAY, _on_flush_task)  # @UndefinedVariable
+
+
+#------------------------------------------------------------------------------
+
+
+def _split(relpath):
+    if '/' not in relpath:
+        return '', relpath
+    return tuple(relpath.rsplit('/', 1))
+
+
+def _join(relpath, name):
+    return name if not relpath else relpath + '/' + name
+
+
+def _real_path(ownerdir, relpath):
+    if not relpath:
+        return ownerdir
+    return os.path.join(ownerdir, *relpath.split('/'))
+
+
+def _owner_and_relpath(filename):
+    customers_dir = os.path.abspath(settings.getCustomersFilesDir())
+    relpath = os.path.relpath(os.path.abspath(filename), customers_dir).replace('\\', '/')
+    if relpath.startswith('..') or relpath == '.':
+        return None, None
+    parts = relpath.split('/')
+    return os.path.join(customers_dir, parts[0]), '/'.join(parts[1:])
+
+
+def _scan_folder(realpath, mtime):
+    folder_info = {
+        'm': mtime,
+        'f': {},
+        'd': [],
+    }
+    for entry in os.scandir(realpath):
+        try:
+            if entry.is_dir():
+                folder_info['d'].append(entry.name)
+            else:
+                folder_info['f'][entry.name] = entry.stat().st_size
+        except OSError:
+            folder_info['f'][entry.name] = -1
+    return folder_info
+
+
+def _drop_folder(folders, relpath):
+    folder_info = folders.pop(relpath, None)
+    if folder_info is None:
+        return False
+    for name in folder_info['d']:
+        _drop_folder(folders, _join(relpath, name))
+    return True
+
+
+def _add_folder(folders, ownerdir, relpath):
+    if relpath in folders:
+        return True
+    if relpath:
+        parent_relpath, name = _split(relpath)
+        if not _add_folder(folders, ownerdir, parent_relpath):
+            return False
+    realpath = _real_path(ownerdir, relpath)
+    try:
+        folders[relpath] = _scan_folder(realpath, os.stat(realpath).st_mtime_ns)
+    except OSError:
+        return False
+    if relpath:
+        parent_info = folders[parent_relpath]
+        if name not in parent_info['d']:
+            parent_info['d'].append(name)
+        parent_info['f'].pop(name, None)
+        parent_info['m'] = os.stat(_real_path(ownerdir, parent_relpath)).st_mtime_ns
+    for name in folders[relpath]['d']:
+        _validate_folder(folders, ownerdir, _join(relpath, name))
+    return True
+
+
+def _validate_folder(folders, ownerdir, relpath):
+    realpath = _real_path(ownerdir, relpath)
+    try:
+        mtime = os.stat(realpath).st_mtime_ns
+    except OSError:
+        return _drop_folder(folders, relpath)
+    changed = False
+    folder_info = folders.get(relpath)
+    if folder_info is None or folder_info['m'] != mtime:
+        try:
+            new_folder_info = _scan_folder(realpath, mtime)
+        except OSError:
+            return _drop_folder(folders, relpath)
+        if folder_info is not None:
+            for name in folder_info['d']:
+                if name not in new_folder_info['d']:
+                    _drop_folder(folders, _join(relpath, name))
+        changed = folder_info != new_folder_info
+        folder_info = new_folder_info
+        folders[relpath] = folder_info
+    for name in folder_info['d']:
+        if _validate_folder(folders, ownerdir, _join(relpath, name)):
+            changed = True
+    return changed
@@ -37,12 +37,12 @@ _DebugLevel = 10
 import os
 import zlib
 
+from collections import OrderedDict
+
 #------------------------------------------------------------------------------
 
 from bitdust.logs import lg
 
-from bitdust.system import bpio
-
 from bitdust.lib import strng
 from bitdust.lib import packetid
 from bitdust.lib import misc
@@ -60,10 +60,20 @@ from bitdust.contacts import identitycache
 from bitdust.userid import my_id
 from bitdust.userid import global_id
 
+from bitdust.supplier import files_index
+
 #------------------------------------------------------------------------------
 
+MAX_LISTINGS = 100
 
-def send(customer_idurl, packet_id, format_type, key_id, remote_idurl, query_items=[]):
+#------------------------------------------------------------------------------
+
+_Listings = OrderedDict()
+
+#------------------------------------------------------------------------------
+
+
+def send(customer_idurl, packet_id, format_type, key_id, remote_idurl, query_items=[], revision=None):
     if not query_items:
         query_items = ['*']
     key_id = my_keys.latest_key_id(key_id)
@@ -91,6 +101,8 @@ def send(customer_idurl, packet_id, format_type, key_id, remote_idurl, query_ite
             return p2p_service.SendFailNoRequest(customer_idurl, packet_id, response='list files query processing error')
     else:
         lg.warn('did not found customer folder: %s' % ownerdir)
+    if revision is not None:
+        plaintext = VersionedListFiles(ownerdir, parts['key_alias'], query_items, plaintext, revision)
     if _Debug:
         lg.out(_DebugLevel, '\n%s' % plaintext)
     raw_list_files = PackListFiles(plaintext, format_type)
@@ -121,31 +133,28 @@ def process_query_item(query_path, key_alias, ownerdir):
     ret += 'Q%s\n' % query_path
     if query_path == '*':
         if key_alias == 'master':
-            key_alias_dir = os.path.join(ownerdir, key_alias)
-            ret += TreeSummary(key_alias_dir, key_alias)
-        for one_key_alias in os.listdir(ownerdir):
+            ret += IndexTreeSummary(ownerdir, key_alias, key_alias)
+        root_folder = files_index.list_folder(ownerdir, '')
+        for one_key_alias in (root_folder[1] if root_folder else []):
             if one_key_alias == 'master':
                 continue
             if key_alias and key_alias != 'master' and one_key_alias != key_alias:
                 continue
             if not misc.ValidKeyAlias(strng.to_text(one_key_alias)):
                 continue
-            key_alias_dir = os.path.join(ownerdir, one_key_alias)
-            ret += TreeSummary(key_alias_dir, one_key_alias)
+            ret += IndexTreeSummary(ownerdir, one_key_alias, one_key_alias)
         if _Debug:
             lg.args(_DebugLevel, o=ownerdir, q=query_path, k=key_alias, result_bytes=len(ret))
         return ret
     # TODO: more validations to be added
     clean_path = query_path.replace('.', '').replace('~', '').replace(':', '').replace('\\', '/').lstrip('/')
-    path_items = clean_path.split('/')
-    path_items.insert(0, ownerdir)
-    local_path = os.path.join(*path_items)
-    if not os.path.exists(local_path):
-        lg.warn('local file or folder not exist: %r' % local_path)
+    clean_path = '/'.join([p for p in clean_path.split('/') if p])
+    if not files_index.exists(ownerdir, clean_path):
+        lg.warn('local file or folder not exist: %r' % os.path.join(ownerdir, clean_path))
         return ''
-    ret += TreeSummary(local_path, key_alias)
+    ret += IndexTreeSummary(ownerdir, clean_path, key_alias)
     if _Debug:
-        lg.args(_DebugLevel, o=ownerdir, q=query_path, k=key_alias, p=local_path, result_bytes=len(ret))
+        lg.args(_DebugLevel, o=ownerdir, q=query_path, k=key_alias, p=clean_path, result_bytes=len(ret))
     return ret
 
 
@@ -168,6 +177,97 @@ def on_timeout(pkt_out):
 #------------------------------------------------------------------------------
 
 
+def VersionedListFiles(ownerdir, key_alias, query_items, plaintext, known_revision):
+    """
+    Customer remembers revision of the latest listing received from us and sends it in the ListFiles() request.
+    If exactly that listing was sent to the customer before, only added and removed lines are returned:
+
+        R12-0a1b2c3d 9-4e5f6a7b
+        Q*
+        Kmaster
+        -V1/2/F20200101010101AM 0 0-2 250 missing Data:1
+        +V1/2/F20200101010101AM 0 0-2 320
+        -Kshare_abc
+
+    Otherwise the full listing is returned with a single "R<revision>" header line.
+    Revision is made of the customer files index revision and a checksum of the full listing.
+    """
+    sections = _split_sections(plaintext)
+    index_revision = files_index.revision(ownerdir) if os.path.isdir(ownerdir) else 0
+    new_revision = '%d-%08x' % (index_revision, zlib.crc32(strng.to_bin(plaintext)) & 0xffffffff)
+    listing_key = (os.path.basename(ownerdir), key_alias, tuple(query_items))
+    previous_listing = _Listings.pop(listing_key, None)
+    _Listings[listing_key] = (new_revision, sections)
+    while len(_Listings) > MAX_LISTINGS:
+        _Listings.popitem(last=False)
+    if not known_revision or not previous_listing or previous_listing[0] != known_revision:
+        if _Debug:
+            lg.args(_DebugLevel, o=ownerdir, k=key_alias, known=known_revision, rev=new_revision, full_bytes=len(plaintext))
+        return 'R%s\n' % new_revision + plaintext
+    delta = _sections_delta(previous_listing[1], sections)
+    if _Debug:
+        lg.args(_DebugLevel, o=ownerdir, k=key_alias, known=known_revision, rev=new_revision, full_bytes=len(plaintext), delta_bytes=len(delta))
+    return 'R%s %s\n' % (new_revision, known_revision) + delta
+
+
+def _split_sections(plaintext):
+    sections = OrderedDict()
+    current_query = None
+    current_lines = None
+    for line in plaintext.split('\n'):
+        if not line:
+            continue
+        if line[0] == 'Q':
+            current_query = line[1:]
+            current_lines = None
+            continue
+        if line[0] == 'K':
+            current_lines = sections.setdefault((current_query, line[1:]), [])
+            continue
+        if current_lines is not None:
+            current_lines.append(line)
+    return sections
+
+
+def _sections_delta(previous_sections, sections):
+    out = StringIO()
+    current_query = [None]
+
+    def _write_section(section_key, removed=False):
+        if section_key[0] != current_query[0]:
+            out.write('Q%s\n' % section_key[0])
+            current_query[0] = section_key[0]
+        out.write('%sK%s\n' % ('-' if removed else '', section_key[1]))
+
+    for section_key, lines in sections.items():
+        previous_lines = previous_sections.get(section_key)
+        if previous_lines is None:
+            _write_section(section_key)
+            for line in lines:
+                out.write('+%s\n' % line)
+            continue
+        lines_set = set(lines)
+        previous_lines_set = set(previous_lines)
+        removed = [line for line in previous_lines if line not in lines_set]
+        added = [line for line in lines if line not in previous_lines_set]
+        if not removed and not added:
+            continue
+        _write_section(section_key)
+        for line in removed:
+            out.write('-%s\n' % line)
+        for line in added:
+            out.write('+%s\n' % line)
+    for section_key in previous_sections.keys():
+        if section_key not in sections:
+            _write_section(section_key, removed=True)
+    src = out.getvalue()
+    out.close()
+    return src
+
+
+#------------------------------------------------------------------------------
+
+
 def PackListFiles(plaintext, method):
     if method == 'Text':
         return plaintext
@@ -180,46 +280,54 @@ def PackListFiles(plaintext, method):
 
 
 def TreeSummary(ownerdir, key_alias):
+    """
+    Walks the given folder on disk and prepares list of files, folders and versions stored there.
+    """
+
+    def _list_folder(subpath):
+        realpath = ownerdir if not subpath else os.path.join(ownerdir, *subpath.split('/'))
+        if not os.path.isdir(realpath):
+            return None
+        files = {}
+        folders = []
+        for name in os.listdir(realpath):
+            pth = os.path.join(realpath, name)
+            if not os.access(pth, os.R_OK):
+                continue
+            if os.path.isdir(pth):
+                folders.append(name)
+                continue
+            try:
+                files[name] = os.path.getsize(pth)
+            except:
+                files[name] = -1
+        return files, folders
+
+    return _tree_summary(_list_folder, key_alias)
+
+
+def IndexTreeSummary(ownerdir, relpath, key_alias):
+    """
+    Same as `TreeSummary()`, but uses customer files index instead of walking the folder on disk.
+    """
+    return _tree_summary(lambda subpath: files_index.list_folder(ownerdir, relpath if not subpath else (relpath + '/' + subpath)), key_alias)
+
+
+def _tree_summary(list_folder, key_alias):
     out = StringIO()
     out.write('K%s\n' % key_alias)
 
-    def cb(result, realpath, subpath, name):
-        if not os.access(realpath, os.R_OK):
-            return False
-        if os.path.isfile(realpath):
-            try:
-                filesz = os.path.getsize(realpath)
-            except:
-                filesz = -1
-            result.write('F%s %d\n' % (subpath, filesz))
-            return False
-        if not packetid.IsCanonicalVersion(name):
-            found_some_versions = False
-            for sub_path in os.listdir(realpath):
-                if packetid.IsCanonicalVersion(sub_path):
-                    found_some_versions = True
-                    break
-            if found_some_versions:
-                result.write('F%s -1\n' % subpath)
-            else:
-                result.write('D%s\n' % subpath)
-            return True
+    def _version_summary(result, subpath, files, folders):
         maxBlock = -1
         versionSize = {}
         dataBlocks = {}
         parityBlocks = {}
         dataMissing = {}
         parityMissing = {}
-        for filename in os.listdir(realpath):
+        for filename in folders:
+            result.write('D%s\n' % (subpath + '/' + filename))
+        for filename, filesz in files.items():
             packetID = subpath + '/' + filename
-            pth = os.path.join(realpath, filename)
-            if os.path.isdir(pth):
-                result.write('D%s\n' % packetID)
-                continue
-            try:
-                filesz = os.path.getsize(pth)
-            except:
-                filesz = -1
             if not packetid.Valid(packetID):
                 result.write('F%s %d\n' % (packetID, filesz))
                 continue
@@ -246,10 +354,10 @@ def TreeSummary(ownerdir, key_alias):
             dataMissing[supplierNum] = set(range(maxBlock + 1))
             parityMissing[supplierNum] = set(range(maxBlock + 1))
             for blockNum in range(maxBlock + 1):
-                if blockNum in list(dataBlocks[supplierNum].keys()):
+                if blockNum in dataBlocks[supplierNum]:
                     versionSize[supplierNum] += dataBlocks[supplierNum][blockNum]
                     dataMissing[supplierNum].discard(blockNum)
-                if blockNum in list(parityBlocks[supplierNum].keys()):
+                if blockNum in parityBlocks[supplierNum]:
                     versionSize[supplierNum] += parityBlocks[supplierNum][blockNum]
                     parityMissing[supplierNum].discard(blockNum)
         suppliers = set(list(dataBlocks.keys()) + list(parityBlocks.keys()))
@@ -258,17 +366,38 @@ def TreeSummary(ownerdir, key_alias):
             if len(dataMissing[supplierNum]) > 0 or len(parityMissing[supplierNum]) > 0:
                 versionString += ' missing'
                 if len(dataMissing[supplierNum]) > 0:
-                    versionString += ' Data:' + (','.join(map(str, dataMissing[supplierNum])))
+                    versionString += ' Data:' + (','.join(map(str, sorted(dataMissing[supplierNum]))))
                 if len(parityMissing[supplierNum]) > 0:
-                    versionString += ' Parity:' + (','.join(map(str, parityMissing[supplierNum])))
+                    versionString += ' Parity:' + (','.join(map(str, sorted(parityMissing[supplierNum]))))
             result.write('V%s\n' % versionString)
-        del dataBlocks
-        del parityBlocks
-        del dataMissing
-        del parityMissing
-        return False
 
-    bpio.traverse_dir_recursive(lambda realpath, subpath, name: cb(out, realpath, subpath, name), ownerdir)
+    def _walk(result, subpath):
+        listing = list_folder(subpath)
+        if not listing:
+            return
+        files, folders = listing
+        for name, filesz in files.items():
+            result.write('F%s %d\n' % ((subpath + '/' + name) if subpath else name, filesz))
+        for name in folders:
+            folder_subpath = (subpath + '/' + name) if subpath else name
+            folder_listing = list_folder(folder_subpath)
+            if not folder_listing:
+                continue
+            if packetid.IsCanonicalVersion(name):
+                _version_summary(result, folder_subpath, folder_listing[0], folder_listing[1])
+                continue
+            found_some_versions = False
+            for sub_name in list(folder_listing[0].keys()) + list(folder_listing[1]):
+                if packetid.IsCanonicalVersion(sub_name):
+                    found_some_versions = True
+                    break
+            if found_some_versions:
+                result.write('F%s -1\n' % folder_subpath)
+            else:
+                result.write('D%s\n' % folder_subpath)
+            _walk(result, folder_subpath)
+
+    _walk(out, '')
     src = out.getvalue()
     out.close()
     return src
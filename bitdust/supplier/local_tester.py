@@ -169,7 +169,10 @@ def _popTester():
 
 def on_thread_finished(ret, cmd):
     global _CurrentProcess
+    from bitdust.supplier import files_index
     _CurrentProcess = None
+    # files in customers folders could be removed, only changed folders are going to be scanned again
+    files_index.validate_all()
     if _Debug:
         lg.out(_DebugLevel, 'local_tester.on_thread_finished %r with %r' % (cmd, ret))
 
@@ -43,6 +43,7 @@ _DebugLevel = 24
 #------------------------------------------------------------------------------
 
 import os
+import io
 import tempfile
 import time
 
@@ -58,6 +59,8 @@ from bitdust.system import bpio
 
 _TempDirPath = None
 _FilesDict = {}
+_Buffers = {}
+_BuffersCounter = 0
 _CollectorTask = None
 _SubDirs = {
     'upload': 60*60*12,  # hold websocket uploads for 12 hours
@@ -214,6 +217,77 @@ def make(name, extension='', prefix='', close_fd=False):
     return fd, filename
 
 
+def make_buffer(name, data, extension=''):
+    """
+    Keep given binary ``data`` in memory instead of writing it on disk
+    and return a virtual file path which can be used instead of a real temp file.
+    A ``bytearray`` object can be passed to be able to append more data to it later.
+
+    Such path is handled by ``erase()`` and ``collect()`` same way as regular temp files,
+    use ``is_buffer()``, ``open_file()`` and ``file_size()`` to read it.
+    """
+    global _FilesDict
+    global _Buffers
+    global _BuffersCounter
+    if name not in _SubDirs:
+        name = 'all'
+    if name not in _FilesDict:
+        _FilesDict[name] = {}
+    _BuffersCounter += 1
+    filename = 'memory://%s/%d%s' % (name, _BuffersCounter, extension)
+    _Buffers[filename] = data
+    _FilesDict[name][filename] = time.time()
+    if _Debug:
+        lg.out(_DebugLevel, 'tmpfile.make_buffer %r with %d bytes' % (filename, len(data)))
+    return filename
+
+
+def is_buffer(filename):
+    """
+    Return True if ``filename`` was created with ``make_buffer()`` and data is still in memory.
+    """
+    return filename in _Buffers
+
+
+def open_file(filename):
+    """
+    Open a real temp file or in-memory buffer for reading in binary mode.
+    """
+    if filename in _Buffers:
+        return io.BytesIO(_Buffers[filename])
+    return open(filename, 'rb')
+
+
+def read_file(filename):
+    """
+    Return whole content of a real temp file or in-memory buffer as bytes.
+    """
+    if filename in _Buffers:
+        return bytes(_Buffers[filename])
+    return bpio.ReadBinaryFile(filename)
+
+
+def file_size(filename):
+    """
+    Return size of a real temp file or in-memory buffer, -1 if it does not exist.
+    """
+    if filename in _Buffers:
+        return len(_Buffers[filename])
+    if not os.path.isfile(filename):
+        return -1
+    try:
+        return os.path.getsize(filename)
+    except:
+        return -1
+
+
+def buffers_size():
+    """
+    Return total amount of bytes currently kept in memory buffers.
+    """
+    return sum(map(len, _Buffers.values()))
+
+
 def make_dir(name, extension='', prefix=''):
     global _TempDirPath
     global _FilesDict
@@ -250,6 +324,12 @@ def erase(name, filename, why='no reason'):
     else:
         lg.warn('we do not know sub folder: %s, we tried because %s' % (name, why))
 
+    if filename in _Buffers:
+        _Buffers.pop(filename)
+        if _Debug:
+            lg.out(_DebugLevel, 'tmpfile.erase buffer [%s] : "%s"' % (filename, why))
+        return
+
     if not os.path.exists(filename):
         lg.warn('[%s] not exist' % filename)
         return
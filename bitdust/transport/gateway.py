@@ -132,6 +132,7 @@ _XMLRPCPort = None
 _XMLRPCURL = ''
 _LastTransferID = None
 _LastInboxPacketTime = 0
+_InboxStats = {}
 _PacketsTimeOutTask = None
 _TransportStateChangedCallbacksList = []
 _TransportLogFile = None
@@ -213,6 +214,39 @@ def can_send(proto):
     return transport(proto).state == 'LISTENING'
 
 
+def get_inbox_stats():
+    """
+    Return per-protocol counters about incoming packets:
+    how many were received in memory or via temporary files,
+    total and maximum time spent to read and unserialize them (``read_*``)
+    and to receive them starting from the first byte (``transfer_*``).
+    """
+    return {proto: dict(stats) for proto, stats in _InboxStats.items()}
+
+
+def _count_inbox_latency(info, packet_size, in_memory, read_time):
+    stats = _InboxStats.get(info.proto)
+    if stats is None:
+        stats = _InboxStats[info.proto] = {
+            'memory_packets': 0,
+            'file_packets': 0,
+            'bytes': 0,
+            'read_total': 0.0,
+            'read_max': 0.0,
+            'transfer_total': 0.0,
+            'transfer_max': 0.0,
+        }
+    stats['memory_packets' if in_memory else 'file_packets'] += 1
+    stats['bytes'] += packet_size
+    stats['read_total'] += read_time
+    stats['read_max'] = max(stats['read_max'], read_time)
+    started = getattr(info, 'time', None)
+    if started:
+        transfer_time = time.time() - started
+        stats['transfer_total'] += transfer_time
+        stats['transfer_max'] = max(stats['transfer_max'], transfer_time)
+
+
 def last_inbox_time():
     global _LastInboxPacketTime
     return _LastInboxPacketTime
@@ -380,7 +414,7 @@ def detach(transport_instance):
 
 def inbox(info):
     """
-    1) The protocol modules write to temporary files and gives us that filename
+    1) The protocol modules write to temporary files or memory buffers and gives us that filename
     2) We unserialize
     3) We check that it is for us
     4) We check that it is from one of our contacts.
@@ -399,11 +433,13 @@ def inbox(info):
     if _Debug:
         lg.out(_DebugLevel, 'gateway.inbox [%s]' % info.filename)
 
-    if info.filename == '' or not os.path.exists(info.filename):
+    started = time.time()
+    in_memory = tmpfile.is_buffer(info.filename)
+    if not in_memory and (info.filename == '' or not os.path.exists(info.filename)):
         lg.err('bad filename=' + info.filename)
         return None
     try:
-        data = bpio.ReadBinaryFile(info.filename)
+        data = tmpfile.read_file(info.filename)
     except:
         lg.err('gateway.inbox ERROR reading file ' + info.filename)
         return None
@@ -422,7 +458,7 @@ def inbox(info):
     if newpacket is None:
         lg.warn('newpacket from %s://%s is None' % (info.proto, info.host))
         return None
-    # newpacket.Valid() will be called later in the flow in packet_in.handle() method
+    # newpacket.Valid() will be called later in the flow in a worker thread, see packet_verifier.verify() method
     try:
         Command = newpacket.Command
         OwnerID = newpacket.OwnerID
@@ -439,6 +475,7 @@ def inbox(info):
         lg.exc()
         return None
     _LastInboxPacketTime = time.time()
+    _count_inbox_latency(info, packet_sz, in_memory, _LastInboxPacketTime - started)
     if _Debug:
         lg.out(_DebugLevel - 2, 'gateway.inbox [%s] signed by %s|%s (for %s) from %s://%s' % (Command, nameurl.GetName(OwnerID), nameurl.GetName(CreatorID), nameurl.GetName(RemoteID), info.proto, info.host))
     if _PacketLogFileEnabled:
@@ -594,6 +631,37 @@ def send_file_single(remote_idurl, proto, host, filename, description='', pkt_ou
     return True
 
 
+def can_pause_receiving(proto):
+    """
+    Return True if given transport is able to stop reading incoming data, see ``pause_receiving()``.
+    """
+    if not proto or not is_installed(strng.to_text(proto)):
+        return False
+    return hasattr(transport(proto).interface, 'pause_receiving')
+
+
+def pause_receiving():
+    """
+    Ask all transports which are able to do that to stop reading incoming data for a while.
+    """
+    for proto, t in transports().items():
+        if hasattr(t.interface, 'pause_receiving'):
+            if _Debug:
+                lg.out(_DebugLevel, 'gateway.pause_receiving %r' % proto)
+            t.call('pause_receiving')
+
+
+def resume_receiving():
+    """
+    Resume reading incoming data in all transports paused by ``pause_receiving()``.
+    """
+    for proto, t in transports().items():
+        if hasattr(t.interface, 'resume_receiving'):
+            if _Debug:
+                lg.out(_DebugLevel, 'gateway.resume_receiving %r' % proto)
+            t.call('resume_receiving')
+
+
 def send_keep_alive(proto, host):
     if not is_ready():
         lg.warn('gateway is not ready')
@@ -184,11 +184,14 @@ class SenderServer(resource.Resource):
             return ''
         r = ''
         for filename in _Outbox[idurl]:
-            if not os.path.isfile(filename):
-                continue
-            if not os.access(filename, os.R_OK):
-                continue
-            src = bpio.ReadBinaryFile(filename)
+            if tmpfile.is_buffer(filename):
+                src = tmpfile.open_file(filename).read()
+            else:
+                if not os.path.isfile(filename):
+                    continue
+                if not os.access(filename, os.R_OK):
+                    continue
+                src = bpio.ReadBinaryFile(filename)
             if src == '':
                 continue
             src64 = base64.b64encode(src)
@@ -72,7 +72,6 @@ from bitdust.automats import automat
 from bitdust.lib import nameurl
 from bitdust.lib import strng
 
-from bitdust.system import bpio
 from bitdust.system import tmpfile
 
 from bitdust.userid import global_id
@@ -87,6 +86,7 @@ from bitdust.p2p import commands
 from bitdust.p2p import p2p_stats
 
 from bitdust.transport import callback
+from bitdust.transport import packet_verifier
 
 #------------------------------------------------------------------------------
 
@@ -100,11 +100,13 @@ _History = []
 def init():
     global _PacketLogFileEnabled
     _PacketLogFileEnabled = config.conf().getBool('logs/packet-enabled')
+    packet_verifier.init()
 
 
 def shutdown():
     global _PacketLogFileEnabled
     _PacketLogFileEnabled = False
+    packet_verifier.shutdown()
 
 
 #------------------------------------------------------------------------------
@@ -250,16 +252,19 @@ def process(newpacket, info):
 def handle(newpacket, info):
     """
     Actually process incoming packet. Here we can be sure that owner/creator of the packet is identified.
+    Signature is verified in a worker thread, see ``packet_verifier`` module,
+    packets are dispatched in the same order they were received.
+    """
+    # check that signed by a contact of ours
+    return packet_verifier.verify(newpacket, info, on_packet_verified)
+
+
+def on_packet_verified(newpacket, info, is_signature_valid):
+    """
+    Called from ``packet_verifier`` when signature of incoming packet was checked.
     """
     from bitdust.transport import packet_out
     handled = False
-    # check that signed by a contact of ours
-    try:
-        is_signature_valid = newpacket.Valid(raise_signature_invalid=False)
-    except:
-        is_signature_valid = False
-        # lg.exc('new packet from %s://%s is NOT VALID:\n\n%r\n' % (
-        #     info.proto, info.host, newpacket.Serialize()))
     if not is_signature_valid:
         if _Debug:
             lg.args(_DebugLevel, PacketID=newpacket.PacketID, OwnerID=newpacket.OwnerID, CreatorID=newpacket.CreatorID, RemoteID=newpacket.RemoteID)
@@ -520,7 +525,7 @@ class PacketIn(automat.Automat):
             # net_misc.ConnectionFailed(None, proto, 'receiveStatusReport %s' % host)
             try:
                 fd, _ = tmpfile.make('error', extension='.inbox')
-                data = bpio.ReadBinaryFile(self.filename)
+                data = tmpfile.read_file(self.filename)
                 os.write(fd, strng.to_bin('from %s:%s %s\n' % (self.proto, self.host, self.status)))
                 os.write(fd, data)
                 os.close(fd)
@@ -83,6 +83,7 @@ from bitdust.p2p import p2p_stats
 from bitdust.lib import nameurl
 from bitdust.lib import strng
 from bitdust.lib import net_misc
+from bitdust.lib import serialization
 
 from bitdust.system import tmpfile
 
@@ -102,6 +103,17 @@ from bitdust.userid import my_id
 
 _OutboxQueue = []
 _PacketsCounter = 0
+_PacketsByPacketID = {}
+_PacketsByFilename = {}
+_PacketsByTransferID = {}
+_PacketsByRemoteIDURL = {}
+_MyRotatedIDURLs = {}
+_OutboxStats = {
+    'memory_packets': 0,
+    'memory_bytes': 0,
+    'file_packets': 0,
+    'file_bytes': 0,
+}
 
 #------------------------------------------------------------------------------
 
@@ -129,6 +141,13 @@ def increment_packets_counter():
     _PacketsCounter += 1
 
 
+def get_outbox_stats():
+    """
+    Return counters of outgoing packets passed to the transports from memory and via temporary files.
+    """
+    return dict(_OutboxStats)
+
+
 #------------------------------------------------------------------------------
 
 
@@ -153,6 +172,7 @@ def create(outpacket, wide, callbacks, target=None, route=None, response_timeout
         )
     p = PacketOut(outpacket, wide, callbacks, target, route, response_timeout, keep_alive, skip_ack=skip_ack)
     queue().append(p)
+    _index_packet(p)
     p.automat('run')
     return p
 
@@ -160,10 +180,61 @@ def create(outpacket, wide, callbacks, target=None, route=None, response_timeout
 #------------------------------------------------------------------------------
 
 
+def _index_packet(p):
+    _PacketsByPacketID.setdefault(p.outpacket.PacketID.lower(), []).append(p)
+    _PacketsByRemoteIDURL.setdefault(id_url.to_original(p.remote_idurl), []).append(p)
+
+
+def _unindex_packet(p):
+    for index, key in (
+        (_PacketsByPacketID, p.outpacket.PacketID.lower()),
+        (_PacketsByRemoteIDURL, id_url.to_original(p.remote_idurl)),
+    ):
+        packets = index.get(key)
+        if packets and p in packets:
+            packets.remove(p)
+            if not packets:
+                index.pop(key)
+    if p.filename and _PacketsByFilename.get(p.filename) is p:
+        _PacketsByFilename.pop(p.filename)
+    for i in p.items + p.results:
+        if i.transfer_id and _PacketsByTransferID.get(i.transfer_id) is p:
+            _PacketsByTransferID.pop(i.transfer_id)
+
+
+def _remote_idurl_keys(remote_idurl):
+    """
+    Return all known original IDURLs of given user, outgoing packets are indexed by the original value of remote IDURL.
+    """
+    idurl_orig = id_url.to_original(remote_idurl)
+    result = [
+        idurl_orig,
+    ]
+    pub_key = id_url.known().get(idurl_orig)
+    if pub_key:
+        for another_idurl in id_url.sources(pub_key):
+            if another_idurl not in result:
+                result.append(another_idurl)
+    return result
+
+
+def _my_rotated_idurls():
+    """
+    List of my own rotated IDURLs is only changing when my identity is rotated, so it is cached here.
+    """
+    cache_key = (my_id.getIDURL().to_bin(), my_id.getLocalIdentity().getRevisionValue())
+    if cache_key not in _MyRotatedIDURLs:
+        _MyRotatedIDURLs.clear()
+        _MyRotatedIDURLs[cache_key] = id_url.list_known_idurls(my_id.getIDURL(), num_revisions=10, include_revisions=False)
+    return _MyRotatedIDURLs[cache_key]
+
+
+#------------------------------------------------------------------------------
+
+
 def search(proto, host, filename, remote_idurl=None):
-    for p in queue():
-        if p.filename != filename:
-            continue
+    p = _PacketsByFilename.get(filename)
+    if p is not None:
         for i in p.items:
             if i.proto == proto:
                 if not remote_idurl:
@@ -180,15 +251,12 @@ def search(proto, host, filename, remote_idurl=None):
             if p.filename:
                 lg.out(_DebugLevel, '%s [%s]' % (os.path.basename(p.filename), ('|'.join(['%s:%s' % (i.proto, i.host) for i in p.items]))))
             else:
-                lg.warn('%s was not initialized yet' % str(p))
+                lg.warn('%s was not initialized yet', p)
     return None, None
 
 
 def search_by_packet_id(packet_id):
-    result = []
-    for p in queue():
-        if p.outpacket.PacketID.count(packet_id):
-            result.append(p)
+    result = [p for p in _PacketsByPacketID.get(packet_id.lower(), []) if p.outpacket.PacketID == packet_id]
     if _Debug:
         lg.out(_DebugLevel, 'packet_out.search_by_packet_id %s:' % packet_id)
         lg.out(_DebugLevel, '%s' % ('        \n'.join(map(str, result))))
@@ -204,7 +272,17 @@ def search_many(
     packet_id=None,
 ):
     results = []
-    for p in queue():
+    if packet_id:
+        candidates = _PacketsByPacketID.get(packet_id.lower(), [])
+    elif filename:
+        candidates = [_PacketsByFilename[filename]] if filename in _PacketsByFilename else []
+    elif remote_idurl:
+        candidates = []
+        for idurl_orig in _remote_idurl_keys(remote_idurl):
+            candidates.extend(_PacketsByRemoteIDURL.get(idurl_orig, []))
+    else:
+        candidates = queue()
+    for p in candidates:
         if remote_idurl and id_url.field(p.remote_idurl).to_bin() != id_url.field(remote_idurl).to_bin():
             continue
         if filename and p.filename != filename:
@@ -226,7 +304,8 @@ def search_many(
 
 
 def search_by_transfer_id(transfer_id):
-    for p in queue():
+    p = _PacketsByTransferID.get(transfer_id)
+    if p is not None:
         for i in p.items:
             if i.transfer_id and i.transfer_id == transfer_id:
                 return p, i
@@ -261,9 +340,7 @@ def search_by_response_packet(newpacket=None, proto=None, host=None, outgoing_co
     matching_packet_ids = []
     matching_packet_ids.append(incoming_packet_id.lower())
     if incoming_command and incoming_command in [commands.Data(), commands.Retrieve()] and id_url.is_cached(incoming_owner_idurl) and incoming_owner_idurl == my_id.getIDURL():
-        my_rotated_idurls = id_url.list_known_idurls(my_id.getIDURL(), num_revisions=10, include_revisions=False)
-        # TODO: my_rotated_idurls can be cached for optimization
-        for another_idurl in my_rotated_idurls:
+        for another_idurl in _my_rotated_idurls():
             another_packet_id = global_id.SubstitutePacketID(incoming_packet_id, idurl=another_idurl).lower()
             if another_packet_id not in matching_packet_ids:
                 matching_packet_ids.append(another_packet_id)
@@ -271,13 +348,13 @@ def search_by_response_packet(newpacket=None, proto=None, host=None, outgoing_co
     #     lg.warn('multiple packet IDs expecting to match for %r: %r' % (newpacket, matching_packet_ids))
     matching_packet_ids_count = 0
     matching_command_ack_count = 0
-    for p in queue():
-        if p.outpacket.PacketID.lower() not in matching_packet_ids:
-            # PacketID of incoming packet not matching with that outgoing packet
-            continue
+    candidates = []
+    for matching_packet_id in matching_packet_ids:
+        candidates.extend(_PacketsByPacketID.get(matching_packet_id, []))
+    for p in candidates:
         matching_packet_ids_count += 1
         if p.outpacket.PacketID != incoming_packet_id:
-            lg.warn('packet ID in queue "almost" matching with incoming: %s ~ %s' % (p.outpacket.PacketID, incoming_packet_id))
+            lg.warn('packet ID in queue "almost" matching with incoming: %s ~ %s', p.outpacket.PacketID, incoming_packet_id)
         if outgoing_command is None and not commands.IsCommandAck(p.outpacket.Command, incoming_command):
             # this command must not be in the reply
             continue
@@ -503,6 +580,14 @@ class PacketOut(automat.Automat):
             return False
         return time.time() - self.time > self.timeout
 
+    def get_envelope_version(self):
+        """
+        Binary envelope is only used when remote node advertised support for it in the identity.
+        """
+        if self.remote_identity is None:
+            return serialization.ENVELOPE_JSON
+        return self.remote_identity.getEnvelopeVersion()
+
     def set_callback(self, command, cb):
         if command not in self.callbacks.keys():
             self.callbacks[command] = []
@@ -717,16 +802,24 @@ class PacketOut(automat.Automat):
         """
         Action method.
         """
-        # serialize and write packet on disk
+        # serialize packet and keep it in memory, only big packets are written on disk
         a_packet = self.outpacket
         if self.route:
             a_packet = self.route.get('packet', a_packet)
         try:
-            fileno, self.filename = tmpfile.make('outbox', extension='.out')
-            self.packetdata = a_packet.Serialize()
-            os.write(fileno, self.packetdata)
-            os.close(fileno)
+            self.packetdata = a_packet.Serialize(envelope_version=self.get_envelope_version())
             self.filesize = len(self.packetdata)
+            if self.filesize <= settings.getOutboxInMemoryMaxSize():
+                self.filename = tmpfile.make_buffer('outbox', self.packetdata, extension='.out')
+                _OutboxStats['memory_packets'] += 1
+                _OutboxStats['memory_bytes'] += self.filesize
+            else:
+                fileno, self.filename = tmpfile.make('outbox', extension='.out')
+                os.write(fileno, self.packetdata)
+                os.close(fileno)
+                _OutboxStats['file_packets'] += 1
+                _OutboxStats['file_bytes'] += self.filesize
+            _PacketsByFilename[self.filename] = self
             if self.filesize < 1024*10:
                 if self.response_timeout:
                     self.timeout = self.response_timeout
@@ -768,11 +861,12 @@ class PacketOut(automat.Automat):
         for i in range(len(self.items)):
             if self.items[i].proto == proto:
                 self.items[i].transfer_id = transfer_id
+                _PacketsByTransferID[transfer_id] = self
                 if _Debug:
                     lg.out(_DebugLevel, 'packet_out.doSetTransferID  %r:%r = %r' % (proto, host, transfer_id))
                 ok = True
         if not ok:
-            lg.warn('not found item for %r:%r' % (proto, host))
+            lg.warn('not found item for %r:%r', proto, host)
 
     def doSaveResponse(self, *args, **kwargs):
         """
@@ -1063,6 +1157,7 @@ class PacketOut(automat.Automat):
         Remove all references to the state machine object to destroy it.
         """
         queue().remove(self)
+        _unindex_packet(self)
         if self not in self.outpacket.Packets:
             lg.warn('packet_out not connected to the packet')
         else:
@@ -1075,6 +1170,8 @@ class PacketOut(automat.Automat):
         self.callbacks.clear()
         if self.finished_deferred and not self.finished_deferred.called:
             self.finished_deferred.cancel()
+        if self.filename and tmpfile.is_buffer(self.filename):
+            tmpfile.throw_out(self.filename, 'packet sent')
         self.destroy()
 
     def _on_remote_identity_cached(self, xmlsrc):
@@ -1086,7 +1183,7 @@ class PacketOut(automat.Automat):
         return xmlsrc
 
     def _on_remote_identity_cache_failed(self, err):
-        lg.warn('%s : %s' % (repr(self), str(err)))
+        lg.warn('%r : %s', self, err)
         if self.outpacket:
             reactor.callLater(0, self.automat, 'failed')  # @UndefinedVariable
         return None
@@ -1155,7 +1252,7 @@ class PacketOut(automat.Automat):
                         )
             if not workitem_sent:
                 self.automat('nothing-to-send')
-                lg.warn('(wide) no supported protocols with %s' % self.remote_idurl)
+                lg.warn('(wide) no supported protocols with %s', self.remote_idurl)
                 if _PacketLogFileEnabled:
                     lg.out(0, '\033[0;49;97mSKIP wide sending %r : no supported protocols\033[0m' % self, log_name='packet', showtime=True)
             else:
@@ -1294,7 +1391,7 @@ class PacketOut(automat.Automat):
                             self.automat('items-sent')
                             return
         self.automat('nothing-to-send')
-        lg.warn('no supported protocols with %s : %s %s %s, byproto:%s' % (self.remote_idurl, tcp_contact, udp_contact, working_protos, str(byproto)))
+        lg.warn('no supported protocols with %s : %s %s %s, byproto:%s', self.remote_idurl, tcp_contact, udp_contact, working_protos, byproto)
         if _PacketLogFileEnabled:
             lg.out(0, '\033[0;49;97mSKIP sending %r : no supported protocols\033[0m' % self, log_name='packet', showtime=True)
 
@@ -0,0 +1,244 @@
+#!/usr/bin/env python
+# packet_verifier.py
+#
+# Copyright (C) 2008 Veselin Penev, https://bitdust.io
+#
+# This file (packet_verifier.py) is part of BitDust Software.
+#
+# BitDust is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# BitDust Software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with BitDust Software.  If not, see <http://www.gnu.org/licenses/>.
+#
+# Please contact us if you have any questions at bitdust.io@gmail.com
+"""
+.. module:: packet_verifier.
+
+Signatures of incoming packets are verified outside of the main thread.
+
+Packets are collected in a bounded queue and verified in batches by a small pool of worker threads,
+so a burst of incoming traffic does not block the reactor.
+Results are always reported back in the same order packets were added to the queue.
+
+When the queue grows above the high watermark transports are asked to pause receiving
+and event "inbox-verification-overloaded" is sent,
+when the queue is drained below the low watermark receiving is resumed
+and event "inbox-verification-recovered" is sent.
+Transports which are not able to pause receiving keep delivering packets,
+so while the queue is above the high watermark new packets from them are shed right away.
+If the queue is full new packets are rejected and will be re-sent later by remote peer.
+"""
+
+#------------------------------------------------------------------------------
+
+from __future__ import absolute_import
+
+#------------------------------------------------------------------------------
+
+_Debug = False
+_DebugLevel = 10
+
+#------------------------------------------------------------------------------
+
+import time
+
+from collections import deque
+
+from twisted.internet import threads
+
+#------------------------------------------------------------------------------
+
+from bitdust.logs import lg
+
+from bitdust.main import events
+
+#------------------------------------------------------------------------------
+
+_MaxWorkers = 4
+_BatchSize = 16
+_MaxQueueSize = 1024
+_HighWatermark = 768
+_LowWatermark = 256
+
+#------------------------------------------------------------------------------
+
+_PendingItems = deque()
+_WaitingItems = deque()
+_ActiveWorkers = 0
+_Overloaded = False
+_Stats = {
+    'verified': 0,
+    'invalid': 0,
+    'rejected': 0,
+    'shed': 0,
+    'batches': 0,
+    'overloaded': 0,
+    'verify_time': 0.0,
+}
+
+#------------------------------------------------------------------------------
+
+
+def init():
+    if _Debug:
+        lg.out(_DebugLevel, 'packet_verifier.init')
+
+
+def shutdown():
+    global _Overloaded
+    if _Debug:
+        lg.out(_DebugLevel, 'packet_verifier.shutdown with %d pending packets' % len(_PendingItems))
+    _WaitingItems.clear()
+    _PendingItems.clear()
+    _Overloaded = False
+
+
+#------------------------------------------------------------------------------
+
+
+def queue_size():
+    return len(_PendingItems)
+
+
+def is_overloaded():
+    return _Overloaded
+
+
+def get_stats():
+    result = dict(_Stats)
+    result.update(
+        queue_size=len(_PendingItems),
+        waiting=len(_WaitingItems),
+        active_workers=_ActiveWorkers,
+        is_overloaded=_Overloaded,
+    )
+    return result
+
+
+#------------------------------------------------------------------------------
+
+
+def verify(newpacket, info, result_callback):
+    """
+    Put incoming packet into the queue to verify its signature in a worker thread.
+    Later ``result_callback(newpacket, info, is_valid)`` will be executed in the main thread,
+    callbacks are always called in the same order packets were added.
+    Returns False if the queue is full and packet was rejected.
+    """
+    if len(_PendingItems) >= _MaxQueueSize:
+        _Stats['rejected'] += 1
+        lg.warn('verification queue is full, rejected %r from %s://%s' % (newpacket, info.proto, info.host))
+        return False
+    if _Overloaded and not _can_pause(info.proto):
+        _Stats['shed'] += 1
+        if _Debug:
+            lg.out(_DebugLevel, 'packet_verifier.verify shed %r from %s://%s, %d packets in the queue' % (newpacket, info.proto, info.host, len(_PendingItems)))
+        return False
+    item = [newpacket, info, result_callback, None]
+    _PendingItems.append(item)
+    _WaitingItems.append(item)
+    _check_overloaded()
+    _start_workers()
+    return True
+
+
+#------------------------------------------------------------------------------
+
+
+def _can_pause(proto):
+    from bitdust.transport import gateway
+    try:
+        return gateway.can_pause_receiving(proto)
+    except:
+        lg.exc()
+        return False
+
+
+def _verify_batch(packets):
+    # executed in a worker thread
+    results = []
+    dt = time.time()
+    for newpacket in packets:
+        try:
+            is_valid = newpacket.Valid(raise_signature_invalid=False)
+        except:
+            is_valid = False
+        results.append(bool(is_valid))
+    return results, time.time() - dt
+
+
+def _start_workers():
+    global _ActiveWorkers
+    while _WaitingItems and _ActiveWorkers < _MaxWorkers:
+        batch = []
+        while _WaitingItems and len(batch) < _BatchSize:
+            batch.append(_WaitingItems.popleft())
+        _ActiveWorkers += 1
+        _Stats['batches'] += 1
+        d = threads.deferToThread(_verify_batch, [item[0] for item in batch])
+        d.addCallback(_on_batch_verified, batch)
+        d.addErrback(_on_batch_failed, batch)
+
+
+def _on_batch_verified(result, batch):
+    global _ActiveWorkers
+    _ActiveWorkers -= 1
+    results, dt = result
+    _Stats['verify_time'] += dt
+    for item, is_valid in zip(batch, results):
+        item[3] = is_valid
+    if _Debug:
+        lg.out(_DebugLevel, 'packet_verifier._on_batch_verified %d packets in %r seconds, %d pending' % (len(batch), dt, len(_PendingItems)))
+    _deliver_results()
+    _start_workers()
+    return None
+
+
+def _on_batch_failed(err, batch):
+    global _ActiveWorkers
+    _ActiveWorkers -= 1
+    lg.err('failed to verify %d packets: %r' % (len(batch), err))
+    for item in batch:
+        item[3] = False
+    _deliver_results()
+    _start_workers()
+    return None
+
+
+def _deliver_results():
+    while _PendingItems and _PendingItems[0][3] is not None:
+        newpacket, info, result_callback, is_valid = _PendingItems.popleft()
+        if is_valid:
+            _Stats['verified'] += 1
+        else:
+            _Stats['invalid'] += 1
+        try:
+            result_callback(newpacket, info, is_valid)
+        except:
+            lg.exc()
+    _check_overloaded()
+
+
+def _check_overloaded():
+    global _Overloaded
+    if not _Overloaded and len(_PendingItems) >= _HighWatermark:
+        from bitdust.transport import gateway
+        _Overloaded = True
+        _Stats['overloaded'] += 1
+        lg.warn('signature verification is falling behind, %d packets in the queue' % len(_PendingItems))
+        gateway.pause_receiving()
+        events.send('inbox-verification-overloaded', data=dict(queue_size=len(_PendingItems)))
+    elif _Overloaded and len(_PendingItems) <= _LowWatermark:
+        from bitdust.transport import gateway
+        _Overloaded = False
+        lg.info('signature verification recovered, %d packets in the queue' % len(_PendingItems))
+        gateway.resume_receiving()
+        events.send('inbox-verification-recovered', data=dict(queue_size=len(_PendingItems)))
@@ -71,6 +71,7 @@ _PacketLogFileEnabled = False
 
 import re
 import time
+import base64
 import random
 
 from twisted.internet import reactor  # @UnresolvedImport
@@ -92,6 +93,7 @@ from bitdust.main import settings
 from bitdust.crypt import key
 from bitdust.crypt import signed
 from bitdust.crypt import encrypted
+from bitdust.crypt import channel_keys
 
 from bitdust.p2p import commands
 from bitdust.p2p import lookup
@@ -148,6 +150,16 @@ def GetRouterProtoHost():
     return _ProxyReceiver.router_proto_host
 
 
+def GetRouterChannelID():
+    """
+    Returns ID of the latest channel created by the router for my route, or None if router does not support channel keys.
+    """
+    global _ProxyReceiver
+    if not _ProxyReceiver or not _ProxyReceiver.router_channels:
+        return None
+    return _ProxyReceiver.router_channels[-1]
+
+
 def ReadMyOriginalIdentitySource():
     return config.conf().getData('services/proxy-transport/my-original-identity').strip()
 
@@ -223,6 +235,7 @@ class ProxyReceiver(automat.Automat):
         self.request_service_packet_id = []
         self.latest_packet_received = 0
         self.router_connection_info = None
+        self.router_channels = []
         self.traffic_in = 0
         super(ProxyReceiver, self).__init__(
             name='proxy_receiver',
@@ -497,6 +510,8 @@ class ProxyReceiver(automat.Automat):
             )
         active_router_session_machine.addStateChangedCallback(self._on_router_session_disconnected, oldstate='CONNECTED')
         lg.info('router %s is connected at %s://%s' % (self.router_idurl, self.router_proto_host[0], self.router_proto_host[1]))
+        # all packets for me will be received by the router first, it must be able to read them
+        my_id.setBinaryEnvelopeAdvertised(bool(self.router_identity and self.router_identity.getEnvelopeVersion() == serialization.ENVELOPE_BINARY))
         my_id.rebuildLocalIdentity()
 
     def doStopListening(self, *args, **kwargs):
@@ -540,12 +555,14 @@ class ProxyReceiver(automat.Automat):
         WriteMyOriginalIdentitySource('')
         config.conf().setString('services/proxy-transport/current-router', '')
         callback.remove_inbox_callback(self._on_inbox_packet_received)
+        self._do_forget_router_channels()
         self.router_identity = None
         self.router_idurl = None
         self.router_id = ''
         self.router_proto_host = None
         self.request_service_packet_id = []
         self.router_connection_info = None
+        my_id.setBinaryEnvelopeAdvertised(True)
         my_id.rebuildLocalIdentity()
 
     def doUpdateRouterID(self, *args, **kwargs):
@@ -614,6 +631,7 @@ class ProxyReceiver(automat.Automat):
         global _ProxyReceiver
         _PacketLogFileEnabled = False
         callback.remove_queue_item_status_callback(self._on_queue_item_status_changed)
+        self._do_forget_router_channels()
         self.possible_router_idurl = None
         self.router_idurl = None
         self.router_id = ''
@@ -629,24 +647,9 @@ class ProxyReceiver(automat.Automat):
 
     def _do_process_inbox_packet(self, *args, **kwargs):
         newpacket, info, _, _ = args[0]
-        block = encrypted.Unserialize(newpacket.Payload)
-        if block is None:
-            lg.err('reading data from %s' % newpacket.CreatorID)
-            return
-        try:
-            session_key = key.DecryptLocalPrivateKey(block.EncryptedSessionKey)
-            padded_data = key.DecryptWithSessionKey(session_key, block.EncryptedData, session_key_type=block.SessionKeyType)
-            inpt = BytesIO(padded_data[:int(block.Length)])
-            data = inpt.read()
-        except:
-            lg.err('reading data from %s' % newpacket.CreatorID)
-            lg.exc()
-            try:
-                inpt.close()
-            except:
-                pass
+        data = self._do_read_relay_data(newpacket)
+        if data is None:
             return
-        inpt.close()
 
         if newpacket.Command == commands.RelayAck():
             try:
@@ -736,13 +739,61 @@ class ProxyReceiver(automat.Automat):
 
         self.traffic_in += len(data)
         packet_in.process(routed_packet, info)
-        del block
         del data
-        del padded_data
-        del inpt
-        del session_key
         del routed_packet
 
+    def _do_read_relay_data(self, newpacket):
+        if channel_keys.is_channel_key_id(newpacket.KeyID):
+            # packet was already verified with HMAC, so only need to decrypt it with the keys of my route
+            try:
+                data = channel_keys.decrypt(newpacket.KeyID, newpacket.Payload)
+            except:
+                lg.exc()
+                data = None
+            if data is None:
+                lg.err('reading data from %s with channel key %r failed' % (newpacket.CreatorID, newpacket.KeyID))
+            return data
+        block = encrypted.Unserialize(newpacket.Payload)
+        if block is None:
+            lg.err('reading data from %s' % newpacket.CreatorID)
+            return None
+        try:
+            session_key = key.DecryptLocalPrivateKey(block.EncryptedSessionKey)
+            padded_data = key.DecryptWithSessionKey(session_key, block.EncryptedData, session_key_type=block.SessionKeyType)
+            inpt = BytesIO(padded_data[:int(block.Length)])
+            data = inpt.read()
+        except:
+            lg.err('reading data from %s' % newpacket.CreatorID)
+            lg.exc()
+            try:
+                inpt.close()
+            except:
+                pass
+            return None
+        inpt.close()
+        return data
+
+    def _do_register_router_channel(self, service_ack_info):
+        try:
+            channel_id = service_ack_info['channel_id']
+            secret = key.DecryptLocalPrivateKey(base64.b64decode(strng.to_bin(service_ack_info['channel_key'])))
+        except:
+            lg.exc()
+            return False
+        channel_keys.register_channel(channel_id, self.router_idurl, secret)
+        self.router_channels.append(channel_id)
+        # previous keys are kept for packets which are still on the way
+        while len(self.router_channels) > 2:
+            channel_keys.unregister_channel(self.router_channels.pop(0))
+        if _Debug:
+            lg.args(_DebugLevel, router_idurl=self.router_idurl, channel_id=channel_id)
+        return True
+
+    def _do_forget_router_channels(self):
+        for channel_id in self.router_channels:
+            channel_keys.unregister_channel(channel_id)
+        self.router_channels = []
+
     def _do_send_identity_to_router(self, identity_source, failed_event):
         try:
             identity_obj = identity.identity(xmlsrc=identity_source)
@@ -786,6 +837,7 @@ class ProxyReceiver(automat.Automat):
             'name': 'service_proxy_server',
             'payload': {
                 'identity': orig_identity,
+                'channel_keys': True,
             },
         }
         newpacket = signed.Packet(
@@ -867,7 +919,17 @@ class ProxyReceiver(automat.Automat):
             self.automat('service-refused', (response, info))
             return
         service_ack_info = strng.to_text(response.Payload)
-        if service_ack_info.startswith('rejected'):
+        if service_ack_info.startswith('{'):
+            # router created symmetric keys for my route
+            try:
+                service_ack_info = serialization.BytesToDict(response.Payload, keys_to_text=True, values_to_text=True)
+            except:
+                lg.exc()
+                self.automat('service-refused', (response, info))
+                return
+        else:
+            service_ack_info = {'result': service_ack_info}
+        if service_ack_info.get('result', '').startswith('rejected'):
             self.automat('service-refused', (response, info))
             return
         active_router_sessions = gateway.find_active_session(info.proto, host=info.host)
@@ -897,6 +959,8 @@ class ProxyReceiver(automat.Automat):
             self.automat('service-refused', (response, info))
             return
         lg.info('found active session for proxy router: %s' % active_router_session_machine)
+        if service_ack_info.get('channel_id'):
+            self._do_register_router_channel(service_ack_info)
         self.automat('service-accepted', (response, info, active_router_session_machine))
 
     def _on_request_service_fail(self, response, info):
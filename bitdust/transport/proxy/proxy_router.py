@@ -65,6 +65,7 @@ _PacketLogFileEnabled = False
 #------------------------------------------------------------------------------
 
 import time
+import base64
 
 #------------------------------------------------------------------------------
 
@@ -90,6 +91,7 @@ from bitdust.services import driver
 from bitdust.crypt import key
 from bitdust.crypt import signed
 from bitdust.crypt import encrypted
+from bitdust.crypt import channel_keys
 
 from bitdust.userid import identity
 from bitdust.userid import my_id
@@ -156,6 +158,8 @@ class ProxyRouter(automat.Automat):
         self.closed_routes = {}
         self.acks = {}
         self.my_hosts = {}
+        # symmetric keys for every route, never stored together with the routes
+        self.channels = {}
 
     def state_changed(self, oldstate, newstate, event, *args, **kwargs):
         """
@@ -266,6 +270,7 @@ class ProxyRouter(automat.Automat):
             self._do_unregister_route(idurl)
         self.routes.clear()
         self.closed_routes.clear()
+        self._do_forget_all_route_channels()
 
     def doForwardOutboxPacket(self, *args, **kwargs):
         """
@@ -301,7 +306,7 @@ class ProxyRouter(automat.Automat):
         else:
             if new_address not in self.routes[idurl]['address']:
                 self.routes[idurl]['address'].append(new_address)
-                lg.info('added new active address %r for %s, currently %d active addresses' % (new_address, nameurl.GetName(idurl), len(self.routes[idurl]['address'])))
+                lg.info('added new active address %r for %s, currently %d active addresses', new_address, nameurl.GetName(idurl), len(self.routes[idurl]['address']))
 
     def doSetContactsOverride(self, *args, **kwargs):
         """
@@ -339,6 +344,7 @@ class ProxyRouter(automat.Automat):
         self.acks.clear()
         for idurl in list(self.routes.keys()):
             self._do_unregister_route(idurl)
+        self._do_forget_all_route_channels()
         events.remove_subscriber(self._on_identity_url_changed, 'identity-url-changed')
         if network_connector.A():
             network_connector.A().removeStateChangedCallback(self._on_network_connector_state_changed)
@@ -369,17 +375,17 @@ class ProxyRouter(automat.Automat):
                 if not active_user_sessions:
                     active_user_sessions = gateway.find_active_session(info.proto, idurl=sender_idurl.to_bin())
             if not active_user_sessions:
-                lg.warn('route with %s found but no active sessions found : %r' % (sender_idurl, info))
+                lg.warn('route with %s found but no active sessions found : %r', sender_idurl, info)
                 return None, None
             active_user_session_machine = automat.by_index(active_user_sessions[0].index)
         if not active_user_session_machine:
             if connection_info.get('index'):
                 active_user_session_machine = automat.by_index(connection_info['index'])
         if not active_user_session_machine:
-            lg.warn('route with %s found but no active user session exist' % sender_idurl)
+            lg.warn('route with %s found but no active user session exist', sender_idurl)
             return None, None
         if not active_user_session_machine.is_connected():
-            lg.warn('route with %s found but session is not connected' % sender_idurl)
+            lg.warn('route with %s found but session is not connected', sender_idurl)
             return None, None
         hosts = []
         try:
@@ -387,16 +393,16 @@ class ProxyRouter(automat.Automat):
         except:
             lg.exc()
         if not hosts:
-            lg.warn('found active user session but host is empty in %r, will try to use recorded info' % active_user_session_machine)
+            lg.warn('found active user session but host is empty in %r, will try to use recorded info', active_user_session_machine)
             hosts = route_info['address']
         if len(hosts) == 0:
-            lg.warn('route with %s do not have actual info about the host, will use identity contacts instead' % sender_idurl)
+            lg.warn('route with %s do not have actual info about the host, will use identity contacts instead', sender_idurl)
             hosts = route_info['contacts']
         if len(hosts) == 0:
-            lg.warn('has no known contacts for route with %s' % sender_idurl)
+            lg.warn('has no known contacts for route with %s', sender_idurl)
             return None, None
         if len(hosts) > 1:
-            lg.warn('found more then one channel with %s : %r' % (sender_idurl, hosts))
+            lg.warn('found more then one channel with %s : %r', sender_idurl, hosts)
         receiver_proto, receiver_host = strng.to_bin(hosts[0][0]), strng.to_bin(hosts[0][1])
         if _Debug:
             lg.args(_DebugLevel, proto=receiver_proto, host=receiver_host, user_session=active_user_session_machine)
@@ -427,7 +433,7 @@ class ProxyRouter(automat.Automat):
                     lg.warn('incoming identity is not correct')
                     return
                 if user_idurl.original() != cached_ident.getIDURL().original():
-                    lg.warn('incoming identity is not belong to request packet creator: %r != %r' % (user_idurl.original(), cached_ident.getIDURL().original()))
+                    lg.warn('incoming identity is not belong to request packet creator: %r != %r', user_idurl.original(), cached_ident.getIDURL().original())
                     return
                 identitycache.UpdateAfterChecking(cached_ident.getIDURL().original(), idsrc)
                 if user_idurl.original() not in list(self.routes.keys()) and user_idurl.to_bin() not in list(self.routes.keys()):
@@ -456,14 +462,17 @@ class ProxyRouter(automat.Automat):
                             oldstate='CONNECTED',
                             callback_id='proxy_router',
                         )
-                        lg.info('connected %s routed user %r and set active session: %r' % (oldnew.upper(), user_idurl, active_user_session_machine))
+                        lg.info('connected %s routed user %r and set active session: %r', oldnew.upper(), user_idurl, active_user_session_machine)
                     else:
                         lg.err('not found session state machine by index %s' % user_connection_info['index'])
                 else:
                     if _Debug:
                         lg.dbg(_DebugLevel, 'active connection with user %s at %s:%s not yet exist' % (user_idurl.original(), info.proto, info.host))
                         lg.dbg(_DebugLevel, 'current active sessions: %d' % len(gateway.list_active_sessions(info.proto)))
-                out_ack = p2p_service.SendAck(request, 'accepted', wide=True)
+                ack_response = 'accepted'
+                if json_payload.get('channel_keys'):
+                    ack_response = self._do_start_route_channel(user_idurl, cached_ident)
+                out_ack = p2p_service.SendAck(request, ack_response, wide=True)
                 self.acks[out_ack.PacketID] = out_ack.RemoteID
                 if _Debug:
                     lg.out(_DebugLevel, 'proxy_server.doProcessRequest !!!!!!! ACCEPTED %s ROUTE for %r  contacts=%s' % (oldnew.upper(), user_idurl, self.routes.get(user_idurl.original(), {}).get('contacts')))
@@ -480,6 +489,7 @@ class ProxyRouter(automat.Automat):
                         active_user_session_machine.removeStateChangedCallback(callback_id='proxy_router')
                 self.routes.pop(user_idurl.original(), None)
                 self.routes.pop(user_idurl.to_bin(), None)
+                self._do_forget_route_channel(user_idurl)
                 self.closed_routes[user_idurl.original()] = time.time()
                 self.closed_routes[user_idurl.to_bin()] = time.time()
                 identitycache.StopOverridingIdentity(user_idurl.original())
@@ -505,7 +515,7 @@ class ProxyRouter(automat.Automat):
         if _Debug:
             lg.args(_DebugLevel, newpacket=newpacket, info=info, receiver_idurl=receiver_idurl)
         if not route_info:
-            lg.warn('route with %s not found for inbox packet: %s' % (receiver_idurl, newpacket))
+            lg.warn('route with %s not found for inbox packet: %s', receiver_idurl, newpacket)
             return
         connection_info = route_info.get('connection_info', {})
         active_user_session_machine = None
@@ -514,7 +524,7 @@ class ProxyRouter(automat.Automat):
             if not active_user_sessions:
                 active_user_sessions = gateway.find_active_session(info.proto, idurl=receiver_idurl.to_bin())
             if not active_user_sessions:
-                lg.warn('route with %s found but no active sessions found with %s://%s, fire "routed-session-disconnected" event' % (receiver_idurl, info.proto, info.host))
+                lg.warn('route with %s found but no active sessions found with %s://%s, fire "routed-session-disconnected" event', receiver_idurl, info.proto, info.host)
                 self.automat('routed-session-disconnected', receiver_idurl)
                 return
             user_connection_info = {
@@ -528,19 +538,19 @@ class ProxyRouter(automat.Automat):
             if active_user_session_machine:
                 if receiver_idurl.original() in self.routes:
                     self.routes[receiver_idurl.original()]['connection_info'] = user_connection_info
-                    lg.info('found and remember active connection info: %r' % user_connection_info)
+                    lg.info('found and remember active connection info: %r', user_connection_info)
                 if receiver_idurl.to_bin() in self.routes:
                     self.routes[receiver_idurl.to_bin()]['connection_info'] = user_connection_info
-                    lg.info('found and remember active connection info (for latest IDURL): %r' % user_connection_info)
+                    lg.info('found and remember active connection info (for latest IDURL): %r', user_connection_info)
         if not active_user_session_machine:
             if connection_info.get('index'):
                 active_user_session_machine = automat.by_index(connection_info['index'])
         if not active_user_session_machine:
-            lg.warn('route with %s found but no active user session, fire "routed-session-disconnected" event' % receiver_idurl)
+            lg.warn('route with %s found but no active user session, fire "routed-session-disconnected" event', receiver_idurl)
             self.automat('routed-session-disconnected', receiver_idurl)
             return
         if not active_user_session_machine.is_connected():
-            lg.warn('route with %s found but session is not connected, fire "routed-session-disconnected" event' % receiver_idurl)
+            lg.warn('route with %s found but session is not connected, fire "routed-session-disconnected" event', receiver_idurl)
             self.automat('routed-session-disconnected', receiver_idurl)
             return
         hosts = []
@@ -552,17 +562,17 @@ class ProxyRouter(automat.Automat):
         except:
             lg.exc()
         if not hosts:
-            lg.warn('found active user session but host is empty in %r, try use recorded info' % active_user_session_machine)
+            lg.warn('found active user session but host is empty in %r, try use recorded info', active_user_session_machine)
             hosts = route_info['address']
         if len(hosts) == 0:
-            lg.warn('route with %s do not have actual info about the host, use identity contacts instead' % receiver_idurl)
+            lg.warn('route with %s do not have actual info about the host, use identity contacts instead', receiver_idurl)
             hosts = route_info['contacts']
         if len(hosts) == 0:
-            lg.warn('has no known contacts for route with %s' % receiver_idurl)
+            lg.warn('has no known contacts for route with %s', receiver_idurl)
             self.automat('routed-session-disconnected', receiver_idurl)
             return
         if len(hosts) > 1:
-            lg.warn('found more then one channel with receiver %s : %r' % (receiver_idurl, hosts))
+            lg.warn('found more then one channel with receiver %s : %r', receiver_idurl, hosts)
         receiver_proto, receiver_host = strng.to_bin(hosts[0][0]), strng.to_bin(hosts[0][1])
         #--- route is healthy, sending forward incoming routed packet
         raw_data, pout = self._do_send_relay_packet(
@@ -616,18 +626,12 @@ class ProxyRouter(automat.Automat):
         newpacket, info = outpacket_info_tuple
         if _Debug:
             lg.args(_DebugLevel, newpacket=newpacket, info=info)
-        block = encrypted.Unserialize(newpacket.Payload)
-        if block is None:
-            lg.err('failed reading data from %s' % newpacket.RemoteID)
+        raw_data = self._do_read_relay_out_data(newpacket)
+        if raw_data is None:
             return
-        inpt = None
         try:
-            session_key = key.DecryptLocalPrivateKey(block.EncryptedSessionKey)
-            padded_data = key.DecryptWithSessionKey(session_key, block.EncryptedData, session_key_type=block.SessionKeyType)
-            inpt = BytesIO(padded_data[:int(block.Length)])
-            # see proxy_sender.ProxySender : _on_first_outbox_packet() for sending part
-            json_payload = serialization.BytesToDict(inpt.read(), keys_to_text=True)
-            inpt.close()
+            # see proxy_sender.ProxySender : _do_send_packet_to_router() for sending part
+            json_payload = serialization.BytesToDict(raw_data, keys_to_text=True)
             sender_idurl = strng.to_bin(json_payload['f'])  # from
             receiver_idurl = strng.to_bin(json_payload['t'])  # to
             wide = json_payload['w']  # wide
@@ -638,18 +642,11 @@ class ProxyRouter(automat.Automat):
         except:
             lg.err('failed reading data from %s' % newpacket.RemoteID)
             lg.exc()
-            try:
-                inpt.close()
-            except:
-                pass
             return
-        del session_key
-        del padded_data
-        del inpt
-        del block
+        del raw_data
         if identitycache.HasKey(sender_idurl) and identitycache.HasKey(receiver_idurl) and not is_retry:
             return self._do_verify_routed_data(newpacket, info, sender_idurl, receiver_idurl, routed_data, wide, response_timeout, keep_alive, is_retry)
-        lg.warn('will send routed data after caching, is_retry=%s sender_idurl=%r receiver_idurl=%r' % (is_retry, sender_idurl, receiver_idurl))
+        lg.warn('will send routed data after caching, is_retry=%s sender_idurl=%r receiver_idurl=%r', is_retry, sender_idurl, receiver_idurl)
         dl = []
         if not identitycache.HasKey(sender_idurl) or is_retry:
             dl.append(identitycache.immediatelyCaching(sender_idurl))
@@ -661,6 +658,38 @@ class ProxyRouter(automat.Automat):
         d.addErrback(lambda err: self._do_verify_routed_data(newpacket, info, None, None, routed_data, wide, response_timeout, keep_alive, is_retry))
         return True
 
+    def _do_read_relay_out_data(self, newpacket):
+        if channel_keys.is_channel_key_id(newpacket.KeyID):
+            # packet was already verified with HMAC, keys of the route are used to decrypt it
+            try:
+                raw_data = channel_keys.decrypt(newpacket.KeyID, newpacket.Payload)
+            except:
+                lg.exc()
+                raw_data = None
+            if raw_data is None:
+                lg.err('failed reading data from %s with channel key %r' % (newpacket.CreatorID, newpacket.KeyID))
+            return raw_data
+        block = encrypted.Unserialize(newpacket.Payload)
+        if block is None:
+            lg.err('failed reading data from %s' % newpacket.RemoteID)
+            return None
+        inpt = None
+        try:
+            session_key = key.DecryptLocalPrivateKey(block.EncryptedSessionKey)
+            padded_data = key.DecryptWithSessionKey(session_key, block.EncryptedData, session_key_type=block.SessionKeyType)
+            inpt = BytesIO(padded_data[:int(block.Length)])
+            raw_data = inpt.read()
+            inpt.close()
+        except:
+            lg.err('failed reading data from %s' % newpacket.RemoteID)
+            lg.exc()
+            try:
+                inpt.close()
+            except:
+                pass
+            return None
+        return raw_data
+
     def _do_check_cached_idurl(self, cache_results, newpacket, info, sender_idurl, receiver_idurl, routed_data, wide, response_timeout, keep_alive, is_retry):
         sender_id_rev = self.routes.get(sender_idurl, {}).get('identity_rev', None)
         receiver_id_rev = self.routes.get(receiver_idurl, {}).get('identity_rev', None)
@@ -691,7 +720,7 @@ class ProxyRouter(automat.Automat):
 
     def _do_verify_routed_data(self, newpacket, info, sender_idurl, receiver_idurl, routed_data, wide, response_timeout, keep_alive, is_retry, route_changed=False):
         if sender_idurl is None or receiver_idurl is None:
-            lg.warn('failed sending %r, sender or receiver IDURL was not cached' % newpacket)
+            lg.warn('failed sending %r, sender or receiver IDURL was not cached', newpacket)
             self._do_send_fail_packet(newpacket, info, wide, response_timeout, keep_alive, newpacket.CreatorID, receiver_idurl, 'sender or receiver IDURL was not found')
             return
         # those must be already cached
@@ -702,7 +731,7 @@ class ProxyRouter(automat.Automat):
             route = self.routes.get(sender_idurl.to_bin(), None)
         #--- route not exist
         if not route:
-            lg.warn('route with %s not exist' % (sender_idurl))
+            lg.warn('route with %s not exist', sender_idurl)
             self._do_send_fail_packet(newpacket, info, wide, response_timeout, keep_alive, sender_idurl, receiver_idurl, 'route not exist')
             return
         routes_keys = list(self.routes.keys())
@@ -870,25 +899,45 @@ class ProxyRouter(automat.Automat):
     def _do_send_relay_packet(self, relay_cmd, inbox_packet, data, publickey, receiver_idurl, receiver_proto=None, receiver_host=None, failed_callback=None, error=None):
         if _Debug:
             lg.args(_DebugLevel, relay_cmd=relay_cmd, inbox_packet=inbox_packet, receiver_idurl=receiver_idurl, receiver_proto=receiver_proto, receiver_host=receiver_host)
-        block = encrypted.Block(
-            CreatorID=my_id.getIDURL(),
-            BackupID='routed incoming data',
-            BlockNumber=0,
-            SessionKey=key.NewSessionKey(session_key_type=key.SessionKeyType()),
-            SessionKeyType=key.SessionKeyType(),
-            LastBlock=True,
-            Data=data,
-            EncryptKey=lambda inp: key.EncryptOpenSSHPublicKey(publickey, inp),
-        )
-        raw_data = block.Serialize()
-        routed_packet = signed.Packet(
-            Command=relay_cmd,
-            OwnerID=inbox_packet.OwnerID,
-            CreatorID=my_id.getIDURL(),
-            PacketID=inbox_packet.PacketID,
-            Payload=raw_data,
-            RemoteID=receiver_idurl,
-        )
+        channel = self.channels.get(id_url.field(receiver_idurl).original()) or self.channels.get(id_url.field(receiver_idurl).to_bin())
+        if channel:
+            # only symmetric encryption and HMAC with the keys of that route
+            epoch = channel_keys.current_epoch(channel['started'])
+            _, auth_key = channel_keys.derive_keys(channel['secret'], epoch)
+            raw_data = channel_keys.encrypt(channel['secret'], epoch, data)
+            routed_packet = signed.Packet(
+                Command=relay_cmd,
+                OwnerID=inbox_packet.OwnerID,
+                CreatorID=my_id.getIDURL(),
+                PacketID=inbox_packet.PacketID,
+                Payload=raw_data,
+                RemoteID=receiver_idurl,
+                KeyID=channel_keys.make_key_id(channel['channel_id'], epoch),
+                AuthKey=auth_key,
+                # AES output is binary, so JSON envelope would make the packet much bigger
+                EnvelopeVersion=serialization.ENVELOPE_BINARY,
+            )
+        else:
+            block = encrypted.Block(
+                CreatorID=my_id.getIDURL(),
+                BackupID='routed incoming data',
+                BlockNumber=0,
+                SessionKey=key.NewSessionKey(session_key_type=key.SessionKeyType()),
+                SessionKeyType=key.SessionKeyType(),
+                LastBlock=True,
+                Data=data,
+                EncryptKey=lambda inp: key.EncryptOpenSSHPublicKey(publickey, inp),
+            )
+            raw_data = block.Serialize()
+            routed_packet = signed.Packet(
+                Command=relay_cmd,
+                OwnerID=inbox_packet.OwnerID,
+                CreatorID=my_id.getIDURL(),
+                PacketID=inbox_packet.PacketID,
+                Payload=raw_data,
+                RemoteID=receiver_idurl,
+            )
+            del block
         cbs = {}
         if failed_callback is not None:
             cbs = {
@@ -929,10 +978,58 @@ class ProxyRouter(automat.Automat):
                 log_name='packet',
                 showtime=True,
             )
-        del block
         del routed_packet
         return raw_data, pout
 
+    def _do_start_route_channel(self, idurl, ident_obj):
+        """
+        Creates new symmetric keys for the route and returns Ack() payload with the secret encrypted for the routed user.
+        So only one RSA operation is made here and all relayed packets are protected with AES and HMAC.
+        """
+        idurl = id_url.field(idurl)
+        channel = {
+            'channel_id': channel_keys.new_channel_id(),
+            'secret': channel_keys.new_secret(),
+            'started': time.time(),
+        }
+        try:
+            encrypted_secret = key.EncryptOpenSSHPublicKey(ident_obj.publickey, channel['secret'])
+        except:
+            lg.exc()
+            return 'accepted'
+        previous_channel = self.channels.pop(idurl.to_bin(), None) or self.channels.pop(idurl.original(), None)
+        if previous_channel:
+            # RelayOut() packets from the user which are still on the way can be verified with previous keys
+            if previous_channel.get('previous_channel_id'):
+                channel_keys.unregister_channel(channel_keys.make_reverse_channel_id(previous_channel['previous_channel_id']))
+            channel['previous_channel_id'] = previous_channel['channel_id']
+        # user will send RelayOut() packets back to me protected with the same secret
+        channel_keys.register_channel(channel_keys.make_reverse_channel_id(channel['channel_id']), idurl, channel['secret'], started=channel['started'])
+        self.channels[idurl.original()] = channel
+        if _Debug:
+            lg.args(_DebugLevel, idurl=idurl, channel_id=channel['channel_id'])
+        return serialization.DictToBytes({
+            'result': 'accepted',
+            'channel_id': channel['channel_id'],
+            'channel_key': strng.to_text(base64.b64encode(encrypted_secret)),
+        }, values_to_text=True)
+
+    def _do_forget_route_channel(self, idurl):
+        idurl = id_url.field(idurl)
+        for channel in (self.channels.pop(idurl.original(), None), self.channels.pop(idurl.to_bin(), None)):
+            if not channel:
+                continue
+            for channel_id in (channel['channel_id'], channel.get('previous_channel_id')):
+                if channel_id:
+                    channel_keys.unregister_channel(channel_keys.make_reverse_channel_id(channel_id))
+
+    def _do_forget_all_route_channels(self):
+        for channel in self.channels.values():
+            for channel_id in (channel['channel_id'], channel.get('previous_channel_id')):
+                if channel_id:
+                    channel_keys.unregister_channel(channel_keys.make_reverse_channel_id(channel_id))
+        self.channels.clear()
+
     def _do_register_route(self, idurl, ident_obj):
         idurl = id_url.field(idurl)
         oldnew = ''
@@ -974,10 +1071,11 @@ class ProxyRouter(automat.Automat):
             active_user_session_machine = automat.by_index(active_user_session_machine_index)
             if active_user_session_machine is not None:
                 active_user_session_machine.removeStateChangedCallback(callback_id='proxy_router')
-                lg.info('removed "proxy_router" callback from active user session %r' % active_user_session_machine)
+                lg.info('removed "proxy_router" callback from active user session %r', active_user_session_machine)
         identitycache.StopOverridingIdentity(idurl.original())
         self.routes.pop(idurl.original(), None)
         self.routes.pop(idurl.to_bin(), None)
+        self._do_forget_route_channel(idurl)
         self.closed_routes[idurl.original()] = time.time()
         self.closed_routes[idurl.to_bin()] = time.time()
         lg.admin('removed route for %r' % idurl.original())
@@ -1217,7 +1315,7 @@ class ProxyRouter(automat.Automat):
     def _on_file_sending_filter(self, remote_idurl, proto, host, filename, description, pkt_out):
         if id_url.to_bin(remote_idurl) == my_id.getIDURL().to_bin():
             # somehow outgoing file is addressed to my self - do not filter it, but give a warning
-            lg.warn('outgoing file addressed to my self: %r' % pkt_out)
+            lg.warn('outgoing file addressed to my self: %r', pkt_out)
             return None
         # now need to check here : the outgoing packet must not be addressed to that host
         # otherwise it must be a "routed" packet - not for me but for another node "routed" via my host
@@ -1229,7 +1327,7 @@ class ProxyRouter(automat.Automat):
         receiver_proto, receiver_host = self._get_session_proto_host(remote_idurl)
         if not receiver_proto or not receiver_host:
             # filter out the packet - because of unknown route we can't send it anyway
-            lg.warn('did not found the real host for outgoing %r addressed to my own host' % pkt_out)
+            lg.warn('did not found the real host for outgoing %r addressed to my own host', pkt_out)
             return False
         if _Debug:
             lg.dbg(_DebugLevel, 'switched %s://%s to %s://%s for outgoing %r' % (proto, host, receiver_proto, receiver_host, pkt_out))
@@ -1287,7 +1385,7 @@ class ProxyRouter(automat.Automat):
         return found
 
     def _on_user_session_disconnected(self, user_id, oldstate, newstate, event_string, *args, **kwargs):
-        lg.warn('user session disconnected  %r : %s->%s' % (user_id, oldstate, newstate))
+        lg.warn('user session disconnected  %r : %s->%s', user_id, oldstate, newstate)
         self.automat('routed-session-disconnected', user_id)
 
     def _on_identity_url_changed(self, evt):
@@ -1298,6 +1396,8 @@ class ProxyRouter(automat.Automat):
             identitycache.StopOverridingIdentity(old)
             self.routes.pop(old)
             self.routes[new] = current_route
+            if old in self.channels:
+                self.channels[new] = self.channels.pop(old)
             new_ident = identitydb.get_ident(new)
             if new_ident and not self._is_my_contacts_present_in_identity(new_ident):
                 if _Debug:
@@ -1305,7 +1405,7 @@ class ProxyRouter(automat.Automat):
                 identitycache.OverrideIdentity(new, new_ident.serialize(as_text=True))
             if new_ident:
                 self.routes[new]['identity_rev'] = new_ident.getRevisionValue()
-            lg.info('replaced route for user after identity rotate detected : %r -> %r' % (old, new))
+            lg.info('replaced route for user after identity rotate detected : %r -> %r', old, new)
             lg.admin('replaced route for %r after identity rotate to %r' % (old, new))
 
     def _is_my_contacts_present_in_identity(self, ident):
@@ -79,6 +79,7 @@ from bitdust.main import settings
 from bitdust.crypt import encrypted
 from bitdust.crypt import key
 from bitdust.crypt import signed
+from bitdust.crypt import channel_keys
 
 from bitdust.services import driver
 
@@ -351,25 +352,46 @@ class ProxySender(automat.Automat):
         if not json_payload['t']:
             raise ValueError('receiver idurl was not set')
         raw_bytes = serialization.DictToBytes(json_payload)
-        block = encrypted.Block(
-            CreatorID=my_id.getIDURL(),
-            BackupID='routed outgoing data',
-            BlockNumber=0,
-            SessionKey=key.NewSessionKey(session_key_type=key.SessionKeyType()),
-            SessionKeyType=key.SessionKeyType(),
-            LastBlock=True,
-            Data=raw_bytes,
-            EncryptKey=lambda inp: key.EncryptOpenSSHPublicKey(publickey, inp),
-        )
-        block_encrypted = block.Serialize()
-        newpacket = signed.Packet(
-            Command=commands.RelayOut(),
-            OwnerID=outpacket.OwnerID,
-            CreatorID=my_id.getIDURL(),
-            PacketID=outpacket.PacketID,
-            Payload=block_encrypted,
-            RemoteID=router_idurl,
-        )
+        router_channel_id = proxy_receiver.GetRouterChannelID()
+        router_channel = channel_keys.get_channel(router_channel_id) if router_channel_id else None
+        if router_channel:
+            # only symmetric encryption and HMAC with the keys of my route, see proxy_router.ProxyRouter._do_read_relay_out_data()
+            epoch = channel_keys.current_epoch(router_channel['started'])
+            _, auth_key = channel_keys.derive_keys(router_channel['secret'], epoch)
+            block_encrypted = channel_keys.encrypt(router_channel['secret'], epoch, raw_bytes)
+            newpacket = signed.Packet(
+                Command=commands.RelayOut(),
+                OwnerID=outpacket.OwnerID,
+                CreatorID=my_id.getIDURL(),
+                PacketID=outpacket.PacketID,
+                Payload=block_encrypted,
+                RemoteID=router_idurl,
+                KeyID=channel_keys.make_key_id(channel_keys.make_reverse_channel_id(router_channel_id), epoch),
+                AuthKey=auth_key,
+                # router which gave me the channel keys is able to read binary envelope as well
+                EnvelopeVersion=serialization.ENVELOPE_BINARY,
+            )
+        else:
+            block = encrypted.Block(
+                CreatorID=my_id.getIDURL(),
+                BackupID='routed outgoing data',
+                BlockNumber=0,
+                SessionKey=key.NewSessionKey(session_key_type=key.SessionKeyType()),
+                SessionKeyType=key.SessionKeyType(),
+                LastBlock=True,
+                Data=raw_bytes,
+                EncryptKey=lambda inp: key.EncryptOpenSSHPublicKey(publickey, inp),
+            )
+            block_encrypted = block.Serialize()
+            newpacket = signed.Packet(
+                Command=commands.RelayOut(),
+                OwnerID=outpacket.OwnerID,
+                CreatorID=my_id.getIDURL(),
+                PacketID=outpacket.PacketID,
+                Payload=block_encrypted,
+                RemoteID=router_idurl,
+            )
+            del block
         if response_timeout is not None:
             # must give some extra time for the proxy re-routing
             response_timeout += 10.0
@@ -405,7 +427,6 @@ class ProxySender(automat.Automat):
                 (outpacket.Command, outpacket.PacketID, len(raw_bytes), global_id.UrlToGlobalID(outpacket.CreatorID), global_id.UrlToGlobalID(outpacket.RemoteID), global_id.UrlToGlobalID(router_idurl)), log_name='packet', showtime=True
             )
         del raw_bytes
-        del block
         del newpacket
         del outpacket
         del router_identity_obj
@@ -59,6 +59,8 @@ from bitdust.automats import automat
 from bitdust.lib import strng
 from bitdust.lib import net_misc
 
+from bitdust.system import tmpfile
+
 #------------------------------------------------------------------------------
 
 FIRST_PRIORITY_SHORT_FILE_SIZE = 64*1024
@@ -126,6 +128,9 @@ class TCPConnection(automat.Automat, basic.Int32StringReceiver):
             publish_events=False,
         )
         self.automat('connection-made')
+        from bitdust.transport.tcp import tcp_node
+        if tcp_node.is_receiving_paused() and self.transport:
+            self.transport.pauseProducing()
 
     def connectionLost(self, reason):
         if _Debug:
@@ -488,18 +493,12 @@ class TCPConnection(automat.Automat, basic.Int32StringReceiver):
             # we have a queue of files to be sent
             # somehow file may be removed before we start sending it
             # so we check it here and skip not existed files
-            if not os.path.isfile(filename):
+            filesize = tmpfile.file_size(filename)
+            if filesize < 0:
                 self.failed_outbox_queue_item(filename, description, 'file not exist')
                 if not (keep_alive or self.force_keep_alive):
                     self.automat('shutdown')
                 continue
-            try:
-                filesize = os.path.getsize(filename)
-            except:
-                self.failed_outbox_queue_item(filename, description, 'can not get file size')
-                if not (keep_alive or self.force_keep_alive):
-                    self.automat('shutdown')
-                continue
             self.stream.create_outbox_file(filename, filesize, description, result_defer, keep_alive)
         return has_reads
 
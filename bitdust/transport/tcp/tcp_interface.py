@@ -215,6 +215,16 @@ class GateInterface():
         """
         return tcp_node.cancel_outbox_file(net_misc.normalize_address(host), filename)
 
+    def pause_receiving(self):
+        """
+        """
+        return tcp_node.pause_receiving()
+
+    def resume_receiving(self):
+        """
+        """
+        return tcp_node.resume_receiving()
+
     def list_sessions(self):
         """
         """
@@ -74,6 +74,7 @@ _OpenedConnections = {}
 _StartedConnections = {}
 _ConnectionsCounter = 0
 _ConnectionTimeout = 10
+_ReceivingPaused = False
 
 #------------------------------------------------------------------------------
 
@@ -239,6 +240,29 @@ def close_connections():
             oc.automat('connection-lost')
 
 
+def is_receiving_paused():
+    return _ReceivingPaused
+
+
+def pause_receiving():
+    global _ReceivingPaused
+    # connections opened later will be paused as well, see tcp_connection.TCPConnection.connectionMade()
+    _ReceivingPaused = True
+    for oclist in opened_connections().values():
+        for oc in oclist:
+            if oc.transport:
+                oc.transport.pauseProducing()
+
+
+def resume_receiving():
+    global _ReceivingPaused
+    _ReceivingPaused = False
+    for oclist in opened_connections().values():
+        for oc in oclist:
+            if oc.transport:
+                oc.transport.resumeProducing()
+
+
 def send(filename, remoteaddress, description=None, keep_alive=True):
     remoteaddress = net_misc.normalize_address(remoteaddress)
     result_defer = Deferred()
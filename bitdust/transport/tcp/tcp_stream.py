@@ -407,7 +407,13 @@ class InboxFile():
         self.stream = stream
         self.file_id = file_id
         self.size = file_size
-        self.fin, self.filename = tmpfile.make('tcp-in', extension='.tcp')
+        if self.size <= settings.getInboxInMemoryMaxSize():
+            self.fin = None
+            self.buffer = bytearray()
+            self.filename = tmpfile.make_buffer('tcp-in', self.buffer, extension='.tcp')
+        else:
+            self.buffer = None
+            self.fin, self.filename = tmpfile.make('tcp-in', extension='.tcp')
         self.bytes_received = 0
         self.started = time.time()
         self.last_block_time = time.time()
@@ -427,7 +433,10 @@ class InboxFile():
         return self.bytes_received
 
     def input_data(self, data):
-        os.write(self.fin, data)
+        if self.buffer is not None:
+            self.buffer.extend(data)
+        else:
+            os.write(self.fin, data)
         self.bytes_received += len(data)
         self.stream.connection.total_bytes_received += len(data)
         self.last_block_time = time.time()
@@ -460,7 +469,7 @@ class OutboxFile():
         self.bytes_out = 0
         self.started = time.time()
         self.timeout = max(int(self.size/settings.SendingSpeedLimit()), 6)
-        self.fout = open(self.filename, 'rb')
+        self.fout = tmpfile.open_file(self.filename)
         if _Debug:
             lg.out(_DebugLevel, '>>>TCP-OUT %s with %d bytes reading from %s' % (self.file_id, self.size, self.filename))
 
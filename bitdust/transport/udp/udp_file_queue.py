@@ -47,6 +47,8 @@ from bitdust.lib import udp
 
 from bitdust.system import tmpfile
 
+from bitdust.main import settings
+
 from bitdust.contacts import contactsdb
 
 #------------------------------------------------------------------------------
@@ -147,14 +149,10 @@ class FileQueue:
             # we have a queue of files to be sent
             # somehow file may be removed before we start sending it
             # so I check it here and skip not existed files
-            if not os.path.isfile(filename):
+            filesize = tmpfile.file_size(filename)
+            if filesize < 0:
                 self.on_failed_outbox_queue_item(filename, description, 'file not exist', result_defer, keep_alive)
                 continue
-            try:
-                filesize = os.path.getsize(filename)
-            except:
-                self.on_failed_outbox_queue_item(filename, description, 'can not get file size', result_defer, keep_alive)
-                continue
             self.start_outbox_file(filename, filesize, description, result_defer, keep_alive)
         return has_reads
 
@@ -448,8 +446,14 @@ class InboxFile():
         self.queue = queue
         self.stream_callback = None
         self.stream_id = stream_id
-        self.fd, self.filename = tmpfile.make('udp-in', extension='.udp')
         self.size = size
+        if self.size <= settings.getInboxInMemoryMaxSize():
+            self.fd = None
+            self.buffer = bytearray()
+            self.filename = tmpfile.make_buffer('udp-in', self.buffer, extension='.udp')
+        else:
+            self.buffer = None
+            self.fd, self.filename = tmpfile.make('udp-in', extension='.udp')
         self.bytes_received = 0
         self.started = time.time()
         self.cancelled = False
@@ -477,11 +481,15 @@ class InboxFile():
         self.stream_callback = None
 
     def close_file(self):
-        os.close(self.fd)
-        self.fd = None
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
 
     def process(self, newdata):
-        os.write(self.fd, newdata)
+        if self.buffer is not None:
+            self.buffer.extend(newdata)
+        else:
+            os.write(self.fd, newdata)
         self.bytes_received += len(newdata)
 
     def is_done(self):
@@ -523,7 +531,7 @@ class OutboxFile():
         self.status = None
         self.error_message = ''
         self.started = time.time()
-        self.fileobj = open(self.filename, 'rb')
+        self.fileobj = tmpfile.open_file(self.filename)
         if _Debug:
             lg.out(18, 'udp_file_queue.OutboxFile.__init__ {%s} [%d] to %s with %d bytes' % (os.path.basename(self.filename), self.stream_id, str(self.queue.session.peer_address), self.size))
 
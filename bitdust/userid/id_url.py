@@ -68,11 +68,16 @@ from bitdust.crypt import hashes
 
 from bitdust.lib import strng
 from bitdust.lib import nameurl
+from bitdust.lib import jsn
 
 from bitdust.main import settings
 
 #------------------------------------------------------------------------------
 
+SNAPSHOT_VERSION = 1
+
+#------------------------------------------------------------------------------
+
 _IdentityHistoryDir = None
 # TODO: if this dictionary grow too much use CodernityDB instead of in-memory storage
 _KnownUsers = {}
@@ -80,18 +85,21 @@ _KnownIDURLs = {}
 _MergedIDURLs = {}
 _KnownSources = {}
 _KnownUniqueNames = {}
+_Snapshot = {}
+_SnapshotChanged = False
 _Ready = False
 
 #------------------------------------------------------------------------------
 
 
 def init():
+    """
+    Verifying every historical identity file is slow, so facts extracted from each of them are stored in a snapshot file.
+    On the next start only files with changed size or modification time are parsed and verified again.
+    """
     global _IdentityHistoryDir
-    global _KnownUsers
-    global _KnownIDURLs
-    global _MergedIDURLs
-    global _KnownSources
-    global _KnownUniqueNames
+    global _Snapshot
+    global _SnapshotChanged
     global _Ready
     from bitdust.userid import identity
     if _Debug:
@@ -103,6 +111,10 @@ def init():
         lg.info('created new folder %r' % _IdentityHistoryDir)
     else:
         lg.info('using existing folder %r' % _IdentityHistoryDir)
+    known_snapshot = read_snapshot()
+    _Snapshot = {}
+    _SnapshotChanged = False
+    verified_files = 0
     for_cleanup = []
     for one_user_dir in os.listdir(_IdentityHistoryDir):
         one_user_name = one_user_dir.split('@')[0]
@@ -122,70 +134,45 @@ def init():
         one_user_identity_files.sort()
         for one_ident_file in one_user_identity_files:
             one_ident_path = os.path.join(one_user_dir_path, strng.to_text(one_ident_file))
+            snapshot_key = '{}/{}'.format(one_user_dir, one_ident_file)
+            snapshot_record = known_snapshot.get(snapshot_key)
             try:
-                xmlsrc = local_fs.ReadTextFile(one_ident_path)
-                known_id_obj = identity.identity(xmlsrc=xmlsrc)
-                if not known_id_obj.isCorrect():
-                    raise Exception('identity history in %r is broken, identity is not correct: %r' % (one_user_dir, one_ident_path))
-                if not known_id_obj.Valid():
-                    raise Exception('identity history in %r is broken, identity is not valid: %r' % (one_user_dir, one_ident_path))
-            except Exception as exc:
-                lg.err(str(exc))
-                for_cleanup.append(one_ident_path)
+                file_stat = os.stat(one_ident_path)
+            except:
+                lg.exc()
                 continue
-            one_pub_key = known_id_obj.getPublicKey()
-            one_revision = known_id_obj.getRevisionValue()
-            if one_pub_key not in _KnownUsers:
-                _KnownUsers[one_pub_key] = one_user_dir_path
-            one_unique_name = '{}_{}'.format(
-                one_user_name,
-                strng.to_text(hashes.sha1(one_pub_key, hexdigest=True)),
-            )
-            known_sources = known_id_obj.getSources(as_originals=True)
-            name_is_matching = True
-            for known_idurl in reversed(known_sources):
-                if nameurl.GetName(known_idurl) != one_user_name:
-                    name_is_matching = False
-                    break
-            if not name_is_matching:
+            if not snapshot_record or snapshot_record['m'] != file_stat.st_mtime_ns or snapshot_record['s'] != file_stat.st_size:
+                _SnapshotChanged = True
+                try:
+                    xmlsrc = local_fs.ReadTextFile(one_ident_path)
+                    known_id_obj = identity.identity(xmlsrc=xmlsrc)
+                    if not known_id_obj.isCorrect():
+                        raise Exception('identity history in %r is broken, identity is not correct: %r' % (one_user_dir, one_ident_path))
+                    if not known_id_obj.Valid():
+                        raise Exception('identity history in %r is broken, identity is not valid: %r' % (one_user_dir, one_ident_path))
+                except Exception as exc:
+                    lg.err(str(exc))
+                    for_cleanup.append(one_ident_path)
+                    continue
+                verified_files += 1
+                snapshot_record = {
+                    'm': file_stat.st_mtime_ns,
+                    's': file_stat.st_size,
+                    'k': strng.to_text(known_id_obj.getPublicKey()),
+                    'r': known_id_obj.getRevisionValue(),
+                    'src': [strng.to_text(src) for src in known_id_obj.getSources(as_originals=True)],
+                }
+            if not _load_history_record(
+                one_user_name=one_user_name,
+                one_user_dir_path=one_user_dir_path,
+                one_pub_key=strng.to_bin(snapshot_record['k']),
+                one_revision=snapshot_record['r'],
+                known_sources=[strng.to_bin(src) for src in snapshot_record['src']],
+            ):
                 lg.err('identity name in one of the sources %r is not matching with %r' % (one_ident_path, one_user_name))
                 for_cleanup.append(one_ident_path)
                 continue
-            for known_idurl in reversed(known_sources):
-                if known_idurl not in _KnownIDURLs:
-                    _KnownIDURLs[known_idurl] = known_id_obj.getPublicKey()
-                    if _Debug:
-                        lg.out(_DebugLevel, '    new IDURL added: %r' % known_idurl)
-                else:
-                    if _KnownIDURLs[known_idurl] != known_id_obj.getPublicKey():
-                        _KnownIDURLs[known_idurl] = known_id_obj.getPublicKey()
-                        lg.warn('another user had same identity source: %r' % known_idurl)
-                if one_pub_key not in _MergedIDURLs:
-                    _MergedIDURLs[one_pub_key] = {}
-                    if _Debug:
-                        lg.out(_DebugLevel, '    new Public Key added: %s...' % one_pub_key[-10:])
-                if one_revision in _MergedIDURLs[one_pub_key]:
-                    if _MergedIDURLs[one_pub_key][one_revision] != known_idurl:
-                        if _MergedIDURLs[one_pub_key][one_revision] not in known_sources:
-                            lg.warn('rewriting existing identity revision %d : %r -> %r' % (one_revision, _MergedIDURLs[one_pub_key][one_revision], known_idurl))
-                    _MergedIDURLs[one_pub_key][one_revision] = known_idurl
-                else:
-                    _MergedIDURLs[one_pub_key][one_revision] = known_idurl
-                    if _Debug:
-                        lg.out(_DebugLevel, '        revision %d merged with other %d known items' % (one_revision, len(_MergedIDURLs[one_pub_key])))
-                if one_pub_key not in _KnownSources:
-                    _KnownSources[one_pub_key] = []
-                if one_unique_name not in _KnownUniqueNames:
-                    _KnownUniqueNames[one_unique_name] = []
-                for one_source in known_id_obj.getSources(as_originals=True):
-                    if one_source not in _KnownSources[one_pub_key]:
-                        _KnownSources[one_pub_key].append(one_source)
-                        if _Debug:
-                            lg.out(_DebugLevel, '    new source %r added for %r' % (one_source, one_pub_key[-10:]))
-                    if one_source not in _KnownUniqueNames[one_unique_name]:
-                        _KnownUniqueNames[one_unique_name].append(one_source)
-                        if _Debug:
-                            lg.out(_DebugLevel, '    new source %r added for unique name %r' % (one_source, one_unique_name))
+            _Snapshot[snapshot_key] = snapshot_record
     for one_ident_path in for_cleanup:
         if os.path.isfile(one_ident_path):
             lg.warn('about to erase broken historical identity file: %r' % one_ident_path)
@@ -193,9 +180,68 @@ def init():
                 os.remove(one_ident_path)
             except:
                 lg.exc()
+    if len(_Snapshot) != len(known_snapshot):
+        _SnapshotChanged = True
+    if _SnapshotChanged:
+        write_snapshot()
+    if _Debug:
+        lg.args(_DebugLevel, history_files=len(_Snapshot), verified_files=verified_files)
     _Ready = True
 
 
+def _load_history_record(one_user_name, one_user_dir_path, one_pub_key, one_revision, known_sources):
+    global _KnownUsers
+    global _KnownIDURLs
+    global _MergedIDURLs
+    global _KnownSources
+    global _KnownUniqueNames
+    for known_idurl in reversed(known_sources):
+        if nameurl.GetName(known_idurl) != one_user_name:
+            return False
+    if one_pub_key not in _KnownUsers:
+        _KnownUsers[one_pub_key] = one_user_dir_path
+    one_unique_name = '{}_{}'.format(
+        one_user_name,
+        strng.to_text(hashes.sha1(one_pub_key, hexdigest=True)),
+    )
+    for known_idurl in reversed(known_sources):
+        if known_idurl not in _KnownIDURLs:
+            _KnownIDURLs[known_idurl] = one_pub_key
+            if _Debug:
+                lg.out(_DebugLevel, '    new IDURL added: %r' % known_idurl)
+        else:
+            if _KnownIDURLs[known_idurl] != one_pub_key:
+                _KnownIDURLs[known_idurl] = one_pub_key
+                lg.warn('another user had same identity source: %r' % known_idurl)
+        if one_pub_key not in _MergedIDURLs:
+            _MergedIDURLs[one_pub_key] = {}
+            if _Debug:
+                lg.out(_DebugLevel, '    new Public Key added: %s...' % one_pub_key[-10:])
+        if one_revision in _MergedIDURLs[one_pub_key]:
+            if _MergedIDURLs[one_pub_key][one_revision] != known_idurl:
+                if _MergedIDURLs[one_pub_key][one_revision] not in known_sources:
+                    lg.warn('rewriting existing identity revision %d : %r -> %r' % (one_revision, _MergedIDURLs[one_pub_key][one_revision], known_idurl))
+            _MergedIDURLs[one_pub_key][one_revision] = known_idurl
+        else:
+            _MergedIDURLs[one_pub_key][one_revision] = known_idurl
+            if _Debug:
+                lg.out(_DebugLevel, '        revision %d merged with other %d known items' % (one_revision, len(_MergedIDURLs[one_pub_key])))
+        if one_pub_key not in _KnownSources:
+            _KnownSources[one_pub_key] = []
+        if one_unique_name not in _KnownUniqueNames:
+            _KnownUniqueNames[one_unique_name] = []
+        for one_source in known_sources:
+            if one_source not in _KnownSources[one_pub_key]:
+                _KnownSources[one_pub_key].append(one_source)
+                if _Debug:
+                    lg.out(_DebugLevel, '    new source %r added for %r' % (one_source, one_pub_key[-10:]))
+            if one_source not in _KnownUniqueNames[one_unique_name]:
+                _KnownUniqueNames[one_unique_name].append(one_source)
+                if _Debug:
+                    lg.out(_DebugLevel, '    new source %r added for unique name %r' % (one_source, one_unique_name))
+    return True
+
+
 def shutdown():
     global _IdentityHistoryDir
     global _KnownIDURLs
@@ -204,6 +250,9 @@ def shutdown():
     global _MergedIDURLs
     global _KnownSources
     global _KnownUniqueNames
+    if _SnapshotChanged:
+        write_snapshot()
+    _Snapshot.clear()
     _IdentityHistoryDir = None
     _KnownUsers.clear()
     _KnownIDURLs.clear()
@@ -216,6 +265,77 @@ def shutdown():
 #------------------------------------------------------------------------------
 
 
+def snapshot_file_path():
+    return os.path.join(_IdentityHistoryDir, 'snapshot.json')
+
+
+def read_snapshot():
+    """
+    Returns records stored in the snapshot file, or empty dictionary if snapshot is missing or damaged.
+    """
+    src = local_fs.ReadTextFile(snapshot_file_path())
+    if not src:
+        return {}
+    try:
+        snapshot = jsn.loads_text(src)
+        records = snapshot['records']
+        if snapshot['version'] != SNAPSHOT_VERSION or snapshot['checksum'] != _snapshot_checksum(records):
+            raise Exception('snapshot checksum is not valid')
+    except Exception as exc:
+        lg.warn('identity history snapshot is broken, all historical identities will be verified again: %r' % exc)
+        return {}
+    return records
+
+
+def write_snapshot():
+    global _SnapshotChanged
+    if not _IdentityHistoryDir:
+        return False
+    snapshot = {
+        'version': SNAPSHOT_VERSION,
+        'records': _Snapshot,
+        'checksum': _snapshot_checksum(_Snapshot),
+    }
+    if not local_fs.WriteTextFile(snapshot_file_path(), jsn.dumps(snapshot, separators=(',', ':'))):
+        lg.err('failed to store identity history snapshot')
+        return False
+    _SnapshotChanged = False
+    return True
+
+
+def _snapshot_checksum(records):
+    return strng.to_text(hashes.sha256(strng.to_bin(jsn.dumps(records, sort_keys=True, separators=(',', ':'))), hexdigest=True))
+
+
+def _snapshot_file_stored(identity_file_path, id_obj):
+    global _SnapshotChanged
+    try:
+        file_stat = os.stat(identity_file_path)
+    except:
+        lg.exc()
+        return False
+    user_dir_path, ident_file = os.path.split(identity_file_path)
+    _Snapshot['{}/{}'.format(os.path.basename(user_dir_path), ident_file)] = {
+        'm': file_stat.st_mtime_ns,
+        's': file_stat.st_size,
+        'k': strng.to_text(id_obj.getPublicKey()),
+        'r': id_obj.getRevisionValue(),
+        'src': [strng.to_text(src) for src in id_obj.getSources(as_originals=True)],
+    }
+    _SnapshotChanged = True
+    return True
+
+
+def _snapshot_file_removed(identity_file_path):
+    global _SnapshotChanged
+    user_dir_path, ident_file = os.path.split(identity_file_path)
+    if _Snapshot.pop('{}/{}'.format(os.path.basename(user_dir_path), ident_file), None) is not None:
+        _SnapshotChanged = True
+
+
+#------------------------------------------------------------------------------
+
+
 def known():
     global _KnownIDURLs
     return _KnownIDURLs
@@ -289,6 +409,7 @@ def identity_cached(new_id_obj):
             except:
                 lg.exc()
         local_fs.WriteBinaryFile(first_identity_file_path, new_id_obj.serialize())
+        _snapshot_file_stored(first_identity_file_path, new_id_obj)
         if _Debug:
             lg.out(_DebugLevel, 'id_url.identity_cached wrote first item for user %r in identity history: %r' % (user_name, first_identity_file_path))
     else:
@@ -342,6 +463,7 @@ def identity_cached(new_id_obj):
                         except:
                             lg.exc()
                     local_fs.WriteBinaryFile(latest_identity_file_path, new_id_obj.serialize())
+                    _snapshot_file_stored(latest_identity_file_path, new_id_obj)
                     if _Debug:
                         lg.out(_DebugLevel, 'id_url.identity_cached latest identity sources for user %r did not changed, updated file %r' % (user_name, latest_identity_file_path))
                 else:
@@ -353,6 +475,7 @@ def identity_cached(new_id_obj):
                         except:
                             lg.exc()
                     local_fs.WriteBinaryFile(next_identity_file_path, new_id_obj.serialize())
+                    _snapshot_file_stored(next_identity_file_path, new_id_obj)
                     is_identity_rotated = True
                     if _Debug:
                         lg.out(_DebugLevel, 'id_url.identity_cached identity sources for user %r changed, wrote new item in the history: %r' % (user_name, next_identity_file_path))
@@ -408,6 +531,8 @@ def identity_cached(new_id_obj):
             lg.args(_DebugLevel, new_revision=new_revision, latest_revision=latest_revision)
         if new_revision > latest_revision:
             lg.info('found rotated identity after caching %r -> %r' % (latest_id_obj.getSources(as_originals=True)[0], new_sources[0]))
+            from bitdust.crypt import key
+            key.ForgetPublicKey(latest_id_obj.getPublicKey())
             from bitdust.main import events
             events.send('identity-rotated', data=dict(
                 old_idurls=latest_id_obj.getSources(as_originals=True),
@@ -451,6 +576,7 @@ def identity_cached(new_id_obj):
         if _Debug:
             lg.out(_DebugLevel, 'id_url.identity_cached revision %d for %r' % (new_revision, new_sources[0]))
     for identity_file_path in for_cleanup:
+        _snapshot_file_removed(identity_file_path)
         if os.path.isfile(identity_file_path):
             try:
                 os.remove(identity_file_path)
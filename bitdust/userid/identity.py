@@ -162,6 +162,7 @@ from bitdust.system import bpio
 
 from bitdust.lib import strng
 from bitdust.lib import nameurl
+from bitdust.lib import serialization
 
 from bitdust.crypt import key
 
@@ -822,6 +823,15 @@ class identity(object):
         """
         return strng.to_text(self.version)
 
+    def getEnvelopeVersion(self):
+        """
+        Returns envelope version which should be used to serialize packets sent to that node.
+        Binary envelope is only used when the node advertised support for it in the version string.
+        """
+        if serialization.EnvelopeCapability() in self.version.split():
+            return serialization.ENVELOPE_BINARY
+        return serialization.ENVELOPE_JSON
+
     def getRevisionValue(self):
         """
         Returns identity revision number.
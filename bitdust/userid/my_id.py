@@ -62,6 +62,7 @@ from bitdust.main import events
 from bitdust.lib import misc
 from bitdust.lib import nameurl
 from bitdust.lib import strng
+from bitdust.lib import serialization
 
 from bitdust.crypt import key
 
@@ -80,6 +81,7 @@ _ValidTransports = [
     'http',
     'proxy',
 ]
+_BinaryEnvelopeAdvertised = True
 
 #------------------------------------------------------------------------------
 
@@ -104,6 +106,23 @@ def shutdown():
 #-------------------------------------------------------------------------------
 
 
+def setBinaryEnvelopeAdvertised(enable):
+    """
+    Packets for me can be received by another node (for example via proxy router),
+    so binary envelope support must not be advertised when that node is not able to read it.
+    Takes effect on next call to ``rebuildLocalIdentity()``.
+    """
+    global _BinaryEnvelopeAdvertised
+    _BinaryEnvelopeAdvertised = bool(enable)
+
+
+def isBinaryEnvelopeAdvertised():
+    return _BinaryEnvelopeAdvertised
+
+
+#-------------------------------------------------------------------------------
+
+
 def isLocalIdentityExists():
     """
     Return True if local file `~/.bitdust/[network name]/metadata/localidentity` exists.
@@ -544,7 +563,7 @@ def buildDefaultIdentity(name='', ip='', idurls=[], revision=0):
     ident.setDate(time.strftime('%b %d, %Y'))
     ident.setPostage(1)
     ident.setRevision(revision)
-    ident.setVersion('')  # TODO: put latest git commit hash here
+    ident.setVersion(serialization.EnvelopeCapability())  # TODO: put latest git commit hash here
     # update software version number
     # version_number = bpio.ReadTextFile(settings.VersionNumberFile()).strip()
     # repo, location = misc.ReadRepoLocation()
@@ -594,7 +613,11 @@ def rebuildLocalIdentity(identity_object=None, skip_transports=[], new_sources=N
     repo = 'sources'
     # lid.setVersion((vernum + b' ' + strng.to_bin(repo.strip()) + b' ' + strng.to_bin(bpio.osinfo().strip()).strip()))
     # TODO: add latest commit hash from the GIT repo to the version
-    lid.setVersion(vernum + b' ' + strng.to_bin(repo.strip()))
+    new_version = vernum + b' ' + strng.to_bin(repo.strip())
+    if _BinaryEnvelopeAdvertised:
+        # also let other nodes know which envelope formats I can read
+        new_version += b' ' + serialization.EnvelopeCapability()
+    lid.setVersion(new_version)
     # generate signature with changed content
     lid.sign()
     new_xmlsrc = lid.serialize()
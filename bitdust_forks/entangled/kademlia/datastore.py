@@ -27,6 +27,7 @@ except ImportError:
 import sqlite3
 import os
 import json
+import threading
 
 from . import constants  # @UnresolvedImport
 from . import encoding  # @UnresolvedImport
@@ -199,7 +200,14 @@ class DictDataStore(DataStore):
 class SQLiteVersionedJsonDataStore(DataStore):
     """
     SQLite database-based datastore.
+
+    Records are indexed by C{key}, also by C{lastPublished} and expiration time,
+    so lookups and expiration do not need to scan the whole table.
+    Older databases without primary key are migrated automatically when opened.
     """
+
+    SCHEMA_VERSION = 2
+
     def __init__(self, dbFile=':memory:'):
         """
         @param dbFile: The name of the file containing the SQLite database; if
@@ -213,24 +221,31 @@ class SQLiteVersionedJsonDataStore(DataStore):
                 dbFile,
                 createDB,
             ))
-        self._db = sqlite3.connect(dbFile)
+        # republishing is running in a worker thread, so connection is shared and protected with a lock
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(dbFile, check_same_thread=False)
         self._db.isolation_level = None
         self._db.text_factory = encoding.to_text
+        if dbFile != ':memory:':
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute('PRAGMA synchronous=NORMAL')
         if createDB:
             self.create_table()
             if _Debug:
                 print('[DHT DB]  Created empty table for DHT records')
+        else:
+            self.migrate()
         self._cursor = self._db.cursor()
 
     def _dbQuery(self, key, columnName):
         try:
-            self._cursor.execute(
-                'SELECT %s FROM data WHERE key=:reqKey' % columnName,
-                {
-                    'reqKey': key,
-                },
-            )
-            row = self._cursor.fetchone()
+            with self._lock:
+                row = self._db.execute(
+                    'SELECT %s FROM data WHERE key=:reqKey' % columnName,
+                    {
+                        'reqKey': key,
+                    },
+                ).fetchone()
             value = row[0]
         except:
             raise KeyError(key)
@@ -243,12 +258,50 @@ class SQLiteVersionedJsonDataStore(DataStore):
         return v['d']
 
     def __delitem__(self, key):
-        self._cursor.execute('DELETE FROM data WHERE key=:reqKey', {
-            'reqKey': key,
-        })
+        with self._lock:
+            self._db.execute('DELETE FROM data WHERE key=:reqKey', {
+                'reqKey': key,
+            })
 
     def create_table(self):
-        self._db.execute('CREATE TABLE data(key, value, lastPublished, originallyPublished, originalPublisherID, expireSeconds, revision)')
+        self._db.execute('CREATE TABLE IF NOT EXISTS data(key TEXT PRIMARY KEY NOT NULL, value, lastPublished, originallyPublished, originalPublisherID, expireSeconds, revision)')
+        self.create_indexes()
+        self._db.execute('PRAGMA user_version=%d' % self.SCHEMA_VERSION)
+
+    def create_indexes(self):
+        self._db.execute('CREATE INDEX IF NOT EXISTS data_last_published ON data(lastPublished)')
+        self._db.execute('CREATE INDEX IF NOT EXISTS data_expire_time ON data(originallyPublished + expireSeconds)')
+
+    def migrate(self):
+        """
+        Upgrade database created by older version: records are copied into a new table with primary key,
+        for duplicated keys only the latest written record is kept.
+        """
+        with self._lock:
+            version = self._db.execute('PRAGMA user_version').fetchone()[0]
+            if version >= self.SCHEMA_VERSION:
+                return False
+            self._db.execute('BEGIN IMMEDIATE')
+            try:
+                if self._db.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='data'").fetchone():
+                    self._db.execute('CREATE TABLE data_migrated(key TEXT PRIMARY KEY NOT NULL, value, lastPublished, originallyPublished, originalPublisherID, expireSeconds, revision)')
+                    self._db.execute(
+                        'INSERT OR REPLACE INTO data_migrated(key, value, lastPublished, originallyPublished, originalPublisherID, expireSeconds, revision) '
+                        'SELECT key, value, lastPublished, originallyPublished, originalPublisherID, expireSeconds, revision FROM data WHERE key IS NOT NULL ORDER BY rowid'
+                    )
+                    self._db.execute('DROP TABLE data')
+                    self._db.execute('ALTER TABLE data_migrated RENAME TO data')
+                    self.create_indexes()
+                    self._db.execute('PRAGMA user_version=%d' % self.SCHEMA_VERSION)
+                else:
+                    self.create_table()
+            except:
+                self._db.execute('ROLLBACK')
+                raise
+            self._db.execute('COMMIT')
+        if _Debug:
+            print('[DHT DB] %r migrated from schema version %d to %d' % (self.dbFile, version, self.SCHEMA_VERSION))
+        return True
 
     def keys(self):
         """
@@ -256,9 +309,9 @@ class SQLiteVersionedJsonDataStore(DataStore):
         """
         keys = []
         try:
-            self._cursor.execute('SELECT key FROM data')
-            for row in self._cursor:
-                keys.append(row[0])
+            with self._lock:
+                for row in self._db.execute('SELECT key FROM data'):
+                    keys.append(row[0])
         finally:
             return keys
 
@@ -301,120 +354,111 @@ class SQLiteVersionedJsonDataStore(DataStore):
         except KeyError:
             return 0
 
-    def setItem(self, key, value, lastPublished, originallyPublished, originalPublisherID, expireSeconds=constants.dataExpireSecondsDefaut, **kwargs):
+    def _itemParams(self, key, value, lastPublished, originallyPublished, originalPublisherID, expireSeconds=constants.dataExpireSecondsDefaut, **kwargs):
         key_hex = encoding.to_text(key)
-        new_revision = kwargs.get('revision', None)
-        if new_revision is None:
-            new_revision = self.revision(key) + 1
-        self._cursor.execute('select key from data where key=:reqKey', {'reqKey': key_hex})
-        opID = originalPublisherID or None
-        if self._cursor.fetchone() is None:
-            self._cursor.execute(
-                'INSERT INTO data(key, value, lastPublished, originallyPublished, originalPublisherID, expireSeconds, revision) VALUES (?, ?, ?, ?, ?, ?, ?)', (
-                    key_hex,
-                    json.dumps({
-                        'k': key_hex,
-                        'd': value,
-                        'v': PROTOCOL_VERSION,
-                    }),
-                    lastPublished,
-                    originallyPublished,
-                    opID,
-                    expireSeconds,
-                    new_revision,
-                )
-            )
-            if _Debug:
-                print('[DHT DB] %r setItem  stored new value for key [%s] with revision %d' % (self.dbFile, key, new_revision))
-        else:
-            self._cursor.execute(
-                'UPDATE data SET value=?, lastPublished=?, originallyPublished=?, originalPublisherID=?, expireSeconds=?, revision=? WHERE key=?', (
-                    json.dumps({
-                        'k': key_hex,
-                        'd': value,
-                        'v': PROTOCOL_VERSION,
-                    }),
-                    lastPublished,
-                    originallyPublished,
-                    opID,
-                    expireSeconds,
-                    new_revision,
-                    key_hex,
-                )
-            )
-            if _Debug:
-                print('[DHT DB] %r setItem  updated existing value for key [%s] with revision %d' % (self.dbFile, key, new_revision))
+        return {
+            'key': key_hex,
+            'value': json.dumps({
+                'k': key_hex,
+                'd': value,
+                'v': PROTOCOL_VERSION,
+            }),
+            'lastPublished': lastPublished,
+            'originallyPublished': originallyPublished,
+            'originalPublisherID': originalPublisherID or None,
+            'expireSeconds': expireSeconds,
+            'revision': kwargs.get('revision', None),
+        }
+
+    _UpsertSQL = (
+        'INSERT INTO data(key, value, lastPublished, originallyPublished, originalPublisherID, expireSeconds, revision) '
+        'VALUES (:key, :value, :lastPublished, :originallyPublished, :originalPublisherID, :expireSeconds, COALESCE(:revision, 1)) '
+        'ON CONFLICT(key) DO UPDATE SET value=excluded.value, lastPublished=excluded.lastPublished, '
+        'originallyPublished=excluded.originallyPublished, originalPublisherID=excluded.originalPublisherID, '
+        'expireSeconds=excluded.expireSeconds, revision=COALESCE(:revision, data.revision + 1)'
+    )
 
-    def getItem(self, key):
-        key_hex = key
-        key_hex = encoding.to_text(key)
-        self._cursor.execute('SELECT * FROM data WHERE key=:reqKey', {
-            'reqKey': key_hex,
-        })
-
-        row = self._cursor.fetchone()
-        if not row:
-            if _Debug:
-                print('[DHT DB] %r getItem [%s]  return None : did not found key in dataStore' % (self.dbfile, key))
-            return None
+    def setItem(self, key, value, lastPublished, originallyPublished, originalPublisherID, expireSeconds=constants.dataExpireSecondsDefaut, **kwargs):
+        params = self._itemParams(key, value, lastPublished, originallyPublished, originalPublisherID, expireSeconds=expireSeconds, **kwargs)
+        with self._lock:
+            self._db.execute(self._UpsertSQL, params)
+        if _Debug:
+            print('[DHT DB] %r setItem  stored value for key [%s]' % (self.dbFile, key))
+
+    def setItems(self, items):
+        """
+        Store many records in a single transaction, every item is a dictionary with same arguments as C{setItem()} accepts.
+        """
+        params = [self._itemParams(**item) for item in items]
+        with self._lock:
+            self._db.execute('BEGIN')
+            try:
+                self._db.executemany(self._UpsertSQL, params)
+            except:
+                self._db.execute('ROLLBACK')
+                raise
+            self._db.execute('COMMIT')
+        return len(params)
+
+    def removeItems(self, keys):
+        """
+        Remove many records in a single transaction.
+        """
+        with self._lock:
+            self._db.execute('BEGIN')
+            try:
+                self._db.executemany('DELETE FROM data WHERE key=?', [(encoding.to_text(k), ) for k in keys])
+            except:
+                self._db.execute('ROLLBACK')
+                raise
+            self._db.execute('COMMIT')
+
+    def removeExpired(self, now, skipKeys=()):
+        """
+        Remove all records which were originally published more than C{expireSeconds} ago.
+        Returns number of removed records.
+        """
+        skip = [encoding.to_text(k) for k in skipKeys]
+        with self._lock:
+            cur = self._db.execute(
+                'DELETE FROM data WHERE originallyPublished + expireSeconds < ? AND expireSeconds > 0 AND originallyPublished > 0 AND key NOT IN (%s)' % ','.join('?'*len(skip)),
+                [now] + skip,
+            )
+            return cur.rowcount
 
+    def _rowToItem(self, row):
         v = row[1]
         if isinstance(v, buffer):
             v = encoding.to_text(v)
-
         v = json.loads(v)
-
         # TODO: check / verify v['k'] against key_hex
         # TODO: check / verify v['v'] against PROTOCOL_VERSION
-
-        value = v['d']
-
-        key_orig = row[0]
-
-        # TODO: check / verify key_orig against key
-
-        opID = row[4] or None
-
-        result = dict(
-            key=key_orig,
-            value=value,
+        return dict(
+            key=row[0],
+            value=v['d'],
             lastPublished=row[2],
             originallyPublished=row[3],
-            originalPublisherID=opID,
+            originalPublisherID=row[4] or None,
             expireSeconds=row[5],
             revision=row[6],
         )
 
+    def getItem(self, key):
+        key_hex = encoding.to_text(key)
+        with self._lock:
+            row = self._db.execute('SELECT key, value, lastPublished, originallyPublished, originalPublisherID, expireSeconds, revision FROM data WHERE key=:reqKey', {
+                'reqKey': key_hex,
+            }).fetchone()
+        if not row:
+            if _Debug:
+                print('[DHT DB] %r getItem [%s]  return None : did not found key in dataStore' % (self.dbFile, key))
+            return None
+        result = self._rowToItem(row)
         if _Debug:
             print('[DHT DB] %r getItem   found one record for key [%s], revision is %d' % (self.dbFile, key, row[6]))
         return result
 
     def getAllItems(self):
-        self._cursor.execute('SELECT * FROM data')
-        rows = self._cursor.fetchall()
-        items = []
-        for row in rows:
-
-            v = row[1]
-            if isinstance(v, buffer):
-                v = encoding.to_text(v)
-
-            v = json.loads(v)
-
-            # TODO: check / verify v['k'] against key_hex
-            # TODO: check / verify v['v'] against PROTOCOL_VERSION
-
-            value = v['d']
-
-            _k = row[0]
-            _opID = row[4] or None
-
-            items.append(dict(
-                value=value,
-                lastPublished=row[2],
-                originallyPublished=row[3],
-                originalPublisherID=_opID,
-                expireSeconds=row[5],
-                revision=row[6],
-            ))
-        return items
+        with self._lock:
+            rows = self._db.execute('SELECT key, value, lastPublished, originallyPublished, originalPublisherID, expireSeconds, revision FROM data').fetchall()
+        return [self._rowToItem(row) for row in rows]
@@ -1902,15 +1902,17 @@ class MultiLayerNode(Node):
         if _Debug:
             print('[DHT NODE]    republishData called, node: %r' % self.layers[layerID])
         expiredKeys = []
-        for key in self._dataStores[layerID].keys():
+        replicatedItems = []
+        now = int(time.time())
+        # read all records at once instead of doing a query for every key
+        for itemData in self._dataStores[layerID].getAllItems():
+            key = itemData['key']
             if _Debug:
                 print('[DHT NODE]        %r' % key)
             # Filter internal variables stored in the datastore
             if key == 'nodeState':
                 continue
 
-            now = int(time.time())
-            itemData = self._dataStores[layerID].getItem(key)
             originallyPublished = itemData['originallyPublished']
             originalPublisherID = itemData['originalPublisherID']
             lastPublished = itemData['lastPublished']
@@ -1940,14 +1942,19 @@ class MultiLayerNode(Node):
                     twisted.internet.reactor.callFromThread(  # @UndefinedVariable
                         self.iterativeStore,
                         key=key,
-                        value=self._dataStore[key],
+                        value=itemData['value'],
                         originalPublisherID=originalPublisherID,
                         age=age,
                         expireSeconds=expireSeconds,
                         layerID=layerID,
                     )
-        for key in expiredKeys:
-            del self._dataStores[layerID][key]
+                    # remember when the data was replicated, so it is not sent again on the next refresh
+                    itemData['lastPublished'] = now
+                    replicatedItems.append(itemData)
+        if replicatedItems:
+            self._dataStores[layerID].setItems(replicatedItems)
+        if expiredKeys:
+            self._dataStores[layerID].removeItems(expiredKeys)
 
 if __name__ == '__main__':
     import sys
@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+# backup_raid.py
+#
+# Copyright (C) 2008 Veselin Penev, https://bitdust.io
+#
+# This file (backup_raid.py) is part of BitDust Software.
+#
+# BitDust is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# BitDust Software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with BitDust Software.  If not, see <http://www.gnu.org/licenses/>.
+#
+# Please contact us if you have any questions at bitdust.io@gmail.com
+
+# Benchmark of the RAID stage of backup.doBlockPushAndRaid(): every serialized block
+# is passed to raid make via a temporary file (old way) or directly from memory.
+# call with parameters like that:
+#     python tests/experiments/backup_raid.py [total size in MB] [block size in MB] [ecc map]
+
+from __future__ import absolute_import
+from __future__ import print_function
+import os
+import sys
+import time
+import shutil
+import tempfile
+
+sys.path.insert(0, os.path.abspath('.'))
+sys.path.insert(0, os.path.abspath('..'))
+
+from bitdust.raid import make
+
+
+def _with_temp_file(tmpdir, blocks, ecc_map, target_dir):
+    for block_number, serialized_block in enumerate(blocks):
+        fileno, filename = tempfile.mkstemp('.raid', '', tmpdir)
+        os.write(fileno, str(len(serialized_block)).encode() + b':' + serialized_block)
+        os.close(fileno)
+        make.do_in_memory(filename, ecc_map, 'F1', block_number, target_dir)
+        os.remove(filename)
+
+
+def _in_memory(tmpdir, blocks, ecc_map, target_dir):
+    for block_number, serialized_block in enumerate(blocks):
+        make.do_in_memory_data('F1/%d' % block_number, str(len(serialized_block)).encode() + b':' + serialized_block, ecc_map, 'F1', block_number, target_dir)
+
+
+def run(total_size, block_size, ecc_map):
+    # the same random block is used many times to not keep 1GB in memory
+    block = os.urandom(block_size)
+    blocks_count = max(1, int(total_size/block_size))
+    tmpdir = tempfile.mkdtemp(prefix='backup_raid_')
+    try:
+        for label, method in (('temp file', _with_temp_file), ('in memory', _in_memory)):
+            target_dir = os.path.join(tmpdir, label.replace(' ', '_'))
+            t = time.time()
+            method(tmpdir, (block for _ in range(blocks_count)), ecc_map, target_dir)
+            dt = time.time() - t
+            shutil.rmtree(target_dir, ignore_errors=True)
+            print('%-10s %d blocks x %d bytes with %s : %.3f sec, %.1f MB/sec' % (
+                label,
+                blocks_count,
+                block_size,
+                ecc_map,
+                dt,
+                blocks_count*block_size/dt/(1024.0*1024.0),
+            ))
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+def main():
+    total_size = int(sys.argv[1] if len(sys.argv) > 1 else 1024)*1024*1024
+    block_size = int(sys.argv[2] if len(sys.argv) > 2 else 4)*1024*1024
+    ecc_map = sys.argv[3] if len(sys.argv) > 3 else 'ecc/18x18'
+    run(total_size, block_size, ecc_map)
+
+
+if __name__ == '__main__':
+    main()
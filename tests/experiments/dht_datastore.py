@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+# dht_datastore.py
+#
+# Copyright (C) 2008 Veselin Penev, https://bitdust.io
+#
+# This file (dht_datastore.py) is part of BitDust Software.
+#
+# BitDust is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# BitDust Software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with BitDust Software.  If not, see <http://www.gnu.org/licenses/>.
+#
+# Please contact us if you have any questions at bitdust.io@gmail.com
+
+# Measures SQLiteVersionedJsonDataStore used by DHT layers: writing and reading many keys,
+# expiration and lookups in a database created with older schema before and after migration.
+# call with parameters like that:
+#     python tests/experiments/dht_datastore.py [number of keys]
+
+from __future__ import absolute_import
+from __future__ import print_function
+import os
+import sys
+import time
+import json
+import shutil
+import hashlib
+import sqlite3
+import tempfile
+
+sys.path.insert(0, os.path.abspath('.'))
+sys.path.insert(0, os.path.abspath('..'))
+
+from bitdust_forks.entangled.kademlia.datastore import SQLiteVersionedJsonDataStore, PROTOCOL_VERSION  # @UnresolvedImport
+
+
+def make_key(i):
+    return hashlib.sha1(('key%d' % i).encode()).hexdigest()
+
+
+def make_value(i):
+    return json.dumps({'type': 'benchmark', 'number': i, 'data': 'x'*100})
+
+
+def measure(label, count, func):
+    t = time.time()
+    func()
+    dt = time.time() - t
+    print('    %-40s %8.3f sec   %10.1f ops/sec' % (label, dt, count/dt if dt else 0))
+
+
+def run(count, tmp_dir):
+    now = int(time.time())
+    keys = [make_key(i) for i in range(count)]
+    lookups = keys[::max(1, count//1000)]
+
+    print('%d keys, %d random lookups' % (count, len(lookups)))
+
+    ds1 = SQLiteVersionedJsonDataStore(dbFile=os.path.join(tmp_dir, 'db_single'))
+    measure('setItem() one by one', count, lambda: [ds1.setItem(k, make_value(i), now, now, 'publisher', expireSeconds=60) for i, k in enumerate(keys)])
+
+    ds2 = SQLiteVersionedJsonDataStore(dbFile=os.path.join(tmp_dir, 'db_batch'))
+    items = [dict(key=k, value=make_value(i), lastPublished=now, originallyPublished=now - (i % 2)*120, originalPublisherID='publisher', expireSeconds=60) for i, k in enumerate(keys)]
+    measure('setItems() in one transaction', count, lambda: ds2.setItems(items))
+    measure('setItems() again, update existing', count, lambda: ds2.setItems(items))
+    measure('getItem() for all keys', count, lambda: [ds2.getItem(k) for k in keys])
+    measure('getAllItems()', count, lambda: ds2.getAllItems())
+    measure('removeExpired() half of keys', count//2, lambda: ds2.removeExpired(now))
+    print('        %d keys left' % len(ds2.keys()))
+
+    legacy_path = os.path.join(tmp_dir, 'db_legacy')
+    db = sqlite3.connect(legacy_path)
+    db.execute('CREATE TABLE data(key, value, lastPublished, originallyPublished, originalPublisherID, expireSeconds, revision)')
+    db.executemany(
+        'INSERT INTO data VALUES (?, ?, ?, ?, ?, ?, ?)',
+        [(k, json.dumps({'k': k, 'd': make_value(i), 'v': PROTOCOL_VERSION}), now, now, 'publisher', 60, 1) for i, k in enumerate(keys)],
+    )
+    db.commit()
+    measure('legacy schema lookups', len(lookups), lambda: [db.execute('SELECT * FROM data WHERE key=?', (k, )).fetchone() for k in lookups])
+    db.close()
+    t = time.time()
+    ds3 = SQLiteVersionedJsonDataStore(dbFile=legacy_path)
+    print('    %-40s %8.3f sec' % ('migration of legacy schema', time.time() - t))
+    measure('lookups after migration', len(lookups), lambda: [ds3.getItem(k) for k in lookups])
+
+
+def main():
+    count = 100000
+    if len(sys.argv) > 1:
+        count = int(sys.argv[1])
+    tmp_dir = tempfile.mkdtemp(prefix='dht_datastore_')
+    try:
+        run(count, tmp_dir)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+# envelope.py
+#
+# Copyright (C) 2008 Veselin Penev, https://bitdust.io
+#
+# This file (envelope.py) is part of BitDust Software.
+#
+# BitDust is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# BitDust Software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with BitDust Software.  If not, see <http://www.gnu.org/licenses/>.
+#
+# Please contact us if you have any questions at bitdust.io@gmail.com
+
+# Compares JSON and binary envelopes of signed.Packet carrying an encrypted.Block:
+# size of the serialized Data packet and time to serialize / unserialize it.
+# The block itself always uses JSON envelope, because blocks are stored on suppliers as they are.
+# call with parameters like that:
+#     python tests/experiments/envelope.py [payload size in KB] [loops]
+
+from __future__ import absolute_import
+from __future__ import print_function
+import os
+import sys
+import time
+import shutil
+import tempfile
+
+sys.path.insert(0, os.path.abspath('.'))
+sys.path.insert(0, os.path.abspath('..'))
+
+from bitdust.logs import lg
+
+from bitdust.main import settings
+
+from bitdust.lib import serialization
+
+from bitdust.crypt import key
+from bitdust.crypt import signed
+from bitdust.crypt import encrypted
+
+_IDURL = 'http://127.0.0.1:8084/alice.xml'
+_KeyID = 'master$alice@127.0.0.1_8084'
+
+
+def run(payload_size, loops):
+    data = os.urandom(payload_size)
+    session_key = key.NewSessionKey(session_key_type=key.SessionKeyType())
+    for label, version in (('json', serialization.ENVELOPE_JSON), ('binary', serialization.ENVELOPE_BINARY)):
+        block = encrypted.Block(
+            CreatorID=_IDURL,
+            BackupID='master$alice@127.0.0.1_8084:1/F1',
+            BlockNumber=0,
+            SessionKey=session_key,
+            SessionKeyType=key.SessionKeyType(),
+            LastBlock=True,
+            Data=data,
+            EncryptedSessionKey=b'x'*256,
+        )
+        packet = signed.Packet('Data', _IDURL, _IDURL, 'master$alice@127.0.0.1_8084:1/F1/0-0-Data', block.Serialize(), _IDURL, KeyID=_KeyID, EnvelopeVersion=version)
+        t = time.time()
+        for _ in range(loops):
+            raw = signed.Packet(
+                packet.Command, packet.OwnerID, packet.CreatorID, packet.PacketID, block.Serialize(), packet.RemoteID,
+                KeyID=_KeyID, Date=packet.Date, Signature=packet.Signature, EnvelopeVersion=version,
+            ).Serialize()
+        dt_serialize = (time.time() - t)/loops
+        t = time.time()
+        for _ in range(loops):
+            encrypted.Unserialize(signed.Unserialize(raw).Payload)
+        dt_unserialize = (time.time() - t)/loops
+        print('%-7s payload=%d bytes packet=%d bytes (+%.1f%%) serialize=%.2f ms unserialize=%.2f ms' % (
+            label,
+            payload_size,
+            len(raw),
+            100.0*(len(raw) - payload_size)/payload_size,
+            dt_serialize*1000.0,
+            dt_unserialize*1000.0,
+        ))
+
+
+def main():
+    payload_size = int(sys.argv[1] if len(sys.argv) > 1 else 1024)*1024
+    loops = int(sys.argv[2] if len(sys.argv) > 2 else 20)
+    lg.set_debug_level(0)
+    tmpdir = tempfile.mkdtemp(prefix='envelope_')
+    try:
+        settings.init(base_dir=tmpdir)
+        key.GenerateNewKey()
+        run(payload_size, loops)
+    finally:
+        settings.shutdown()
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,561 @@
+#!/usr/bin/env python
+# proxy_relay.py
+#
+# Copyright (C) 2008 Veselin Penev, https://bitdust.io
+#
+# This file (proxy_relay.py) is part of BitDust Software.
+#
+# BitDust is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# BitDust Software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with BitDust Software.  If not, see <http://www.gnu.org/licenses/>.
+#
+# Please contact us if you have any questions at bitdust.io@gmail.com
+
+# Throughput benchmark of the packets relaying done by proxy_router().
+#
+# A router, a routed node and several senders are running inside one process and talking over loopback TCP.
+# Senders are sending packets to the routed node via the router ("in" direction, RelayIn)
+# and the routed node is sending packets to the senders via the router ("out" direction, RelayOut).
+# Router is a real ProxyRouter() instance : incoming packets are passed to _do_forward_inbox_packet()
+# and RelayOut packets to _do_forward_outbox_packet(). Only the user session lookup in gateway()
+# and packet_out.create() are replaced, the last one serializes and writes the packet like packet_out() does
+# and passes it to the loopback connection instead of the transport.
+# Encryption, signing and serialization done by the router are measured separately: those methods are wrapped
+# and their time is excluded from the "route" stage.
+# Every sender keeps a fixed window of packets in flight, so the router is always busy.
+#
+# All nodes are sharing same local key, because BitDust can only have one private key per process.
+# Only the identity of the target node for RelayOut packets is signed with another key.
+# Packets are relayed with RSA protected blocks (--mode rsa) or with route channel keys (--mode channel).
+#
+# Packets mix is a comma separated list of "direction:command:size:weight" items.
+# call with parameters like that:
+#     python tests/experiments/proxy_relay.py --mode both --senders 4 --window 8 --packets 2000 --mix in:Data:4096:3,in:Message:512:1,out:Data:4096:1
+
+from __future__ import absolute_import
+from __future__ import print_function
+import os
+import sys
+import time
+import struct
+import random
+import shutil
+import tempfile
+import argparse
+
+sys.path.insert(0, os.path.abspath('.'))
+sys.path.insert(0, os.path.abspath('..'))
+
+from twisted.internet import reactor  # @UnresolvedImport
+from twisted.internet.protocol import Factory, ClientFactory
+from twisted.protocols.basic import Int32StringReceiver
+
+from bitdust.logs import lg
+
+from bitdust.automats import automat
+
+from bitdust.main import settings
+
+from bitdust.system import tmpfile
+
+from bitdust.lib import serialization
+
+from bitdust.p2p import commands
+
+from bitdust.crypt import key
+from bitdust.crypt import signed
+from bitdust.crypt import encrypted
+from bitdust.crypt import channel_keys
+
+from bitdust.userid import my_id
+from bitdust.userid import id_url
+
+from bitdust.contacts import identitycache
+
+from bitdust.transport import gateway
+from bitdust.transport import packet_out
+
+from bitdust.transport.proxy import proxy_router
+
+#------------------------------------------------------------------------------
+
+STAGES = ('unserialize', 'verify', 'route', 'encrypt', 'sign', 'serialize', 'packet_out', 'transport', 'receive')
+
+# sequence number of the packet and index of the sender, carried in front of every frame
+_Header = struct.Struct('>QH')
+
+#------------------------------------------------------------------------------
+
+
+class Stats(object):
+
+    def __init__(self):
+        self.cpu = dict((stage, 0.0) for stage in STAGES)
+        self.latency = []
+        self.bytes = 0
+        # time spent inside of wrapped calls since last measure(), it is already counted by other stages
+        self.inner = 0.0
+
+    def measure(self, stage, t):
+        t2 = time.process_time()
+        self.cpu[stage] += t2 - t - self.inner
+        self.inner = 0.0
+        return t2
+
+    def wrap(self, stage, func, active):
+        """
+        Count time of every call of ``func`` made while ``active()`` is True towards given stage.
+        Nested wrapped calls are only counted once, by the innermost stage.
+        """
+
+        def _wrapper(*args, **kwargs):
+            if not active():
+                return func(*args, **kwargs)
+            t = time.process_time()
+            outer = self.inner
+            self.inner = 0.0
+            try:
+                return func(*args, **kwargs)
+            finally:
+                dt = time.process_time() - t
+                self.cpu[stage] += dt - self.inner
+                self.inner = outer + dt
+
+        return _wrapper
+
+
+class Info(object):
+
+    """
+    Same fields as gateway() is passing with every inbox packet.
+    """
+
+    def __init__(self, proto, host):
+        self.proto = proto
+        self.host = host
+
+
+class RoutedSession(automat.Automat):
+
+    """
+    Stands for the connection of the routed node with the router, proxy_router() only checks it is connected.
+    """
+
+    def is_connected(self):
+        return True
+
+    def get_proto(self):
+        return 'tcp'
+
+    def get_host(self):
+        return '127.0.0.1:7000'
+
+
+class Node(Int32StringReceiver):
+
+    MAX_LENGTH = 64*1024*1024
+
+    def connectionMade(self):
+        self.factory.bench.on_connected(self)
+
+    def stringReceived(self, frame):
+        self.factory.bench.on_frame_received(self, frame)
+
+
+class NodeFactory(Factory):
+
+    protocol = Node
+
+    def __init__(self, bench):
+        self.bench = bench
+
+
+class NodeClientFactory(ClientFactory):
+
+    protocol = Node
+
+    def __init__(self, bench):
+        self.bench = bench
+
+    def clientConnectionFailed(self, connector, reason):
+        lg.err('connection failed: %r' % reason)
+        self.bench.stop()
+
+
+class Bench(object):
+
+    def __init__(self, mode, mix, senders, window, packets, pool, sender_idurl, on_done):
+        self.mode = mode
+        self.on_done = on_done
+        self.mix = mix
+        self.senders_count = senders
+        self.window = window
+        self.packets = packets
+        self.stats = Stats()
+        self.rand = random.Random(senders*1000 + window)
+        self.my_idurl = my_id.getIDURL()
+        self.sender_idurl = sender_idurl
+        self.publickey = my_id.getLocalIdentity().getPublicKey()
+        self.session = RoutedSession(name='routed_session', state='CONNECTED')
+        self.router = proxy_router.ProxyRouter(name='proxy_router', state='LISTEN')
+        self.router._do_register_route(self.my_idurl, my_id.getLocalIdentity())
+        self.channel = None
+        if mode == 'channel':
+            # see proxy_receiver.ProxyReceiver : _do_register_router_channel() for the routed node side
+            self.router._do_start_route_channel(self.my_idurl, my_id.getLocalIdentity())
+            self.channel = self.router.channels[self.my_idurl.original()]
+            channel_keys.register_channel(self.channel['channel_id'], self.my_idurl, self.channel['secret'])
+        self.pools = [self._make_pool(direction, command, size, pool) for direction, command, size, _ in mix]
+        self.weights = [weight for _, _, _, weight in mix]
+        self.router_listener = None
+        self.routed_listener = None
+        self.router_links = []
+        self.routed_link = None
+        self.router_to_routed = None
+        self.router_to_senders = []
+        self.route_link = None
+        self.senders = []
+        self.sent = 0
+        self.delivered = 0
+        self.in_flight = {}
+        self.routing = None
+        self.wrapped = []
+        self.started = None
+        self.finished = None
+
+    def _make_pool(self, direction, command, size, pool):
+        """
+        Prepare packets to be replayed: plain signed packets for the "in" direction
+        and packets wrapped like proxy_sender() does for the "out" direction.
+        """
+        result = []
+        for i in range(pool):
+            p = signed.Packet(
+                Command=command,
+                OwnerID=self.my_idurl,
+                CreatorID=self.my_idurl,
+                PacketID='%s%d' % (command.lower(), i),
+                Payload=os.urandom(size),
+                RemoteID=self.my_idurl if direction == 'in' else self.sender_idurl,
+            )
+            if direction == 'in':
+                result.append(p.Serialize())
+                continue
+            # see proxy_sender.ProxySender : _do_send_packet_to_router()
+            raw_bytes = serialization.DictToBytes({
+                'f': self.my_idurl.to_bin(),
+                't': self.sender_idurl.to_bin(),
+                'p': p.Serialize(),
+                'w': False,
+                'i': None,
+                'a': False,
+                'r': False,
+            })
+            if self.channel:
+                epoch = channel_keys.current_epoch(self.channel['started'])
+                _, auth_key = channel_keys.derive_keys(self.channel['secret'], epoch)
+                newpacket = signed.Packet(
+                    Command=commands.RelayOut(),
+                    OwnerID=self.my_idurl,
+                    CreatorID=self.my_idurl,
+                    PacketID=p.PacketID,
+                    Payload=channel_keys.encrypt(self.channel['secret'], epoch, raw_bytes),
+                    RemoteID=self.my_idurl,
+                    KeyID=channel_keys.make_key_id(channel_keys.make_reverse_channel_id(self.channel['channel_id']), epoch),
+                    AuthKey=auth_key,
+                    EnvelopeVersion=serialization.ENVELOPE_BINARY,
+                )
+            else:
+                block = encrypted.Block(
+                    CreatorID=self.my_idurl,
+                    BackupID='routed outgoing data',
+                    BlockNumber=0,
+                    SessionKey=key.NewSessionKey(session_key_type=key.SessionKeyType()),
+                    SessionKeyType=key.SessionKeyType(),
+                    LastBlock=True,
+                    Data=raw_bytes,
+                    EncryptKey=lambda inp: key.EncryptOpenSSHPublicKey(self.publickey, inp),
+                )
+                newpacket = signed.Packet(
+                    Command=commands.RelayOut(),
+                    OwnerID=self.my_idurl,
+                    CreatorID=self.my_idurl,
+                    PacketID=p.PacketID,
+                    Payload=block.Serialize(),
+                    RemoteID=self.my_idurl,
+                )
+            result.append(newpacket.Serialize())
+        return result
+
+    #------------------------------------------------------------------------------
+
+    def start(self):
+        gateway.find_active_session = self.find_active_session
+        packet_out.create = self.packet_out_create
+        self.wrap_stages()
+        self.router_listener = reactor.listenTCP(0, NodeFactory(self), interface='127.0.0.1')  # @UndefinedVariable
+        self.routed_listener = reactor.listenTCP(0, NodeFactory(self), interface='127.0.0.1')  # @UndefinedVariable
+        # router connects to the routed node first, then routed node and senders are connecting to the router
+        reactor.connectTCP('127.0.0.1', self.routed_listener.getHost().port, NodeClientFactory(self))  # @UndefinedVariable
+        for _ in range(self.senders_count + 1):
+            reactor.connectTCP('127.0.0.1', self.router_listener.getHost().port, NodeClientFactory(self))  # @UndefinedVariable
+
+    def stop(self):
+        if self.finished is not None:
+            return
+        self.finished = time.perf_counter()
+        for link in self.senders + self.router_links + [self.route_link, self.routed_link, self.router_to_routed]:
+            if link:
+                link.transport.loseConnection()
+        for listener in (self.router_listener, self.routed_listener):
+            if listener:
+                listener.stopListening()
+        self.unwrap_stages()
+        if self.channel:
+            channel_keys.unregister_channel(self.channel['channel_id'])
+        self.router._do_unregister_route(self.my_idurl)
+        self.router.destroy()
+        self.session.destroy()
+        self.on_done(self)
+
+    def wrap_stages(self):
+        """
+        Only the calls made by the router are measured, packets are also created and verified by other nodes.
+        """
+        active = lambda: self.routing is not None
+        for owner, name, stage in (
+            (encrypted.Block, '__init__', 'encrypt'),
+            (channel_keys, 'encrypt', 'encrypt'),
+            (encrypted.Block, 'Sign', 'sign'),
+            (signed.Packet, 'Sign', 'sign'),
+            (channel_keys, 'make_auth_code', 'sign'),
+            (encrypted.Block, 'Serialize', 'serialize'),
+            (signed.Packet, 'Serialize', 'serialize'),
+        ):
+            func = getattr(owner, name)
+            self.wrapped.append((owner, name, func))
+            setattr(owner, name, self.stats.wrap(stage, func, active))
+
+    def unwrap_stages(self):
+        while self.wrapped:
+            owner, name, func = self.wrapped.pop()
+            setattr(owner, name, func)
+
+    def on_connected(self, link):
+        if link.factory.__class__ is NodeFactory:
+            if link.factory is self.routed_listener.factory:
+                self.routed_link = link
+            else:
+                self.router_links.append(link)
+        else:
+            if link.transport.getPeer().port == self.routed_listener.getHost().port:
+                self.router_to_routed = link
+            else:
+                self.senders.append(link)
+        if self.routed_link and self.router_to_routed and len(self.senders) == self.senders_count + 1 and len(self.router_links) == self.senders_count + 1:
+            if self.started is None:
+                # any of the connections to the router can be used by the routed node
+                self.route_link = self.senders.pop(0)
+                router_side = dict((l.transport.getPeer().port, l) for l in self.router_links)
+                self.router_to_senders = [router_side[l.transport.getHost().port] for l in self.senders]
+                self.started = time.perf_counter()
+                for sender_index in range(self.senders_count):
+                    for _ in range(self.window):
+                        self.send_next(sender_index)
+
+    #------------------------------------------------------------------------------
+
+    def send_next(self, sender_index):
+        if self.sent >= self.packets:
+            return
+        self.sent += 1
+        seq = self.sent
+        pos = self.rand.choices(range(len(self.mix)), weights=self.weights)[0]
+        direction = self.mix[pos][0]
+        raw = self.pools[pos][seq % len(self.pools[pos])]
+        self.in_flight[seq] = (time.perf_counter(), sender_index)
+        if direction == 'in':
+            self.senders[sender_index].sendString(_Header.pack(seq, sender_index) + raw)
+        else:
+            self.route_link.sendString(_Header.pack(seq, sender_index) + raw)
+
+    def on_frame_received(self, link, frame):
+        seq, sender_index = _Header.unpack_from(frame)
+        data = frame[_Header.size:]
+        if link is self.routed_link or link in self.senders:
+            self.do_receive(link, seq, data)
+        else:
+            self.do_route(seq, sender_index, data)
+
+    def do_route(self, seq, sender_index, data):
+        """
+        Router receives a packet from the routed node or from other nodes and passes it to proxy_router().
+        """
+        st = self.stats
+        t = time.process_time()
+        newpacket = signed.Unserialize(data)
+        t = st.measure('unserialize', t)
+        if not newpacket or not newpacket.Valid():
+            lg.err('invalid packet %d received by router' % seq)
+            return
+        t = st.measure('verify', t)
+        # packet_out.create() will be called right away and will take the rest
+        self.routing = (seq, sender_index, t)
+        if newpacket.Command == commands.RelayOut():
+            self.router._do_forward_outbox_packet((newpacket, Info('tcp', '127.0.0.1:7000')))
+        else:
+            self.router._do_forward_inbox_packet((self.my_idurl, newpacket, Info('tcp', '127.0.0.1:%d' % sender_index)))
+        if self.routing is not None:
+            self.routing = None
+            lg.err('packet %d was not relayed by the router' % seq)
+
+    def find_active_session(self, proto, host=None, idurl=None):
+        """
+        Replaces gateway.find_active_session() : only the routed node is connected to the router.
+        """
+        if idurl and id_url.field(idurl) == self.my_idurl:
+            return [self.session]
+        return []
+
+    def packet_out_create(self, outpacket, wide, callbacks, route=None, target=None, **kwargs):
+        """
+        Replaces packet_out.create(), see packet_out.PacketOut : doSerializeAndWrite().
+        """
+        st = self.stats
+        seq, sender_index, t = self.routing
+        t = st.measure('route', t)
+        if route:
+            packetdata = route['packet'].Serialize()
+            link = self.router_to_routed
+        else:
+            packetdata = outpacket.Serialize()
+            link = self.router_to_senders[sender_index]
+        self.routing = None
+        t = st.measure('serialize', t)
+        filename = tmpfile.make_buffer('outbox', packetdata, extension='.out')
+        t = st.measure('packet_out', t)
+        link.sendString(_Header.pack(seq, sender_index) + packetdata)
+        tmpfile.erase('outbox', filename, 'sent')
+        st.measure('transport', t)
+        return None
+
+    def do_receive(self, link, seq, data):
+        """
+        Same steps as proxy_receiver() does for incoming RelayIn packets, other nodes only verify the packet.
+        """
+        t = time.process_time()
+        newpacket = signed.Unserialize(data)
+        if not newpacket or not newpacket.Valid():
+            lg.err('invalid packet %d delivered' % seq)
+        elif newpacket.Command == commands.RelayIn():
+            if channel_keys.is_channel_key_id(newpacket.KeyID):
+                inner = channel_keys.decrypt(newpacket.KeyID, newpacket.Payload)
+            else:
+                block = encrypted.Unserialize(newpacket.Payload)
+                session_key = key.DecryptLocalPrivateKey(block.EncryptedSessionKey)
+                inner = key.DecryptWithSessionKey(session_key, block.EncryptedData, session_key_type=block.SessionKeyType)[:int(block.Length)]
+            routed_packet = signed.Unserialize(inner)
+            if not routed_packet:
+                lg.err('failed reading routed packet %d' % seq)
+        self.stats.measure('receive', t)
+        started, sender_index = self.in_flight.pop(seq)
+        self.stats.latency.append(time.perf_counter() - started)
+        self.stats.bytes += len(data)
+        self.delivered += 1
+        if self.delivered >= self.packets:
+            self.stop()
+            return
+        reactor.callLater(0, self.send_next, sender_index)  # @UndefinedVariable
+
+    #------------------------------------------------------------------------------
+
+    def report(self):
+        st = self.stats
+        elapsed = (self.finished or time.perf_counter()) - (self.started or time.perf_counter())
+        latency = sorted(st.latency)
+        total_cpu = sum(st.cpu.values()) or 1.0
+        print('mode=%s senders=%d window=%d delivered=%d/%d elapsed=%.2f sec' % (self.mode, self.senders_count, self.window, self.delivered, self.packets, elapsed))
+        if not latency or not elapsed:
+            return None
+        print('    throughput: %.1f packets/sec, %.2f MB/sec' % (len(latency)/elapsed, st.bytes/elapsed/1024.0/1024.0))
+        print('    latency: p50=%.2f ms p99=%.2f ms max=%.2f ms' % (percentile(latency, 0.5)*1000.0, percentile(latency, 0.99)*1000.0, latency[-1]*1000.0))
+        print('    %-12s %10s %12s %8s' % ('stage', 'cpu sec', 'us/packet', 'share'))
+        for stage in STAGES:
+            print('    %-12s %10.3f %12.1f %7.1f%%' % (stage, st.cpu[stage], st.cpu[stage]*1000000.0/len(latency), 100.0*st.cpu[stage]/total_cpu))
+        return len(latency)/elapsed
+
+
+def percentile(sorted_values, p):
+    return sorted_values[min(len(sorted_values) - 1, int(round(p*(len(sorted_values) - 1))))]
+
+
+def parse_mix(mix):
+    result = []
+    for item in mix.split(','):
+        direction, command, size, weight = item.strip().split(':')
+        if direction not in ('in', 'out'):
+            raise ValueError('direction must be "in" or "out": %r' % item)
+        result.append((direction, command, int(size), float(weight)))
+    return result
+
+
+def run(modes, mix, senders, window, packets, pool, sender_idurl):
+    """
+    Reactor can not be restarted, so all benchmarks are running one by one inside one reactor loop.
+    """
+    results = []
+
+    def _start_next(bench=None):
+        if bench:
+            results.append(bench.report())
+        if len(results) == len(modes):
+            reactor.stop()  # @UndefinedVariable
+            return
+        Bench(modes[len(results)], mix, senders, window, packets, pool, sender_idurl, on_done=lambda b: reactor.callLater(0, _start_next, b)).start()  # @UndefinedVariable
+
+    reactor.callWhenRunning(_start_next)  # @UndefinedVariable
+    reactor.run()  # @UndefinedVariable
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='measure how many packets per second proxy_router() can relay')
+    parser.add_argument('--mode', choices=('rsa', 'channel', 'both'), default='both')
+    parser.add_argument('--mix', default='in:Data:4096:3,in:Message:512:1,out:Data:4096:1')
+    parser.add_argument('--senders', type=int, default=4)
+    parser.add_argument('--window', type=int, default=8, help='packets in flight per sender')
+    parser.add_argument('--packets', type=int, default=2000)
+    parser.add_argument('--pool', type=int, default=10, help='prepared packets per mix item')
+    args = parser.parse_args()
+    mix = parse_mix(args.mix)
+    lg.set_debug_level(0)
+    tmpdir = tempfile.mkdtemp(prefix='proxy_relay_')
+    try:
+        settings.init(base_dir=tmpdir)
+        tmpfile.init(os.path.join(tmpdir, 'temp'))
+        # router must know identity of the target node to relay RelayOut packets, it is signed with another key
+        key.GenerateNewKey()
+        sender_ident = my_id.buildDefaultIdentity(name='sender', ip='127.0.0.1', idurls=[b'http://127.0.0.1:8084/sender.xml'])
+        key.GenerateNewKey()
+        my_id.setLocalIdentity(my_id.buildDefaultIdentity(name='relay', ip='127.0.0.1', idurls=[b'http://127.0.0.1:8084/relay.xml']))
+        identitycache.UpdateAfterChecking(my_id.getIDURL().to_bin(), my_id.getLocalIdentity().serialize())
+        identitycache.UpdateAfterChecking(sender_ident.getIDURL().to_bin(), sender_ident.serialize())
+        modes = ('rsa', 'channel') if args.mode == 'both' else (args.mode, )
+        run(modes, mix, args.senders, args.window, args.packets, args.pool, id_url.field(sender_ident.getIDURL()))
+    finally:
+        tmpfile.shutdown()
+        settings.shutdown()
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+# raid_parity.py
+#
+# Copyright (C) 2008 Veselin Penev, https://bitdust.io
+#
+# This file (raid_parity.py) is part of BitDust Software.
+#
+# BitDust is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# BitDust Software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with BitDust Software.  If not, see <http://www.gnu.org/licenses/>.
+#
+# Please contact us if you have any questions at bitdust.io@gmail.com
+
+# Micro-benchmark of the RAID parity engines available in raid.make.do_in_memory()
+# call with parameters like that:
+#     python tests/experiments/raid_parity.py [block size in bytes] [repeats]
+
+from __future__ import absolute_import
+from __future__ import print_function
+import os
+import sys
+import time
+import shutil
+import tempfile
+
+sys.path.insert(0, os.path.abspath('.'))
+sys.path.insert(0, os.path.abspath('..'))
+
+from bitdust.raid import make
+
+ECC_MAPS = ('ecc/4x4', 'ecc/7x7', 'ecc/18x18')
+ENGINES = ('array', 'bigint')
+
+
+def _read_segments(dirpath):
+    result = {}
+    for filename in sorted(os.listdir(dirpath)):
+        with open(os.path.join(dirpath, filename), 'rb') as f:
+            result[filename] = f.read()
+    return result
+
+
+def run(block_size, repeats):
+    source_data = os.urandom(block_size)
+    tmpdir = tempfile.mkdtemp(prefix='raid_parity_')
+    try:
+        for ecc_map in ECC_MAPS:
+            timings = {}
+            outputs = {}
+            for engine in ENGINES:
+                best = None
+                for _ in range(repeats):
+                    source_path = os.path.join(tmpdir, 'source')
+                    target_dir = os.path.join(tmpdir, engine)
+                    shutil.rmtree(target_dir, ignore_errors=True)
+                    with open(source_path, 'wb') as f:
+                        f.write(source_data)
+                    t = time.time()
+                    make.do_in_memory(source_path, ecc_map, 'F1', 1, target_dir, engine=engine)
+                    dt = time.time() - t
+                    best = dt if best is None else min(best, dt)
+                timings[engine] = best
+                outputs[engine] = _read_segments(target_dir)
+            identical = outputs['array'] == outputs['bigint']
+            print('%-10s block=%d bytes  array: %.4f sec  bigint: %.4f sec  speedup: x%.1f  identical: %r' % (
+                ecc_map,
+                block_size,
+                timings['array'],
+                timings['bigint'],
+                timings['array']/max(timings['bigint'], 0.000001),
+                identical,
+            ))
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+def main():
+    block_size = int(sys.argv[1]) if len(sys.argv) > 1 else 1024*1024
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    run(block_size, repeats)
+
+
+if __name__ == '__main__':
+    main()
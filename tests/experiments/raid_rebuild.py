@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+# raid_rebuild.py
+#
+# Copyright (C) 2008 Veselin Penev, https://bitdust.io
+#
+# This file (raid_rebuild.py) is part of BitDust Software.
+#
+# BitDust is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# BitDust Software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with BitDust Software.  If not, see <http://www.gnu.org/licenses/>.
+#
+# Please contact us if you have any questions at bitdust.io@gmail.com
+
+# Measures how fast raid.read.RebuildOne() reconstructs a missing segment
+# and compares it with the old byte by byte XOR loop.
+# call with parameters like that:
+#     python tests/experiments/raid_rebuild.py [segment size in bytes] [number of segments]
+
+from __future__ import absolute_import
+from __future__ import print_function
+import os
+import sys
+import time
+import shutil
+import tempfile
+
+sys.path.insert(0, os.path.abspath('.'))
+sys.path.insert(0, os.path.abspath('..'))
+
+from bitdust.raid import read
+
+
+def rebuild_by_bytes(inlist, outfilename):
+    """
+    Same XOR loop RebuildOne() was doing before : one byte of every segment at a time.
+    """
+    segments = []
+    for filename in inlist:
+        with open(filename, 'rb') as f:
+            segments.append(f.read())
+    result = bytearray(len(segments[0]))
+    for i in range(len(result)):
+        for segment in segments:
+            result[i] ^= segment[i]
+    with open(outfilename, 'wb') as f:
+        f.write(result)
+
+
+def run(segment_size, segments_count):
+    tmpdir = tempfile.mkdtemp(prefix='raid_rebuild_')
+    try:
+        inlist = []
+        for i in range(segments_count):
+            inlist.append(os.path.join(tmpdir, '%d-Data' % i))
+            with open(inlist[-1], 'wb') as f:
+                f.write(os.urandom(segment_size))
+        timings = {}
+        outputs = {}
+        for label, method in (
+            ('bytes', lambda outfilename: rebuild_by_bytes(inlist, outfilename)),
+            ('segments', lambda outfilename: read.RebuildOne(inlist, len(inlist), outfilename)),
+        ):
+            outfilename = os.path.join(tmpdir, 'rebuilt_%s' % label)
+            t = time.time()
+            method(outfilename)
+            timings[label] = time.time() - t
+            with open(outfilename, 'rb') as f:
+                outputs[label] = f.read()
+        print('segment=%d bytes x %d  bytes: %.4f sec  segments: %.4f sec  speedup: x%.1f  identical: %r' % (
+            segment_size,
+            segments_count,
+            timings['bytes'],
+            timings['segments'],
+            timings['bytes']/max(timings['segments'], 0.000001),
+            outputs['bytes'] == outputs['segments'],
+        ))
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+def main():
+    segment_size = int(sys.argv[1]) if len(sys.argv) > 1 else 1024*1024
+    segments_count = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    run(segment_size, segments_count)
+
+
+if __name__ == '__main__':
+    main()
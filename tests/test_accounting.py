@@ -0,0 +1,142 @@
+from unittest import TestCase
+import os
+import shutil
+import tempfile
+
+from bitdust.logs import lg
+
+from bitdust.system import bpio
+
+from bitdust.main import settings
+
+from bitdust.storage import accounting
+
+from bitdust.userid import identity
+from bitdust.userid import id_url
+
+alice = b'http://127.0.0.1:8084/alice.xml'
+bob = b'http://127.0.0.1:8084/bob.xml'
+hans1 = 'http://first.com/hans.xml'
+hans2 = 'http://second.net/hans.xml'
+
+# same customer with rotated IDURL
+_HansIdentities = {
+    'hans1':
+    """<?xml version="1.0" encoding="utf-8"?>
+        <identity>
+          <sources>
+            <source>http://first.com/hans.xml</source>
+            <source>http://second.net/hans.xml</source>
+          </sources>
+          <contacts>
+            <contact>tcp://127.0.0.1:7457</contact>
+          </contacts>
+          <certificates/>
+          <scrubbers/>
+          <postage>1</postage>
+          <date>Jul 01, 2019</date>
+          <version></version>
+          <revision>0</revision>
+          <publickey>ssh-rsa AAAAB3NzaC1yc2EAAAADAQABAAABAQCiMX5AjFoK+B8bEts97OEKkJmONy8wDVSTe4Sx356p1fd48UQHq0g3xphfEWqZNVEvvXyVT3ToJZpsn6ZXALR6awp1EosV0Y3eCRn3HJ7VFifsObEBaJlbIpPWO3a44yQuNmB18dpAZsOYF0fuv9O9JZF/r2aS3DwJKKvrb1raPtuOkmLvMFOyFzQ4CzbpzOhxfLyk4VyyqWtxgRWa3cLJRC1s8pZP+Eeujz9lUXJOBJkz458myjcNogZ60HqMWPmNEQxKQKxKz5s1KhTzEa13AbK3mfBz6GYRSUE4PgzPNGt3ggKjm109MCECVLJ20i41l1x0LQogH4io0zN1KGFJ</publickey>
+          <signature>13068553383637753085388545974152093609980484012770452572120600195304903547295645115743544723314736720580808645983593697230309177682054712275065288665744892926477896400614384619512508972942866186572904043048207845632626832350683561290105271937200406689170558357079802162498698787054408426873656285478048378799191423141745937328344899208835186975874729426520455853791306586430419171014111851754881354985456443997095404651969419163775186405638979606072817375092764901667492456855939205354792829575562245938026302306124652445463109637611383925691836897970969979043999831425972117577943735372131767450971245110225874441582</signature>
+        </identity>""",
+    'hans2':
+    """<?xml version="1.0" encoding="utf-8"?>
+        <identity>
+          <sources>
+            <source>http://second.net/hans.xml</source>
+            <source>http://third.org/hans.xml</source>
+          </sources>
+          <contacts>
+            <contact>tcp://127.0.0.1:7457</contact>
+          </contacts>
+          <certificates/>
+          <scrubbers/>
+          <postage>1</postage>
+          <date>Jul 01, 2019</date>
+          <version></version>
+          <revision>1</revision>
+          <publickey>ssh-rsa AAAAB3NzaC1yc2EAAAADAQABAAABAQCiMX5AjFoK+B8bEts97OEKkJmONy8wDVSTe4Sx356p1fd48UQHq0g3xphfEWqZNVEvvXyVT3ToJZpsn6ZXALR6awp1EosV0Y3eCRn3HJ7VFifsObEBaJlbIpPWO3a44yQuNmB18dpAZsOYF0fuv9O9JZF/r2aS3DwJKKvrb1raPtuOkmLvMFOyFzQ4CzbpzOhxfLyk4VyyqWtxgRWa3cLJRC1s8pZP+Eeujz9lUXJOBJkz458myjcNogZ60HqMWPmNEQxKQKxKz5s1KhTzEa13AbK3mfBz6GYRSUE4PgzPNGt3ggKjm109MCECVLJ20i41l1x0LQogH4io0zN1KGFJ</publickey>
+          <signature>9964338615595898119523219160985389694716834455244251121310208348749311239026480163448985744966067564091031002898262983039746088711129723160991957466541609144298294968214985017280673670405176798626865604720543551314153138295619813468551357860935622955238006750497782286078815952649485259190562480676412057686853832517927221963473242813486514373660489478033158129265672776156687967394550999847921296632829991543789469343181140623972591265599094214576144469741220772769413300453153162888368211327094417654762184709016011327148922218562411856167502006839171679742071717903072564535777785105712764567873880374805969385183</signature>
+        </identity>""",
+}
+
+
+class TestAccountingLedger(TestCase):
+
+    def setUp(self):
+        lg.set_debug_level(0)
+        try:
+            bpio.rmdir_recursive('/tmp/.bitdust_tmp')
+        except Exception:
+            pass
+        settings.init(base_dir='/tmp/.bitdust_tmp')
+        try:
+            os.makedirs(os.path.dirname(settings.CustomersSpaceFile()))
+        except:
+            pass
+
+    def tearDown(self):
+        accounting.shutdown()
+        settings.shutdown()
+        bpio.rmdir_recursive('/tmp/.bitdust_tmp')
+
+    def test_quotas_and_usage(self):
+        self.assertTrue(accounting.check_create_customers_quotas(10000))
+        self.assertFalse(accounting.check_create_customers_quotas(10000))
+        space_dict, free_space = accounting.read_customers_quotas()
+        self.assertEqual((space_dict, free_space), ({}, 10000))
+        space_dict[alice] = 3000
+        self.assertEqual(accounting.read_customers_quotas(), ({}, 10000))
+        accounting.write_customers_quotas(space_dict, 7000)
+        self.assertEqual(bpio._read_dict(settings.CustomersSpaceFile()), {
+            'free': '7000',
+            'http://127.0.0.1:8084/alice.xml': '3000',
+        })
+        self.assertEqual(accounting.get_customer_quota(alice), 3000)
+        self.assertIsNone(accounting.get_customer_quota(bob))
+        self.assertIsNone(accounting.get_customer_usage(alice))
+        self.assertEqual(accounting.add_customer_usage(alice, 500), 500)
+        self.assertEqual(accounting.add_customer_usage(alice, 200), 700)
+        self.assertEqual(accounting.add_customer_usage(alice, -1000), 0)
+        self.assertEqual(accounting.add_customer_usage(alice, 100), 100)
+        self.assertFalse(os.path.isfile(settings.CustomersUsedSpaceFile()))
+        self.assertTrue(accounting.flush_ledger())
+        self.assertFalse(accounting.flush_ledger())
+        self.assertEqual(bpio._read_dict(settings.CustomersUsedSpaceFile()), {
+            'http://127.0.0.1:8084/alice.xml': '100',
+        })
+        self.assertEqual(accounting.add_customer_usage(bob, 300), 300)
+        # only given customers are updated
+        accounting.update_customers_usage({alice: '150'})
+        accounting.shutdown()
+        self.assertEqual(accounting.read_customers_usage(), {alice: '150', bob: '300'})
+        self.assertEqual(accounting.get_customer_usage(alice), 150)
+        self.assertEqual(accounting.read_customers_quotas(), ({alice: '3000'}, 7000))
+
+    def _cache_identity(self, idname):
+        some_identity = identity.identity(xmlsrc=_HansIdentities[idname])
+        self.assertTrue(some_identity.Valid())
+        id_url.identity_cached(some_identity)
+        return some_identity
+
+    def test_rotated_customer_usage(self):
+        id_url._IdentityHistoryDir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, id_url._IdentityHistoryDir, True)
+        id_url.init()
+        self.addCleanup(id_url.shutdown)
+        os.makedirs('/tmp/.bitdust_tmp/identitycache/', exist_ok=True)
+        self._cache_identity('hans1')
+        self.assertEqual(accounting.add_customer_usage(hans1, 500), 500)
+        self._cache_identity('hans2')
+        self.assertIsNone(accounting.get_customer_usage(hans2))
+        self.assertTrue(accounting.rotate_customer_usage(hans1))
+        self.assertFalse(accounting.rotate_customer_usage(hans1))
+        self.assertEqual(accounting.get_customer_usage(hans1), 500)
+        self.assertEqual(accounting.get_customer_usage(hans2), 500)
+        self.assertEqual(accounting.add_customer_usage(hans2, 100), 600)
+        self.assertEqual(list(accounting.read_customers_usage().keys()), [id_url.field(hans2).to_bin()])
+        # value stored with the old IDURL is replaced when used space was re-calculated
+        accounting._Usage[hans1.encode()] = '50'
+        accounting.update_customers_usage({hans2: '200'})
+        self.assertEqual(accounting.read_customers_usage(), {id_url.field(hans2).to_bin(): '200'})
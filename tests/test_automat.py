@@ -0,0 +1,102 @@
+from unittest import TestCase
+
+from twisted.internet import task
+
+from bitdust.automats import automat
+
+
+class SampleMachine(automat.Automat):
+
+    timers = {
+        'timer-1sec': (1.0, ['ON']),
+        'timer-10sec': (10.0, ['ON', 'OFF']),
+    }
+
+    def init(self):
+        self.fired = []
+
+    def A(self, event, *args, **kwargs):
+        self.fired.append(event)
+        if event == 'switch':
+            self.state = 'OFF' if self.state == 'ON' else 'ON'
+        return self.state
+
+
+class TestTimerWheel(TestCase):
+
+    def setUp(self):
+        self.clock = task.Clock()
+
+    def test_periodic_timers(self):
+        wheel = automat.TimerWheel(tick=0.01, slots=4, levels=3, clock=self.clock)
+        fired = {}
+        timers = {}
+        for interval in (0.01, 0.03, 0.05, 0.2, 1.0, 3.0):
+            fired[interval] = 0
+            timers[interval] = wheel.arm(lambda i: fired.__setitem__(i, fired[i] + 1), (interval, ), interval, owner='T')
+        self.assertEqual(wheel.stats(), {'T': 6})
+        for _ in range(600):
+            self.clock.advance(0.01)
+        self.assertEqual(fired[0.01], 600)
+        self.assertEqual(fired[0.03], 200)
+        self.assertEqual(fired[0.05], 120)
+        self.assertEqual(fired[0.2], 30)
+        self.assertEqual(fired[1.0], 6)
+        self.assertEqual(fired[3.0], 2)
+        self.assertTrue(wheel.disarm(timers[0.01]))
+        self.assertFalse(wheel.disarm(timers[0.01]))
+        self.clock.advance(1.0)
+        self.assertEqual(fired[0.01], 600)
+        self.assertEqual(fired[1.0], 7)
+        for t in list(timers.values()):
+            wheel.disarm(t)
+        self.assertEqual(wheel.stats(), {})
+        self.assertEqual(wheel.size(), 0)
+        self.assertEqual(self.clock.getDelayedCalls(), [])
+
+    def test_long_timer_with_big_jump(self):
+        wheel = automat.TimerWheel(tick=0.01, slots=4, levels=2, clock=self.clock)
+        fired = []
+        wheel.arm(fired.append, ('x', ), 5.0, owner='T')
+        self.clock.advance(4.99)
+        self.assertEqual(fired, [])
+        self.clock.advance(0.01)
+        self.assertEqual(fired, ['x'])
+        self.clock.advance(5.0)
+        self.assertEqual(fired, ['x', 'x'])
+
+    def test_stall_is_coalesced(self):
+        wheel = automat.TimerWheel(tick=0.01, slots=4, levels=3, clock=self.clock)
+        fired = []
+        wheel.arm(fired.append, ('x', ), 0.1, owner='T')
+        self.clock.advance(0.1)
+        self.assertEqual(len(fired), 1)
+        # reactor was blocked for 10 seconds
+        self.clock.advance(10.0)
+        self.assertEqual(len(fired), 2)
+        # next period is counted from the current tick
+        self.clock.advance(0.09)
+        self.assertEqual(len(fired), 2)
+        self.clock.advance(0.01)
+        self.assertEqual(len(fired), 3)
+
+    def test_automat_timers(self):
+        old_wheel = automat._TimerWheel
+        automat._TimerWheel = automat.TimerWheel(clock=self.clock)
+        try:
+            m = SampleMachine('sample', 'ON')
+            self.assertEqual(automat.timers_stats(), {'SampleMachine': 2})
+            for _ in range(3):
+                self.clock.advance(1.0)
+            self.assertEqual(m.fired.count('timer-1sec'), 3)
+            m.automat('switch')
+            self.assertEqual(m.state, 'OFF')
+            self.assertEqual(automat.timers_stats(), {'SampleMachine': 1})
+            self.clock.advance(10.0)
+            self.assertEqual(m.fired.count('timer-1sec'), 3)
+            self.assertEqual(m.fired.count('timer-10sec'), 1)
+            m.destroy()
+            self.assertEqual(automat.timers_stats(), {})
+        finally:
+            automat._TimerWheel.clear()
+            automat._TimerWheel = old_wheel
@@ -0,0 +1,57 @@
+from unittest import TestCase
+
+from bitdust.logs import lg
+
+from bitdust.storage import backup_matrix
+
+
+class TestBlocksMatrix(TestCase):
+
+    def setUp(self):
+        lg.set_debug_level(0)
+
+    def test_cells(self):
+        m = backup_matrix.BlocksMatrix(3)
+        self.assertEqual(len(m), 0)
+        m.set_both(0, 0, 1, 1)
+        m.set_both(0, 1, 1, -1)
+        m.set(2, 'Data', 2, 1)
+        m.set(2, 'Parity', 2, -1)
+        self.assertEqual(m.keys(), [0, 2])
+        self.assertNotIn(1, m)
+        self.assertEqual(m.get(2, 'Data', 2), 1)
+        self.assertEqual(m.get(2, 'Parity', 2), -1)
+        self.assertRaises(KeyError, m.get, 1, 'Data', 0)
+        self.assertRaises(IndexError, m.set, 0, 'Data', 3, 1)
+        self.assertEqual(m.to_dict(), {
+            0: {'D': [1, 1, 0], 'P': [1, -1, 0]},
+            2: {'D': [0, 0, 1], 'P': [0, 0, -1]},
+        })
+        self.assertEqual(m.row(1, 'D'), [0, 0, 0])
+        self.assertEqual(m.unknown_blocks(5), [1, 3, 4])
+        self.assertEqual(m.count_pieces(0), 2)
+        self.assertEqual(m.count_pieces(2), 1)
+        self.assertEqual(m.count_pieces(5), 0)
+        self.assertEqual(m.clear_supplier(0), 2)
+        self.assertEqual(m.clear_supplier(1), 1)
+        self.assertEqual(m.block(0), {'D': [0, 0, 0], 'P': [0, -1, 0]})
+        self.assertEqual(m.clear_supplier(1, table=backup_matrix._CLEAR_ALL), 0)
+        self.assertEqual(m.block(0)['P'], [0, 0, 0])
+
+    def test_scans(self):
+        m = backup_matrix.BlocksMatrix(4)
+        for blockNum in range(4):
+            for supplierNum in range(4):
+                m.set_both(blockNum, supplierNum, 1, 1)
+        self.assertEqual(backup_matrix._find_weak_block(m, 4, 4, [0, 1, 2, 3]), (-1, 4))
+        m.set(1, 'Parity', 2, -1)
+        m.set(3, 'Data', 0, 0)
+        m.set(3, 'Data', 3, 0)
+        self.assertEqual(backup_matrix._find_weak_block(m, 4, 4, [0, 1, 2, 3]), (3, 2))
+        self.assertEqual(backup_matrix._find_weak_block(m, 3, 4, [0, 1, 2, 3]), (1, 3))
+        self.assertEqual(backup_matrix._find_weak_block(m, 3, 4, [0, 1, 3]), (0, 3))
+        col = m.column(2, 6)
+        self.assertEqual(backup_matrix._positions(col.translate(backup_matrix._NOT_BOTH_PRESENT)), [1, 4, 5])
+        self.assertEqual(backup_matrix._positions(col.translate(backup_matrix._DATA_PRESENT)), [0, 1, 2, 3])
+        flags = backup_matrix._and_not(m.column(1, 4).translate(backup_matrix._DATA_PRESENT), m.column(0, 4).translate(backup_matrix._DATA_PRESENT))
+        self.assertEqual(backup_matrix._positions(flags), [3])
@@ -1,6 +1,7 @@
 import os
+import time
 
-from unittest import TestCase
+from unittest import TestCase, mock
 
 from bitdust.logs import lg
 
@@ -10,6 +11,7 @@ from bitdust.main import settings
 
 from bitdust.crypt import key
 from bitdust.crypt import signed
+from bitdust.crypt import channel_keys
 
 from bitdust.contacts import identitycache
 
@@ -162,3 +164,131 @@ class Test(TestCase):
             raw1 = p1.Serialize()
             p2 = signed.Unserialize(raw1)
             self.assertTrue(p2.Valid())
+
+    def test_public_keys_cache(self):
+        key.InitMyKey()
+        key.ClearPublicKeysCache()
+        p1 = signed.Packet(
+            'Data',
+            my_id.getIDURL(),
+            my_id.getIDURL(),
+            'SomeID',
+            os.urandom(1024),
+            self.bob_ident.getIDURL(),
+        )
+        for _ in range(5):
+            self.assertTrue(signed.Unserialize(p1.Serialize()).Valid())
+        stats = key.PublicKeysCacheStats()
+        self.assertEqual(stats['size'], 1)
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['hits'], 4)
+        self.assertTrue(self.bob_ident.Valid())
+        self.assertEqual(key.PublicKeysCacheStats()['size'], 2)
+        self.assertTrue(key.ForgetPublicKey(my_id.getLocalIdentity().getPublicKey()))
+        self.assertFalse(key.ForgetPublicKey(my_id.getLocalIdentity().getPublicKey()))
+        self.assertTrue(p1.Valid())
+        stats = key.PublicKeysCacheStats()
+        self.assertEqual(stats['size'], 2)
+        self.assertEqual(stats['misses'], 3)
+
+    def test_channel_keys(self):
+        key.InitMyKey()
+        channel_id = channel_keys.new_channel_id()
+        secret = channel_keys.new_secret()
+        encrypted_secret = key.EncryptOpenSSHPublicKey(my_id.getLocalIdentity().getPublicKey(), secret)
+        self.assertEqual(key.DecryptLocalPrivateKey(encrypted_secret), secret)
+        data = os.urandom(1024)
+        packets = []
+        for epoch in range(3):
+            _, auth_key = channel_keys.derive_keys(secret, epoch)
+            p1 = signed.Packet(
+                'Relay',
+                my_id.getIDURL(),
+                my_id.getIDURL(),
+                'SomeID',
+                channel_keys.encrypt(secret, epoch, data),
+                self.bob_ident.getIDURL(),
+                KeyID=channel_keys.make_key_id(channel_id, epoch),
+                AuthKey=auth_key,
+            )
+            packets.append(signed.Unserialize(p1.Serialize()))
+        self.assertNotEqual(channel_keys.derive_keys(secret, 0), channel_keys.derive_keys(secret, 1))
+        self.assertFalse(packets[0].Valid())
+        channel_keys.register_channel(channel_id, self.bob_ident.getIDURL(), secret)
+        self.assertFalse(packets[0].Valid())
+        # channel was started one epoch ago, so keys of epochs 0, 1 and 2 are accepted now
+        started = time.time() - channel_keys.EPOCH_LIFETIME
+        channel_keys.register_channel(channel_id, my_id.getIDURL(), secret, started=started)
+        for p2 in packets:
+            self.assertTrue(p2.Valid())
+            self.assertEqual(channel_keys.decrypt(p2.KeyID, p2.Payload), data)
+        # two epochs later packets of the first epoch are not accepted anymore
+        with mock.patch.object(channel_keys.time, 'time', lambda: started + 3*channel_keys.EPOCH_LIFETIME + 1):
+            self.assertFalse(packets[0].Valid())
+            self.assertIsNone(channel_keys.decrypt(packets[0].KeyID, packets[0].Payload))
+            self.assertTrue(packets[2].Valid())
+            self.assertEqual(channel_keys.decrypt(packets[2].KeyID, packets[2].Payload), data)
+        packets[1].Payload += b'x'
+        self.assertFalse(packets[1].Valid())
+        self.assertEqual(channel_keys.split_key_id(packets[2].KeyID), (channel_id, 2))
+        self.assertEqual(channel_keys.split_key_id(my_id.getGlobalID(key_alias='master')), (None, None))
+        self.assertTrue(channel_keys.unregister_channel(channel_id))
+        self.assertFalse(packets[0].Valid())
+        self.assertIsNone(channel_keys.decrypt(packets[0].KeyID, packets[0].Payload))
+
+    def test_relay_out_channel_keys(self):
+        import base64
+        from bitdust.lib import serialization
+        from bitdust.transport.proxy import proxy_router
+        key.InitMyKey()
+        router = mock.Mock(channels={})
+        # router created a channel for my route, bob is pretending to be the router here
+        ack_payload = proxy_router.ProxyRouter._do_start_route_channel(router, my_id.getIDURL(), my_id.getLocalIdentity())
+        service_ack_info = serialization.BytesToDict(ack_payload, keys_to_text=True, values_to_text=True)
+        channel_id = service_ack_info['channel_id']
+        secret = key.DecryptLocalPrivateKey(base64.b64decode(service_ack_info['channel_key']))
+        channel_keys.register_channel(channel_id, self.bob_ident.getIDURL(), secret)
+        reverse_channel_id = channel_keys.make_reverse_channel_id(channel_id)
+        self.assertTrue(channel_keys.is_registered(reverse_channel_id))
+        self.assertEqual(channel_keys.get_channel(reverse_channel_id)['started'], router.channels[my_id.getIDURL().original()]['started'])
+        data = os.urandom(1024)
+        epoch = channel_keys.current_epoch(channel_keys.get_channel(channel_id)['started'])
+        _, auth_key = channel_keys.derive_keys(secret, epoch)
+        p1 = signed.Packet(
+            'RelayOut',
+            my_id.getIDURL(),
+            my_id.getIDURL(),
+            'SomeID',
+            channel_keys.encrypt(secret, epoch, data),
+            self.bob_ident.getIDURL(),
+            KeyID=channel_keys.make_key_id(reverse_channel_id, epoch),
+            AuthKey=auth_key,
+        )
+        p2 = signed.Unserialize(p1.Serialize())
+        self.assertTrue(p2.Valid())
+        self.assertEqual(proxy_router.ProxyRouter._do_read_relay_out_data(router, p2), data)
+        # packets routed to me with channel keys are not much bigger than the data itself
+        inbox_packet = signed.Packet('Data', self.bob_ident.getIDURL(), self.bob_ident.getIDURL(), 'SomeID', data, my_id.getIDURL())
+        with mock.patch.object(proxy_router.packet_out, 'create', lambda **kw: kw['route']['packet']):
+            _, routed_packet = proxy_router.ProxyRouter._do_send_relay_packet(router, 'Relay', inbox_packet, data, None, my_id.getIDURL())
+        self.assertTrue(channel_keys.is_channel_key_id(routed_packet.KeyID))
+        self.assertLess(len(routed_packet.Serialize()), len(data) + 1024)
+        p4 = signed.Unserialize(routed_packet.Serialize())
+        self.assertEqual(channel_keys.decrypt(p4.KeyID, p4.Payload), data)
+        # router's own channel can not be used to send RelayOut() packets to the router
+        p3 = signed.Packet(
+            'RelayOut',
+            my_id.getIDURL(),
+            my_id.getIDURL(),
+            'SomeID',
+            channel_keys.encrypt(secret, epoch, data),
+            self.bob_ident.getIDURL(),
+            KeyID=channel_keys.make_key_id(channel_id, epoch),
+            AuthKey=auth_key,
+        )
+        self.assertFalse(signed.Unserialize(p3.Serialize()).Valid())
+        proxy_router.ProxyRouter._do_forget_route_channel(router, my_id.getIDURL())
+        self.assertEqual(router.channels, {})
+        self.assertFalse(channel_keys.is_registered(reverse_channel_id))
+        self.assertFalse(p2.Valid())
+        channel_keys.unregister_channel(channel_id)
@@ -0,0 +1,99 @@
+from unittest import TestCase
+import os
+
+from twisted.internet.defer import Deferred
+
+from bitdust.logs import lg
+
+from bitdust.system import bpio
+from bitdust.system import local_fs
+
+from bitdust.lib import jsn
+from bitdust.lib import utime
+
+from bitdust.dht import dht_service
+
+_CacheDirPath = '/tmp/.bitdust_test_dht_cache'
+
+
+class TestDHTCache(TestCase):
+
+    def setUp(self):
+        lg.set_debug_level(0)
+        try:
+            bpio.rmdir_recursive(_CacheDirPath)
+        except Exception:
+            pass
+        os.makedirs(_CacheDirPath)
+        dht_service.drop_counters()
+        self.lookups = []
+        self._get_value = dht_service.get_value
+        dht_service.get_value = self._fake_get_value
+
+    def tearDown(self):
+        dht_service.get_value = self._get_value
+        dht_service.save_cache()
+        dht_service._Cache.clear()
+        dht_service._CacheDirPath = None
+        dht_service._CacheMaxRecords = dht_service.CACHE_MAX_RECORDS
+        dht_service._PendingLookups.clear()
+        bpio.rmdir_recursive(_CacheDirPath)
+
+    def _fake_get_value(self, key, layer_id=0, parallel_calls=None):
+        d = Deferred()
+        self.lookups.append((key, layer_id, d))
+        return d
+
+    def test_single_flight_lookup(self):
+        dht_service.load_cache(_CacheDirPath)
+        results = []
+        for _ in range(3):
+            dht_service.get_cached_json_value('abc', layer_id=2).addCallback(results.append)
+        self.assertEqual(len(self.lookups), 1)
+        self.lookups[0][2].callback({'values': [(jsn.dumps({'a': 1}), 123)]})
+        self.assertEqual(results, [{'a': 1}]*3)
+        results[0]['a'] = 2
+        self.assertEqual(results[1:], [{'a': 1}]*2)
+        self.assertIsNot(results[1], results[2])
+        self.assertEqual(dht_service.get_cached_value(dht_service.key_to_hash('abc'), layer_id=2)['v'], {'a': 1})
+        self.assertEqual(dht_service._PendingLookups, {})
+        dht_service.get_cached_json_value('abc', layer_id=2).addCallback(results.append)
+        self.assertEqual(len(self.lookups), 1)
+        self.assertEqual(len(results), 4)
+        failures = []
+        dht_service.get_json_value('xyz').addErrback(failures.append)
+        dht_service.get_json_value('xyz').addErrback(failures.append)
+        self.assertEqual(len(self.lookups), 2)
+        self.lookups[1][2].errback(Exception('lookup failed'))
+        self.assertEqual(len(failures), 2)
+        stats = dht_service.cache_stats()
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 3)
+        self.assertEqual(stats['coalesced'], 3)
+        self.assertEqual(stats['records'], {2: 1})
+
+    def test_lru_eviction_and_persistence(self):
+        dht_service.load_cache(_CacheDirPath, max_records=3)
+        for i in range(4):
+            dht_service.store_cached_key('k%d' % i, {'i': i}, layer_id=0)
+            if i == 2:
+                self.assertIsNotNone(dht_service.get_cached_value('k0'))
+        self.assertEqual(list(dht_service.cache()[0].keys()), ['k2', 'k0', 'k3'])
+        self.assertEqual(dht_service.counter('cache_evicted'), 1)
+        self.assertEqual(dht_service.save_cache(), 1)
+        self.assertTrue(os.path.isfile(os.path.join(_CacheDirPath, '0.json')))
+        dht_service._Cache.clear()
+        self.assertEqual(dht_service.load_cache(_CacheDirPath, max_records=2), 2)
+        self.assertEqual(list(dht_service.cache()[0].keys()), ['k0', 'k3'])
+
+    def test_legacy_cache_folder(self):
+        now = utime.utcnow_to_sec1970()
+        legacy_dir_path = os.path.join(_CacheDirPath, '3')
+        os.makedirs(legacy_dir_path)
+        local_fs.WriteTextFile(os.path.join(legacy_dir_path, 'new'), jsn.dumps({'v': {'a': 1}, 't': now}))
+        local_fs.WriteTextFile(os.path.join(legacy_dir_path, 'expired'), jsn.dumps({'v': {'a': 2}, 't': now - dht_service.KEY_EXPIRE_MAX_SECONDS - 1}))
+        self.assertEqual(dht_service.load_cache(_CacheDirPath), 1)
+        self.assertFalse(os.path.isdir(legacy_dir_path))
+        self.assertTrue(os.path.isfile(os.path.join(_CacheDirPath, '3.json')))
+        self.assertEqual(dht_service.get_cached_value('new', layer_id=3)['v'], {'a': 1})
+        self.assertIsNone(dht_service.get_cached_value('new', layer_id=0))
@@ -0,0 +1,74 @@
+from unittest import TestCase, mock
+import os
+import json
+import time
+import shutil
+import sqlite3
+import tempfile
+
+from bitdust_forks.entangled.kademlia import constants  # @UnresolvedImport
+from bitdust_forks.entangled.kademlia.node import MultiLayerNode  # @UnresolvedImport
+from bitdust_forks.entangled.kademlia.datastore import SQLiteVersionedJsonDataStore  # @UnresolvedImport
+
+
+class TestSQLiteDataStore(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp(prefix='test_dht_datastore_')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_upsert_and_expire(self):
+        ds = SQLiteVersionedJsonDataStore(dbFile=os.path.join(self.tmp_dir, 'db_0'))
+        ds.setItem('aa', 'value1', 100, 100, 'publisher', expireSeconds=50)
+        ds.setItem('aa', 'value2', 110, 100, 'publisher', expireSeconds=50)
+        ds.setItem('bb', 'value3', 100, 100, None, expireSeconds=500, revision=5)
+        self.assertEqual(ds['aa'], 'value2')
+        self.assertEqual(ds.revision('aa'), 2)
+        self.assertEqual(ds.revision('bb'), 5)
+        self.assertEqual(ds.lastPublished('aa'), 110)
+        self.assertEqual(sorted(ds.keys()), ['aa', 'bb'])
+        ds.setItems([
+            dict(key='cc', value='value4', lastPublished=100, originallyPublished=100, originalPublisherID=None, expireSeconds=50),
+            dict(key='dd', value='value5', lastPublished=100, originallyPublished=100, originalPublisherID=None, expireSeconds=50),
+        ])
+        self.assertEqual(ds.removeExpired(200, skipKeys=['dd']), 2)
+        self.assertEqual(sorted(ds.keys()), ['bb', 'dd'])
+        ds.removeItems(['bb', 'dd'])
+        self.assertEqual(ds.keys(), [])
+        self.assertIsNone(ds.getItem('bb'))
+
+    def test_migrate_legacy_schema(self):
+        db_path = os.path.join(self.tmp_dir, 'db_0')
+        db = sqlite3.connect(db_path)
+        db.execute('CREATE TABLE data(key, value, lastPublished, originallyPublished, originalPublisherID, expireSeconds, revision)')
+        for rev in (1, 2):
+            db.execute('INSERT INTO data VALUES (?, ?, ?, ?, ?, ?, ?)', ('aa', json.dumps({'k': 'aa', 'd': 'v%d' % rev, 'v': 1}), 100, 100, None, 50, rev))
+        db.commit()
+        db.close()
+        ds = SQLiteVersionedJsonDataStore(dbFile=db_path)
+        self.assertEqual(ds.keys(), ['aa'])
+        self.assertEqual(ds['aa'], 'v2')
+        self.assertEqual(ds.revision('aa'), 2)
+        self.assertFalse(ds.migrate())
+
+    def test_republish(self):
+        ds = SQLiteVersionedJsonDataStore(dbFile=os.path.join(self.tmp_dir, 'db_0'))
+        now = int(time.time())
+        old = now - constants.replicateInterval - 10
+        ds.setItem('aa', 'replicated', old, old, 'publisher', expireSeconds=500)
+        ds.setItem('bb', 'fresh', now, now, 'publisher', expireSeconds=500)
+        ds.setItem('cc', 'expired', old, now - constants.dataExpireTimeout - 10, 'publisher', expireSeconds=500)
+        fake_node = mock.Mock(_dataStores={0: ds}, layers={0: 'my_id'})
+        with mock.patch('twisted.internet.reactor.callFromThread') as call_from_thread:
+            MultiLayerNode._threadedRepublishData(fake_node, layerID=0)
+        self.assertEqual(call_from_thread.call_count, 1)
+        self.assertEqual(call_from_thread.call_args[1]['key'], 'aa')
+        self.assertEqual(sorted(ds.keys()), ['aa', 'bb'])
+        self.assertGreaterEqual(ds.lastPublished('aa'), now)
+        self.assertEqual(ds.originalPublishTime('aa'), old)
+        self.assertEqual(ds.revision('aa'), 1)
+        with mock.patch('twisted.internet.reactor.callFromThread') as call_from_thread:
+            MultiLayerNode._threadedRepublishData(fake_node, layerID=0)
+        self.assertEqual(call_from_thread.call_count, 0)
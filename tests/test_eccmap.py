@@ -0,0 +1,53 @@
+from unittest import TestCase
+
+from bitdust.raid import eccmap
+
+
+class TestFetchPlan(TestCase):
+
+    def _fixable(self, ecc_map, fetch_data, fetch_parity):
+        return ecc_map.Fixable(
+            [1 if i in fetch_data else 0 for i in range(ecc_map.datasegments)],
+            [1 if i in fetch_parity else 0 for i in range(ecc_map.paritysegments)],
+        )
+
+    def test_all_data_available(self):
+        for name in ('ecc/2x2', 'ecc/4x4', 'ecc/18x18'):
+            ecc_map = eccmap.eccmap(name)
+            D, P = ecc_map.datasegments, ecc_map.paritysegments
+            self.assertEqual(ecc_map.GetFetchPlan([0]*D, [0]*P, [1]*D, [1]*P), (list(range(D)), []))
+            self.assertEqual(ecc_map.GetFetchPlan([1]*D, [0]*P, [1]*D, [1]*P), ([], []))
+
+    def test_missing_data(self):
+        ecc_map = eccmap.eccmap('ecc/7x7')
+        available_data = [1]*7
+        available_data[1] = 0
+        fetch_data, fetch_parity = ecc_map.GetFetchPlan([0]*7, [0]*7, available_data, [1]*7)
+        self.assertEqual(fetch_data, [0, 2, 3, 4, 5, 6])
+        self.assertEqual(len(fetch_parity), 1)
+        self.assertIn(1, ecc_map.ParityToData[fetch_parity[0]])
+        self.assertTrue(self._fixable(ecc_map, fetch_data, fetch_parity))
+        # some Data already received and one Parity already requested
+        have_parity = [0]*7
+        have_parity[fetch_parity[0]] = 1
+        self.assertEqual(ecc_map.GetFetchPlan([1, 0, 1, 1, 1, 1, 1], have_parity, available_data, [1]*7), ([], []))
+
+    def test_not_fixable(self):
+        ecc_map = eccmap.eccmap('ecc/4x4')
+        fetch_data, fetch_parity = ecc_map.GetFetchPlan([0]*4, [0]*4, [0]*4, [1, 0, 0, 0])
+        self.assertEqual(fetch_data, [])
+        self.assertFalse(self._fixable(ecc_map, fetch_data, fetch_parity))
+        self.assertEqual(ecc_map.FixData([0, 1, 1, 1], [1, 0, 0, 0]), [0, 1, 1, 1])
+        self.assertEqual(ecc_map.FixData([0, 1, 1, 1], [0, 1, 0, 0]), [1, 1, 1, 1])
+
+
+class TestParityBigint(TestCase):
+
+    def test_parity_out_of_range(self):
+        from bitdust.raid import raidutils
+        ecc_map = eccmap.eccmap('ecc/4x4')
+        segments = dict((i, bytes([i + 1])*8) for i in range(4))
+        self.assertEqual(len(raidutils.build_parity_bigint(segments, 8, ecc_map)), 4)
+        ecc_map.DataToParity[0] = list(ecc_map.DataToParity[0]) + [ecc_map.paritysegments]
+        with self.assertRaisesRegex(Exception, 'eccmap error'):
+            raidutils.build_parity_bigint(segments, 8, ecc_map)
@@ -673,6 +673,40 @@ class TestIDURL(TestCase):
         self.assertEqual(id_url.field(hans2).original(), strng.to_bin(hans2))
         self.assertEqual(id_url.field(hans3).original(), strng.to_bin(hans3))
 
+    def test_startup_snapshot(self):
+        self._cache_identity('alice')
+        self._cache_identity('hans1')
+        self._cache_identity('hans2')
+        self._cache_identity('hans3')
+        history_dir = id_url._IdentityHistoryDir
+        known_state = (dict(id_url.known()), dict(id_url.merged()), dict(id_url.sources()), dict(id_url.unique_names()))
+        id_url.shutdown()
+        self.assertTrue(os.path.isfile(os.path.join(history_dir, 'snapshot.json')))
+        verified = []
+        original_valid = identity.identity.Valid
+
+        def _valid(id_obj):
+            verified.append(id_obj.getIDURL(as_original=True))
+            return original_valid(id_obj)
+
+        identity.identity.Valid = _valid
+        try:
+            id_url._IdentityHistoryDir = history_dir
+            id_url.init()
+            self.assertEqual(verified, [])
+            self.assertEqual((id_url.known(), id_url.merged(), id_url.sources(), id_url.unique_names()), known_state)
+            self.assertEqual(id_url.field(hans1).to_text(), hans3)
+            id_url.shutdown()
+            alice_dir = [d for d in os.listdir(history_dir) if d.startswith('alice@')][0]
+            alice_file_path = os.path.join(history_dir, alice_dir, '0')
+            os.utime(alice_file_path, ns=(0, 0))
+            id_url._IdentityHistoryDir = history_dir
+            id_url.init()
+            self.assertEqual(verified, [strng.to_bin(alice_text)])
+            self.assertEqual((id_url.known(), id_url.merged(), id_url.sources(), id_url.unique_names()), known_state)
+        finally:
+            identity.identity.Valid = original_valid
+
 
 if __name__ == '__main__':
     unittest.main()
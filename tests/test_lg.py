@@ -0,0 +1,110 @@
+import os
+import shutil
+import tempfile
+
+from unittest import TestCase
+
+from bitdust.logs import lg
+
+
+class TestAsyncWriter(TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp(prefix='test_lg_')
+        self.logfilename = os.path.join(self.tmpdir, 'stdout.log')
+        self.debug_level = lg.get_debug_level()
+        lg.set_debug_level(10)
+        lg.disable_output()
+        lg.open_log_file(self.logfilename)
+
+    def tearDown(self):
+        lg.close_log_file()
+        lg._LogFileName = None
+        lg.stdout_stop_redirecting()
+        lg.stderr_stop_redirecting()
+        lg._NoOutput = False
+        lg.set_debug_level(self.debug_level)
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def _read(self, filename):
+        with open(filename, 'r') as f:
+            return f.read().splitlines()
+
+    def test_batches(self):
+        self.assertTrue(lg.start_async_writer(buffer_size=1000, flush_interval=10.0))
+        self.assertFalse(lg.start_async_writer())
+        for i in range(100):
+            lg.out(4, 'line %d' % i)
+        lg.out(4, 'packet line', log_name='packet')
+        lg.out(20, 'not visible')
+        stats = lg.async_writer_stats()
+        self.assertTrue(stats['started'])
+        self.assertEqual(stats['dropped'], 0)
+        lg.close_log_file()
+        self.assertFalse(lg.is_async_writer_started())
+        lines = self._read(self.logfilename)
+        self.assertEqual(len(lines), 100)
+        for i in range(100):
+            self.assertTrue(lines[i].endswith('line %d' % i))
+        self.assertEqual(len(self._read(os.path.join(self.tmpdir, 'packet.log'))), 1)
+        self.assertGreaterEqual(lg.async_writer_stats()['written'], 101)
+
+    def test_overflow(self):
+        lg.start_async_writer(buffer_size=5, flush_interval=10.0)
+        # writer is not able to take records from the buffer while the lock is held
+        with lg._AsyncLock:
+            dropped = lg.async_writer_stats()['dropped']
+            for i in range(20):
+                lg.out(4, 'line %d' % i)
+            self.assertEqual(lg.async_writer_stats()['dropped'] - dropped, 15)
+        lg.stop_async_writer()
+        lines = self._read(self.logfilename)
+        self.assertEqual(len(lines), 6)
+        self.assertTrue(lines[4].endswith('line 4'))
+        self.assertIn('15 log records were dropped', lines[5])
+
+    def test_lazy_args(self):
+        lg.start_async_writer(buffer_size=1000, flush_interval=10.0)
+        formatted = []
+
+        class Lazy(object):
+
+            def __init__(self):
+                self.state = 'lazy'
+
+            def __repr__(self):
+                formatted.append(1)
+                return self.state
+
+        with lg._AsyncLock:
+            obj = Lazy()
+            lg.out(4, 'line %d %r', 1, obj)
+            lg.out(20, 'not visible %r', Lazy())
+            lg.warn('warning %s', 'abc')
+            lg.out(4, 'broken %d', 'abc')
+            # only the line which is going to be written is formatted, and right away
+            self.assertEqual(len(formatted), 1)
+            obj.state = 'changed'
+        lg.stop_async_writer()
+        self.assertEqual(len(formatted), 1)
+        lines = self._read(self.logfilename)
+        self.assertTrue(lines[0].endswith('line 1 lazy'))
+        self.assertIn('warning abc', lines[1])
+        self.assertTrue(lines[2].endswith("broken %d ('abc',)"))
+
+    def test_errors_are_written_immediately(self):
+        lg.start_async_writer(buffer_size=1000, flush_interval=10.0)
+        streamed = []
+        lg._WebStreamFunc = lambda level, s: streamed.append(s)
+        try:
+            lg.out(4, 'line 1')
+            lg.err('something failed')
+            lines = self._read(self.logfilename)
+            self.assertEqual(len(lines), 2)
+            self.assertIn('something failed', lines[1])
+            lg._LogsEnabled = False
+            lg.out(4, 'line 2')
+            self.assertEqual(len(streamed), 2)
+        finally:
+            lg._LogsEnabled = True
+            lg._WebStreamFunc = None
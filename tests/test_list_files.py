@@ -0,0 +1,79 @@
+from unittest import TestCase
+import os
+
+from bitdust.logs import lg
+
+from bitdust.system import bpio
+
+from bitdust.main import settings
+
+from bitdust.supplier import files_index
+from bitdust.supplier import list_files
+
+
+class TestFilesIndex(TestCase):
+
+    def setUp(self):
+        lg.set_debug_level(0)
+        try:
+            bpio.rmdir_recursive('/tmp/.bitdust_tmp')
+        except Exception:
+            pass
+        settings.init(base_dir='/tmp/.bitdust_tmp')
+        self.ownerdir = os.path.join(settings.getCustomersFilesDir(), 'alice@127.0.0.1_8084')
+        self._write('master/.index', 12)
+        self._write('master/1/2/F20200101010101AM/0-0-Data', 100)
+        self._write('master/1/2/F20200101010101AM/0-0-Parity', 100)
+        self._write('master/1/2/F20200101010101AM/2-0-Data', 50)
+        self._write('master/1/3/F20200202020202PM/0-0-Data', 10)
+        self._write('share_abc/1/F20200303030303AM/0-1-Data', 20)
+
+    def tearDown(self):
+        files_index.shutdown()
+        settings.shutdown()
+        bpio.rmdir_recursive('/tmp/.bitdust_tmp')
+
+    def _write(self, relpath, size):
+        filename = os.path.join(self.ownerdir, *relpath.split('/'))
+        if not os.path.isdir(os.path.dirname(filename)):
+            os.makedirs(os.path.dirname(filename))
+        bpio.WriteBinaryFile(filename, b'x'*size)
+        return filename
+
+    def _check_same_as_disk(self):
+        for key_alias in ('master', 'share_abc'):
+            from_index = list_files.IndexTreeSummary(self.ownerdir, key_alias, key_alias)
+            from_disk = list_files.TreeSummary(os.path.join(self.ownerdir, key_alias), key_alias)
+            self.assertEqual(sorted(from_index.splitlines()), sorted(from_disk.splitlines()))
+
+    def test_index_matches_disk(self):
+        self._check_same_as_disk()
+        summary = list_files.process_query_item('*', 'master', self.ownerdir).splitlines()
+        self.assertEqual(summary[:2], ['Q*', 'Kmaster'])
+        self.assertIn('Kshare_abc', summary)
+        self.assertIn('F.index 12', summary)
+        self.assertIn('V1/2/F20200101010101AM 0 0-2 250 missing Data:1 Parity:1,2', summary)
+        self.assertIn('F1/2 -1', summary)
+        self.assertIn('D1', summary)
+        self.assertEqual(
+            list_files.process_query_item('master/1/3', 'master', self.ownerdir),
+            'Qmaster/1/3\n' + list_files.TreeSummary(os.path.join(self.ownerdir, 'master', '1', '3'), 'master'),
+        )
+        self.assertEqual(list_files.process_query_item('master/9', 'master', self.ownerdir), '')
+
+    def test_incremental_updates(self):
+        revision = files_index.revision(self.ownerdir)
+        files_index.on_file_written(self._write('master/1/2/F20200101010101AM/1-0-Data', 70))
+        files_index.on_file_written(self._write('master/5/F20200404040404AM/0-0-Data', 30))
+        self._check_same_as_disk()
+        filename = os.path.join(self.ownerdir, 'master', '1', '3')
+        bpio._dir_remove(filename)
+        files_index.on_path_removed(filename)
+        self._check_same_as_disk()
+        self.assertEqual(files_index.revision(self.ownerdir), revision + 3)
+        self.assertEqual(files_index.flush(), 1)
+        files_index._Indexes.clear()
+        os.remove(os.path.join(self.ownerdir, 'master', '1', '2', 'F20200101010101AM', '0-0-Parity'))
+        self._write('share_abc/1/F20200303030303AM/1-1-Data', 20)
+        self._check_same_as_disk()
+        self.assertEqual(files_index.revision(self.ownerdir), revision + 4)
@@ -0,0 +1,77 @@
+from unittest import TestCase, mock
+import zlib
+
+from bitdust.logs import lg
+
+from bitdust.system import bpio
+
+from bitdust.main import settings
+
+from bitdust.customer import list_files_orator
+
+from bitdust.storage import backup_control
+
+
+class FakePacket(object):
+
+    def __init__(self, packet_id):
+        self.PacketID = packet_id
+        self.OwnerID = 'http://127.0.0.1:8084/bob.xml'
+        self.Payload = b''
+
+
+class FakeBlock(object):
+
+    def Data(self):
+        return zlib.compress(b'listing')
+
+
+class TestListFilesOrator(TestCase):
+
+    def setUp(self):
+        lg.set_debug_level(0)
+        try:
+            bpio.rmdir_recursive('/tmp/.bitdust_tmp')
+        except Exception:
+            pass
+        settings.init(base_dir='/tmp/.bitdust_tmp')
+        self.orator = list_files_orator.A('init')
+        self.orator.state = 'REMOTE_FILES'
+        self.orator.requested_lf_packet_ids = set(['lf1', 'lf2'])
+        self.orator.received_lf_counter = 0
+        self.sent = []
+
+    def tearDown(self):
+        list_files_orator.Destroy()
+        settings.shutdown()
+        bpio.rmdir_recursive('/tmp/.bitdust_tmp')
+
+    def _send_list_files(self, target_supplier, customer_idurl, revision, timeout):
+        self.sent.append(revision)
+        return FakePacket('lf%d' % (len(self.sent) + 2))
+
+    def test_rejected_delta(self):
+        list_files_global_id = {
+            'idurl': 'http://127.0.0.1:8084/alice.xml',
+            'key_id': 'master$alice@127.0.0.1_8084',
+        }
+        with mock.patch.object(backup_control.contactsdb, 'supplier_position', lambda *a, **kw: 0), \
+             mock.patch.object(backup_control.my_keys, 'is_key_private', lambda *a: True), \
+             mock.patch.object(backup_control.encrypted, 'Unserialize', lambda *a, **kw: FakeBlock()), \
+             mock.patch.object(backup_control.backup_matrix, 'LoadLatestRawListFiles', lambda *a: ''), \
+             mock.patch.object(backup_control.backup_matrix, 'process_raw_list_files_delta', lambda **kw: None), \
+             mock.patch.object(backup_control.backup_matrix, 'process_raw_list_files', lambda **kw: (False, [], [], [])), \
+             mock.patch.object(backup_control.backup_matrix, 'GetLatestListFilesRevision', lambda *a: 5), \
+             mock.patch.object(backup_control.backup_matrix, 'SetRemoteListFilesRevision', lambda *a, **kw: None), \
+             mock.patch.object(list_files_orator.p2p_service, 'SendListFiles', self._send_list_files):
+            # only changes were sent by supplier, but they do not match with the local copy of the listing
+            with mock.patch.object(backup_control.backup_matrix, 'ReadListFilesRevision', lambda *a: (5, 4)):
+                self.assertFalse(backup_control.IncomingSupplierListFiles(FakePacket('lf1'), list_files_global_id))
+            self.assertEqual(self.sent, [''])
+            self.assertEqual(self.orator.requested_lf_packet_ids, set(['lf2', 'lf3']))
+            self.assertEqual(self.orator.received_lf_counter, 0)
+            # full listing is received as an answer to the new request and accepted
+            with mock.patch.object(backup_control.backup_matrix, 'ReadListFilesRevision', lambda *a: (5, None)):
+                self.assertTrue(backup_control.IncomingSupplierListFiles(FakePacket('lf3'), list_files_global_id))
+        self.assertEqual(self.orator.requested_lf_packet_ids, set(['lf2']))
+        self.assertEqual(self.orator.received_lf_counter, 1)
@@ -0,0 +1,156 @@
+from unittest import TestCase, mock
+import sqlite3
+import os
+
+from bitdust.logs import lg
+
+from bitdust.system import bpio
+
+from bitdust.main import listeners
+
+from bitdust.crypt import my_keys
+
+from bitdust.chat import message_database
+
+_DBPath = '/tmp/.bitdust_test_message_database/chat.db'
+
+_LocalKeyIDs = {
+    'master$alice@127.0.0.1_8084': 1,
+    'master$bob@127.0.0.1_8084': 2,
+}
+
+
+class TestMessageDatabase(TestCase):
+
+    def setUp(self):
+        lg.set_debug_level(0)
+        try:
+            bpio.rmdir_recursive(os.path.dirname(_DBPath))
+        except Exception:
+            pass
+        os.makedirs(os.path.dirname(_DBPath))
+        self.snapshots = []
+        self._get_local_key_id = my_keys.get_local_key_id
+        self._get_local_key = my_keys.get_local_key
+        self._push_snapshot = listeners.push_snapshot
+        my_keys.get_local_key_id = _LocalKeyIDs.get
+        my_keys.get_local_key = {v: k for k, v in _LocalKeyIDs.items()}.get
+        listeners.push_snapshot = lambda model_name, snap_id=None, **kwargs: self.snapshots.append((model_name, snap_id))
+        message_database.init(filepath=_DBPath)
+
+    def tearDown(self):
+        message_database.shutdown()
+        my_keys.get_local_key_id = self._get_local_key_id
+        my_keys.get_local_key = self._get_local_key
+        listeners.push_snapshot = self._push_snapshot
+        bpio.rmdir_recursive(os.path.dirname(_DBPath))
+
+    def _insert(self, message_id, message_time, sender, recipient):
+        return message_database.insert_message(
+            data={'text': message_id},
+            message_id=message_id,
+            message_time=message_time,
+            sender=sender,
+            recipient=recipient,
+            message_type='private_message',
+            direction='out',
+        )
+
+    def test_write_behind(self):
+        self.assertEqual(list(message_database.db().execute('PRAGMA journal_mode'))[0][0], 'wal')
+        alice = 'master$alice@127.0.0.1_8084'
+        bob = 'master$bob@127.0.0.1_8084'
+        self._insert('m1', 100, alice, bob)
+        self._insert('m2', 101, bob, alice)
+        self._insert('m3', 102, alice, bob)
+        self.assertEqual(self.snapshots, [
+            ('conversation', '1&2'),
+            ('message', '1&2/m1'),
+            ('message', '1&2/m2'),
+            ('message', '1&2/m3'),
+        ])
+        self.assertEqual(len(message_database._PendingMessages), 3)
+        self.assertEqual(list(message_database.db().execute('SELECT count(*) FROM history'))[0][0], 0)
+        messages = message_database.query_messages(sender_id=alice, recipient_id=bob)
+        self.assertEqual([m['payload']['message_id'] for m in messages], ['m3', 'm2', 'm1'])
+        self.assertEqual(message_database._PendingMessages, [])
+        self.assertEqual(message_database.flush(), 0)
+        self._insert('m4', 103, bob, alice)
+        self.assertEqual(message_database.flush(), 1)
+        self.assertEqual(message_database.list_conversations(), [{
+            'conversation_id': '1&2',
+            'type': 'private_message',
+            'started': 100,
+            'last_updated': 103,
+            'last_message_id': 'm4',
+        }])
+        self.assertEqual(len(self.snapshots), 5)
+
+    def test_flush_failed_row(self):
+        alice = 'master$alice@127.0.0.1_8084'
+        bob = 'master$bob@127.0.0.1_8084'
+        self._insert('m1', 100, alice, bob)
+        # broken row makes the whole transaction fail
+        message_database._PendingMessages.append((1, 2, 3))
+        self._insert('m2', 101, bob, alice)
+        self.assertEqual(message_database.flush(), 2)
+        self.assertEqual(message_database._PendingMessages, [])
+        self.assertEqual(list(message_database.db().execute('SELECT count(*) FROM history'))[0][0], 2)
+        self.assertEqual(message_database.list_conversations()[0]['last_message_id'], 'm2')
+
+    def test_flush_retry_locked(self):
+        alice = 'master$alice@127.0.0.1_8084'
+        bob = 'master$bob@127.0.0.1_8084'
+        self._insert('m1', 100, alice, bob)
+        delays = []
+        locked_cursor = mock.Mock()
+        locked_cursor.executemany.side_effect = sqlite3.OperationalError('database is locked')
+        locked_cursor.execute.side_effect = sqlite3.OperationalError('database is locked')
+        with mock.patch.object(message_database, 'cur', lambda *a: locked_cursor), \
+             mock.patch.object(message_database, '_schedule_flush', lambda delay=0: delays.append(delay)):
+            for _ in range(message_database.FLUSH_RETRY_MAX_ATTEMPTS):
+                self.assertEqual(message_database.flush(), 0)
+        # retried with an increasing delay and dropped after the last attempt
+        self.assertEqual(len(delays), message_database.FLUSH_RETRY_MAX_ATTEMPTS - 1)
+        self.assertEqual(delays, sorted(delays))
+        self.assertLess(delays[0], delays[-1])
+        self.assertEqual(message_database._PendingMessages, [])
+        self.assertEqual(len(message_database._PendingConversations), 0)
+        self.assertEqual(message_database._FlushRetryAttempts, 0)
+
+    def test_flush_no_retry_other_errors(self):
+        alice = 'master$alice@127.0.0.1_8084'
+        bob = 'master$bob@127.0.0.1_8084'
+        self._insert('m1', 100, alice, bob)
+        delays = []
+        broken_cursor = mock.Mock()
+        broken_cursor.executemany.side_effect = sqlite3.OperationalError('no such table: history')
+        broken_cursor.execute.side_effect = sqlite3.OperationalError('no such table: history')
+        with mock.patch.object(message_database, 'cur', lambda *a: broken_cursor), \
+             mock.patch.object(message_database, '_schedule_flush', lambda delay=0: delays.append(delay)):
+            self.assertEqual(message_database.flush(), 0)
+        self.assertEqual(delays, [])
+        self.assertEqual(message_database._PendingMessages, [])
+
+    def test_flush_new_conversation_exists(self):
+        alice = 'master$alice@127.0.0.1_8084'
+        bob = 'master$bob@127.0.0.1_8084'
+        self._insert('m1', 100, alice, bob)
+        self.assertEqual(message_database.flush(), 1)
+        conversation_id = message_database.list_conversations()[0]['conversation_id']
+        # conversation is queued as a new one again, but the row was already created
+        self._insert('m2', 101, bob, alice)
+        message_database._PendingConversations[conversation_id]['new'] = True
+        real_cursor = message_database.cur()
+
+        def _execute(sql, params=()):
+            if sql.startswith('INSERT INTO conversations'):
+                raise sqlite3.IntegrityError('UNIQUE constraint failed: conversations.conversation_id')
+            return real_cursor.execute(sql, params)
+
+        cursor = mock.Mock(wraps=real_cursor)
+        cursor.execute.side_effect = _execute
+        with mock.patch.object(message_database, 'cur', lambda *a: cursor):
+            self.assertEqual(message_database.flush(), 1)
+        self.assertEqual(len(message_database.list_conversations()), 1)
+        self.assertEqual(message_database.list_conversations()[0]['last_message_id'], 'm2')
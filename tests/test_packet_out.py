@@ -0,0 +1,75 @@
+from unittest import TestCase
+
+from bitdust.logs import lg
+
+from bitdust.transport import packet_out
+
+
+class FakeOutPacket(object):
+
+    def __init__(self, command, packet_id):
+        self.Command = command
+        self.PacketID = packet_id
+
+
+class FakePacketOut(object):
+
+    def __init__(self, command, packet_id, remote_idurl, filename):
+        self.outpacket = FakeOutPacket(command, packet_id)
+        self.remote_idurl = remote_idurl
+        self.filename = filename
+        self.items = []
+        self.results = []
+
+
+class TestPacketOutIndexes(TestCase):
+
+    def setUp(self):
+        lg.set_debug_level(0)
+
+    def _add(self, p):
+        packet_out.queue().append(p)
+        packet_out._index_packet(p)
+        packet_out._PacketsByFilename[p.filename] = p
+
+    def _remove(self, p):
+        packet_out.queue().remove(p)
+        packet_out._unindex_packet(p)
+
+    def test_indexes(self):
+        alice = b'http://127.0.0.1:8084/alice.xml'
+        bob = b'http://127.0.0.1:8084/bob.xml'
+        p1 = FakePacketOut('Data', 'Abc:123', alice, 'memory://outbox/1.out')
+        p2 = FakePacketOut('Retrieve', 'abc:123', bob, 'memory://outbox/2.out')
+        p3 = FakePacketOut('Data', 'xyz:456', alice, 'memory://outbox/3.out')
+        for p in (p1, p2, p3):
+            self._add(p)
+        p1.items.append(packet_out.WorkItem('tcp', '127.0.0.1:7771', 100))
+        p1.items[0].transfer_id = 1001
+        packet_out._PacketsByTransferID[1001] = p1
+        try:
+            self.assertEqual(packet_out.search_by_packet_id('abc:123'), [p2])
+            self.assertEqual(packet_out.search_by_packet_id('Abc:123'), [p1])
+            self.assertEqual(packet_out.search_by_packet_id('bc:123'), [])
+            self.assertEqual(packet_out.search_by_packet_id('xyz'), [])
+            self.assertEqual(packet_out.search_by_packet_id('xyz:456'), [p3])
+            self.assertEqual(packet_out.search_by_packet_id('XYZ'), [])
+            self.assertEqual(packet_out.search_by_transfer_id(1001), (p1, p1.items[0]))
+            self.assertEqual(packet_out.search_by_transfer_id(1002), (None, None))
+            self.assertEqual(packet_out.search('tcp', '127.0.0.1:7771', 'memory://outbox/1.out'), (p1, p1.items[0]))
+            self.assertEqual(packet_out.search('udp', '127.0.0.1:7771', 'memory://outbox/1.out'), (None, None))
+            self.assertEqual(packet_out.search_many(packet_id='Abc:123'), [(p1, p1.items[0])])
+            self.assertEqual(packet_out.search_many(remote_idurl=alice, proto='tcp'), [(p1, p1.items[0])])
+            self._remove(p1)
+            self.assertEqual(packet_out.search_by_packet_id('Abc:123'), [])
+            self.assertEqual(packet_out.search_by_packet_id('abc:123'), [p2])
+            self.assertEqual(packet_out.search_by_transfer_id(1001), (None, None))
+            self.assertEqual(packet_out.search('tcp', '127.0.0.1:7771', 'memory://outbox/1.out'), (None, None))
+        finally:
+            for p in (p1, p2, p3):
+                if p in packet_out.queue():
+                    self._remove(p)
+        self.assertEqual(packet_out.search_by_packet_id('abc:123'), [])
+        self.assertEqual(packet_out.search_by_packet_id('xyz:456'), [])
+        self.assertEqual(packet_out.search_many(remote_idurl=alice, proto='tcp'), [])
+        self.assertEqual(packet_out.search_many(packet_id='abc:123'), [])
@@ -0,0 +1,120 @@
+import time
+import random
+
+from twisted.trial.unittest import TestCase
+from twisted.internet import reactor  # @UnresolvedImport
+from twisted.internet.defer import Deferred
+
+from bitdust.logs import lg
+
+from bitdust.transport import packet_verifier
+
+
+class FakeInfo(object):
+
+    proto = 'tcp'
+    host = '127.0.0.1:7771'
+
+
+class FakePacket(object):
+
+    def __init__(self, number, valid):
+        self.number = number
+        self.valid = valid
+
+    def Valid(self, raise_signature_invalid=False):
+        time.sleep(random.random()*0.005)
+        if self.valid is None:
+            raise Exception('broken packet')
+        return self.valid
+
+
+class TestPacketVerifier(TestCase):
+
+    def setUp(self):
+        lg.set_debug_level(0)
+        packet_verifier.init()
+        # only TCP transport is able to pause receiving
+        self.can_pause = packet_verifier._can_pause
+        packet_verifier._can_pause = lambda proto: proto == 'tcp'
+
+    def tearDown(self):
+        packet_verifier._can_pause = self.can_pause
+        packet_verifier.shutdown()
+
+    def test_results_in_arrival_order(self):
+        test_done = Deferred()
+        total = 100
+        received = []
+
+        def _on_verified(newpacket, info, is_valid):
+            received.append((newpacket.number, is_valid))
+            if len(received) == total:
+                self.assertEqual([n for n, _ in received], list(range(total)))
+                for n, is_valid in received:
+                    self.assertEqual(is_valid, n % 3 == 0)
+                stats = packet_verifier.get_stats()
+                self.assertEqual(stats['queue_size'], 0)
+                self.assertGreater(stats['batches'], 1)
+                test_done.callback(True)
+
+        for n in range(total):
+            valid = (n % 3 == 0) or (None if n % 3 == 1 else False)
+            self.assertTrue(packet_verifier.verify(FakePacket(n, valid), FakeInfo(), _on_verified))
+        return test_done
+
+    def test_queue_is_bounded(self):
+        test_done = Deferred()
+        old_limits = (packet_verifier._MaxQueueSize, packet_verifier._HighWatermark, packet_verifier._LowWatermark)
+        packet_verifier._MaxQueueSize, packet_verifier._HighWatermark, packet_verifier._LowWatermark = 10, 8, 2
+        received = []
+
+        def _check_recovered():
+            self.assertFalse(packet_verifier.is_overloaded())
+            packet_verifier._MaxQueueSize, packet_verifier._HighWatermark, packet_verifier._LowWatermark = old_limits
+            test_done.callback(True)
+
+        def _on_verified(newpacket, info, is_valid):
+            received.append(newpacket.number)
+            if len(received) == 10:
+                reactor.callLater(0, _check_recovered)  # @UndefinedVariable
+
+        for n in range(15):
+            accepted = packet_verifier.verify(FakePacket(n, True), FakeInfo(), _on_verified)
+            self.assertEqual(accepted, n < 10)
+        self.assertTrue(packet_verifier.is_overloaded())
+        self.assertEqual(packet_verifier.get_stats()['rejected'], 5)
+        return test_done
+
+    def test_shed_when_not_able_to_pause(self):
+        test_done = Deferred()
+        old_limits = (packet_verifier._MaxQueueSize, packet_verifier._HighWatermark, packet_verifier._LowWatermark)
+        packet_verifier._MaxQueueSize, packet_verifier._HighWatermark, packet_verifier._LowWatermark = 10, 4, 2
+        udp_info = FakeInfo()
+        udp_info.proto = 'udp'
+        received = []
+
+        def _on_verified(newpacket, info, is_valid):
+            received.append(newpacket.number)
+            if len(received) == 8:
+                packet_verifier._MaxQueueSize, packet_verifier._HighWatermark, packet_verifier._LowWatermark = old_limits
+                test_done.callback(True)
+
+        shed = packet_verifier.get_stats()['shed']
+        for n in range(4):
+            self.assertTrue(packet_verifier.verify(FakePacket(n, True), udp_info, _on_verified))
+        self.assertTrue(packet_verifier.is_overloaded())
+        # UDP packets are dropped right away, but TCP connections are paused and can still deliver data
+        self.assertFalse(packet_verifier.verify(FakePacket(100, True), udp_info, _on_verified))
+        for n in range(4, 8):
+            self.assertTrue(packet_verifier.verify(FakePacket(n, True), FakeInfo(), _on_verified))
+        self.assertEqual(packet_verifier.get_stats()['shed'] - shed, 1)
+        return test_done
+
+    def test_tcp_paused_for_new_connections(self):
+        from bitdust.transport.tcp import tcp_node
+        self.assertFalse(tcp_node.is_receiving_paused())
+        tcp_node.pause_receiving()
+        self.assertTrue(tcp_node.is_receiving_paused())
+        tcp_node.resume_receiving()
+        self.assertFalse(tcp_node.is_receiving_paused())
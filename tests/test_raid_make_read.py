@@ -1,8 +1,12 @@
 from unittest import TestCase
+import os
 import time
 
 import subprocess
 
+from bitdust.raid import make
+from bitdust.raid import read
+
 
 class TestMakeRead(TestCase):
 
@@ -62,3 +66,58 @@ class TestMakeRead(TestCase):
 
     def test_small_file(self):
         self._test_file('bitdust.png')
+
+    def test_parity_engines_identical(self):
+        source_data = os.urandom(100003)
+        for ecc_map in ('ecc/4x4', 'ecc/7x7', 'ecc/18x18', ):
+            results = {}
+            for engine in ('array', 'bigint', ):
+                source_path = '%s/source_%s' % (self.dir_to_test, engine)
+                target_dir = '%s/%s/%s' % (self.dir_to_test, ecc_map.replace('/', '_'), engine)
+                with open(source_path, 'wb') as f:
+                    f.write(source_data)
+                make.do_in_memory(source_path, ecc_map, 'F1', 1, target_dir, engine=engine)
+                results[engine] = {}
+                for filename in os.listdir(target_dir):
+                    with open(os.path.join(target_dir, filename), 'rb') as f:
+                        results[engine][filename] = f.read()
+            self.assertTrue(results['bigint'])
+            self.assertEqual(results['array'], results['bigint'])
+
+    def test_rebuild_one(self):
+        segments = [os.urandom(5000) for _ in range(3)]
+        # other segments can be longer, only the length of the first one is used
+        segments.append(os.urandom(5100))
+        inlist = []
+        for i, segment in enumerate(segments):
+            inlist.append('%s/%d-Data' % (self.dir_to_test, i))
+            with open(inlist[-1], 'wb') as f:
+                f.write(segment)
+        # same result as the old implementation produced XOR-ing one byte at a time
+        expected = bytearray(len(segments[0]))
+        for i in range(len(expected)):
+            for segment in segments:
+                expected[i] ^= segment[i]
+        outfilename = '%s/rebuilt' % self.dir_to_test
+        progress = []
+        _chunk_size = read._RebuildChunkSize
+        read._RebuildChunkSize = 1024
+        try:
+            self.assertTrue(read.RebuildOne(inlist, len(inlist), outfilename, threshold_control=lambda size: progress.append(size) or True))
+        finally:
+            read._RebuildChunkSize = _chunk_size
+        with open(outfilename, 'rb') as f:
+            self.assertEqual(f.read(), bytes(expected))
+        self.assertEqual(progress, [1024, 1024, 1024, 1024, 904])
+
+    def test_make_from_memory(self):
+        source_data = os.urandom(100003)
+        source_path = '%s/source' % self.dir_to_test
+        with open(source_path, 'wb') as f:
+            f.write(source_data)
+        self.assertEqual(make.do_in_memory(source_path, 'ecc/7x7', 'F1', 1, '%s/file' % self.dir_to_test), (7, 7))
+        self.assertEqual(make.do_in_memory_data('F1/1', source_data, 'ecc/7x7', 'F1', 1, '%s/memory' % self.dir_to_test), (7, 7))
+        for filename in os.listdir('%s/file' % self.dir_to_test):
+            with open('%s/file/%s' % (self.dir_to_test, filename), 'rb') as f1:
+                with open('%s/memory/%s' % (self.dir_to_test, filename), 'rb') as f2:
+                    self.assertEqual(f1.read(), f2.read())
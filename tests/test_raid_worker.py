@@ -348,7 +348,8 @@ class TestRaidWorker(TestCase):
         os.system('rm -rf /tmp/destination.txt')
         os.system('rm -rf /tmp/raidtest')
         os.system("mkdir -p '/tmp/raidtest/master$alice@somehost.com/0/F12345678'")
-        open('/tmp/source1.txt', 'w').write(base64.b64encode(os.urandom(1000000)).decode())
+        # source file must be big enough to keep the parity engine busy when the task is cancelled
+        open('/tmp/source1.txt', 'w').write(base64.b64encode(os.urandom(20000000)).decode())
         reactor.callWhenRunning(raid_worker.A, 'init')  # @UndefinedVariable
 
         def _task_failed(c, t, r):
@@ -377,3 +378,47 @@ class TestRaidWorker(TestCase):
         reactor.callLater(0.55, raid_worker.cancel_task, 'make', '/tmp/source1.txt')  # @UndefinedVariable
 
         return test_result
+
+    def test_process_pool_many_tasks(self):
+        test_result = Deferred()
+        os.system('rm -rf /tmp/raidtest')
+        os.system("mkdir -p '/tmp/raidtest/master$alice@somehost.com/0/F12345678'")
+        for block_num in range(5):
+            with open('/tmp/source2_%d.txt' % block_num, 'w') as f:
+                f.write(base64.b64encode(os.urandom(100000)).decode())
+        reactor.callWhenRunning(raid_worker.A, 'init')  # @UndefinedVariable
+        results = {}
+
+        def _task_done(c, t, r):
+            results[t[3]] = r
+            if len(results) < 5:
+                return
+            stats = raid_worker.get_stats()
+            os.system('rm -rf /tmp/source2_*.txt')
+            os.system('rm -rf /tmp/raidtest')
+            reactor.callLater(0, raid_worker.A, 'shutdown')  # @UndefinedVariable
+            if stats['processor'] != 'ProcessRaidProcessor':
+                reactor.callLater(0.1, test_result.errback, Exception('expect tasks to be executed in child processes, but %r was used' % stats['processor']))  # @UndefinedVariable
+            elif stats['tasks_done'] != 5 or stats['queue_depth'] != 0:
+                reactor.callLater(0.1, test_result.errback, Exception('wrong stats: %r' % stats))  # @UndefinedVariable
+            elif list(results.values()) != [(64, 64)]*5:
+                reactor.callLater(0.1, test_result.errback, Exception('wrong results: %r' % results))  # @UndefinedVariable
+            else:
+                reactor.callLater(0.1, test_result.callback, True)  # @UndefinedVariable
+
+        for block_num in range(5):
+            reactor.callLater(  # @UndefinedVariable
+                0.5,
+                raid_worker.add_task,
+                'make',
+                (
+                    '/tmp/source2_%d.txt' % block_num,
+                    'ecc/64x64',
+                    'F12345678',
+                    str(block_num),
+                    '/tmp/raidtest/master$alice@somehost.com/0/F12345678',
+                ),
+                _task_done,
+            )
+
+        return test_result
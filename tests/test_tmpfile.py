@@ -0,0 +1,52 @@
+from unittest import TestCase
+import os
+
+from bitdust.system import bpio
+from bitdust.system import tmpfile
+
+
+class Test(TestCase):
+
+    def setUp(self):
+        try:
+            bpio.rmdir_recursive('/tmp/.bitdust_tmp_files')
+        except Exception:
+            pass
+        os.makedirs('/tmp/.bitdust_tmp_files')
+        tmpfile.init(temp_dir_path='/tmp/.bitdust_tmp_files')
+
+    def tearDown(self):
+        tmpfile.shutdown()
+        tmpfile._TempDirPath = None
+        bpio.rmdir_recursive('/tmp/.bitdust_tmp_files')
+
+    def test_memory_buffer(self):
+        data = os.urandom(1000)
+        filename = tmpfile.make_buffer('outbox', data, extension='.out')
+        self.assertTrue(tmpfile.is_buffer(filename))
+        self.assertFalse(os.path.exists(filename))
+        self.assertEqual(tmpfile.file_size(filename), 1000)
+        self.assertEqual(tmpfile.open_file(filename).read(), data)
+        fd, real_filename = tmpfile.make('outbox', extension='.out')
+        os.write(fd, data)
+        os.close(fd)
+        self.assertFalse(tmpfile.is_buffer(real_filename))
+        self.assertEqual(tmpfile.file_size(real_filename), 1000)
+        with tmpfile.open_file(real_filename) as f:
+            self.assertEqual(f.read(), data)
+        tmpfile.throw_out(filename, 'test')
+        tmpfile.throw_out(real_filename, 'test')
+        self.assertFalse(tmpfile.is_buffer(filename))
+        self.assertEqual(tmpfile.file_size(filename), -1)
+        self.assertEqual(tmpfile.file_size(real_filename), -1)
+        self.assertEqual(tmpfile.buffers_size(), 0)
+
+    def test_growing_memory_buffer(self):
+        buf = bytearray()
+        filename = tmpfile.make_buffer('tcp-in', buf, extension='.tcp')
+        buf.extend(b'abc')
+        buf.extend(b'def')
+        self.assertEqual(tmpfile.file_size(filename), 6)
+        self.assertEqual(tmpfile.read_file(filename), b'abcdef')
+        tmpfile.throw_out(filename, 'test')
+        self.assertFalse(tmpfile.is_buffer(filename))